@@ -6,6 +6,7 @@ from ninja import NinjaAPI
 from ninja.security import HttpBearer
 from django.http import HttpRequest
 from apps.users.models import User
+from .timing import TimedJSONRenderer
 
 class AuthBearer(HttpBearer):
     """
@@ -30,6 +31,7 @@ api = NinjaAPI(
     description="Full-stack RBAC system with Django Ninja and Next.js",
     docs_url="/docs",
     csrf=False,  # Disable CSRF for API (use proper auth instead)
+    renderer=TimedJSONRenderer(),
 )
 
 
@@ -44,6 +46,29 @@ def health_check(request):
     }
 
 
+# Prometheus metrics
+@api.get("/metrics", tags=["System"], auth=None, include_in_schema=False)
+def prometheus_metrics(request):
+    """Prometheus text exposition (latency per route, DB queries, cache, outbound calls, orders)"""
+    import hmac
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseNotFound
+    from . import metrics
+
+    if not settings.METRICS_ENABLED:
+        return HttpResponseNotFound()
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        # Không có token: chỉ mở khi DEBUG, production phải đặt METRICS_TOKEN
+        return HttpResponseNotFound()
+
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
+
+
 # Import and register routers
 from apps.rbac.api import router as rbac_router
 from apps.users.api import router as users_router
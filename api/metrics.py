@@ -0,0 +1,99 @@
+"""
+Prometheus metrics
+
+Recorded with prometheus_client and served at /api/metrics. Under gunicorn,
+set PROMETHEUS_MULTIPROC_DIR (see config/gunicorn.conf.py) before the workers
+start: each worker then writes its samples to mmap files in that directory
+and a scrape of any worker aggregates all of them. Without it the
+process-local registry is served (runserver, management commands).
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Route label for requests that matched no URL pattern (keeps label cardinality bounded)
+UNMATCHED_ROUTE = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter(
+    'http_requests', 'Requests by response status',
+    ['method', 'route', 'status']
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements per request',
+    ['method', 'route'], buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_LATENCY = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL per request',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups', 'Cache lookups by cache and result (hit / miss)',
+    ['cache', 'result']
+)
+OUTBOUND_LATENCY = Histogram(
+    'outbound_request_duration_seconds', 'Calls to external services (SMTP, SePay)',
+    ['service', 'operation', 'outcome'], buckets=LATENCY_BUCKETS
+)
+ORDERS_CREATED = Counter('orders_created', 'Orders created')
+ORDERS_WEIGHED = Counter('orders_weighed', 'Orders marked as weighed')
+ORDERS_PAID = Counter('orders_paid', 'Orders marked as paid', ['source'])
+
+
+def route_of(request) -> str:
+    """URL pattern of the request, e.g. /api/seafood/orders/<uuid:order_id>"""
+    match = getattr(request, 'resolver_match', None)
+    return f'/{match.route}' if match is not None else UNMATCHED_ROUTE
+
+
+def observe_request(request, response, timing) -> None:
+    """Record one finished request (timing: api.timing.RequestTiming)"""
+    method = request.method
+    route = route_of(request)
+    REQUEST_LATENCY.labels(method, route).observe(timing.total)
+    REQUEST_QUERIES.labels(method, route).observe(timing.queries.count)
+    REQUEST_DB_LATENCY.labels(method, route).observe(timing.queries.duration)
+    REQUESTS.labels(method, route, str(response.status_code)).inc()
+
+
+def cache_lookup(cache_name: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def outbound(service: str, operation: str):
+    """Time a call to an external service; outcome is 'error' if the block raises"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        OUTBOUND_LATENCY.labels(service, operation, outcome).observe(time.perf_counter() - start)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition text of all metrics (every worker's in multi-process mode)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,38 +1,136 @@
 """
 Custom middleware
 """
-import time
+import math
 import logging
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from . import metrics
+from .ratelimit import RateLimiter
+from .timing import RequestTiming
+
 logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger('api.slow_requests')
 
 
-class RequestLoggingMiddleware(MiddlewareMixin):
+class RequestTimingMiddleware:
     """
-    Log all API requests with timing
+    Per-request DB and serialization timing
+
+    Counts and times every SQL statement of the request through
+    connection.execute_wrapper (works with DEBUG off), then:
+    - adds a Server-Timing header (db, serialize, app) when
+      REQUEST_TIMING_HEADER is on;
+    - logs one JSON line to the 'api.slow_requests' logger for requests
+      slower than REQUEST_TIMING_SLOW_MS, with the slowest and the most
+      repeated statements (REQUEST_TIMING_TOP_QUERIES of each);
+    - records latency / query count per route in the Prometheus metrics
+      when METRICS_ENABLED is on.
     """
-    def process_request(self, request):
-        request.start_time = time.time()
-        return None
+    def __init__(self, get_response):
+        self.timing = getattr(settings, 'REQUEST_TIMING_ENABLED', False)
+        self.metrics = getattr(settings, 'METRICS_ENABLED', False)
+        if not self.timing and not self.metrics:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = self.timing and getattr(settings, 'REQUEST_TIMING_HEADER', True)
+        self.slow_seconds = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500) / 1000
+        self.top_n = getattr(settings, 'REQUEST_TIMING_TOP_QUERIES', 5)
 
-    def process_response(self, request, response):
-        if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
-            logger.info(
-                f"{request.method} {request.path} - "
-                f"Status: {response.status_code} - "
-                f"Duration: {duration:.2f}s"
-            )
+    def __call__(self, request):
+        timing = RequestTiming(self.top_n)
+        request._timing = timing
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.queries))
+            response = self.get_response(request)
+        timing.finish()
+
+        if self.header:
+            response['Server-Timing'] = timing.server_timing()
+        if self.timing and timing.total >= self.slow_seconds:
+            slow_request_logger.warning(timing.log_line(request, response))
+        if self.metrics:
+            metrics.observe_request(request, response, timing)
         return response
 
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
-    Simple rate limiting middleware
-    For production, use django-ratelimit or Redis-based solution
+    Token-bucket rate limiting per client IP, per user and per route class
+
+    Route classes come from settings.RATE_LIMIT_ROUTES (first matching path
+    prefix wins) and their limits from settings.RATE_LIMITS:
+        {'auth': {'ip': (10, 60)}, ...}   # (requests, period in seconds)
+    A request must fit in every bucket that applies (the IP bucket, plus the
+    user bucket when a valid bearer token is sent); otherwise 429 with a
+    Retry-After header.
     """
+    def __init__(self, get_response=None):
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.routes = list(settings.RATE_LIMIT_ROUTES)
+        self.limits = {
+            route_class: {
+                scope: (float(requests), requests / period)
+                for scope, (requests, period) in scopes.items()
+            }
+            for route_class, scopes in settings.RATE_LIMITS.items()
+        }
+        self.proxy_count = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXY_COUNT', 0)
+        self.limiter = RateLimiter(getattr(settings, 'RATE_LIMIT_REDIS_URL', None))
+
     def process_request(self, request):
-        # Implement rate limiting logic here
-        # This is a placeholder
+        route_class = self._route_class(request.path_info)
+        if route_class is None:
+            return None
+
+        limits = self.limits[route_class]
+        buckets = []
+        if 'ip' in limits:
+            buckets.append((f'ratelimit:{route_class}:ip:{self._client_ip(request)}', *limits['ip']))
+        if 'user' in limits:
+            user_id = self._user_id(request)
+            if user_id:
+                buckets.append((f'ratelimit:{route_class}:user:{user_id}', *limits['user']))
+        if not buckets:
+            return None
+
+        retry_after = self.limiter.consume(buckets)
+        if not retry_after:
+            return None
+
+        response = JsonResponse(
+            {'detail': 'Quá nhiều yêu cầu, vui lòng thử lại sau'},
+            status=429
+        )
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _route_class(self, path: str):
+        for prefix, route_class in self.routes:
+            if path.startswith(prefix):
+                return route_class
         return None
+
+    def _client_ip(self, request) -> str:
+        # Behind N trusted proxies the client is the Nth address from the right
+        if self.proxy_count:
+            forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+            if len(forwarded) >= self.proxy_count:
+                return forwarded[-self.proxy_count]
+        return request.META.get('REMOTE_ADDR', '')
+
+    def _user_id(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not header.startswith('Bearer '):
+            return None
+        from apps.users.jwt_utils import decode_access_token
+        payload = decode_access_token(header[7:])
+        return payload.get('user_id') if payload else None
@@ -0,0 +1,49 @@
+"""
+pytest plugin: query budgets and N+1 detection (enabled in pytest.ini)
+
+    @pytest.mark.query_budget(5)                 # whole test: at most 5 statements, no N+1
+    def test_orders(client, db): ...
+
+    def test_report(db, query_budget):
+        with query_budget(3, label='report'):   # just this block
+            ...
+
+    def test_list(db, query_recorder):
+        client.get('/api/seafood/orders')
+        assert not query_recorder.repeated()
+"""
+import pytest
+
+from .querybudget import REPEAT_THRESHOLD, QueryRecorder, assert_query_budget
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries=None, repeat_threshold=REPEAT_THRESHOLD): '
+        'fail if the test runs more SQL statements or repeats one statement shape (N+1)'
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    if marker is None:
+        return (yield)
+    max_queries = marker.args[0] if marker.args else marker.kwargs.get('max_queries')
+    repeat_threshold = marker.kwargs.get('repeat_threshold', REPEAT_THRESHOLD)
+    with assert_query_budget(max_queries, repeat_threshold, label=item.nodeid):
+        return (yield)
+
+
+@pytest.fixture
+def query_budget():
+    """assert_query_budget(max_queries, repeat_threshold, label) as a fixture"""
+    return assert_query_budget
+
+
+@pytest.fixture
+def query_recorder():
+    """Statements run during the test (QueryRecorder)"""
+    with QueryRecorder() as recorder:
+        yield recorder
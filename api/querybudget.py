@@ -0,0 +1,233 @@
+"""
+Query budgets and N+1 detection
+
+QueryRecorder captures every SQL statement (all connections) through
+connection.execute_wrapper and groups them by shape: the SQL text with
+literals and IN / VALUES lists collapsed, so the statements of an N+1 loop
+fall into one group. assert_query_budget() fails when a block runs more
+statements than its budget or repeats one shape REPEAT_THRESHOLD times.
+
+ROUTE_QUERY_BUDGETS holds the declared budget of each GET route, checked
+against seeded data by `manage.py check_query_budgets` (see
+run_route_baseline) and usable from tests through the pytest plugin in
+api/pytest_plugin.py.
+"""
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections
+
+# Một dạng câu lệnh chạy từ ngần này lần trở lên trong một lần gọi = dấu hiệu N+1
+REPEAT_THRESHOLD = 3
+
+# Budget cho route chưa khai báo trong ROUTE_QUERY_BUDGETS
+DEFAULT_QUERY_BUDGET = 6
+
+# 'METHOD /api/<route>' -> số câu SQL tối đa trên dữ liệu seed. Số câu của các
+# route này không được tăng theo số đơn / số ngày / số nhân viên.
+ROUTE_QUERY_BUDGETS: Dict[str, int] = {
+    'GET /api/rbac/dashboard': 8,
+    'GET /api/users/': 3,
+    'GET /api/users/staff/weekly-details': 3,
+    'GET /api/users/staff/all-kpi-summary': 3,
+    'GET /api/users/staff/monthly-details/{user_id}': 4,
+    'GET /api/users/transactions/summary/stats': 4,
+    'GET /api/seafood/orders': 4,
+    'GET /api/seafood/orders/{order_id}': 4,
+    'GET /api/seafood/orders/by-role/sale': 4,
+    'GET /api/seafood/orders/by-role/employee': 4,
+    'GET /api/seafood/stats/products': 3,
+    'GET /api/payroll/employees-summary': 4,
+}
+
+# Route đang có N+1 đã biết (baseline): vẫn báo cáo nhưng không làm fail build.
+# Sửa xong thì xóa khỏi đây.
+KNOWN_N_PLUS_ONE: frozenset = frozenset()
+
+# Route trả mã khác 2xx một cách có chủ đích với tài khoản quản trị của baseline
+# (vd. chỉ dành cho khách hàng). Mọi route khác phải trả 2xx.
+ROUTE_EXPECTED_STATUS: Dict[str, int] = {
+    'GET /api/users/customer/orders': 403,
+    'GET /api/users/customer/orders/{order_id}': 403,
+}
+
+_SAVEPOINT = re.compile(r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)*(?:%s|\?)\s*\)')
+_VALUES_ROWS = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+
+
+def sql_shape(sql: str) -> str:
+    """SQL text with literals and parameter lists collapsed"""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    return _VALUES_ROWS.sub(r'\1', shape)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """Records the statements run inside the block, on every connection"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._stack: Optional[ExitStack] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _SAVEPOINT.match(sql):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Shapes run at least `threshold` times, most repeated first"""
+        shapes = Counter(sql_shape(sql) for sql in self.statements)
+        return [(shape, times) for shape, times in shapes.most_common() if times >= threshold]
+
+    def report(self, threshold: int = REPEAT_THRESHOLD) -> str:
+        lines = [f'{self.count} queries']
+        for shape, times in self.repeated(threshold):
+            lines.append(f'  x{times}: {shape[:300]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def assert_query_budget(
+    max_queries: Optional[int] = None,
+    repeat_threshold: Optional[int] = REPEAT_THRESHOLD,
+    label: str = 'block'
+) -> Iterator[QueryRecorder]:
+    """
+    Fail if the block runs more than max_queries statements, or repeats one
+    statement shape repeat_threshold times (None turns either check off).
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    problems = []
+    if max_queries is not None and recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries, budget {max_queries}')
+    if repeat_threshold is not None and recorder.repeated(repeat_threshold):
+        problems.append('repeated statement shape (N+1)')
+    if problems:
+        raise QueryBudgetExceeded(f"{label}: {'; '.join(problems)}\n{recorder.report(repeat_threshold or 2)}")
+
+
+def route_budget(route_key: str) -> int:
+    return ROUTE_QUERY_BUDGETS.get(route_key, DEFAULT_QUERY_BUDGET)
+
+
+# ---------------------------------------------------------------------------
+# Baseline: every GET route of api.main against seeded data
+# ---------------------------------------------------------------------------
+
+# Tham số path -> (model, field) lấy giá trị từ dữ liệu seed
+PATH_PARAM_SOURCES = {
+    'permission_id': ('rbac.Permission', 'pk'),
+    'role_id': ('rbac.Role', 'pk'),
+    'user_role_id': ('rbac.UserRole', 'pk'),
+    'department_id': ('rbac.Department', 'pk'),
+    'user_id': ('users.User', 'pk'),
+    'transaction_id': ('users.Transaction', 'pk'),
+    'order_id': ('seafood.Order', 'pk'),
+    'order_code': ('seafood.Order', 'order_code'),
+    'product_id': ('seafood.Seafood', 'pk'),
+    'batch_id': ('seafood.ImportBatch', 'pk'),
+    'payroll_id': ('payroll.Payroll', 'pk'),
+}
+
+_PATH_PARAM = re.compile(r'{(?:\w+:)?(\w+)}')
+
+
+def iter_get_routes(api) -> Iterator[Tuple[str, str]]:
+    """(route key 'GET /api/...', path template) for every GET operation"""
+    from ninja.utils import normalize_path
+
+    for prefix, router in api._routers:
+        for path, path_view in router.path_operations.items():
+            if any('GET' in operation.methods for operation in path_view.operations):
+                template = normalize_path('/api/' + '/'.join((prefix, path)))
+                yield f'GET {template}', template
+
+
+def _path_values(template: str) -> Optional[Dict[str, str]]:
+    from django.apps import apps
+
+    values = {}
+    for name in _PATH_PARAM.findall(template):
+        source = PATH_PARAM_SOURCES.get(name)
+        if source is None:
+            return None
+        model_label, field = source
+        value = apps.get_model(model_label).objects.order_by('pk').values_list(field, flat=True).first()
+        if value is None:
+            return None
+        values[name] = str(value)
+    return values
+
+
+def run_route_baseline(api, client, query_params: Optional[dict] = None) -> List[dict]:
+    """
+    Call every GET route once with `client` (an authenticated test Client)
+
+    A route is ok when it answers 2xx (or its ROUTE_EXPECTED_STATUS) within its
+    budget and without an N+1 shape (unless listed in KNOWN_N_PLUS_ONE);
+    'problems' says why it is not.
+
+    Returns: [{'route', 'status', 'queries', 'budget', 'repeated', 'problems', 'ok', 'skipped'}]
+    """
+    today = date.today()
+    query_params = query_params if query_params is not None else {'year': today.year, 'month': today.month}
+    results = []
+    for route_key, template in iter_get_routes(api):
+        values = _path_values(template)
+        if values is None:
+            results.append({'route': route_key, 'skipped': 'no data for path parameters', 'problems': [], 'ok': True})
+            continue
+        url = _PATH_PARAM.sub(lambda match: values[match.group(1)], template)
+
+        with QueryRecorder() as recorder:
+            response = client.get(url, query_params)
+        budget = route_budget(route_key)
+        repeated = recorder.repeated()
+        problems = []
+        expected_status = ROUTE_EXPECTED_STATUS.get(route_key)
+        if expected_status is None and not 200 <= response.status_code < 300:
+            problems.append(f'status {response.status_code}')
+        elif expected_status is not None and response.status_code != expected_status:
+            problems.append(f'status {response.status_code}, expected {expected_status}')
+        if recorder.count > budget:
+            problems.append('over budget')
+        if repeated and route_key not in KNOWN_N_PLUS_ONE:
+            problems.append('N+1')
+        results.append({
+            'route': route_key,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'budget': budget,
+            'repeated': repeated,
+            'problems': problems,
+            'ok': not problems,
+            'skipped': None,
+        })
+    return results
@@ -0,0 +1,142 @@
+"""
+Token-bucket rate limiting
+
+Buckets live in Redis and are checked and charged atomically by one Lua
+script, so a request costs a single round trip however many buckets apply.
+While Redis is unreachable an in-process limiter with the same semantics
+takes over (limits then apply per worker process).
+"""
+import logging
+import threading
+import time
+from typing import Optional, Sequence, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# (key, capacity, refill rate in tokens per second)
+Bucket = Tuple[str, float, float]
+
+# KEYS: bucket keys; ARGV: capacity, rate for each key (same order).
+# All-or-nothing: one token is taken from every bucket only if each has one.
+# Returns the seconds to wait as a string ("0" = allowed) - Lua numbers
+# returned directly would be truncated to integers.
+TOKEN_BUCKET_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local retry_after = 0
+local levels = {}
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local stamp = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        retry_after = math.max(retry_after, (1 - tokens) / rate)
+    end
+end
+
+local cost = 1
+if retry_after > 0 then
+    cost = 0
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local tokens = levels[i] - cost
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil((capacity - tokens) / rate * 1000) + 1000)
+end
+
+return tostring(retry_after)
+"""
+
+
+class LocalTokenBuckets:
+    """In-process token buckets, used while Redis is down"""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        # key -> (tokens, timestamp, time at which the bucket is full again)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, buckets: Sequence[Bucket], now: Optional[float] = None) -> float:
+        """Take one token from every bucket; returns 0 if allowed, else seconds to wait"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if len(self._buckets) > self.MAX_KEYS:
+                self._evict(now)
+
+            levels = []
+            retry_after = 0.0
+            for key, capacity, rate in buckets:
+                tokens, stamp, _ = self._buckets.get(key, (capacity, now, now))
+                tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+
+            cost = 0 if retry_after else 1
+            for (key, capacity, rate), tokens in zip(buckets, levels):
+                tokens -= cost
+                self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            return retry_after
+
+    def _evict(self, now: float):
+        # A bucket that has refilled completely is the same as a missing one
+        self._buckets = {key: state for key, state in self._buckets.items() if state[2] > now}
+        if len(self._buckets) > self.MAX_KEYS:
+            self._buckets.clear()
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by every worker through Redis"""
+
+    def __init__(self, url: str, timeout: float = 0.05):
+        self._client = Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, buckets: Sequence[Bucket]) -> float:
+        args = []
+        for _, capacity, rate in buckets:
+            args += [capacity, rate]
+        return float(self._script(keys=[key for key, _, _ in buckets], args=args))
+
+
+class RateLimiter:
+    """Redis token buckets with an in-process fallback"""
+
+    # After a Redis error, stay on the local buckets this long before retrying Redis
+    REDIS_RETRY_SECONDS = 5.0
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.local = LocalTokenBuckets()
+        self.redis = RedisTokenBuckets(redis_url) if redis_url else None
+        self._redis_down_until = 0.0
+        self._redis_down = False
+
+    def consume(self, buckets: Sequence[Bucket]) -> float:
+        """Take one token from every bucket; returns 0 if allowed, else seconds to wait"""
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                retry_after = self.redis.consume(buckets)
+            except RedisError as e:
+                if not self._redis_down:
+                    logger.warning(f"Rate limiter: Redis unavailable, using in-process buckets ({e})")
+                self._redis_down = True
+                self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+            else:
+                if self._redis_down:
+                    logger.info("Rate limiter: Redis available again")
+                    self._redis_down = False
+                return retry_after
+        return self.local.consume(buckets)
@@ -0,0 +1,114 @@
+"""
+Per-request timing
+
+Every SQL statement a request runs goes through QueryStats (installed with
+connection.execute_wrapper), so query count and DB time are known without
+DEBUG. JSON encoding time is added by TimedJSONRenderer. The middleware
+turns these into a Server-Timing header and a slow-request log line.
+"""
+import heapq
+import json
+import time
+from itertools import count
+from typing import Dict, List
+
+from ninja.renderers import JSONRenderer
+
+# Longest SQL text kept in a log line
+MAX_SQL_LENGTH = 1000
+
+
+class QueryStats:
+    """execute_wrapper that counts and times the statements of one request"""
+
+    def __init__(self, top_n: int = 5):
+        self.top_n = top_n
+        self.count = 0
+        self.duration = 0.0
+        # min-heap of (duration, seq, sql) holding the top_n slowest statements
+        self._slowest = []
+        self._seq = count()
+        # SQL text (without params) -> executions; N+1 shows up as one text run many times
+        self._executions: Dict[str, int] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self._executions[sql] = self._executions.get(sql, 0) + 1
+            entry = (elapsed, next(self._seq), sql)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[dict]:
+        return [
+            {'ms': round(elapsed * 1000, 2), 'sql': sql[:MAX_SQL_LENGTH]}
+            for elapsed, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def repeated(self) -> List[dict]:
+        """Statements run more than once, most repeated first"""
+        repeated = heapq.nlargest(
+            self.top_n,
+            ((executions, sql) for sql, executions in self._executions.items() if executions > 1)
+        )
+        return [{'count': executions, 'sql': sql[:MAX_SQL_LENGTH]} for executions, sql in repeated]
+
+
+class RequestTiming:
+    """Timing collected for one request (stored on request._timing)"""
+
+    def __init__(self, top_n: int = 5):
+        self.start = time.perf_counter()
+        self.queries = QueryStats(top_n)
+        self.serialize = 0.0
+        self.total = 0.0
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+
+    @property
+    def app(self) -> float:
+        return max(0.0, self.total - self.queries.duration - self.serialize)
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.queries.duration * 1000:.1f};desc="{self.queries.count} queries", '
+            f'serialize;dur={self.serialize * 1000:.1f}, '
+            f'app;dur={self.app * 1000:.1f}'
+        )
+
+    def log_line(self, request, response) -> str:
+        return json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(self.total * 1000, 1),
+            'db_ms': round(self.queries.duration * 1000, 1),
+            'db_queries': self.queries.count,
+            'serialize_ms': round(self.serialize * 1000, 1),
+            'app_ms': round(self.app * 1000, 1),
+            'slowest_queries': self.queries.slowest(),
+            'repeated_queries': self.queries.repeated(),
+        }, ensure_ascii=False)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that adds its encoding time to the request's timing"""
+
+    def render(self, request, data, *, response_status: int):
+        timing = getattr(request, '_timing', None)
+        if timing is None:
+            return super().render(request, data, response_status=response_status)
+        start = time.perf_counter()
+        try:
+            return super().render(request, data, response_status=response_status)
+        finally:
+            timing.serialize += time.perf_counter() - start
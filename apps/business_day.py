@@ -0,0 +1,81 @@
+"""
+Business Day - Shared date windows for reports
+
+The database stores UTC timestamps (TIME_ZONE = 'UTC') while the shop works in
+settings.BUSINESS_TIME_ZONE. These helpers turn business days, weeks and months
+into half-open [start, end) aware datetime ranges, so report queries filter the
+raw created_at column (index friendly) instead of casting it with __date.
+"""
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+DateTimeRange = Tuple[datetime, datetime]
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def business_tz() -> tzinfo:
+    """Time zone used to split business days"""
+    return _zone(settings.BUSINESS_TIME_ZONE)
+
+
+def business_today() -> date:
+    """Current date in the business time zone"""
+    return timezone.localdate(timezone=business_tz())
+
+
+def business_date(value: datetime) -> date:
+    """Business date of an aware timestamp"""
+    return timezone.localtime(value, business_tz()).date()
+
+
+def day_start(day: date) -> datetime:
+    """Aware datetime of business midnight at the start of day"""
+    return datetime.combine(day, time.min, tzinfo=business_tz())
+
+
+def day_range(day: date) -> DateTimeRange:
+    """[start of day, start of next day)"""
+    return day_start(day), day_start(day + timedelta(days=1))
+
+
+def date_range(date_from: date, date_to: date) -> DateTimeRange:
+    """[start of date_from, start of the day after date_to) - both days included"""
+    return day_start(date_from), day_start(date_to + timedelta(days=1))
+
+
+def week_start(day: Optional[date] = None) -> date:
+    """Monday of the week containing day (default: today)"""
+    day = day or business_today()
+    return day - timedelta(days=day.weekday())
+
+
+def week_range(day: Optional[date] = None) -> DateTimeRange:
+    """Monday 00:00 to next Monday 00:00 of the week containing day"""
+    start = week_start(day)
+    return date_range(start, start + timedelta(days=6))
+
+
+def month_start(day: Optional[date] = None) -> date:
+    """First day of the month containing day (default: today)"""
+    return (day or business_today()).replace(day=1)
+
+
+def month_end(year: int, month: int) -> date:
+    """Last day of the month"""
+    return date(year, month, monthrange(year, month)[1])
+
+
+def month_range(year: int, month: int) -> DateTimeRange:
+    """First day 00:00 to the first day of the next month 00:00"""
+    return date_range(date(year, month, 1), month_end(year, month))
@@ -5,17 +5,18 @@ from typing import List, Optional
 from uuid import UUID
 from ninja import Router
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Q, Prefetch
 from decimal import Decimal
 
-from .models import SalaryConfiguration, Payroll, PayrollAdjustment
+from .models import Payroll, PayrollAdjustment
 from .schemas import (
     PayrollRead, PayrollCalculateRequest, PayrollBulkCalculateRequest,
     PayrollApproveRequest, PayrollStatusUpdate, PayrollSummary,
-    EmployeePayrollSummary
+    EmployeePayrollSummary, PayrollSimulateRequest, PayrollSimulationResult
 )
-from .services import PayrollCalculationService
+from .services import PayrollCalculationService, BulkPayrollService, PayrollSimulationService
 from apps.users.models import User
+from apps.rbac.models import UserRole
 
 router = Router(tags=["Payroll"], auth=None)
 
@@ -58,61 +59,21 @@ def calculate_payroll(request, payload: PayrollCalculateRequest):
 @router.post("/calculate-bulk")
 def calculate_bulk_payroll(request, payload: PayrollBulkCalculateRequest):
     """Tính lương hàng loạt cho nhiều nhân viên"""
-    # Get users to calculate
-    if payload.user_ids:
-        users = User.objects.filter(id__in=payload.user_ids, is_active=True)
-    else:
-        # Calculate for all active employees (exclude viewers)
-        users = User.objects.filter(
-            is_active=True,
-            user_roles__role__slug__in=['salesperson', 'accountant', 'warehouse', 'manager']
-        ).distinct()
-
-    results = {
-        'success': [],
-        'failed': [],
-        'total': users.count()
-    }
+    # Get users to calculate (default: all active employees, exclude viewers)
+    users = BulkPayrollService.eligible_users(payload.user_ids)
 
-    for user in users:
-        try:
-            # Check if already exists
-            existing = Payroll.objects.filter(
-                user=user,
-                year=payload.year,
-                month=payload.month
-            ).first()
-
-            if existing and existing.status != 'draft':
-                results['failed'].append({
-                    'user_id': str(user.id),
-                    'user_name': user.full_name,
-                    'reason': f'Đã tồn tại với trạng thái {existing.status}'
-                })
-                continue
-
-            # Delete draft if exists
-            if existing:
-                existing.delete()
-
-            # Calculate
-            service = PayrollCalculationService(user, payload.year, payload.month)
-            payroll = service.calculate_payroll()
-
-            results['success'].append({
-                'user_id': str(user.id),
-                'user_name': user.full_name,
-                'net_salary': float(payroll.net_salary)
-            })
+    return BulkPayrollService(payload.year, payload.month).calculate(users)
 
-        except Exception as e:
-            results['failed'].append({
-                'user_id': str(user.id),
-                'user_name': user.full_name,
-                'reason': str(e)
-            })
 
-    return results
+@router.post("/simulate", response=PayrollSimulationResult)
+def simulate_payroll(request, payload: PayrollSimulateRequest):
+    """Mô phỏng lương khi thay đổi cấu hình lương (không ghi bảng lương)"""
+    return PayrollSimulationService(payload.year, payload.month).simulate(
+        payload.overrides.model_dump(exclude_none=True),
+        role_ids=payload.role_ids,
+        user_ids=payload.user_ids,
+        refresh=payload.refresh
+    )
 
 
 @router.get("/list", response=List[PayrollRead])
@@ -124,7 +85,13 @@ def list_payrolls(
     user_id: Optional[UUID] = None
 ):
     """Lấy danh sách bảng lương"""
-    query = Payroll.objects.select_related('user').all()
+    query = Payroll.objects.select_related('user').prefetch_related(
+        Prefetch(
+            'user__user_roles',
+            queryset=UserRole.objects.filter(is_active=True).select_related('role').order_by('pk'),
+            to_attr='active_user_roles'
+        )
+    )
 
     if year:
         query = query.filter(year=year)
@@ -143,68 +110,66 @@ def list_payrolls(
 @router.get("/summary", response=PayrollSummary)
 def get_payroll_summary(request, year: int, month: int):
     """Lấy tổng quan bảng lương tháng"""
-    payrolls = Payroll.objects.filter(year=year, month=month)
-
-    stats = payrolls.aggregate(
+    # Tổng tiền và số lượng theo trạng thái trong một truy vấn
+    stats = Payroll.objects.filter(year=year, month=month).aggregate(
+        total_employees=Count('id'),
         total_gross=Sum('gross_salary'),
         total_net=Sum('net_salary'),
         total_insurance=Sum('total_insurance'),
         total_tax=Sum('personal_income_tax'),
         total_commission=Sum('sales_commission'),
-        total_kpi=Sum('kpi_bonus')
+        total_kpi=Sum('kpi_bonus'),
+        draft_count=Count('id', filter=Q(status='draft')),
+        pending_count=Count('id', filter=Q(status='pending')),
+        approved_count=Count('id', filter=Q(status='approved')),
+        paid_count=Count('id', filter=Q(status='paid')),
     )
 
-    status_counts = {
-        'draft': payrolls.filter(status='draft').count(),
-        'pending': payrolls.filter(status='pending').count(),
-        'approved': payrolls.filter(status='approved').count(),
-        'paid': payrolls.filter(status='paid').count(),
-    }
-
     return {
-        'total_employees': payrolls.count(),
+        'total_employees': stats['total_employees'],
         'total_gross_salary': stats['total_gross'] or Decimal('0'),
         'total_net_salary': stats['total_net'] or Decimal('0'),
         'total_insurance': stats['total_insurance'] or Decimal('0'),
         'total_tax': stats['total_tax'] or Decimal('0'),
         'total_commission': stats['total_commission'] or Decimal('0'),
         'total_kpi_bonus': stats['total_kpi'] or Decimal('0'),
-        'draft_count': status_counts['draft'],
-        'pending_count': status_counts['pending'],
-        'approved_count': status_counts['approved'],
-        'paid_count': status_counts['paid'],
+        'draft_count': stats['draft_count'],
+        'pending_count': stats['pending_count'],
+        'approved_count': stats['approved_count'],
+        'paid_count': stats['paid_count'],
     }
 
 
 @router.get("/employees-summary", response=List[EmployeePayrollSummary])
 def get_employees_payroll_summary(request, year: int, month: int):
     """Lấy tổng quan lương của tất cả nhân viên"""
-    # Get all active employees
-    users = User.objects.filter(
-        is_active=True,
-        user_roles__role__slug__in=['salesperson', 'accountant', 'warehouse', 'manager']
-    ).distinct()
+    # Get all active employees with their active roles and this month's payroll
+    users = list(BulkPayrollService.eligible_users().prefetch_related(
+        Prefetch(
+            'user_roles',
+            queryset=UserRole.objects.filter(is_active=True).select_related('role').order_by('pk'),
+            to_attr='active_user_roles'
+        ),
+        Prefetch(
+            'payrolls',
+            queryset=Payroll.objects.filter(year=year, month=month),
+            to_attr='month_payrolls'
+        ),
+    ))
+
+    # Salary config by role id (primary role = first active role, like user.get_roles().first())
+    primary_roles = {user.id: user.active_user_roles[0] for user in users if user.active_user_roles}
+    configs = BulkPayrollService(year, month).load_salary_configs(
+        user_role.role_id for user_role in primary_roles.values()
+    )
 
     result = []
     for user in users:
-        # Get payroll if exists
-        payroll = Payroll.objects.filter(
-            user=user,
-            year=year,
-            month=month
-        ).first()
-
-        # Get role
-        user_role = user.get_roles().first()
-        role_name = user_role.role.name if user_role else 'N/A'
+        payroll = user.month_payrolls[0] if user.month_payrolls else None
 
-        # Get salary config
-        config = None
-        if user_role:
-            config = SalaryConfiguration.objects.filter(
-                role=user_role.role,
-                is_active=True
-            ).first()
+        user_role = primary_roles.get(user.id)
+        role_name = user_role.role.name if user_role else 'N/A'
+        config = configs.get(user_role.role_id) if user_role else None
 
         if payroll:
             result.append({
@@ -329,7 +294,10 @@ def delete_payroll(request, payroll_id: UUID):
 
 def _payroll_to_dict(payroll: Payroll) -> dict:
     """Convert payroll to dict with user info"""
-    user_role = payroll.user.get_roles().first()
+    if hasattr(payroll.user, 'active_user_roles'):
+        user_role = next(iter(payroll.user.active_user_roles), None)
+    else:
+        user_role = payroll.user.get_roles().first()
 
     return {
         'id': payroll.id,
@@ -0,0 +1,364 @@
+"""
+Payroll Calculations - Pure salary math
+
+Các hàm ở đây chỉ nhận dữ liệu thuần (dict cấu hình lương + số liệu tổng hợp
+của tháng) và trả về dict số liệu bảng lương, không truy cập DB và không import
+Django. Nhờ vậy có thể chạy trong ProcessPoolExecutor trên nhiều nhân CPU, và
+cùng một đầu vào luôn cho cùng một kết quả (ngữ cảnh Decimal cố định).
+"""
+from decimal import Context, Decimal, ROUND_HALF_EVEN, localcontext
+
+
+CONFIG_FIELDS = (
+    'base_salary',
+    'standard_working_days',
+    'attendance_allowance',
+    'transportation_allowance',
+    'meal_allowance',
+    'phone_allowance',
+    'enable_commission',
+    'commission_rate_1',
+    'commission_threshold_2',
+    'commission_rate_2',
+    'commission_threshold_3',
+    'commission_rate_3',
+    'commission_threshold_4',
+    'commission_rate_4',
+    'kpi_bonus_amount',
+    'social_insurance_rate',
+    'health_insurance_rate',
+    'unemployment_insurance_rate',
+)
+
+# Ngữ cảnh Decimal dùng cho mọi phép tính lương (không phụ thuộc tiến trình/luồng gọi)
+PAYROLL_CONTEXT = Context(prec=28, rounding=ROUND_HALF_EVEN)
+
+CENT = Decimal('0.01')
+
+PERSONAL_DEDUCTION = Decimal('11000000')  # 11M
+DEPENDENT_DEDUCTION = Decimal('4400000')  # 4.4M per dependent
+
+# Tax brackets (in VND)
+TAX_BRACKETS = [
+    (5000000, 0.05),
+    (10000000, 0.10),
+    (18000000, 0.15),
+    (32000000, 0.20),
+    (52000000, 0.25),
+    (80000000, 0.30),
+    (float('inf'), 0.35)
+]
+
+KPI_REVENUE_TARGET = Decimal('50000000')
+KPI_ORDERS_TARGET = 20
+
+
+def config_to_dict(config) -> dict:
+    """Chuyển SalaryConfiguration thành dict thuần (picklable)"""
+    return {field: getattr(config, field) for field in CONFIG_FIELDS}
+
+
+def actual_base_salary(config: dict, working_days: Decimal) -> Decimal:
+    """
+    Tính lương cơ bản thực tế theo công thức:
+    Lương CB thực = (Lương CB / Số ngày chuẩn) × Số ngày công thực tế
+    """
+    daily_rate = config['base_salary'] / Decimal(config['standard_working_days'])
+    actual_salary = daily_rate * working_days
+    return actual_salary.quantize(CENT)
+
+
+def attendance_allowance(config: dict, working_days: Decimal) -> Decimal:
+    """
+    Tính phụ cấp chuyên cần:
+    - Đi đủ công (>= standard - 1): Full allowance
+    - Nghỉ 1-2 ngày: 60% allowance
+    - Nghỉ >2 ngày: 0
+    """
+    standard_days = Decimal(config['standard_working_days'])
+    days_off = standard_days - working_days
+
+    if days_off <= 1:
+        return config['attendance_allowance']
+    elif days_off <= 3:
+        return config['attendance_allowance'] * Decimal('0.6')
+    else:
+        return Decimal('0')
+
+
+def sales_commission(config: dict, order_totals: dict) -> tuple[Decimal, Decimal]:
+    """
+    Tính hoa hồng doanh số theo bậc thang:
+    - < 20M: 1%
+    - 20-50M: 1.5%
+    - 50-100M: 2%
+    - > 100M: 2.5%
+
+    Returns: (commission_amount, total_revenue)
+    """
+    if not config['enable_commission']:
+        return Decimal('0'), Decimal('0')
+
+    # Total revenue from completed orders
+    total_revenue = order_totals['completed_revenue']
+
+    # Calculate commission based on revenue tiers
+    if total_revenue < config['commission_threshold_2']:
+        commission_rate = config['commission_rate_1']
+    elif total_revenue < config['commission_threshold_3']:
+        commission_rate = config['commission_rate_2']
+    elif total_revenue < config['commission_threshold_4']:
+        commission_rate = config['commission_rate_3']
+    else:
+        commission_rate = config['commission_rate_4']
+
+    commission = (total_revenue * commission_rate / Decimal('100')).quantize(CENT)
+    return commission, total_revenue
+
+
+def kpi_score(config: dict, working_days: Decimal, order_totals: dict) -> Decimal:
+    """
+    Tính điểm KPI (0-100):
+    - Doanh số đạt (30 điểm)
+    - Số đơn hàng (20 điểm)
+    - Tỷ lệ thu tiền (20 điểm)
+    - Chất lượng dịch vụ (15 điểm)
+    - Chấm công (15 điểm)
+    """
+    total_orders = order_totals['total_orders']
+    completed_orders = order_totals['completed_orders']
+    total_revenue = order_totals['total_revenue']
+    total_paid = order_totals['total_paid']
+
+    score = Decimal('0')
+
+    # 1. Doanh số đạt (30 điểm) - Mục tiêu 50M
+    if total_revenue >= KPI_REVENUE_TARGET:
+        score += Decimal('30')
+    else:
+        score += (total_revenue / KPI_REVENUE_TARGET) * Decimal('30')
+
+    # 2. Số đơn hàng (20 điểm) - Mục tiêu 20 đơn
+    if total_orders >= KPI_ORDERS_TARGET:
+        score += Decimal('20')
+    else:
+        score += (Decimal(total_orders) / Decimal(KPI_ORDERS_TARGET)) * Decimal('20')
+
+    # 3. Tỷ lệ thu tiền (20 điểm)
+    if total_revenue > 0:
+        score += (total_paid / total_revenue) * Decimal('20')
+
+    # 4. Chất lượng dịch vụ (15 điểm) - Tỷ lệ hoàn thành
+    if total_orders > 0:
+        score += (Decimal(completed_orders) / Decimal(total_orders)) * Decimal('15')
+
+    # 5. Chấm công (15 điểm)
+    standard_days = Decimal(config['standard_working_days'])
+    score += (working_days / standard_days) * Decimal('15')
+
+    return score.quantize(CENT)
+
+
+def kpi_bonus(config: dict, score: Decimal) -> Decimal:
+    """
+    Tính thưởng KPI dựa trên điểm KPI:
+    Thưởng KPI = (Điểm KPI / 100) × Mức thưởng KPI
+    """
+    bonus = (score / Decimal('100')) * config['kpi_bonus_amount']
+    return bonus.quantize(CENT)
+
+
+def insurance(config: dict, base_salary: Decimal) -> dict:
+    """
+    Tính bảo hiểm:
+    - BHXH: 8%
+    - BHYT: 1.5%
+    - BHTN: 1%
+    """
+    social_insurance = (base_salary * config['social_insurance_rate'] / Decimal('100')).quantize(CENT)
+    health_insurance = (base_salary * config['health_insurance_rate'] / Decimal('100')).quantize(CENT)
+    unemployment_insurance = (base_salary * config['unemployment_insurance_rate'] / Decimal('100')).quantize(CENT)
+
+    return {
+        'social_insurance': social_insurance,
+        'health_insurance': health_insurance,
+        'unemployment_insurance': unemployment_insurance,
+        'total_insurance': social_insurance + health_insurance + unemployment_insurance
+    }
+
+
+def personal_income_tax(gross_salary: Decimal, total_insurance: Decimal, dependents: int = 0) -> dict:
+    """
+    Tính thuế TNCN theo bậc thang lũy tiến:
+
+    Thu nhập chịu thuế = Tổng thu nhập - BH - Giảm trừ bản thân - Giảm trừ người phụ thuộc
+
+    Bậc thuế:
+    - Đến 5M: 5%
+    - Trên 5-10M: 10%
+    - Trên 10-18M: 15%
+    - Trên 18-32M: 20%
+    - Trên 32-52M: 25%
+    - Trên 52-80M: 30%
+    - Trên 80M: 35%
+    """
+    personal_deduction = PERSONAL_DEDUCTION
+    dependent_deduction = DEPENDENT_DEDUCTION * Decimal(dependents)
+
+    taxable_income = gross_salary - total_insurance - personal_deduction - dependent_deduction
+
+    if taxable_income <= 0:
+        return {
+            'taxable_income': Decimal('0'),
+            'personal_deduction': personal_deduction,
+            'dependent_deduction': dependent_deduction,
+            'tax': Decimal('0')
+        }
+
+    tax = Decimal('0')
+    remaining = taxable_income
+    prev_bracket = Decimal('0')
+
+    for bracket_limit, rate in TAX_BRACKETS:
+        if remaining <= 0:
+            break
+
+        taxable_in_bracket = min(remaining, Decimal(bracket_limit) - prev_bracket)
+        tax += taxable_in_bracket * Decimal(str(rate))
+        remaining -= taxable_in_bracket
+        prev_bracket = Decimal(bracket_limit)
+
+    return {
+        'taxable_income': taxable_income,
+        'personal_deduction': personal_deduction,
+        'dependent_deduction': dependent_deduction,
+        'tax': tax.quantize(CENT)
+    }
+
+
+def payroll_extras(payroll) -> dict:
+    """Tham số nhập tay của một bảng lương đã tính (để tính lại giữ nguyên)"""
+    return {
+        'dependents': int(payroll.dependent_deduction / DEPENDENT_DEDUCTION),
+        'advance_payment': payroll.advance_payment,
+        'penalty': payroll.penalty,
+        'other_bonus': payroll.other_bonus,
+        'other_deduction': payroll.other_deduction,
+    }
+
+
+def calculate_payroll_figures(
+    config: dict,
+    working_days: Decimal,
+    order_totals: dict,
+    dependents: int = 0,
+    advance_payment: Decimal = Decimal('0'),
+    penalty: Decimal = Decimal('0'),
+    other_bonus: Decimal = Decimal('0'),
+    other_deduction: Decimal = Decimal('0')
+) -> dict:
+    """
+    Tính toàn bộ số liệu bảng lương của một nhân viên
+
+    Returns: dict giá trị các trường tiền/điểm của Payroll (không gồm user/year/month/status)
+    """
+    with localcontext(PAYROLL_CONTEXT):
+        # 1. Actual base salary
+        base = actual_base_salary(config, working_days)
+
+        # 2. Allowances
+        attendance = attendance_allowance(config, working_days)
+        total_allowances = (
+            attendance +
+            config['transportation_allowance'] +
+            config['meal_allowance'] +
+            config['phone_allowance']
+        )
+
+        # 3. Bonuses
+        commission, revenue = sales_commission(config, order_totals)
+        score = kpi_score(config, working_days, order_totals)
+        bonus = kpi_bonus(config, score)
+        total_bonuses = commission + bonus + other_bonus
+
+        # 4. Gross salary
+        gross_salary = base + total_allowances + total_bonuses
+
+        # 5. Insurance (based on base salary)
+        insurance_data = insurance(config, config['base_salary'])
+
+        # 6. Tax
+        tax_data = personal_income_tax(gross_salary, insurance_data['total_insurance'], dependents)
+
+        # 7. Total deductions
+        total_deductions = (
+            insurance_data['total_insurance'] +
+            tax_data['tax'] +
+            advance_payment +
+            penalty +
+            other_deduction
+        )
+
+        return {
+            # Base salary
+            'base_salary': config['base_salary'],
+            'working_days': working_days,
+            'standard_working_days': config['standard_working_days'],
+            'actual_base_salary': base,
+
+            # Allowances
+            'attendance_allowance': attendance,
+            'transportation_allowance': config['transportation_allowance'],
+            'meal_allowance': config['meal_allowance'],
+            'phone_allowance': config['phone_allowance'],
+            'total_allowances': total_allowances,
+
+            # Bonuses
+            'sales_commission': commission,
+            'sales_revenue': revenue,
+            'kpi_score': score,
+            'kpi_bonus': bonus,
+            'other_bonus': other_bonus,
+            'total_bonuses': total_bonuses,
+
+            # Gross
+            'gross_salary': gross_salary,
+
+            # Insurance
+            'social_insurance': insurance_data['social_insurance'],
+            'health_insurance': insurance_data['health_insurance'],
+            'unemployment_insurance': insurance_data['unemployment_insurance'],
+            'total_insurance': insurance_data['total_insurance'],
+
+            # Tax
+            'taxable_income': tax_data['taxable_income'],
+            'personal_deduction': tax_data['personal_deduction'],
+            'dependent_deduction': tax_data['dependent_deduction'],
+            'personal_income_tax': tax_data['tax'],
+
+            # Other deductions
+            'advance_payment': advance_payment,
+            'penalty': penalty,
+            'other_deduction': other_deduction,
+            'total_deductions': total_deductions,
+
+            # Net
+            'net_salary': gross_salary - total_deductions,
+        }
+
+
+def calculate_payroll_task(task: tuple) -> tuple:
+    """
+    Hàm chạy trong tiến trình worker:
+    (key, config, working_days, order_totals[, extras]) -> (key, figures, error)
+
+    extras: tham số khác của calculate_payroll_figures (người phụ thuộc, tạm ứng...).
+    Khai báo ở cấp module để pickle được khi dùng ProcessPoolExecutor. Lỗi của
+    một nhân viên được trả về dạng chuỗi để không làm hỏng cả lô.
+    """
+    key, config, working_days, order_totals, *rest = task
+    extras = rest[0] if rest else {}
+    try:
+        return key, calculate_payroll_figures(config, working_days, order_totals, **extras), None
+    except Exception as e:
+        return key, None, str(e)
@@ -0,0 +1,103 @@
+"""
+Management command to benchmark per-employee vs batch payroll calculation
+"""
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.business_day import month_end
+from apps.payroll.models import Payroll, SalaryConfiguration
+from apps.payroll.services import BulkPayrollService, PayrollCalculationService
+from apps.rbac.models import Role, UserRole
+from apps.seafood.models import DailySalesFact
+from apps.users.models import Attendance
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk payroll vs per-employee payroll (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200, help='Number of employees')
+        parser.add_argument('--year', type=int, default=2024)
+        parser.add_argument('--month', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                users = self._seed(options)
+                self._run(users, options['year'], options['month'])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write('Benchmark data rolled back')
+
+    def _seed(self, options):
+        rnd = random.Random(options['seed'])
+        year, month = options['year'], options['month']
+        tag = f"bench{options['seed']}"
+
+        role = Role.objects.create(name=f'Benchmark {tag}', slug=f'salesperson-{tag}', level=10)
+        SalaryConfiguration.objects.create(role=role, base_salary=Decimal('8000000'), enable_commission=True)
+
+        users = User.objects.bulk_create([
+            User(email=f'{tag}-{i}@benchmark.local', username=f'{tag}-{i}', first_name='Bench', last_name=str(i))
+            for i in range(options['employees'])
+        ])
+        UserRole.objects.bulk_create([UserRole(user=user, role=role) for user in users])
+
+        days = [date(year, month, 1) + timedelta(days=offset) for offset in range(month_end(year, month).day)]
+        Attendance.objects.bulk_create([
+            Attendance(user=user, date=day, attendance_type=rnd.choice(['full', 'full', 'full', 'half', 'off']))
+            for user in users for day in days if day.weekday() < 6
+        ], batch_size=2000)
+        DailySalesFact.objects.bulk_create([
+            DailySalesFact(
+                date=day, role='created_by', user=user, status=rnd.choice(['completed', 'completed', 'pending']),
+                order_count=rnd.randint(1, 5), revenue=Decimal(rnd.randint(1, 80) * 100000),
+                paid_amount=Decimal(rnd.randint(0, 40) * 100000)
+            )
+            for user in users for day in days if rnd.random() < 0.7
+        ], batch_size=2000)
+        return users
+
+    def _measure(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:<14} {elapsed * 1000:9.1f} ms {len(queries):7d} queries')
+        return elapsed
+
+    def _run(self, users, year, month):
+        self.stdout.write(f'Calculating payroll for {len(users)} employees ({month}/{year})')
+
+        def per_employee():
+            for user in users:
+                PayrollCalculationService(user, year, month).calculate_payroll()
+
+        sid = transaction.savepoint()
+        per_employee_time = self._measure('per-employee', per_employee)
+        legacy = dict(Payroll.objects.filter(user__in=users, year=year, month=month).values_list('user_id', 'net_salary'))
+        transaction.savepoint_rollback(sid)
+
+        bulk_time = self._measure('bulk', lambda: BulkPayrollService(year, month).calculate(users))
+        bulk = dict(Payroll.objects.filter(user__in=users, year=year, month=month).values_list('user_id', 'net_salary'))
+
+        if bulk != legacy:
+            self.stdout.write(self.style.ERROR('Results differ between per-employee and bulk calculation'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Identical results, speed-up x{per_employee_time / bulk_time:.1f}'
+            ))
@@ -0,0 +1,65 @@
+"""
+Management command to calculate a month's payroll, optionally across CPU cores
+"""
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from uuid import UUID
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payroll.services import BulkPayrollService, release_inherited_connections
+
+
+class Command(BaseCommand):
+    help = 'Calculate draft payrolls for a month (use --workers to spread the math over processes)'
+
+    # Each worker receives about this many chunks (load balance vs pickling overhead)
+    CHUNKS_PER_WORKER = 4
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True)
+        parser.add_argument('--month', type=int, required=True)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (1 = serial in this process)'
+        )
+        parser.add_argument(
+            '--user-ids',
+            nargs='+',
+            type=UUID,
+            help='Only these users (default: all eligible active employees)'
+        )
+
+    def handle(self, *args, **options):
+        year, month, workers = options['year'], options['month'], options['workers']
+        if not 1 <= month <= 12:
+            raise CommandError('--month must be between 1 and 12')
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        users = list(BulkPayrollService.eligible_users(options['user_ids']))
+        service = BulkPayrollService(year, month)
+        self.stdout.write(f'Calculating payroll {month}/{year} for {len(users)} employees ({workers} workers)...')
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = service.calculate(users)
+        else:
+            # Workers only run the pure calculations; DB work stays in this process.
+            # The pool forks lazily (after the batch loads reopened the connection),
+            # so each child drops the inherited connection in its initializer.
+            chunksize = max(1, math.ceil(len(users) / (workers * self.CHUNKS_PER_WORKER)))
+            with ProcessPoolExecutor(max_workers=workers, initializer=release_inherited_connections) as executor:
+                results = service.calculate(users, executor=executor, chunksize=chunksize)
+        elapsed = time.perf_counter() - started
+
+        for failure in results['failed']:
+            self.stdout.write(self.style.WARNING(f"  {failure['user_name']}: {failure['reason']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.2f}s. {len(results['success'])} calculated, "
+            f"{len(results['failed'])} failed of {results['total']}"
+        ))
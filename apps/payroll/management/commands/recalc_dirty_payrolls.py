@@ -0,0 +1,53 @@
+"""
+Management command to recalculate draft payrolls whose inputs changed
+"""
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payroll.models import Payroll
+from apps.payroll.services import PayrollRecalculationService, release_inherited_connections
+
+
+class Command(BaseCommand):
+    help = 'Recalculate only the draft payrolls marked dirty by attendance / order changes'
+
+    CHUNKS_PER_WORKER = 4
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (1 = serial in this process)'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        pending = Payroll.objects.filter(status='draft', dirty_at__isnull=False).count()
+        if not pending:
+            self.stdout.write('No dirty payrolls')
+            return
+        self.stdout.write(f'Recalculating {pending} dirty payrolls ({workers} workers)...')
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = PayrollRecalculationService.recalculate_dirty()
+        else:
+            chunksize = max(1, math.ceil(pending / (workers * self.CHUNKS_PER_WORKER)))
+            with ProcessPoolExecutor(max_workers=workers, initializer=release_inherited_connections) as executor:
+                results = PayrollRecalculationService.recalculate_dirty(executor=executor, chunksize=chunksize)
+        elapsed = time.perf_counter() - started
+
+        for failure in results['failed']:
+            self.stdout.write(self.style.WARNING(f"  {failure['user_name']}: {failure['reason']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.2f}s. {results['recalculated']} recalculated, "
+            f"{results['skipped']} changed again during the run, {len(results['failed'])} failed"
+        ))
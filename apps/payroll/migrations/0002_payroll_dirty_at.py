@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payroll", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payroll",
+            name="dirty_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Thời điểm chấm công / đơn hàng thay đổi sau khi tính (bản nháp cần tính lại)",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payroll",
+            index=models.Index(
+                fields=["status", "dirty_at"], name="payrolls_status_2ffdc7_idx"
+            ),
+        ),
+    ]
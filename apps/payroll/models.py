@@ -363,6 +363,11 @@ class Payroll(models.Model):
         default='draft',
         help_text="Trạng thái"
     )
+    dirty_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Thời điểm chấm công / đơn hàng thay đổi sau khi tính (bản nháp cần tính lại)"
+    )
 
     # Notes
     notes = models.TextField(blank=True, null=True, help_text="Ghi chú")
@@ -400,6 +405,7 @@ class Payroll(models.Model):
             models.Index(fields=['user', 'year', 'month']),
             models.Index(fields=['status']),
             models.Index(fields=['year', 'month']),
+            models.Index(fields=['status', 'dirty_at']),
         ]
 
     def __str__(self):
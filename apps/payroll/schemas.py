@@ -163,3 +163,74 @@ class EmployeePayrollSummary(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SalaryConfigOverrides(BaseModel):
+    """Giá trị cấu hình lương muốn thử (None = giữ nguyên cấu hình hiện tại)"""
+    base_salary: Optional[Decimal] = Field(None, ge=0)
+    standard_working_days: Optional[int] = Field(None, gt=0)
+    attendance_allowance: Optional[Decimal] = Field(None, ge=0)
+    transportation_allowance: Optional[Decimal] = Field(None, ge=0)
+    meal_allowance: Optional[Decimal] = Field(None, ge=0)
+    phone_allowance: Optional[Decimal] = Field(None, ge=0)
+    enable_commission: Optional[bool] = None
+    commission_rate_1: Optional[Decimal] = Field(None, ge=0)
+    commission_threshold_2: Optional[Decimal] = Field(None, ge=0)
+    commission_rate_2: Optional[Decimal] = Field(None, ge=0)
+    commission_threshold_3: Optional[Decimal] = Field(None, ge=0)
+    commission_rate_3: Optional[Decimal] = Field(None, ge=0)
+    commission_threshold_4: Optional[Decimal] = Field(None, ge=0)
+    commission_rate_4: Optional[Decimal] = Field(None, ge=0)
+    kpi_bonus_amount: Optional[Decimal] = Field(None, ge=0)
+    social_insurance_rate: Optional[Decimal] = Field(None, ge=0)
+    health_insurance_rate: Optional[Decimal] = Field(None, ge=0)
+    unemployment_insurance_rate: Optional[Decimal] = Field(None, ge=0)
+
+
+class PayrollSimulateRequest(BaseModel):
+    """Schema for payroll what-if simulation request"""
+    year: int
+    month: int = Field(..., ge=1, le=12)
+    overrides: SalaryConfigOverrides
+    role_ids: Optional[list[UUID]] = None  # If None, overrides apply to every role's config
+    user_ids: Optional[list[UUID]] = None  # If None, simulate all eligible users
+    refresh: bool = False  # Reload monthly aggregates instead of using the cache
+
+
+class PayrollSimulationFigures(BaseModel):
+    """Main payroll figures used in a simulation"""
+    gross_salary: Decimal
+    sales_commission: Decimal
+    kpi_bonus: Decimal
+    total_insurance: Decimal
+    personal_income_tax: Decimal
+    net_salary: Decimal
+
+
+class EmployeePayrollSimulation(BaseModel):
+    """Schema for one employee in a payroll simulation"""
+    user_id: UUID
+    user_name: str
+    role_name: str
+    baseline: PayrollSimulationFigures
+    simulated: PayrollSimulationFigures
+    delta: PayrollSimulationFigures
+
+
+class PayrollSimulationFailure(BaseModel):
+    """Employee that could not be simulated"""
+    user_id: UUID
+    user_name: str
+    reason: str
+
+
+class PayrollSimulationResult(BaseModel):
+    """Schema for payroll what-if simulation result"""
+    year: int
+    month: int
+    total_employees: int
+    baseline: PayrollSimulationFigures
+    simulated: PayrollSimulationFigures
+    delta: PayrollSimulationFigures
+    employees: list[EmployeePayrollSimulation]
+    failed: list[PayrollSimulationFailure]
@@ -1,23 +1,102 @@
 """
 Payroll Services - Business logic for salary calculation
 """
+from concurrent.futures import Executor
 from decimal import Decimal
-from django.db.models import Sum
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from datetime import datetime
+from datetime import date
+from api import metrics
+from apps.business_day import business_date, month_end
 from apps.users.models import User, Attendance
-from apps.seafood.models import Order
+from apps.rbac.models import UserRole
+from apps.seafood.repositories import SalesFactRepository
 from .models import SalaryConfiguration, Payroll, PayrollAdjustment
+from . import calculations
 
 
-class PayrollCalculationService:
-    """Service để tính lương"""
+def _attendance_aggregates() -> dict:
+    """Số ngày công đủ / nửa ngày trong một truy vấn"""
+    return {
+        'full_days': Count('id', filter=Q(attendance_type='full')),
+        'half_days': Count('id', filter=Q(attendance_type='half')),
+    }
+
+
+def _working_days_from_row(row: dict) -> Decimal:
+    return Decimal(row['full_days'] or 0) + (Decimal(row['half_days'] or 0) * Decimal('0.5'))
+
+
+def _order_aggregates() -> dict:
+    """Tổng hợp đơn hàng trong tháng từ các dòng DailySalesFact cấp đơn"""
+    completed = Q(status='completed')
+    return {
+        'total_orders': Sum('order_count'),
+        'completed_orders': Sum('order_count', filter=completed),
+        'total_revenue': Sum('revenue'),
+        'completed_revenue': Sum('revenue', filter=completed),
+        'total_paid': Sum('paid_amount'),
+    }
+
+
+def _order_totals_from_row(row: Optional[dict]) -> dict:
+    row = row or {}
+    return {
+        'total_orders': row.get('total_orders') or 0,
+        'completed_orders': row.get('completed_orders') or 0,
+        'total_revenue': row.get('total_revenue') or Decimal('0'),
+        'completed_revenue': row.get('completed_revenue') or Decimal('0'),
+        'total_paid': row.get('total_paid') or Decimal('0'),
+    }
 
-    def __init__(self, user: User, year: int, month: int):
+
+def release_inherited_connections() -> None:
+    """
+    Initializer cho ProcessPoolExecutor: bỏ các kết nối DB kế thừa khi fork
+
+    Worker chỉ chạy phần tính toán thuần, nhưng fork vẫn sao chép kết nối đang
+    mở của tiến trình cha. Không gọi close() ở đây: close() gửi lệnh kết thúc
+    qua socket dùng chung và cắt luôn kết nối của tiến trình cha. Chỉ bỏ tham
+    chiếu (psycopg không đóng kết nối do tiến trình khác mở); nếu worker cần
+    DB, Django sẽ mở kết nối mới.
+    """
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+def build_payroll_record(user: User, year: int, month: int, figures: dict, notes: str = '') -> Payroll:
+    """Tạo bản ghi Payroll nháp (chưa lưu) từ số liệu của calculations.calculate_payroll_figures"""
+    return Payroll(user=user, year=year, month=month, status='draft', notes=notes, **figures)
+
+
+class PayrollCalculationService:
+    """
+    Service để tính lương
+
+    salary_config / working_days / order_totals có thể truyền sẵn (tính lương
+    hàng loạt) để không phải truy vấn lại cho từng nhân viên.
+    """
+
+    def __init__(
+        self,
+        user: User,
+        year: int,
+        month: int,
+        salary_config: Optional[SalaryConfiguration] = None,
+        working_days: Optional[Decimal] = None,
+        order_totals: Optional[dict] = None
+    ):
         self.user = user
         self.year = year
         self.month = month
-        self.salary_config = self._get_salary_config()
+        self.salary_config = salary_config or self._get_salary_config()
+        self.config_data = calculations.config_to_dict(self.salary_config)
+        self._working_days = working_days
+        self._order_totals = order_totals
 
     def _get_salary_config(self) -> SalaryConfiguration:
         """Lấy cấu hình lương của user"""
@@ -44,353 +123,521 @@ class PayrollCalculationService:
         - Half day = 0.5 ngày
         - Off = 0 ngày
         """
-        # Get first and last day of month
-        first_day = datetime(self.year, self.month, 1).date()
-        if self.month == 12:
-            last_day = datetime(self.year + 1, 1, 1).date()
-        else:
-            last_day = datetime(self.year, self.month + 1, 1).date()
-
-        # Get attendances
-        attendances = Attendance.objects.filter(
-            user=self.user,
-            date__gte=first_day,
-            date__lt=last_day
-        )
-
-        full_days = attendances.filter(attendance_type='full').count()
-        half_days = attendances.filter(attendance_type='half').count()
+        if self._working_days is None:
+            # Get attendances
+            row = Attendance.objects.filter(
+                user=self.user,
+                date__gte=date(self.year, self.month, 1),
+                date__lte=month_end(self.year, self.month)
+            ).aggregate(**_attendance_aggregates())
+            self._working_days = _working_days_from_row(row)
 
-        total_days = Decimal(full_days) + (Decimal(half_days) * Decimal('0.5'))
-        return total_days
+        return self._working_days
 
     def calculate_actual_base_salary(self, working_days: Decimal) -> Decimal:
-        """
-        Tính lương cơ bản thực tế theo công thức:
-        Lương CB thực = (Lương CB / Số ngày chuẩn) × Số ngày công thực tế
-        """
-        daily_rate = self.salary_config.base_salary / Decimal(self.salary_config.standard_working_days)
-        actual_salary = daily_rate * working_days
-        return actual_salary.quantize(Decimal('0.01'))
+        """Lương CB thực = (Lương CB / Số ngày chuẩn) × Số ngày công thực tế"""
+        return calculations.actual_base_salary(self.config_data, working_days)
 
     def calculate_attendance_allowance(self, working_days: Decimal) -> Decimal:
-        """
-        Tính phụ cấp chuyên cần:
-        - Đi đủ công (>= standard - 1): Full allowance
-        - Nghỉ 1-2 ngày: 60% allowance
-        - Nghỉ >2 ngày: 0
-        """
-        standard_days = Decimal(self.salary_config.standard_working_days)
-        days_off = standard_days - working_days
-
-        if days_off <= 1:
-            return self.salary_config.attendance_allowance
-        elif days_off <= 3:
-            return self.salary_config.attendance_allowance * Decimal('0.6')
-        else:
-            return Decimal('0')
+        """Phụ cấp chuyên cần theo số ngày nghỉ"""
+        return calculations.attendance_allowance(self.config_data, working_days)
+
+    def get_month_order_totals(self) -> dict:
+        """Tổng hợp đơn hàng do user tạo trong tháng (từ bảng DailySalesFact)"""
+        if self._order_totals is None:
+            totals = SalesFactRepository().order_facts(
+                user_id=self.user.id,
+                date_from=date(self.year, self.month, 1),
+                date_to=month_end(self.year, self.month)
+            ).aggregate(**_order_aggregates())
+            self._order_totals = _order_totals_from_row(totals)
+        return self._order_totals
 
     def calculate_sales_commission(self) -> tuple[Decimal, Decimal]:
         """
-        Tính hoa hồng doanh số theo bậc thang:
-        - < 20M: 1%
-        - 20-50M: 1.5%
-        - 50-100M: 2%
-        - > 100M: 2.5%
+        Tính hoa hồng doanh số theo bậc thang
 
         Returns: (commission_amount, total_revenue)
         """
-        if not self.salary_config.enable_commission:
-            return Decimal('0'), Decimal('0')
+        return calculations.sales_commission(self.config_data, self.get_month_order_totals())
 
-        # Get first and last day of month
-        first_day = datetime(self.year, self.month, 1)
-        if self.month == 12:
-            last_day = datetime(self.year + 1, 1, 1)
-        else:
-            last_day = datetime(self.year, self.month + 1, 1)
-
-        # Get total revenue from completed orders
-        orders = Order.objects.filter(
-            created_by=self.user,
-            created_at__gte=first_day,
-            created_at__lt=last_day,
-            status='completed'
+    def calculate_kpi_score(self) -> Decimal:
+        """Tính điểm KPI (0-100)"""
+        return calculations.kpi_score(
+            self.config_data,
+            self.calculate_working_days(),
+            self.get_month_order_totals()
         )
 
-        total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
+    def calculate_kpi_bonus(self, kpi_score: Decimal) -> Decimal:
+        """Thưởng KPI = (Điểm KPI / 100) × Mức thưởng KPI"""
+        return calculations.kpi_bonus(self.config_data, kpi_score)
 
-        # Calculate commission based on revenue tiers
-        if total_revenue < self.salary_config.commission_threshold_2:
-            commission_rate = self.salary_config.commission_rate_1
-        elif total_revenue < self.salary_config.commission_threshold_3:
-            commission_rate = self.salary_config.commission_rate_2
-        elif total_revenue < self.salary_config.commission_threshold_4:
-            commission_rate = self.salary_config.commission_rate_3
-        else:
-            commission_rate = self.salary_config.commission_rate_4
+    def calculate_insurance(self, base_salary: Decimal) -> dict:
+        """Tính BHXH / BHYT / BHTN"""
+        return calculations.insurance(self.config_data, base_salary)
 
-        commission = (total_revenue * commission_rate / Decimal('100')).quantize(Decimal('0.01'))
-        return commission, total_revenue
+    def calculate_personal_income_tax(self, gross_salary: Decimal, total_insurance: Decimal, dependents: int = 0) -> dict:
+        """Tính thuế TNCN theo bậc thang lũy tiến"""
+        return calculations.personal_income_tax(gross_salary, total_insurance, dependents)
 
-    def calculate_kpi_score(self) -> Decimal:
+    def calculate_payroll(self, dependents: int = 0, advance_payment: Decimal = Decimal('0'),
+                         penalty: Decimal = Decimal('0'), other_bonus: Decimal = Decimal('0'),
+                         other_deduction: Decimal = Decimal('0'), notes: str = '') -> Payroll:
         """
-        Tính điểm KPI (0-100):
-        - Doanh số đạt (30 điểm)
-        - Số đơn hàng (20 điểm)
-        - Tỷ lệ thu tiền (20 điểm)
-        - Chất lượng dịch vụ (15 điểm)
-        - Chấm công (15 điểm)
+        Tính toán và tạo bảng lương hoàn chỉnh
         """
-        # Get first and last day of month
-        first_day = datetime(self.year, self.month, 1)
-        if self.month == 12:
-            last_day = datetime(self.year + 1, 1, 1)
-        else:
-            last_day = datetime(self.year, self.month + 1, 1)
-
-        # Get orders
-        orders = Order.objects.filter(
-            created_by=self.user,
-            created_at__gte=first_day,
-            created_at__lt=last_day
+        payroll = self.build_payroll(
+            dependents=dependents,
+            advance_payment=advance_payment,
+            penalty=penalty,
+            other_bonus=other_bonus,
+            other_deduction=other_deduction,
+            notes=notes
         )
+        payroll.save(force_insert=True)
+        return payroll
 
-        total_orders = orders.count()
-        completed_orders = orders.filter(status='completed').count()
-        total_revenue = orders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        total_paid = orders.aggregate(total=Sum('paid_amount'))['total'] or Decimal('0')
-
-        score = Decimal('0')
-
-        # 1. Doanh số đạt (30 điểm) - Mục tiêu 50M
-        revenue_target = Decimal('50000000')
-        if total_revenue >= revenue_target:
-            score += Decimal('30')
-        else:
-            score += (total_revenue / revenue_target) * Decimal('30')
-
-        # 2. Số đơn hàng (20 điểm) - Mục tiêu 20 đơn
-        orders_target = 20
-        if total_orders >= orders_target:
-            score += Decimal('20')
-        else:
-            score += (Decimal(total_orders) / Decimal(orders_target)) * Decimal('20')
+    def build_payroll(self, dependents: int = 0, advance_payment: Decimal = Decimal('0'),
+                      penalty: Decimal = Decimal('0'), other_bonus: Decimal = Decimal('0'),
+                      other_deduction: Decimal = Decimal('0'), notes: str = '') -> Payroll:
+        """
+        Tính toán bảng lương (chưa lưu DB)
+        """
+        figures = calculations.calculate_payroll_figures(
+            self.config_data,
+            self.calculate_working_days(),
+            self.get_month_order_totals(),
+            dependents=dependents,
+            advance_payment=advance_payment,
+            penalty=penalty,
+            other_bonus=other_bonus,
+            other_deduction=other_deduction
+        )
+        return build_payroll_record(self.user, self.year, self.month, figures, notes=notes)
 
-        # 3. Tỷ lệ thu tiền (20 điểm)
-        if total_revenue > 0:
-            collection_rate = (total_paid / total_revenue) * Decimal('20')
-            score += collection_rate
-        else:
-            score += Decimal('0')
 
-        # 4. Chất lượng dịch vụ (15 điểm) - Tỷ lệ hoàn thành
-        if total_orders > 0:
-            completion_rate = (Decimal(completed_orders) / Decimal(total_orders)) * Decimal('15')
-            score += completion_rate
-        else:
-            score += Decimal('0')
+class BulkPayrollService:
+    """
+    Tính lương hàng loạt theo lô
 
-        # 5. Chấm công (15 điểm)
-        working_days = self.calculate_working_days()
-        standard_days = Decimal(self.salary_config.standard_working_days)
-        attendance_rate = (working_days / standard_days) * Decimal('15')
-        score += attendance_rate
+    Vai trò, cấu hình lương, ngày công, doanh số và bảng lương hiện có của
+    cả lô được nạp bằng vài truy vấn gom nhóm; tính toán thực hiện trong bộ
+    nhớ (có thể chia ra nhiều tiến trình, xem compute) và ghi bằng một
+    bulk_create trong transaction.
+    """
 
-        return score.quantize(Decimal('0.01'))
+    ELIGIBLE_ROLE_SLUGS = ['salesperson', 'accountant', 'warehouse', 'manager']
 
-    def calculate_kpi_bonus(self, kpi_score: Decimal) -> Decimal:
-        """
-        Tính thưởng KPI dựa trên điểm KPI:
-        Thưởng KPI = (Điểm KPI / 100) × Mức thưởng KPI
+    def __init__(self, year: int, month: int):
+        self.year = year
+        self.month = month
+        self.first_day = date(year, month, 1)
+        self.last_day = month_end(year, month)
+
+    @classmethod
+    def eligible_users(cls, user_ids: Optional[Iterable[UUID]] = None):
+        """Nhân viên cần tính lương (mặc định: tất cả nhân viên đang làm việc)"""
+        if user_ids:
+            return User.objects.filter(id__in=list(user_ids), is_active=True)
+        return User.objects.filter(
+            is_active=True,
+            user_roles__role__slug__in=cls.ELIGIBLE_ROLE_SLUGS
+        ).distinct()
+
+    def load_primary_roles(self, user_ids: List[UUID]) -> Dict[UUID, UserRole]:
+        """Role chính của mỗi user (giống user.get_roles().first())"""
+        primary = {}
+        user_roles = UserRole.objects.filter(
+            user_id__in=user_ids,
+            is_active=True
+        ).select_related('role').order_by('user_id', 'pk')
+        for user_role in user_roles:
+            primary.setdefault(user_role.user_id, user_role)
+        return primary
+
+    def load_salary_configs(self, role_ids: Iterable[UUID]) -> Dict[UUID, SalaryConfiguration]:
+        configs = {}
+        for config in SalaryConfiguration.objects.filter(role_id__in=set(role_ids), is_active=True).order_by('pk'):
+            configs.setdefault(config.role_id, config)
+        return configs
+
+    def load_working_days(self, user_ids: List[UUID]) -> Dict[UUID, Decimal]:
+        rows = Attendance.objects.filter(
+            user_id__in=user_ids,
+            date__gte=self.first_day,
+            date__lte=self.last_day
+        ).values('user_id').annotate(**_attendance_aggregates()).order_by()
+        return {row['user_id']: _working_days_from_row(row) for row in rows}
+
+    def load_order_totals(self, user_ids: List[UUID]) -> Dict[UUID, dict]:
+        rows = SalesFactRepository().order_facts(
+            date_from=self.first_day,
+            date_to=self.last_day
+        ).filter(user_id__in=user_ids).values('user_id').annotate(**_order_aggregates()).order_by()
+        return {row['user_id']: _order_totals_from_row(row) for row in rows}
+
+    def prepare(
+        self,
+        users: List[User],
+        failed: list,
+        extras: Optional[Dict[UUID, dict]] = None
+    ) -> tuple[list, Dict[UUID, UUID]]:
         """
-        kpi_bonus = (kpi_score / Decimal('100')) * self.salary_config.kpi_bonus_amount
-        return kpi_bonus.quantize(Decimal('0.01'))
+        Nạp dữ liệu đầu vào của cả lô
 
-    def calculate_insurance(self, base_salary: Decimal) -> dict:
-        """
-        Tính bảo hiểm:
-        - BHXH: 8%
-        - BHYT: 1.5%
-        - BHTN: 1%
+        extras: tham số nhập tay theo user (người phụ thuộc, tạm ứng...), mặc định 0.
+        Returns: (tasks, replaced_drafts) - tasks là các tuple dữ liệu thuần cho
+        calculations.calculate_payroll_task; nhân viên không tính được được ghi vào failed.
         """
-        social_insurance = (base_salary * self.salary_config.social_insurance_rate / Decimal('100')).quantize(Decimal('0.01'))
-        health_insurance = (base_salary * self.salary_config.health_insurance_rate / Decimal('100')).quantize(Decimal('0.01'))
-        unemployment_insurance = (base_salary * self.salary_config.unemployment_insurance_rate / Decimal('100')).quantize(Decimal('0.01'))
+        extras = extras or {}
+        user_ids = [user.id for user in users]
+        roles = self.load_primary_roles(user_ids)
+        configs = self.load_salary_configs(user_role.role_id for user_role in roles.values())
+        working_days = self.load_working_days(user_ids)
+        order_totals = self.load_order_totals(user_ids)
+        existing = {
+            row['user_id']: row
+            for row in Payroll.objects.filter(
+                user_id__in=user_ids,
+                year=self.year,
+                month=self.month
+            ).values('id', 'user_id', 'status')
+        }
 
-        total_insurance = social_insurance + health_insurance + unemployment_insurance
+        config_data = {}
+        tasks = []
+        replaced_drafts = {}
+        for user in users:
+            try:
+                current = existing.get(user.id)
+                if current and current['status'] != 'draft':
+                    raise ValueError(f"Đã tồn tại với trạng thái {current['status']}")
+
+                user_role = roles.get(user.id)
+                if not user_role:
+                    raise ValueError(f"User {user.email} không có role")
+                config = configs.get(user_role.role_id)
+                if not config:
+                    raise ValueError(f"Không tìm thấy cấu hình lương cho role {user_role.role.name}")
+            except ValueError as e:
+                failed.append(self._failure(user, e))
+                continue
+
+            if config.pk not in config_data:
+                config_data[config.pk] = calculations.config_to_dict(config)
+            if current:
+                replaced_drafts[user.id] = current['id']
+            tasks.append((
+                user.id,
+                config_data[config.pk],
+                working_days.get(user.id, Decimal('0')),
+                order_totals.get(user.id, _order_totals_from_row(None)),
+                extras.get(user.id, {})
+            ))
+
+        return tasks, replaced_drafts
+
+    def compute(self, tasks: list, executor: Optional[Executor] = None, chunksize: int = 1) -> Dict[UUID, tuple]:
+        """
+        Tính số liệu lương cho các task: {user_id: (figures, error)}
 
-        return {
-            'social_insurance': social_insurance,
-            'health_insurance': health_insurance,
-            'unemployment_insurance': unemployment_insurance,
-            'total_insurance': total_insurance
-        }
+        executor (vd. ProcessPoolExecutor(initializer=release_inherited_connections))
+        cho phép chia việc ra nhiều tiến trình; kết quả giống hệt khi chạy tuần tự.
+        """
+        if executor is None:
+            mapped = map(calculations.calculate_payroll_task, tasks)
+        else:
+            mapped = executor.map(calculations.calculate_payroll_task, tasks, chunksize=chunksize)
+        return {user_id: (figures, error) for user_id, figures, error in mapped}
 
-    def calculate_personal_income_tax(self, gross_salary: Decimal, total_insurance: Decimal, dependents: int = 0) -> dict:
+    def calculate(self, users: Iterable[User], executor: Optional[Executor] = None, chunksize: int = 1) -> dict:
         """
-        Tính thuế TNCN theo bậc thang lũy tiến:
-
-        Thu nhập chịu thuế = Tổng thu nhập - BH - Giảm trừ bản thân - Giảm trừ người phụ thuộc
-
-        Bậc thuế:
-        - Đến 5M: 5%
-        - Trên 5-10M: 10%
-        - Trên 10-18M: 15%
-        - Trên 18-32M: 20%
-        - Trên 32-52M: 25%
-        - Trên 52-80M: 30%
-        - Trên 80M: 35%
+        Tính lương cho danh sách nhân viên
+
+        Bảng lương nháp cũ được thay thế; bảng lương đã chuyển trạng thái được giữ nguyên.
+        Returns: {'success': [...], 'failed': [...], 'total': int}
         """
-        personal_deduction = Decimal('11000000')  # 11M
-        dependent_deduction = Decimal('4400000') * Decimal(dependents)  # 4.4M per dependent
-
-        # Calculate taxable income
-        taxable_income = gross_salary - total_insurance - personal_deduction - dependent_deduction
-
-        if taxable_income <= 0:
-            return {
-                'taxable_income': Decimal('0'),
-                'personal_deduction': personal_deduction,
-                'dependent_deduction': dependent_deduction,
-                'tax': Decimal('0')
+        users = list(users)
+        results = {'success': [], 'failed': [], 'total': len(users)}
+        if not users:
+            return results
+
+        tasks, _ = self.prepare(users, results['failed'])
+        computed = self.compute(tasks, executor=executor, chunksize=chunksize)
+
+        payrolls = {}
+        for user in users:
+            if user.id not in computed:
+                continue
+            figures, error = computed[user.id]
+            if error is not None:
+                results['failed'].append(self._failure(user, error))
+                continue
+            payrolls[user.id] = build_payroll_record(user, self.year, self.month, figures)
+
+        with transaction.atomic():
+            # Bảng lương có thể đã được duyệt / tạo mới từ lúc prepare: khóa và đọc lại
+            current = Payroll.objects.select_for_update().filter(
+                user_id__in=list(payrolls),
+                year=self.year,
+                month=self.month
+            ).values_list('id', 'user_id', 'status')
+            replaced = []
+            for payroll_id, user_id, status in current:
+                if status == 'draft':
+                    replaced.append(payroll_id)
+                else:
+                    payroll = payrolls.pop(user_id)
+                    results['failed'].append(self._failure(payroll.user, f"Đã tồn tại với trạng thái {status}"))
+            if replaced:
+                Payroll.objects.filter(id__in=replaced).delete()
+            Payroll.objects.bulk_create(list(payrolls.values()), batch_size=500)
+
+        results['success'] = [
+            {
+                'user_id': str(user_id),
+                'user_name': payroll.user.full_name,
+                'net_salary': float(payroll.net_salary)
             }
-
-        # Tax brackets (in VND)
-        brackets = [
-            (5000000, 0.05),
-            (10000000, 0.10),
-            (18000000, 0.15),
-            (32000000, 0.20),
-            (52000000, 0.25),
-            (80000000, 0.30),
-            (float('inf'), 0.35)
+            for user_id, payroll in payrolls.items()
         ]
+        return results
 
-        tax = Decimal('0')
-        remaining = taxable_income
-        prev_bracket = Decimal('0')
-
-        for bracket_limit, rate in brackets:
-            if remaining <= 0:
-                break
-
-            taxable_in_bracket = min(remaining, Decimal(bracket_limit) - prev_bracket)
-            tax += taxable_in_bracket * Decimal(str(rate))
-            remaining -= taxable_in_bracket
-            prev_bracket = Decimal(bracket_limit)
-
+    @staticmethod
+    def _failure(user: User, reason) -> dict:
         return {
-            'taxable_income': taxable_income,
-            'personal_deduction': personal_deduction,
-            'dependent_deduction': dependent_deduction,
-            'tax': tax.quantize(Decimal('0.01'))
+            'user_id': str(user.id),
+            'user_name': user.full_name,
+            'reason': str(reason)
         }
 
-    def calculate_payroll(self, dependents: int = 0, advance_payment: Decimal = Decimal('0'),
-                         penalty: Decimal = Decimal('0'), other_bonus: Decimal = Decimal('0'),
-                         other_deduction: Decimal = Decimal('0'), notes: str = '') -> Payroll:
-        """
-        Tính toán và tạo bảng lương hoàn chỉnh
-        """
-        # 1. Calculate working days
-        working_days = self.calculate_working_days()
-
-        # 2. Calculate actual base salary
-        actual_base_salary = self.calculate_actual_base_salary(working_days)
-
-        # 3. Calculate allowances
-        attendance_allowance = self.calculate_attendance_allowance(working_days)
-        transportation_allowance = self.salary_config.transportation_allowance
-        meal_allowance = self.salary_config.meal_allowance
-        phone_allowance = self.salary_config.phone_allowance
-        total_allowances = attendance_allowance + transportation_allowance + meal_allowance + phone_allowance
-
-        # 4. Calculate bonuses
-        sales_commission, sales_revenue = self.calculate_sales_commission()
-        kpi_score = self.calculate_kpi_score()
-        kpi_bonus = self.calculate_kpi_bonus(kpi_score)
-        total_bonuses = sales_commission + kpi_bonus + other_bonus
-
-        # 5. Calculate gross salary
-        gross_salary = actual_base_salary + total_allowances + total_bonuses
-
-        # 6. Calculate insurance (based on base salary)
-        insurance = self.calculate_insurance(self.salary_config.base_salary)
-
-        # 7. Calculate tax
-        tax_data = self.calculate_personal_income_tax(
-            gross_salary,
-            insurance['total_insurance'],
-            dependents
-        )
-
-        # 8. Calculate total deductions
-        total_deductions = (
-            insurance['total_insurance'] +
-            tax_data['tax'] +
-            advance_payment +
-            penalty +
-            other_deduction
-        )
-
-        # 9. Calculate net salary
-        net_salary = gross_salary - total_deductions
-
-        # 10. Create payroll record
-        payroll = Payroll.objects.create(
-            user=self.user,
-            year=self.year,
-            month=self.month,
-
-            # Base salary
-            base_salary=self.salary_config.base_salary,
-            working_days=working_days,
-            standard_working_days=self.salary_config.standard_working_days,
-            actual_base_salary=actual_base_salary,
-
-            # Allowances
-            attendance_allowance=attendance_allowance,
-            transportation_allowance=transportation_allowance,
-            meal_allowance=meal_allowance,
-            phone_allowance=phone_allowance,
-            total_allowances=total_allowances,
-
-            # Bonuses
-            sales_commission=sales_commission,
-            sales_revenue=sales_revenue,
-            kpi_score=kpi_score,
-            kpi_bonus=kpi_bonus,
-            other_bonus=other_bonus,
-            total_bonuses=total_bonuses,
 
-            # Gross
-            gross_salary=gross_salary,
+class PayrollRecalculationService:
+    """
+    Tính lại các bảng lương nháp bị đánh dấu dirty
+
+    Signal trên Attendance / Order gọi mark_dirty cho (user, năm, tháng) bị ảnh
+    hưởng; job recalc_dirty_payrolls chỉ tính lại những bản nháp đó, giữ nguyên
+    các khoản nhập tay (người phụ thuộc, tạm ứng, phạt, thưởng / khấu trừ khác).
+    """
+
+    @staticmethod
+    def mark_dirty(user_ids: Iterable[Optional[UUID]], year: int, month: int) -> int:
+        """Đánh dấu bảng lương nháp cần tính lại; trả về số bản ghi bị đánh dấu"""
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not user_ids:
+            return 0
+        return Payroll.objects.filter(
+            user_id__in=user_ids,
+            year=year,
+            month=month,
+            status='draft'
+        ).update(dirty_at=timezone.now())
+
+    @staticmethod
+    def mark_dirty_at(user_ids: Iterable[Optional[UUID]], created_at) -> int:
+        """Đánh dấu theo tháng (giờ kinh doanh) của một thời điểm, vd. Order.created_at"""
+        day = business_date(created_at)
+        return PayrollRecalculationService.mark_dirty(user_ids, day.year, day.month)
+
+    @staticmethod
+    def recalculate_dirty(executor: Optional[Executor] = None, chunksize: int = 1) -> dict:
+        """
+        Tính lại mọi bảng lương nháp đang dirty
 
-            # Insurance
-            social_insurance=insurance['social_insurance'],
-            health_insurance=insurance['health_insurance'],
-            unemployment_insurance=insurance['unemployment_insurance'],
-            total_insurance=insurance['total_insurance'],
+        Mỗi bản ghi chỉ được ghi nếu dirty_at không đổi (kiểm tra dưới
+        select_for_update, ghi bằng một bulk_update mỗi tháng): nếu dữ liệu lại
+        thay đổi trong lúc tính, bản ghi vẫn dirty và được tính ở lần chạy sau.
+        Returns: {'recalculated': int, 'skipped': int, 'failed': [...]}
+        """
+        results = {'recalculated': 0, 'skipped': 0, 'failed': []}
+        dirty = Payroll.objects.filter(
+            status='draft',
+            dirty_at__isnull=False
+        ).select_related('user').order_by('year', 'month', 'pk')
+
+        periods = {}
+        for payroll in dirty:
+            periods.setdefault((payroll.year, payroll.month), []).append(payroll)
+
+        for (year, month), payrolls in periods.items():
+            service = BulkPayrollService(year, month)
+            by_user = {payroll.user_id: payroll for payroll in payrolls}
+            tasks, _ = service.prepare(
+                [payroll.user for payroll in payrolls],
+                results['failed'],
+                extras={user_id: calculations.payroll_extras(payroll) for user_id, payroll in by_user.items()}
+            )
+            computed = service.compute(tasks, executor=executor, chunksize=chunksize)
+
+            calculated = {}
+            for user_id, (figures, error) in computed.items():
+                if error is not None:
+                    results['failed'].append(BulkPayrollService._failure(by_user[user_id].user, error))
+                    continue
+                calculated[by_user[user_id].pk] = figures
+            if not calculated:
+                continue
+
+            now = timezone.now()
+            with transaction.atomic():
+                # Khóa các bản nháp rồi ghi một lần; bản ghi có dirty_at đã đổi thì bỏ qua
+                current = dict(Payroll.objects.select_for_update().filter(
+                    pk__in=list(calculated),
+                    status='draft'
+                ).values_list('pk', 'dirty_at'))
+                changed = []
+                for payroll in payrolls:
+                    figures = calculated.get(payroll.pk)
+                    if figures is None:
+                        continue
+                    if current.get(payroll.pk) != payroll.dirty_at:
+                        results['skipped'] += 1
+                        continue
+                    for field, value in figures.items():
+                        setattr(payroll, field, value)
+                    payroll.dirty_at = None
+                    payroll.updated_at = now
+                    changed.append(payroll)
+                if changed:
+                    fields = [*next(iter(calculated.values())), 'dirty_at', 'updated_at']
+                    Payroll.objects.bulk_update(changed, fields, batch_size=500)
+                results['recalculated'] += len(changed)
+
+        return results
+
+
+class PayrollSimulationService:
+    """
+    Mô phỏng bảng lương khi thay đổi cấu hình lương (what-if), không ghi DB
+
+    Ngày công và doanh số của tháng được nạp một lần cho toàn bộ nhân viên và
+    cache trong CACHE_SECONDS; mỗi lần mô phỏng chỉ đọc role / cấu hình lương
+    hiện tại rồi tính lại hai lần (cấu hình hiện tại và cấu hình đã sửa) trong bộ nhớ.
+    """
+
+    CACHE_KEY = 'payroll:month_inputs:{year}-{month}'
+    CACHE_SECONDS = 300
+
+    FIGURES = (
+        'gross_salary',
+        'sales_commission',
+        'kpi_bonus',
+        'total_insurance',
+        'personal_income_tax',
+        'net_salary',
+    )
+
+    def __init__(self, year: int, month: int):
+        self.year = year
+        self.month = month
+        self.bulk = BulkPayrollService(year, month)
 
-            # Tax
-            taxable_income=tax_data['taxable_income'],
-            personal_deduction=tax_data['personal_deduction'],
-            dependent_deduction=tax_data['dependent_deduction'],
-            personal_income_tax=tax_data['tax'],
+    def _cache_key(self) -> str:
+        return self.CACHE_KEY.format(year=self.year, month=self.month)
 
-            # Other deductions
-            advance_payment=advance_payment,
-            penalty=penalty,
-            other_deduction=other_deduction,
-            total_deductions=total_deductions,
+    def month_inputs(self, refresh: bool = False) -> dict:
+        """
+        Dữ liệu đầu vào của tháng cho mọi nhân viên đủ điều kiện (có cache)
 
-            # Net
-            net_salary=net_salary,
+        Returns: {'users': [{'id', 'name', 'email'}], 'working_days': {...}, 'order_totals': {...}}
+        """
+        key = self._cache_key()
+        inputs = None if refresh else cache.get(key)
+        if not refresh:
+            metrics.cache_lookup('payroll_inputs', inputs is not None)
+        if inputs is None:
+            users = [
+                {'id': user.id, 'name': user.full_name, 'email': user.email}
+                for user in BulkPayrollService.eligible_users().order_by('pk')
+            ]
+            user_ids = [user['id'] for user in users]
+            inputs = {
+                'users': users,
+                'working_days': self.bulk.load_working_days(user_ids),
+                'order_totals': self.bulk.load_order_totals(user_ids),
+            }
+            cache.set(key, inputs, timeout=self.CACHE_SECONDS)
+        return inputs
+
+    def invalidate(self) -> None:
+        cache.delete(self._cache_key())
+
+    def _figures(self, figures: dict) -> dict:
+        return {name: figures[name] for name in self.FIGURES}
+
+    def simulate(
+        self,
+        overrides: dict,
+        role_ids: Optional[Iterable[UUID]] = None,
+        user_ids: Optional[Iterable[UUID]] = None,
+        refresh: bool = False
+    ) -> dict:
+        """
+        Tính bảng lương theo cấu hình hiện tại và theo cấu hình đã sửa
 
-            # Status
-            status='draft',
-            notes=notes
-        )
+        overrides: {field: value} áp dụng lên cấu hình lương của role_ids (mặc định: mọi role).
+        Returns: chênh lệch từng nhân viên và tổng (xem PayrollSimulationResult)
+        """
+        inputs = self.month_inputs(refresh=refresh)
+        users = inputs['users']
+        if user_ids:
+            wanted = set(user_ids)
+            users = [user for user in users if user['id'] in wanted]
+        role_ids = set(role_ids) if role_ids else None
+
+        roles = self.bulk.load_primary_roles([user['id'] for user in users])
+        configs = self.bulk.load_salary_configs(user_role.role_id for user_role in roles.values())
+        config_data = {}
+        for role_id, config in configs.items():
+            baseline = calculations.config_to_dict(config)
+            simulated = dict(baseline)
+            if role_ids is None or role_id in role_ids:
+                simulated.update(overrides)
+            config_data[role_id] = (baseline, simulated)
+
+        zero = {name: Decimal('0') for name in self.FIGURES}
+        totals = {'baseline': dict(zero), 'simulated': dict(zero)}
+        employees = []
+        failed = []
+        for user in users:
+            user_role = roles.get(user['id'])
+            if not user_role:
+                failed.append({'user_id': user['id'], 'user_name': user['name'],
+                               'reason': f"User {user['email']} không có role"})
+                continue
+            if user_role.role_id not in config_data:
+                failed.append({'user_id': user['id'], 'user_name': user['name'],
+                               'reason': f"Không tìm thấy cấu hình lương cho role {user_role.role.name}"})
+                continue
+
+            working_days = inputs['working_days'].get(user['id'], Decimal('0'))
+            order_totals = inputs['order_totals'].get(user['id'], _order_totals_from_row(None))
+            result = {}
+            for variant, config in zip(('baseline', 'simulated'), config_data[user_role.role_id]):
+                result[variant] = self._figures(
+                    calculations.calculate_payroll_figures(config, working_days, order_totals)
+                )
+                for name in self.FIGURES:
+                    totals[variant][name] += result[variant][name]
+
+            employees.append({
+                'user_id': user['id'],
+                'user_name': user['name'],
+                'role_name': user_role.role.name,
+                'baseline': result['baseline'],
+                'simulated': result['simulated'],
+                'delta': {name: result['simulated'][name] - result['baseline'][name] for name in self.FIGURES},
+            })
 
-        return payroll
+        return {
+            'year': self.year,
+            'month': self.month,
+            'total_employees': len(employees),
+            'baseline': totals['baseline'],
+            'simulated': totals['simulated'],
+            'delta': {name: totals['simulated'][name] - totals['baseline'][name] for name in self.FIGURES},
+            'employees': employees,
+            'failed': failed,
+        }
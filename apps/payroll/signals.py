@@ -0,0 +1,69 @@
+"""
+Payroll Signals
+Đánh dấu bảng lương nháp cần tính lại khi chấm công / đơn hàng thay đổi
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.business_day import business_date
+from apps.seafood.models import Order
+from apps.seafood.signals import orders_updated
+from apps.users.models import Attendance
+from .services import PayrollRecalculationService
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_attendance_period(sender, instance, raw=False, **kwargs):
+    """Lưu user / ngày cũ để đánh dấu cả tháng cũ khi chấm công bị chuyển ngày"""
+    if raw or instance._state.adding:
+        return
+    instance._previous_period = Attendance.objects.filter(pk=instance.pk).values_list('user_id', 'date').first()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def attendance_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    periods = {(instance.user_id, instance.date.year, instance.date.month)}
+    # Lấy ra luôn: nếu để lại, lần delete sau của instance sẽ đánh dấu nhầm tháng cũ
+    previous = instance.__dict__.pop('_previous_period', None)
+    if previous:
+        periods.add((previous[0], previous[1].year, previous[1].month))
+    for user_id, year, month in periods:
+        PayrollRecalculationService.mark_dirty([user_id], year, month)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, raw=False, **kwargs):
+    """
+    Doanh số trong lương lấy từ DailySalesFact (vai trò created_by), được cập nhật
+    ở on_commit do signal của app seafood đăng ký trước (seafood đứng trước payroll
+    trong INSTALLED_APPS). Đánh dấu dirty cũng chạy ở on_commit nên job tính lại
+    luôn đọc được bảng tổng hợp đã cập nhật.
+    """
+    if raw:
+        return
+    # _previous_staff_ids do seafood.signals.remember_order_staff lưu (theo STAFF_ROLE_FIELDS)
+    previous = dict(zip(Order.STAFF_ROLE_FIELDS, getattr(instance, '_previous_staff_ids', ())))
+    user_ids = [instance.created_by_id, previous.get('created_by')]
+    created_at = instance.created_at
+    transaction.on_commit(lambda: PayrollRecalculationService.mark_dirty_at(user_ids, created_at))
+
+
+@receiver(orders_updated)
+def orders_bulk_updated(sender, orders, **kwargs):
+    """Như order_changed, cho các đơn cập nhật bằng queryset.update() (vd. thanh toán)"""
+    periods = {}
+    for order in orders:
+        day = business_date(order['created_at'])
+        periods.setdefault((day.year, day.month), set()).add(order['created_by_id'])
+
+    def mark():
+        for (year, month), user_ids in periods.items():
+            PayrollRecalculationService.mark_dirty(user_ids, year, month)
+
+    if periods:
+        transaction.on_commit(mark)
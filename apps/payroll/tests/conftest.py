@@ -0,0 +1,44 @@
+"""
+Payroll test fixtures
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from apps.payroll.models import SalaryConfiguration
+
+YEAR, MONTH = 2026, 3
+
+
+@pytest.fixture
+def staff(make_user):
+    """Nhân viên sale có ngày công và doanh số ngẫu nhiên (cố định theo seed)"""
+    from apps.rbac.models import Role
+    from apps.seafood.models import DailySalesFact
+    from apps.users.models import Attendance
+
+    def make(count):
+        rnd = random.Random(count)
+        role, _ = Role.objects.get_or_create(slug='salesperson', defaults={'name': 'Salesperson'})
+        SalaryConfiguration.objects.get_or_create(
+            role=role, defaults={'base_salary': Decimal('8333333'), 'enable_commission': True}
+        )
+        users = [make_user(first_name='Sale', last_name=str(index), roles=['salesperson']) for index in range(count)]
+        days = [date(YEAR, MONTH, 1) + timedelta(days=offset) for offset in range(31)]
+        Attendance.objects.bulk_create([
+            Attendance(user=user, date=day, attendance_type=rnd.choice(['full', 'full', 'half', 'off']))
+            for user in users for day in days
+        ])
+        DailySalesFact.objects.bulk_create([
+            DailySalesFact(
+                date=day, role='created_by', user=user, status=rnd.choice(['completed', 'pending']),
+                order_count=rnd.randint(1, 5), revenue=Decimal(rnd.randint(1, 9_999_999)),
+                paid_amount=Decimal(rnd.randint(0, 4_000_000)),
+            )
+            for user in users for day in days if rnd.random() < 0.6
+        ])
+        return users
+
+    return make
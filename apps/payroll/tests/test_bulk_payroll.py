@@ -0,0 +1,106 @@
+"""
+Bulk payroll: process-pool results match the serial run, and the save
+re-checks payrolls changed between prepare and save
+"""
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from django.core.management import call_command
+
+from apps.payroll.models import Payroll
+from apps.payroll.services import BulkPayrollService, build_payroll_record, release_inherited_connections
+
+from .conftest import MONTH, YEAR
+
+FIGURES = [
+    field.name for field in Payroll._meta.concrete_fields
+    if field.name not in ('id', 'created_at', 'updated_at', 'dirty_at')
+]
+
+
+def payroll_rows():
+    return {row['user']: row for row in Payroll.objects.values(*FIGURES)}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('make_executor', [
+    lambda: ThreadPoolExecutor(max_workers=3),
+    lambda: ProcessPoolExecutor(max_workers=3, initializer=release_inherited_connections),
+], ids=['in-process', 'process-pool'])
+def test_calculate_with_executor_matches_serial(staff, make_executor):
+    users = staff(24)
+    service = BulkPayrollService(YEAR, MONTH)
+
+    serial = service.calculate(users)
+    serial_rows = payroll_rows()
+    with make_executor() as executor:
+        parallel = service.calculate(users, executor=executor, chunksize=5)
+
+    assert not serial['failed'] and not parallel['failed']
+    assert parallel['success'] == serial['success']
+    assert payroll_rows() == serial_rows
+    assert len(serial_rows) == 24
+    assert any(row['sales_commission'] for row in serial_rows.values())
+
+
+@pytest.mark.django_db
+def test_calculate_payroll_command_workers_match_serial(staff):
+    staff(12)
+
+    call_command('calculate_payroll', year=YEAR, month=MONTH, stdout=io.StringIO())
+    serial_rows = payroll_rows()
+    call_command('calculate_payroll', year=YEAR, month=MONTH, workers=2, stdout=io.StringIO())
+
+    # Kết nối của tiến trình cha vẫn dùng được sau khi các worker thoát
+    assert payroll_rows() == serial_rows
+    assert len(serial_rows) == 12
+
+
+def change_payrolls_during_compute(mocker, change):
+    """Chạy change() sau compute, trước khi lưu (như một request khác chen vào)"""
+    compute = BulkPayrollService.compute
+
+    def compute_then_change(service, tasks, **kwargs):
+        computed = compute(service, tasks, **kwargs)
+        change()
+        return computed
+
+    mocker.patch.object(BulkPayrollService, 'compute', compute_then_change)
+
+
+@pytest.mark.django_db
+def test_calculate_keeps_payroll_approved_after_prepare(staff, mocker):
+    users = staff(3)
+    service = BulkPayrollService(YEAR, MONTH)
+    service.calculate(users)
+    approved = Payroll.objects.get(user=users[1])
+    change_payrolls_during_compute(mocker, lambda: Payroll.objects.filter(pk=approved.pk).update(status='approved'))
+
+    results = service.calculate(users)
+
+    assert [row['user_id'] for row in results['failed']] == [str(users[1].id)]
+    assert 'approved' in results['failed'][0]['reason']
+    assert [row['user_id'] for row in results['success']] == [str(users[0].id), str(users[2].id)]
+    assert Payroll.objects.get(user=users[1]).pk == approved.pk
+    assert Payroll.objects.get(user=users[1]).status == 'approved'
+    assert Payroll.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_calculate_replaces_draft_created_after_prepare(staff, mocker):
+    users = staff(2)
+    service = BulkPayrollService(YEAR, MONTH)
+    concurrent = BulkPayrollService(YEAR, MONTH)
+    tasks, _ = concurrent.prepare([users[0]], [])
+    figures, _ = concurrent.compute(tasks)[users[0].id]
+    change_payrolls_during_compute(
+        mocker, lambda: build_payroll_record(users[0], YEAR, MONTH, figures, notes='concurrent').save()
+    )
+
+    results = service.calculate(users)
+
+    assert not results['failed']
+    assert len(results['success']) == 2
+    assert Payroll.objects.count() == 2
+    assert not Payroll.objects.filter(notes='concurrent').exists()
@@ -0,0 +1,177 @@
+"""
+Dirty payroll recalculation: constant query count, manual inputs kept,
+rows touched during the run left for the next one; signals mark only the
+affected user's draft for the affected month
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from api.querybudget import QueryRecorder
+from apps.business_day import business_tz
+from apps.payroll.models import Payroll
+from apps.payroll.services import BulkPayrollService, PayrollRecalculationService
+from apps.seafood.services import PaymentService
+from apps.users.models import Attendance
+
+from .conftest import MONTH, YEAR
+
+
+def calculated_staff(staff, count):
+    users = staff(count)
+    BulkPayrollService(YEAR, MONTH).calculate(users)
+    return users
+
+
+@pytest.mark.django_db
+def test_recalculate_dirty_query_count_ignores_headcount(staff):
+    def recalculate(count):
+        users = calculated_staff(staff, count)
+        PayrollRecalculationService.mark_dirty([user.id for user in users], YEAR, MONTH)
+        with QueryRecorder() as recorder:
+            results = PayrollRecalculationService.recalculate_dirty()
+        return recorder.count, results
+
+    few, few_results = recalculate(3)
+    many, many_results = recalculate(25)
+
+    assert few == many
+    assert few_results['recalculated'] == 3
+    assert many_results['recalculated'] == 25
+    assert not Payroll.objects.filter(dirty_at__isnull=False).exists()
+
+
+@pytest.mark.django_db
+def test_recalculate_dirty_keeps_manual_inputs(staff):
+    users = calculated_staff(staff, 2)
+    payroll = Payroll.objects.get(user=users[0])
+    Payroll.objects.filter(pk=payroll.pk).update(advance_payment=Decimal('500000'))
+    expected_net = payroll.net_salary - Decimal('500000')
+
+    PayrollRecalculationService.mark_dirty([users[0].id], YEAR, MONTH)
+    results = PayrollRecalculationService.recalculate_dirty()
+
+    payroll.refresh_from_db()
+    assert results == {'recalculated': 1, 'skipped': 0, 'failed': []}
+    assert payroll.advance_payment == Decimal('500000')
+    assert payroll.net_salary == expected_net
+    assert payroll.dirty_at is None
+
+
+@pytest.mark.django_db
+def test_recalculate_dirty_skips_payrolls_changed_during_the_run(staff, mocker):
+    users = calculated_staff(staff, 3)
+    PayrollRecalculationService.mark_dirty([user.id for user in users], YEAR, MONTH)
+    compute = BulkPayrollService.compute
+
+    def compute_then_touch(service, tasks, **kwargs):
+        computed = compute(service, tasks, **kwargs)
+        # Chấm công thay đổi trong lúc tính
+        Payroll.objects.filter(user=users[1]).update(dirty_at=timezone.now() + timedelta(seconds=1))
+        return computed
+
+    mocker.patch.object(BulkPayrollService, 'compute', compute_then_touch)
+    results = PayrollRecalculationService.recalculate_dirty()
+
+    assert results['recalculated'] == 2
+    assert results['skipped'] == 1
+    assert list(Payroll.objects.filter(dirty_at__isnull=False).values_list('user', flat=True)) == [users[1].id]
+
+
+# ============================================
+# Signals: chỉ đánh dấu bản nháp của đúng nhân viên / tháng
+# ============================================
+
+def on_day(day):
+    return datetime.combine(day, time(10), tzinfo=business_tz())
+
+
+def dirty_payrolls():
+    return set(Payroll.objects.filter(dirty_at__isnull=False).values_list('user_id', 'year', 'month'))
+
+
+@pytest.fixture
+def payrolls(staff):
+    """
+    3 nhân viên có bảng lương tháng MONTH (người thứ 3 đã duyệt);
+    người đầu có thêm bảng lương nháp tháng trước
+    """
+    users = calculated_staff(staff, 3)
+    BulkPayrollService(YEAR, MONTH - 1).calculate([users[0]])
+    Payroll.objects.filter(user=users[2]).update(status='approved')
+    Payroll.objects.update(dirty_at=None)
+    return users
+
+
+@pytest.mark.django_db
+def test_attendance_change_marks_only_that_users_draft_for_that_month(payrolls):
+    attendance = Attendance.objects.get(user=payrolls[0], date__day=5)
+    attendance.attendance_type = 'off' if attendance.attendance_type != 'off' else 'full'
+    attendance.save()
+
+    assert dirty_payrolls() == {(payrolls[0].id, YEAR, MONTH)}
+
+
+@pytest.mark.django_db
+def test_attendance_moved_to_another_month_marks_both_months(payrolls):
+    attendance = Attendance.objects.get(user=payrolls[0], date__day=31)
+    attendance.date = attendance.date.replace(month=MONTH - 1, day=28)
+    attendance.save()
+    assert dirty_payrolls() == {(payrolls[0].id, YEAR, MONTH), (payrolls[0].id, YEAR, MONTH - 1)}
+
+    Payroll.objects.update(dirty_at=None)
+    attendance.delete()
+    assert dirty_payrolls() == {(payrolls[0].id, YEAR, MONTH - 1)}
+
+
+@pytest.mark.django_db
+def test_approved_or_paid_payrolls_are_never_marked(payrolls, make_order, django_capture_on_commit_callbacks):
+    Payroll.objects.filter(user=payrolls[1]).update(status='paid')
+    order = make_order(payrolls[1], created_at=on_day(date(YEAR, MONTH, 10)))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Attendance.objects.filter(user=payrolls[2], date__day=3).get().save()
+        order.status = 'cancelled'
+        order.save()
+
+    assert dirty_payrolls() == set()
+
+
+@pytest.mark.django_db
+def test_order_change_marks_creator_draft_on_commit(payrolls, make_order, django_capture_on_commit_callbacks):
+    order = make_order(payrolls[0], created_at=on_day(date(YEAR, MONTH, 12)))
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        order.status = 'cancelled'
+        order.save()
+    assert dirty_payrolls() == set()
+
+    for callback in callbacks:
+        callback()
+    assert dirty_payrolls() == {(payrolls[0].id, YEAR, MONTH)}
+
+
+@pytest.mark.django_db
+def test_order_reassigned_marks_old_and_new_creator(payrolls, make_order, django_capture_on_commit_callbacks):
+    order = make_order(payrolls[0], created_at=on_day(date(YEAR, MONTH, 12)))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.created_by = payrolls[1]
+        order.save()
+
+    assert dirty_payrolls() == {(payrolls[0].id, YEAR, MONTH), (payrolls[1].id, YEAR, MONTH)}
+
+
+@pytest.mark.django_db
+def test_webhook_payment_marks_creator_draft(payrolls, make_order, django_capture_on_commit_callbacks):
+    order = make_order(payrolls[1], total=250_000, created_at=on_day(date(YEAR, MONTH, 20)), status='pending')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        result = PaymentService.process(
+            'sepay', 'tx-1', Decimal('250000'), 'success', reference_number=order.order_code
+        )
+
+    assert result['result'] == 'applied'
+    assert dirty_payrolls() == {(payrolls[1].id, YEAR, MONTH)}
@@ -0,0 +1,40 @@
+"""
+Payroll summaries: query count independent of headcount
+"""
+import pytest
+
+from api.querybudget import QueryRecorder
+from apps.payroll import api
+from apps.payroll.services import BulkPayrollService
+
+from .conftest import MONTH, YEAR
+
+
+def count_queries(call):
+    with QueryRecorder() as recorder:
+        result = call()
+    return recorder.count, result
+
+
+def calculated_staff(staff, count):
+    users = staff(count)
+    BulkPayrollService(YEAR, MONTH).calculate(users)
+    return users
+
+
+@pytest.mark.django_db
+def test_payroll_summaries_query_count_ignores_headcount(staff, make_user, query_budget):
+    users = calculated_staff(staff, 3)
+    make_user(roles=['warehouse'])   # chưa có cấu hình lương / bảng lương
+    few, _ = count_queries(lambda: api.get_employees_payroll_summary(None, YEAR, MONTH))
+
+    users += calculated_staff(staff, 20)
+    with query_budget(4, label='employees-summary'):
+        rows = api.get_employees_payroll_summary(None, YEAR, MONTH)
+    with query_budget(1, label='payroll-summary'):
+        summary = api.get_payroll_summary(None, YEAR, MONTH)
+
+    assert few == 4
+    assert len(rows) == 24
+    assert sum(row['status'] == 'not_calculated' for row in rows) == 1
+    assert summary['total_employees'] == summary['draft_count'] == 23
@@ -0,0 +1,72 @@
+"""
+Payroll what-if simulation: read-only, and its figures are exactly what
+BulkPayrollService would write for the same configuration
+"""
+from decimal import Decimal
+
+import pytest
+
+from api.querybudget import QueryRecorder
+from apps.payroll import api
+from apps.payroll.models import Payroll, SalaryConfiguration
+from apps.payroll.schemas import PayrollSimulateRequest
+from apps.payroll.services import BulkPayrollService, PayrollSimulationService
+
+from .conftest import MONTH, YEAR
+
+OVERRIDES = {'base_salary': Decimal('12000000'), 'commission_rate_1': Decimal('0.05'), 'kpi_bonus_amount': Decimal('0')}
+
+
+def simulate(**fields):
+    payload = PayrollSimulateRequest(year=YEAR, month=MONTH, overrides=fields.pop('overrides', OVERRIDES), **fields)
+    return api.simulate_payroll(None, payload)
+
+
+def written_figures():
+    return {
+        row['user_id']: {name: row[name] for name in PayrollSimulationService.FIGURES}
+        for row in Payroll.objects.values('user_id', *PayrollSimulationService.FIGURES)
+    }
+
+
+@pytest.mark.django_db
+def test_simulation_performs_no_writes(staff):
+    users = staff(6)
+    BulkPayrollService(YEAR, MONTH).calculate(users[:3])
+    payrolls = written_figures()
+    configs = list(SalaryConfiguration.objects.values())
+
+    with QueryRecorder() as cold:
+        simulate(refresh=True)
+    with QueryRecorder() as warm:
+        result = simulate()
+
+    statements = cold.statements + warm.statements
+    assert all(sql.lstrip().upper().startswith('SELECT') for sql in statements), statements
+    # Lần sau đọc ngày công / doanh số từ cache: chỉ còn role + cấu hình lương
+    assert warm.count == 2
+    assert result['total_employees'] == 6
+    assert written_figures() == payrolls
+    assert list(SalaryConfiguration.objects.values()) == configs
+
+
+@pytest.mark.django_db
+def test_simulation_matches_bulk_payroll(staff):
+    users = staff(8)
+
+    result = simulate(refresh=True)
+    BulkPayrollService(YEAR, MONTH).calculate(users)
+    baseline = written_figures()
+    SalaryConfiguration.objects.update(**OVERRIDES)
+    BulkPayrollService(YEAR, MONTH).calculate(users)
+    simulated = written_figures()
+
+    employees = {row['user_id']: row for row in result['employees']}
+    assert set(employees) == {user.id for user in users}
+    for user in users:
+        assert employees[user.id]['baseline'] == baseline[user.id]
+        assert employees[user.id]['simulated'] == simulated[user.id]
+    for name in PayrollSimulationService.FIGURES:
+        assert result['baseline'][name] == sum(row[name] for row in baseline.values())
+        assert result['simulated'][name] == sum(row[name] for row in simulated.values())
+    assert result['delta']['gross_salary'] != 0
@@ -13,14 +13,14 @@ from .schemas import (
     RolePermissionAssign, RolePermissionRemove,
     UserRoleCreate, UserRoleUpdate, UserRoleOut, UserRoleWithDetails,
     BulkUserRoleAssign, BulkRoleAssign, BulkUserRoleRemove,
-    DepartmentCreate, DepartmentUpdate, DepartmentOut, DepartmentWithDetails,
+    DepartmentCreate, DepartmentUpdate, DepartmentOut, DepartmentWithDetails, DepartmentHeadcount,
     RoleStats, PermissionStats, UserRoleStats, RBACDashboard,
 )
 from .services import (
     PermissionService,
     RoleService,
     UserRoleService,
-    DepartmentService,
+    DepartmentService, DepartmentTreeService,
 )
 from .permissions import require_permission, require_any_permission
 
@@ -198,12 +198,12 @@ def delete_role(request, role_id: UUID, hard_delete: bool = False):
 @router.put("/roles/{role_id}/permissions")
 def assign_permissions_to_role(request, role_id: UUID, payload: RolePermissionAssign):
     """Assign permissions to role"""
-    RoleService.assign_permissions(
+    counts = RoleService.assign_permissions(
         role_id=role_id,
         permission_ids=payload.permission_ids,
         granted_by_id=request.user.id if hasattr(request, 'user') else None
     )
-    return {"message": f"Assigned {len(payload.permission_ids)} permissions to role"}
+    return {"message": f"Assigned {sum(counts.values())} permissions to role", **counts}
 
 
 @router.delete("/roles/{role_id}/permissions")
@@ -309,32 +309,36 @@ def assign_role_to_user(request, payload: UserRoleCreate):
 @router.post("/user-roles/bulk-assign-users")
 def bulk_assign_role_to_users(request, payload: BulkUserRoleAssign):
     """Assign one role to multiple users"""
-    user_roles = UserRoleService.bulk_assign_users(
+    counts = UserRoleService.bulk_assign_users(
         user_ids=payload.user_ids,
         role_id=payload.role_id,
         assigned_by_id=request.user.id if hasattr(request, 'user') else None,
         expires_at=payload.expires_at
     )
+    total = sum(counts.values())
 
     return {
-        "message": f"Assigned role to {len(user_roles)} users",
-        "count": len(user_roles)
+        "message": f"Assigned role to {total} users",
+        "count": total,
+        **counts
     }
 
 
 @router.post("/user-roles/bulk-assign-roles")
 def bulk_assign_roles_to_user(request, payload: BulkRoleAssign):
     """Assign multiple roles to one user"""
-    user_roles = UserRoleService.bulk_assign_roles(
+    counts = UserRoleService.bulk_assign_roles(
         user_id=payload.user_id,
         role_ids=payload.role_ids,
         assigned_by_id=request.user.id if hasattr(request, 'user') else None,
         expires_at=payload.expires_at
     )
+    total = sum(counts.values())
 
     return {
-        "message": f"Assigned {len(user_roles)} roles to user",
-        "count": len(user_roles)
+        "message": f"Assigned {total} roles to user",
+        "count": total,
+        **counts
     }
 
 
@@ -354,7 +358,7 @@ def remove_user_role(request, user_role_id: UUID, hard_delete: bool = False):
 @router.post("/user-roles/bulk-remove")
 def bulk_remove_user_roles(request, payload: BulkUserRoleRemove):
     """Remove roles from multiple users"""
-    UserRoleService.bulk_remove_roles(
+    removed = UserRoleService.bulk_remove_roles(
         user_ids=payload.user_ids,
         role_ids=payload.role_ids,
         hard_delete=False
@@ -363,7 +367,8 @@ def bulk_remove_user_roles(request, payload: BulkUserRoleRemove):
     return {
         "message": "Roles removed from users successfully",
         "user_count": len(payload.user_ids),
-        "role_count": len(payload.role_ids)
+        "role_count": len(payload.role_ids),
+        "removed": removed
     }
 
 
@@ -404,16 +409,16 @@ def list_departments(
     return list(departments)
 
 
+@router.get("/departments/headcounts", response=List[DepartmentHeadcount])
+def get_department_headcounts(request, is_active: Optional[bool] = True):
+    """Headcount of every department: direct members and whole subtree"""
+    return DepartmentTreeService.get_headcounts(is_active=is_active)
+
+
 @router.get("/departments/{department_id}", response=DepartmentWithDetails)
 def get_department(request, department_id: UUID):
     """Get department by ID"""
-    dept = DepartmentService.get_department(department_id)
-
-    from apps.users.models import User
-    member_count = User.objects.filter(
-        department=dept,
-        is_active=True
-    ).count()
+    dept = DepartmentService.get_department(department_id, with_counts=True)
 
     return {
         "id": dept.id,
@@ -429,10 +434,18 @@ def get_department(request, department_id: UUID):
         "parent_name": dept.parent.name if dept.parent else None,
         "manager_email": dept.manager.email if dept.manager else None,
         "default_role_name": dept.default_role.name if dept.default_role else None,
-        "member_count": member_count,
+        "member_count": dept.member_count,
+        "total_member_count": dept.total_member_count or 0,
     }
 
 
+@router.get("/departments/{department_id}/ancestors", response=List[DepartmentOut])
+def get_department_ancestors(request, department_id: UUID, include_self: bool = False):
+    """Ancestor chain of a department, root first"""
+    DepartmentService.get_department(department_id)
+    return DepartmentTreeService.get_ancestors(department_id, include_self=include_self)
+
+
 @router.post("/departments", response=DepartmentOut)
 def create_department(request, payload: DepartmentCreate):
     """Create new department"""
@@ -450,7 +463,11 @@ def create_department(request, payload: DepartmentCreate):
 def update_department(request, department_id: UUID, payload: DepartmentUpdate):
     """Update department"""
     update_data = payload.dict(exclude_unset=True)
-    return DepartmentService.update_department(department_id, **update_data)
+    try:
+        return DepartmentService.update_department(department_id, **update_data)
+    except ValueError as e:
+        from api.exceptions import BadRequest
+        raise BadRequest(str(e))
 
 
 @router.delete("/departments/{department_id}")
@@ -504,23 +521,20 @@ def get_user_role_stats(request):
     """Get user role assignment statistics"""
     from django.utils import timezone
 
-    total = UserRole.objects.count()
-    active = UserRole.objects.filter(is_active=True).count()
-
-    now = timezone.now()
-    expired = UserRole.objects.filter(
-        expires_at__isnull=False,
-        expires_at__lte=now
-    ).count()
+    stats = UserRole.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        expired=Count('id', filter=Q(expires_at__lte=timezone.now())),
+    )
 
     users_with_roles = UserRole.objects.filter(
         is_active=True
     ).values('user_id').distinct().count()
 
     return {
-        "total_assignments": total,
-        "active_assignments": active,
-        "expired_assignments": expired,
+        "total_assignments": stats['total'],
+        "active_assignments": stats['active'],
+        "expired_assignments": stats['expired'],
         "users_with_roles": users_with_roles,
     }
 
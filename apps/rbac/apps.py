@@ -5,3 +5,6 @@ class RbacConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.rbac'
     verbose_name = 'RBAC'
+
+    def ready(self):
+        from . import signals  # noqa: F401
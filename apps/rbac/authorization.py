@@ -0,0 +1,108 @@
+"""
+RBAC Authorization Cache
+Tập role / quyền đã biên dịch của từng user cho các kiểm tra quyền O(1)
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from api import metrics
+
+
+class AuthorizationCache:
+    """
+    Cache quyền của user: {'roles': frozenset(slug), 'permissions': frozenset(codename),
+    'level': int, 'expires_at': thời điểm role sớm nhất hết hạn hoặc None}
+
+    - Nạp bằng một truy vấn (UserRole -> Role -> RolePermission -> Permission).
+    - Ghi nhớ trên instance user (mỗi request một instance) và trong Redis theo
+      user id + phiên bản RBAC toàn cục.
+    - Mọi thay đổi Role / Permission / RolePermission / UserRole tăng VERSION_KEY
+      (xem apps.rbac.signals), các entry cũ tự hết hạn.
+
+    Chỉ tính role đang hoạt động, chưa hết hạn (UserRole và Role) và permission
+    đang hoạt động. Entry không sống quá thời điểm role sớm nhất hết hạn.
+    """
+    VERSION_KEY = 'rbac:version'
+    CACHE_KEY = 'rbac:authz:{version}:{user_id}'
+    CACHE_SECONDS = 3600
+    MEMO_ATTR = '_rbac_authorization'
+
+    @staticmethod
+    def version() -> int:
+        return cache.get_or_set(AuthorizationCache.VERSION_KEY, 1, timeout=None)
+
+    @staticmethod
+    def bump() -> None:
+        """Vô hiệu hóa cache quyền của mọi user (sau khi transaction commit)"""
+        def incr():
+            try:
+                cache.incr(AuthorizationCache.VERSION_KEY)
+            except ValueError:
+                cache.set(AuthorizationCache.VERSION_KEY, 2, timeout=None)
+
+        transaction.on_commit(incr)
+
+    @staticmethod
+    def load(user_id) -> dict:
+        """Đọc role slug, level cao nhất và permission codename của user trong một truy vấn"""
+        from .models import UserRole
+
+        rows = UserRole.objects.filter(
+            UserRole.not_expired_q(),
+            user_id=user_id,
+            is_active=True,
+            role__is_active=True
+        ).values_list(
+            'role__slug',
+            'role__level',
+            'expires_at',
+            'role__role_permissions__permission__codename',
+            'role__role_permissions__permission__is_active'
+        )
+
+        roles = set()
+        permissions = set()
+        level = 0
+        expires_at = None
+        for slug, role_level, role_expires_at, codename, permission_active in rows:
+            roles.add(slug)
+            level = max(level, role_level)
+            if role_expires_at and (expires_at is None or role_expires_at < expires_at):
+                expires_at = role_expires_at
+            if codename and permission_active:
+                permissions.add(codename)
+
+        return {
+            'roles': frozenset(roles),
+            'permissions': frozenset(permissions),
+            'level': level,
+            'expires_at': expires_at,
+        }
+
+    @staticmethod
+    def _timeout(authorization: dict) -> int:
+        expires_at = authorization['expires_at']
+        if expires_at is None:
+            return AuthorizationCache.CACHE_SECONDS
+        remaining = (expires_at - timezone.now()).total_seconds()
+        return max(1, min(AuthorizationCache.CACHE_SECONDS, int(remaining)))
+
+    @staticmethod
+    def get(user) -> dict:
+        """Quyền của user: memo trên instance -> Redis -> DB"""
+        authorization = getattr(user, AuthorizationCache.MEMO_ATTR, None)
+        if authorization is None:
+            key = AuthorizationCache.CACHE_KEY.format(version=AuthorizationCache.version(), user_id=user.pk)
+            authorization = cache.get(key)
+            metrics.cache_lookup('authorization', authorization is not None)
+            if authorization is None:
+                authorization = AuthorizationCache.load(user.pk)
+                cache.set(key, authorization, timeout=AuthorizationCache._timeout(authorization))
+            setattr(user, AuthorizationCache.MEMO_ATTR, authorization)
+        return authorization
+
+    @staticmethod
+    def forget(user) -> None:
+        """Bỏ memo trên instance (vd. sau khi đổi role của chính user này trong cùng request)"""
+        user.__dict__.pop(AuthorizationCache.MEMO_ATTR, None)
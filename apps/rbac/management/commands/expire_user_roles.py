@@ -0,0 +1,17 @@
+"""
+Deactivate expired user role assignments (run on a schedule, e.g. every few minutes)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.rbac.services import UserRoleService
+
+
+class Command(BaseCommand):
+    help = 'Deactivate user roles whose expires_at has passed and invalidate the RBAC cache'
+
+    def handle(self, *args, **options):
+        expired = UserRoleService.expire_roles()
+        if expired:
+            self.stdout.write(self.style.SUCCESS(f'Deactivated {expired} expired role assignments'))
+        else:
+            self.stdout.write('No expired role assignments')
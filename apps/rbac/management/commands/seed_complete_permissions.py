@@ -5,6 +5,7 @@ Based on actual pages and features currently in use
 from django.core.management.base import BaseCommand
 from apps.rbac.models import Permission, Role
 from django.db import transaction
+from django.db.models import Count
 
 
 class Command(BaseCommand):
@@ -112,6 +113,24 @@ class Command(BaseCommand):
                     'description': 'Hủy đơn hàng'
                 },
 
+                # ==========================================
+                # PAYMENTS MODULE
+                # ==========================================
+                {
+                    'module': 'payments',
+                    'name': 'Xem giao dịch thanh toán',
+                    'codename': 'view_payment_transactions',
+                    'action': 'list',
+                    'description': 'Xem lịch sử giao dịch nhận từ cổng thanh toán'
+                },
+                {
+                    'module': 'payments',
+                    'name': 'Đối soát sao kê ngân hàng',
+                    'codename': 'reconcile_payments',
+                    'action': 'manage',
+                    'description': 'Tải sao kê ngân hàng lên và ghi nhận thanh toán cho đơn khớp'
+                },
+
                 # ==========================================
                 # POS MODULE
                 # ==========================================
@@ -394,38 +413,37 @@ class Command(BaseCommand):
                 },
             ]
 
-            # Create permissions
-            created_count = 0
-            updated_count = 0
-            skipped_count = 0
+            # Create / update permissions: one diff query + one upsert
+            existing = dict(Permission.objects.values_list('codename', 'name'))
+            name_owners = {name: codename for codename, name in existing.items()}
 
+            to_write = []
+            skipped_count = 0
             for perm_data in PERMISSIONS:
-                try:
-                    permission, created = Permission.objects.update_or_create(
-                        codename=perm_data['codename'],
-                        defaults={
-                            'module': perm_data['module'],
-                            'name': perm_data['name'],
-                            'action': perm_data['action'],
-                            'description': perm_data['description'],
-                            'is_active': True
-                        }
-                    )
-                    if created:
-                        created_count += 1
-                        self.stdout.write(f'  ✓ Created: {perm_data["name"]}')
-                    else:
-                        updated_count += 1
-                except Exception as e:
+                owner = name_owners.get(perm_data['name'], perm_data['codename'])
+                if owner != perm_data['codename']:
                     # If permission exists with same name but different codename, skip
                     skipped_count += 1
                     self.stdout.write(
-                        self.style.WARNING(f'  ⚠ Skipped: {perm_data["name"]} - {str(e)}')
+                        self.style.WARNING(f'  ⚠ Skipped: {perm_data["name"]} - name used by {owner}')
                     )
+                    continue
+                if perm_data['codename'] not in existing:
+                    self.stdout.write(f'  ✓ Created: {perm_data["name"]}')
+                to_write.append(Permission(is_active=True, **perm_data))
+
+            Permission.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=['codename'],
+                update_fields=['module', 'name', 'action', 'description', 'is_active', 'updated_at']
+            )
+            created_count = sum(1 for permission in to_write if permission.codename not in existing)
+            updated_count = len(to_write) - created_count
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'\n✓ Permissions: Created {created_count}, Updated {updated_count}'
+                    f'\n✓ Permissions: Created {created_count}, Updated {updated_count}, Skipped {skipped_count}'
                 )
             )
 
@@ -462,6 +480,7 @@ class Command(BaseCommand):
                         'view_dashboard', 'view_seafood_dashboard',
                         'view_products', 'create_product', 'update_product', 'view_product_detail',
                         'view_orders', 'view_order_detail', 'update_order', 'create_order',
+                        'view_payment_transactions', 'reconcile_payments',
                         'view_import_batches', 'create_import_batch',
                         'view_revenue_reports', 'view_inventory_reports',
                         'view_categories', 'create_category', 'update_category'
@@ -508,6 +527,7 @@ class Command(BaseCommand):
                     'permissions': [
                         'view_dashboard', 'view_seafood_dashboard',
                         'view_orders', 'view_order_detail',
+                        'view_payment_transactions', 'reconcile_payments',
                         'view_products', 'view_product_detail',
                         'view_revenue_reports', 'view_inventory_reports', 'export_reports',
                         'view_import_batches'
@@ -549,11 +569,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('SUMMARY'))
             self.stdout.write('='*70)
 
-            modules = Permission.objects.values_list('module', flat=True).distinct().order_by('module')
+            modules = Permission.objects.values('module').annotate(count=Count('id')).order_by('module')
             self.stdout.write('\nPermissions by Module:')
-            for module in modules:
-                count = Permission.objects.filter(module=module).count()
-                self.stdout.write(f'  • {module.upper()}: {count} permissions')
+            for row in modules:
+                self.stdout.write(f'  • {row["module"].upper()}: {row["count"]} permissions')
 
             self.stdout.write(f'\n✓ Total Permissions: {Permission.objects.count()}')
             self.stdout.write(f'✓ Total Roles: {Role.objects.count()}')
@@ -5,6 +5,7 @@ Usage: python manage.py seed_rbac
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from apps.rbac.models import Permission, Role, RolePermission, Department
+from apps.rbac.services import bulk_activate_links
 from apps.rbac.seed_data import (
     PERMISSIONS_TEMPLATE,
     ROLES_TEMPLATE,
@@ -219,12 +220,12 @@ class Command(BaseCommand):
                         )
                     )
 
-        # Assign permissions
-        for permission in permissions_to_assign:
-            RolePermission.objects.get_or_create(
-                role=role,
-                permission=permission
-            )
+        # Assign permissions (set-based)
+        bulk_activate_links(
+            RolePermission,
+            ('role', 'permission'),
+            ((role.id, permission.id) for permission in permissions_to_assign)
+        )
 
         if permissions_to_assign:
             self.stdout.write(
@@ -40,6 +40,10 @@ class Command(BaseCommand):
             {'module': 'orders', 'name': 'Đánh dấu đã gửi vận chuyển', 'codename': 'ship_order', 'action': 'update'},
             {'module': 'orders', 'name': 'Thay đổi giá và trọng lượng', 'codename': 'adjust_order_items', 'action': 'update'},
 
+            # PAYMENTS
+            {'module': 'payments', 'name': 'Xem giao dịch thanh toán', 'codename': 'view_payment_transactions', 'action': 'list'},
+            {'module': 'payments', 'name': 'Đối soát sao kê ngân hàng', 'codename': 'reconcile_payments', 'action': 'manage'},
+
             # POS
             {'module': 'pos', 'name': 'Sử dụng POS', 'codename': 'use_pos', 'action': 'use'},
             {'module': 'pos', 'name': 'Tạo đơn POS', 'codename': 'create_pos_order', 'action': 'create'},
@@ -128,6 +132,7 @@ class Command(BaseCommand):
                     'view_dashboard', 'view_seafood_dashboard',
                     'view_products', 'create_product', 'update_product',
                     'view_orders', 'create_order', 'update_order', 'export_order_pdf',
+                    'view_payment_transactions', 'reconcile_payments',
                     'use_pos', 'create_pos_order',
                     'view_categories', 'create_category', 'update_category',
                     'view_inventory', 'import_inventory', 'export_inventory', 'check_inventory',
@@ -175,6 +180,7 @@ class Command(BaseCommand):
                     'view_dashboard',
                     'view_products',
                     'view_orders', 'export_order_pdf',
+                    'view_payment_transactions', 'reconcile_payments',
                     'view_categories',
                     'view_inventory',
                     'view_reports', 'export_reports'
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rbac", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userrole",
+            index=models.Index(
+                fields=["user", "is_active", "expires_at"],
+                name="rbac_user_r_user_id_3a4472_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    Department = apps.get_model("rbac", "Department")
+    DepartmentClosure = apps.get_model("rbac", "DepartmentClosure")
+
+    parents = dict(Department.objects.values_list("id", "parent_id"))
+    links = []
+    for department_id in parents:
+        node, depth, seen = department_id, 0, set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            links.append(
+                DepartmentClosure(ancestor_id=node, descendant_id=department_id, depth=depth)
+            )
+            node, depth = parents.get(node), depth + 1
+    DepartmentClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rbac", "0003_user_role_expiry_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "depth",
+                    models.PositiveIntegerField(
+                        help_text="Distance from ancestor (0 = itself)"
+                    ),
+                ),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="rbac.department",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="rbac.department",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Department Closure",
+                "verbose_name_plural": "Department Closure",
+                "db_table": "department_closure",
+                "indexes": [
+                    models.Index(
+                        fields=["descendant", "depth"],
+                        name="department__descend_b6cae3_idx",
+                    )
+                ],
+                "unique_together": {("ancestor", "descendant")},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -186,6 +186,8 @@ class UserRole(BaseModel):
         indexes = [
             models.Index(fields=['user', 'role']),
             models.Index(fields=['expires_at']),
+            # Tra cứu quyền theo user: role đang hoạt động và chưa hết hạn
+            models.Index(fields=['user', 'is_active', 'expires_at']),
         ]
 
     def __str__(self):
@@ -198,6 +200,13 @@ class UserRole(BaseModel):
         from django.utils import timezone
         return timezone.now() > self.expires_at
 
+    @staticmethod
+    def not_expired_q(now=None, prefix: str = '') -> models.Q:
+        """Q for assignments without expiry or expiring after now (prefix: lookup path to UserRole)"""
+        from django.utils import timezone
+        now = now or timezone.now()
+        return models.Q(**{f'{prefix}expires_at__isnull': True}) | models.Q(**{f'{prefix}expires_at__gt': now})
+
 
 class Department(BaseModel):
     """
@@ -246,3 +255,37 @@ class Department(BaseModel):
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+
+class DepartmentClosure(models.Model):
+    """
+    Closure table of the department tree
+
+    One row per (ancestor, descendant) pair, including each department with
+    itself at depth 0, so subtree / ancestor queries are a single indexed join.
+    Maintained by DepartmentTreeService (signals on Department); deleting a
+    department removes its rows through the cascade.
+    """
+    ancestor = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        related_name='descendant_links'
+    )
+    descendant = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links'
+    )
+    depth = models.PositiveIntegerField(help_text="Distance from ancestor (0 = itself)")
+
+    class Meta:
+        db_table = 'department_closure'
+        unique_together = [['ancestor', 'descendant']]
+        verbose_name = 'Department Closure'
+        verbose_name_plural = 'Department Closure'
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
@@ -282,16 +282,7 @@ def get_user_permissions(user: User) -> List[str]:
     if not user or not user.is_authenticated:
         return []
 
-    from .models import Permission
-
-    return list(
-        Permission.objects.filter(
-            roles__role_users__user=user,
-            roles__role_users__is_active=True,
-            roles__is_active=True,
-            is_active=True
-        ).values_list('codename', flat=True).distinct()
-    )
+    return sorted(user.get_authorization()['permissions'])
 
 
 def get_user_roles(user: User) -> List[str]:
@@ -305,12 +296,4 @@ def get_user_roles(user: User) -> List[str]:
     if not user or not user.is_authenticated:
         return []
 
-    from .models import Role
-
-    return list(
-        Role.objects.filter(
-            role_users__user=user,
-            role_users__is_active=True,
-            is_active=True
-        ).values_list('slug', flat=True).distinct()
-    )
+    return sorted(user.get_authorization()['roles'])
@@ -207,6 +207,19 @@ class DepartmentWithDetails(DepartmentOut):
     manager_email: Optional[str] = None
     default_role_name: Optional[str] = None
     member_count: Optional[int] = 0
+    total_member_count: Optional[int] = 0
+
+
+class DepartmentHeadcount(BaseModel):
+    id: UUID
+    name: str
+    code: str
+    parent_id: Optional[UUID] = None
+    member_count: int = 0
+    total_member_count: int = 0
+
+    class Config:
+        from_attributes = True
 
 
 # ============================================
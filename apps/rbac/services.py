@@ -5,14 +5,68 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from django.db import transaction
-from django.db.models import Count, Q, Prefetch
+from django.db.models import Count, OuterRef, Q, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from .models import Permission, Role, RolePermission, UserRole, Department
+from .authorization import AuthorizationCache
+from .models import Permission, Role, RolePermission, UserRole, Department, DepartmentClosure
 from apps.users.models import User
 
 
+def bulk_activate_links(model, key_fields, keys, values=None, refresh_fields=()) -> dict:
+    """
+    Create or reactivate link rows (e.g. user-role, role-permission) set-based
+
+    One query reads the existing rows for ``keys`` ((a_id, b_id) pairs over
+    ``key_fields``), then a single bulk_create(update_conflicts) writes only
+    the rows that are new, inactive, or active but differing in
+    ``refresh_fields``. bulk_create sends no signals, so the authorization
+    cache is bumped here when anything was written.
+
+    Returns {'created', 'reactivated', 'unchanged'}; unchanged rows were
+    already active (their refresh_fields are still brought up to date).
+    """
+    values = values or {}
+    keys = set(keys)
+    counts = {'created': 0, 'reactivated': 0, 'unchanged': 0}
+    if not keys:
+        return counts
+
+    first, second = (f'{field}_id' for field in key_fields)
+    existing = {
+        (row[0], row[1]): row[2:]
+        for row in model.objects.filter(**{
+            f'{first}__in': {key[0] for key in keys},
+            f'{second}__in': {key[1] for key in keys},
+        }).values_list(first, second, 'is_active', *refresh_fields)
+    }
+
+    wanted = tuple(values.get(field) for field in refresh_fields)
+    rows = []
+    for key in keys:
+        current = existing.get(key)
+        if current is None:
+            counts['created'] += 1
+        elif not current[0]:
+            counts['reactivated'] += 1
+        else:
+            counts['unchanged'] += 1
+            if current[1:] == wanted:
+                continue
+        rows.append(model(**{first: key[0], second: key[1]}, is_active=True, **values))
+
+    if rows:
+        model.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=list(key_fields),
+            update_fields=['is_active', 'updated_at', *values]
+        )
+        AuthorizationCache.bump()
+    return counts
+
+
 # ============================================
 # Permission Services
 # ============================================
@@ -201,23 +255,22 @@ class RoleService:
         role_id: UUID,
         permission_ids: List[UUID],
         granted_by_id: Optional[UUID] = None
-    ):
-        """Assign permissions to role"""
+    ) -> dict:
+        """Assign permissions to role; returns created / reactivated / unchanged counts"""
         role = RoleService.get_role(role_id)
 
         # Get valid permissions
-        permissions = Permission.objects.filter(
+        permission_ids = Permission.objects.filter(
             id__in=permission_ids,
             is_active=True
-        )
+        ).values_list('id', flat=True)
 
-        # Create role-permission relationships
-        for permission in permissions:
-            RolePermission.objects.get_or_create(
-                role=role,
-                permission=permission,
-                defaults={'granted_by_id': granted_by_id}
-            )
+        return bulk_activate_links(
+            RolePermission,
+            ('role', 'permission'),
+            ((role.id, permission_id) for permission_id in permission_ids),
+            values={'granted_by_id': granted_by_id}
+        )
 
     @staticmethod
     @transaction.atomic
@@ -307,25 +360,16 @@ class UserRoleService:
         role_id: UUID,
         assigned_by_id: Optional[UUID] = None,
         expires_at: Optional[datetime] = None
-    ) -> List[UserRole]:
-        """Assign one role to multiple users"""
+    ) -> dict:
+        """Assign one role to multiple users; returns created / reactivated / unchanged counts"""
         role = get_object_or_404(Role, id=role_id, is_active=True)
-        users = User.objects.filter(id__in=user_ids, is_active=True)
-
-        user_roles = []
-        for user in users:
-            user_role, _ = UserRole.objects.update_or_create(
-                user=user,
-                role=role,
-                defaults={
-                    'assigned_by_id': assigned_by_id,
-                    'expires_at': expires_at,
-                    'is_active': True
-                }
-            )
-            user_roles.append(user_role)
+        user_ids = User.objects.filter(id__in=user_ids, is_active=True).values_list('id', flat=True)
 
-        return user_roles
+        return UserRoleService._assign_pairs(
+            ((user_id, role.id) for user_id in user_ids),
+            assigned_by_id,
+            expires_at
+        )
 
     @staticmethod
     @transaction.atomic
@@ -334,25 +378,27 @@ class UserRoleService:
         role_ids: List[UUID],
         assigned_by_id: Optional[UUID] = None,
         expires_at: Optional[datetime] = None
-    ) -> List[UserRole]:
-        """Assign multiple roles to one user"""
+    ) -> dict:
+        """Assign multiple roles to one user; returns created / reactivated / unchanged counts"""
         user = get_object_or_404(User, id=user_id, is_active=True)
-        roles = Role.objects.filter(id__in=role_ids, is_active=True)
-
-        user_roles = []
-        for role in roles:
-            user_role, _ = UserRole.objects.update_or_create(
-                user=user,
-                role=role,
-                defaults={
-                    'assigned_by_id': assigned_by_id,
-                    'expires_at': expires_at,
-                    'is_active': True
-                }
-            )
-            user_roles.append(user_role)
+        role_ids = Role.objects.filter(id__in=role_ids, is_active=True).values_list('id', flat=True)
 
-        return user_roles
+        return UserRoleService._assign_pairs(
+            ((user.id, role_id) for role_id in role_ids),
+            assigned_by_id,
+            expires_at
+        )
+
+    @staticmethod
+    def _assign_pairs(pairs, assigned_by_id: Optional[UUID], expires_at: Optional[datetime]) -> dict:
+        """Upsert (user_id, role_id) pairs; an active assignment only gets its expiry refreshed"""
+        return bulk_activate_links(
+            UserRole,
+            ('user', 'role'),
+            pairs,
+            values={'assigned_by_id': assigned_by_id, 'expires_at': expires_at},
+            refresh_fields=('expires_at',)
+        )
 
     @staticmethod
     @transaction.atomic
@@ -375,17 +421,35 @@ class UserRoleService:
         user_ids: List[UUID],
         role_ids: List[UUID],
         hard_delete: bool = False
-    ):
-        """Remove roles from multiple users"""
+    ) -> int:
+        """Remove roles from multiple users; returns the number of assignments removed"""
         user_roles = UserRole.objects.filter(
             user_id__in=user_ids,
             role_id__in=role_ids
         )
 
         if hard_delete:
-            user_roles.delete()
+            removed, _ = user_roles.delete()
         else:
-            user_roles.update(is_active=False, updated_at=timezone.now())
+            removed = user_roles.filter(is_active=True).update(is_active=False, updated_at=timezone.now())
+            if removed:
+                # update() không gửi signal
+                AuthorizationCache.bump()
+        return removed
+
+    @staticmethod
+    def expire_roles(now: Optional[datetime] = None) -> int:
+        """Deactivate every expired assignment in one UPDATE; returns the number of rows"""
+        now = now or timezone.now()
+        expired = UserRole.objects.filter(
+            is_active=True,
+            expires_at__lte=now
+        ).update(is_active=False, updated_at=now)
+
+        if expired:
+            # update() không gửi signal
+            AuthorizationCache.bump()
+        return expired
 
     @staticmethod
     def update_user_role(
@@ -438,12 +502,26 @@ class DepartmentService:
         return queryset.order_by('code')
 
     @staticmethod
-    def get_department(department_id: UUID) -> Department:
-        """Get department by ID"""
-        return get_object_or_404(
-            Department.objects.select_related('parent', 'manager', 'default_role'),
-            id=department_id
-        )
+    def get_department(department_id: UUID, with_counts: bool = False) -> Department:
+        """
+        Get department by ID
+
+        with_counts annotates member_count (direct members) and
+        total_member_count (whole subtree) in the same query.
+        """
+        queryset = Department.objects.select_related('parent', 'manager', 'default_role')
+        if with_counts:
+            subtree_members = User.objects.filter(
+                is_active=True,
+                department__ancestor_links__ancestor=OuterRef('pk')
+            ).order_by().values('department__ancestor_links__ancestor').annotate(
+                total=Count('pk')
+            ).values('total')
+            queryset = queryset.annotate(
+                member_count=Count('members', filter=Q(members__is_active=True)),
+                total_member_count=Subquery(subtree_members)
+            )
+        return get_object_or_404(queryset, id=department_id)
 
     @staticmethod
     def create_department(
@@ -455,14 +533,15 @@ class DepartmentService:
         default_role_id: Optional[UUID] = None
     ) -> Department:
         """Create new department"""
-        return Department.objects.create(
-            name=name,
-            code=code,
-            description=description,
-            parent_id=parent_id,
-            manager_id=manager_id,
-            default_role_id=default_role_id
-        )
+        with transaction.atomic():
+            return Department.objects.create(
+                name=name,
+                code=code,
+                description=description,
+                parent_id=parent_id,
+                manager_id=manager_id,
+                default_role_id=default_role_id
+            )
 
     @staticmethod
     def update_department(department_id: UUID, **kwargs) -> Department:
@@ -473,7 +552,9 @@ class DepartmentService:
             if hasattr(department, key):
                 setattr(department, key, value)
 
-        department.save()
+        # Đổi parent sẽ cập nhật closure table trong signal -> cùng transaction
+        with transaction.atomic():
+            department.save()
         return department
 
     @staticmethod
@@ -485,3 +566,102 @@ class DepartmentService:
             department.delete()
         else:
             department.soft_delete()
+
+
+class DepartmentTreeService:
+    """
+    Department hierarchy backed by the DepartmentClosure table
+
+    Every query here is one indexed join on the closure table, whatever the
+    depth of the tree.
+    """
+
+    @staticmethod
+    def insert_node(department: Department):
+        """Add closure rows for a new department: itself + every ancestor of its parent"""
+        links = [DepartmentClosure(ancestor=department, descendant=department, depth=0)]
+        if department.parent_id:
+            links.extend(
+                DepartmentClosure(ancestor_id=ancestor_id, descendant=department, depth=depth + 1)
+                for ancestor_id, depth in DepartmentClosure.objects.filter(
+                    descendant_id=department.parent_id
+                ).values_list('ancestor_id', 'depth')
+            )
+        DepartmentClosure.objects.bulk_create(links)
+
+    @staticmethod
+    def move_node(department: Department):
+        """Re-link a department's subtree under its (new) parent"""
+        subtree = list(
+            DepartmentClosure.objects.filter(ancestor=department).values_list('descendant_id', 'depth')
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        # Cắt liên kết giữa các ancestor cũ và toàn bộ subtree
+        DepartmentClosure.objects.filter(
+            descendant_id__in=subtree_ids
+        ).exclude(ancestor_id__in=subtree_ids).delete()
+
+        if department.parent_id:
+            ancestors = DepartmentClosure.objects.filter(
+                descendant_id=department.parent_id
+            ).values_list('ancestor_id', 'depth')
+            DepartmentClosure.objects.bulk_create([
+                DepartmentClosure(
+                    ancestor_id=ancestor_id,
+                    descendant_id=descendant_id,
+                    depth=ancestor_depth + descendant_depth + 1
+                )
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, descendant_depth in subtree
+            ])
+
+    @staticmethod
+    def is_descendant(department_id: UUID, ancestor_id: UUID) -> bool:
+        """True if department_id is ancestor_id itself or below it"""
+        return DepartmentClosure.objects.filter(
+            ancestor_id=ancestor_id,
+            descendant_id=department_id
+        ).exists()
+
+    @staticmethod
+    def get_descendant_ids(department_id: UUID, include_self: bool = True) -> List[UUID]:
+        """IDs of every department in the subtree"""
+        queryset = DepartmentClosure.objects.filter(ancestor_id=department_id)
+        if not include_self:
+            queryset = queryset.filter(depth__gt=0)
+        return list(queryset.values_list('descendant_id', flat=True))
+
+    @staticmethod
+    def get_ancestors(department_id: UUID, include_self: bool = False) -> List[Department]:
+        """Ancestor chain, root first"""
+        links = DepartmentClosure.objects.filter(descendant_id=department_id).select_related('ancestor')
+        if not include_self:
+            links = links.filter(depth__gt=0)
+        return [link.ancestor for link in links.order_by('-depth')]
+
+    @staticmethod
+    def get_members(department_id: UUID, is_active: bool = True):
+        """Users of a department and all of its sub-departments"""
+        return User.objects.filter(
+            department__ancestor_links__ancestor_id=department_id,
+            is_active=is_active
+        )
+
+    @staticmethod
+    def get_headcounts(is_active: Optional[bool] = True) -> List[Department]:
+        """
+        Departments annotated with member_count (direct) and
+        total_member_count (whole subtree)
+        """
+        active_members = Q(descendant_links__descendant__members__is_active=True)
+        queryset = Department.objects.annotate(
+            member_count=Count(
+                'descendant_links__descendant__members',
+                filter=active_members & Q(descendant_links__depth=0)
+            ),
+            total_member_count=Count('descendant_links__descendant__members', filter=active_members)
+        )
+        if is_active is not None:
+            queryset = queryset.filter(is_active=is_active)
+        return list(queryset.order_by('code'))
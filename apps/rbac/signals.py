@@ -0,0 +1,86 @@
+"""
+RBAC Signals
+Tăng phiên bản cache quyền khi role / permission / gán quyền / trạng thái user thay đổi
+Cập nhật closure table khi tạo / di chuyển phòng ban
+"""
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.users.models import User
+from .authorization import AuthorizationCache
+from .models import Department, Permission, Role, RolePermission, UserRole
+from .services import DepartmentTreeService
+
+# Các trường của User được nhúng vào JWT claims (xem create_user_access_token)
+_USER_CLAIM_FIELDS = ('is_active', 'is_superuser', 'user_type')
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def rbac_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    AuthorizationCache.bump()
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        AuthorizationCache.bump()
+
+
+@receiver(pre_save, sender=User)
+def remember_user_claims(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Ghi nhận thay đổi trạng thái / loại user để token cũ không còn được tin"""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(_USER_CLAIM_FIELDS):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*_USER_CLAIM_FIELDS).first()
+    current = tuple(getattr(instance, field) for field in _USER_CLAIM_FIELDS)
+    instance._claims_changed = previous is not None and previous != current
+
+
+@receiver(post_save, sender=User)
+def user_claims_changed(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, '_claims_changed', False):
+        return
+    instance._claims_changed = False
+    AuthorizationCache.bump()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    AuthorizationCache.bump()
+
+
+@receiver(pre_save, sender=Department)
+def remember_department_parent(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Ghi nhận parent cũ; chặn việc đặt phòng ban vào chính cây con của nó"""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'parent' not in update_fields and 'parent_id' not in update_fields:
+        return
+    previous = Department.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+    instance._parent_changed = previous != instance.parent_id
+    if instance._parent_changed and instance.parent_id and DepartmentTreeService.is_descendant(
+        instance.parent_id, instance.pk
+    ):
+        raise ValueError("Không thể chuyển phòng ban vào chính nó hoặc phòng ban con của nó")
+
+
+@receiver(post_save, sender=Department)
+def department_tree_changed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        DepartmentTreeService.insert_node(instance)
+    elif getattr(instance, '_parent_changed', False):
+        instance._parent_changed = False
+        DepartmentTreeService.move_node(instance)
@@ -0,0 +1,208 @@
+"""
+Authorization cache: entries are keyed by the global RBAC version, every RBAC /
+user-claim change bumps that version on commit, and an entry never outlives the
+earliest role expiry
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.querybudget import QueryRecorder
+from apps.rbac.authorization import AuthorizationCache
+from apps.rbac.models import Permission, Role, RolePermission, UserRole
+from apps.users.models import User
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """with committed(): ... chạy các callback on_commit như khi transaction commit"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user(roles=['sale'])
+
+
+@pytest.fixture
+def export_permission(db):
+    return Permission.objects.create(name='Export orders', codename='orders.export', module='orders', action='export')
+
+
+def fresh(user):
+    """Instance mới như ở request sau: không còn memo trên instance"""
+    return User.objects.get(pk=user.pk)
+
+
+def version():
+    return cache.get(AuthorizationCache.VERSION_KEY)
+
+
+@pytest.mark.django_db
+def test_cached_entry_is_served_without_queries(seller):
+    AuthorizationCache.get(seller)
+    user = fresh(seller)
+
+    with QueryRecorder() as recorder:
+        assert AuthorizationCache.get(user)['roles'] == {'sale'}
+
+    assert recorder.count == 0
+
+
+@pytest.mark.django_db
+def test_stale_version_falls_back_to_db(seller, export_permission, committed):
+    AuthorizationCache.get(seller)
+    # Ghi thẳng bằng bulk_create (không có signal): entry cũ vẫn được dùng
+    role = Role.objects.get(slug='sale')
+    RolePermission.objects.bulk_create([RolePermission(role=role, permission=export_permission)])
+    assert 'orders.export' not in AuthorizationCache.get(fresh(seller))['permissions']
+
+    with committed():
+        AuthorizationCache.bump()
+    user = fresh(seller)
+    with QueryRecorder() as recorder:
+        authorization = AuthorizationCache.get(user)
+
+    assert recorder.count == 1
+    assert 'orders.export' in authorization['permissions']
+    assert cache.get(AuthorizationCache.CACHE_KEY.format(version=version(), user_id=seller.pk)) == authorization
+
+
+def change_role(seller, permission):
+    role = Role.objects.get(slug='sale')
+    role.level = 50
+    role.save()
+
+
+def grant_permission(seller, permission):
+    RolePermission.objects.create(role=Role.objects.get(slug='sale'), permission=permission)
+
+
+def revoke_permission(seller, permission):
+    grant_permission(seller, permission)
+    RolePermission.objects.filter(permission=permission).get().delete()
+
+
+def add_role_permission_m2m(seller, permission):
+    Role.objects.get(slug='sale').permissions.add(permission)
+
+
+def deactivate_permission(seller, permission):
+    permission.is_active = False
+    permission.save()
+
+
+def assign_role(seller, permission):
+    UserRole.objects.create(user=seller, role=Role.objects.create(name='Kho', slug='kho'))
+
+
+def unassign_role(seller, permission):
+    UserRole.objects.get(user=seller).delete()
+
+
+def deactivate_user(seller, permission):
+    seller.is_active = False
+    seller.save()
+
+
+def promote_user(seller, permission):
+    seller.is_superuser = True
+    seller.save(update_fields=['is_superuser'])
+
+
+def delete_user(seller, permission):
+    seller.delete()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('change', [
+    change_role, grant_permission, revoke_permission, add_role_permission_m2m, deactivate_permission,
+    assign_role, unassign_role, deactivate_user, promote_user, delete_user,
+])
+def test_changes_bump_version_on_commit(seller, export_permission, committed, change):
+    start = AuthorizationCache.version()
+
+    with committed() as callbacks:
+        change(seller, export_permission)
+        assert version() == start
+
+    assert callbacks
+    assert version() > start
+
+
+@pytest.mark.django_db
+def test_saving_non_claim_user_fields_keeps_version(seller, committed):
+    start = AuthorizationCache.version()
+
+    with committed():
+        seller.first_name = 'An'
+        seller.save()
+        seller.is_active = True
+        seller.save(update_fields=['is_active'])
+
+    assert version() == start
+
+
+@pytest.mark.django_db
+def test_uncommitted_change_keeps_version(seller, django_capture_on_commit_callbacks):
+    start = AuthorizationCache.version()
+
+    with django_capture_on_commit_callbacks(execute=False):
+        change_role(seller, None)
+
+    assert version() == start
+
+
+@pytest.fixture
+def cache_writes(mocker):
+    return mocker.patch('apps.rbac.authorization.cache', wraps=cache)
+
+
+def stored_timeout(cache_writes):
+    (key, authorization), kwargs = cache_writes.set.call_args
+    return kwargs['timeout']
+
+
+@pytest.mark.django_db
+def test_ttl_without_expiry_is_the_default(seller, cache_writes):
+    AuthorizationCache.get(seller)
+
+    assert stored_timeout(cache_writes) == AuthorizationCache.CACHE_SECONDS
+
+
+@pytest.mark.django_db
+def test_ttl_is_capped_at_earliest_role_expiry(seller, cache_writes):
+    now = timezone.now()
+    for slug, seconds in (('kho', 600), ('ca-dem', 120)):
+        UserRole.objects.create(
+            user=seller, role=Role.objects.create(name=slug, slug=slug), expires_at=now + timedelta(seconds=seconds)
+        )
+
+    authorization = AuthorizationCache.get(seller)
+
+    assert authorization['roles'] == {'sale', 'kho', 'ca-dem'}
+    assert authorization['expires_at'] == now + timedelta(seconds=120)
+    assert 110 <= stored_timeout(cache_writes) <= 120
+
+
+@pytest.mark.django_db
+def test_ttl_never_exceeds_default_for_distant_expiry(seller, cache_writes):
+    UserRole.objects.filter(user=seller).update(expires_at=timezone.now() + timedelta(days=30))
+
+    AuthorizationCache.get(seller)
+
+    assert stored_timeout(cache_writes) == AuthorizationCache.CACHE_SECONDS
+
+
+@pytest.mark.django_db
+def test_expired_roles_are_not_loaded(seller):
+    UserRole.objects.create(
+        user=seller, role=Role.objects.create(name='Kho', slug='kho'), expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    authorization = AuthorizationCache.get(seller)
+
+    assert authorization['roles'] == {'sale'}
+    assert authorization['expires_at'] is None
@@ -0,0 +1,188 @@
+"""
+Set-based role / permission assignment: bulk_activate_links reports created,
+reactivated and unchanged links, writes in one upsert, and re-running the same
+assignment changes nothing
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.querybudget import QueryRecorder
+from apps.rbac.authorization import AuthorizationCache
+from apps.rbac.models import Permission, Role, RolePermission, UserRole
+from apps.rbac.services import RoleService, UserRoleService
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """with committed(): ... chạy các callback on_commit như khi transaction commit"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.fixture
+def role(db):
+    return Role.objects.create(name='Kho', slug='kho')
+
+
+@pytest.fixture
+def users(make_user):
+    return [make_user() for _ in range(3)]
+
+
+def assign(users, role, expires_at=None):
+    with QueryRecorder() as recorder:
+        counts = UserRoleService.bulk_assign_users([user.id for user in users], role.id, expires_at=expires_at)
+    writes = [sql for sql in recorder.statements if not sql.lstrip().upper().startswith('SELECT')]
+    return counts, writes
+
+
+def assignments(role):
+    return {
+        user_id: (row_id, is_active, expires_at)
+        for user_id, row_id, is_active, expires_at in UserRole.objects.filter(role=role).values_list(
+            'user_id', 'id', 'is_active', 'expires_at'
+        )
+    }
+
+
+@pytest.mark.django_db
+def test_new_links_are_created_in_one_insert(users, role):
+    counts, writes = assign(users, role)
+
+    assert counts == {'created': 3, 'reactivated': 0, 'unchanged': 0}
+    assert len(writes) == 1 and writes[0].lstrip().upper().startswith('INSERT')
+    assert {user_id: row[1] for user_id, row in assignments(role).items()} == {user.id: True for user in users}
+
+
+@pytest.mark.django_db
+def test_inactive_links_are_reactivated_in_place(users, role):
+    assign(users, role)
+    UserRole.objects.filter(user=users[0]).update(is_active=False)
+    before = assignments(role)
+    expires_at = timezone.now() + timedelta(days=7)
+
+    counts, writes = assign(users[:1], role, expires_at=expires_at)
+
+    assert counts == {'created': 0, 'reactivated': 1, 'unchanged': 0}
+    assert len(writes) == 1
+    assert assignments(role)[users[0].id] == (before[users[0].id][0], True, expires_at)
+
+
+@pytest.mark.django_db
+def test_active_links_are_unchanged_without_writes(users, role, committed):
+    assign(users, role)
+    before = assignments(role)
+    start = AuthorizationCache.version()
+
+    with committed():
+        counts, writes = assign(users, role)
+
+    assert counts == {'created': 0, 'reactivated': 0, 'unchanged': 3}
+    assert writes == []
+    assert assignments(role) == before
+    assert cache.get(AuthorizationCache.VERSION_KEY) == start
+
+
+@pytest.mark.django_db
+def test_unchanged_links_still_get_their_expiry_refreshed(users, role):
+    assign(users, role)
+    expires_at = timezone.now() + timedelta(days=1)
+
+    counts, writes = assign(users[:2], role, expires_at=expires_at)
+
+    assert counts == {'created': 0, 'reactivated': 0, 'unchanged': 2}
+    assert len(writes) == 1
+    assert [assignments(role)[user.id][2] for user in users] == [expires_at, expires_at, None]
+
+
+@pytest.mark.django_db
+def test_mixed_batch_counts(users, make_user, role, committed):
+    assign(users[:2], role)
+    UserRole.objects.filter(user=users[1]).update(is_active=False)
+    inactive_user = make_user(is_active=False)
+    start = AuthorizationCache.version()
+
+    with committed():
+        counts, _ = assign(users + [inactive_user], role)
+
+    assert counts == {'created': 1, 'reactivated': 1, 'unchanged': 1}
+    assert inactive_user.id not in assignments(role)
+    assert cache.get(AuthorizationCache.VERSION_KEY) > start
+
+
+@pytest.mark.django_db
+def test_reassignment_is_idempotent(users, role, committed):
+    expires_at = timezone.now() + timedelta(days=30)
+    with committed():
+        first, _ = assign(users, role, expires_at=expires_at)
+    after_first = assignments(role)
+    version = AuthorizationCache.version()
+
+    with committed():
+        second, writes = assign(users, role, expires_at=expires_at)
+
+    assert first == {'created': 3, 'reactivated': 0, 'unchanged': 0}
+    assert second == {'created': 0, 'reactivated': 0, 'unchanged': 3}
+    assert writes == []
+    assert assignments(role) == after_first
+    assert UserRole.objects.count() == 3
+    assert cache.get(AuthorizationCache.VERSION_KEY) == version
+
+
+@pytest.mark.django_db
+def test_bulk_assign_roles_to_one_user(users, role):
+    other = Role.objects.create(name='Sale', slug='sale')
+    retired = Role.objects.create(name='Cũ', slug='cu', is_active=False)
+    role_ids = [role.id, other.id, retired.id]
+
+    assert UserRoleService.bulk_assign_roles(users[0].id, role_ids) == {'created': 2, 'reactivated': 0, 'unchanged': 0}
+    assert UserRoleService.bulk_assign_roles(users[0].id, role_ids) == {'created': 0, 'reactivated': 0, 'unchanged': 2}
+    assert set(UserRole.objects.filter(user=users[0]).values_list('role__slug', flat=True)) == {'kho', 'sale'}
+
+
+@pytest.mark.django_db
+def test_assign_permissions_skips_inactive_and_is_idempotent(role):
+    permissions = [
+        Permission.objects.create(name=f'P{i}', codename=f'p.{i}', module='p', action='view', is_active=i < 2)
+        for i in range(3)
+    ]
+    ids = [permission.id for permission in permissions]
+
+    assert RoleService.assign_permissions(role.id, ids) == {'created': 2, 'reactivated': 0, 'unchanged': 0}
+    RolePermission.objects.filter(permission=permissions[0]).update(is_active=False)
+    assert RoleService.assign_permissions(role.id, ids) == {'created': 0, 'reactivated': 1, 'unchanged': 1}
+    assert RoleService.assign_permissions(role.id, ids) == {'created': 0, 'reactivated': 0, 'unchanged': 2}
+    assert RolePermission.objects.filter(role=role, is_active=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_bulk_remove_then_reassign(users, role, committed):
+    assign(users, role)
+    user_ids = [user.id for user in users]
+    start = AuthorizationCache.version()
+
+    with committed(), QueryRecorder() as recorder:
+        assert UserRoleService.bulk_remove_roles(user_ids[:2], [role.id]) == 2
+    assert UserRoleService.bulk_remove_roles(user_ids[:2], [role.id]) == 0
+
+    assert [sql.lstrip().split()[0].upper() for sql in recorder.statements] == ['UPDATE']
+    assert cache.get(AuthorizationCache.VERSION_KEY) > start
+    assert assign(users, role)[0] == {'created': 0, 'reactivated': 2, 'unchanged': 1}
+    assert UserRoleService.bulk_remove_roles(user_ids, [role.id], hard_delete=True) == 3
+    assert not UserRole.objects.filter(role=role).exists()
+
+
+@pytest.mark.django_db
+def test_expired_bulk_assignments_are_expired_then_reactivated(users, role):
+    assign(users[:2], role, expires_at=timezone.now() - timedelta(seconds=1))
+    assign(users[2:], role, expires_at=timezone.now() + timedelta(days=1))
+
+    assert UserRoleService.expire_roles() == 2
+    assert UserRoleService.expire_roles() == 0
+    assert {user_id for user_id, row in assignments(role).items() if row[1]} == {users[2].id}
+
+    counts, _ = assign(users[:2], role)
+    assert counts == {'created': 0, 'reactivated': 2, 'unchanged': 0}
+    assert all(row[1] and row[2] is None for user_id, row in assignments(role).items() if user_id != users[2].id)
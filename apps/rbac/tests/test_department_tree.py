@@ -0,0 +1,145 @@
+"""
+Department closure table: after every insert, move and delete the rows must
+equal the closure computed from the parent pointers
+"""
+import pytest
+
+from api.querybudget import QueryRecorder
+from apps.rbac.models import Department, DepartmentClosure
+from apps.rbac.services import DepartmentService, DepartmentTreeService
+
+
+def closure_from_parents():
+    """(ancestor, descendant, depth) dựng lại bằng cách đi ngược parent của từng phòng ban"""
+    parents = dict(Department.objects.values_list('id', 'parent_id'))
+    rows = set()
+    for department_id in parents:
+        ancestor_id, depth = department_id, 0
+        while ancestor_id is not None:
+            rows.add((ancestor_id, department_id, depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+def assert_closure_is_consistent():
+    assert set(DepartmentClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')) == closure_from_parents()
+
+
+@pytest.fixture
+def tree(db):
+    """
+    A ─ B ─ C ─ D
+    └─ E
+    """
+    departments = {}
+    for code, parent in (('A', None), ('B', 'A'), ('C', 'B'), ('D', 'C'), ('E', 'A')):
+        departments[code] = DepartmentService.create_department(
+            name=f'Phòng {code}', code=code, parent_id=departments[parent].id if parent else None
+        )
+    return departments
+
+
+def codes(ids):
+    return set(Department.objects.filter(id__in=ids).values_list('code', flat=True))
+
+
+def ancestor_codes(department, include_self=False):
+    return [d.code for d in DepartmentTreeService.get_ancestors(department.id, include_self=include_self)]
+
+
+def move(department, parent):
+    return DepartmentService.update_department(department.id, parent_id=parent.id if parent else None)
+
+
+@pytest.mark.django_db
+def test_insert_builds_closure(tree):
+    assert_closure_is_consistent()
+    assert DepartmentClosure.objects.get(ancestor=tree['A'], descendant=tree['D']).depth == 3
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['B'].id)) == {'B', 'C', 'D'}
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['B'].id, include_self=False)) == {'C', 'D'}
+    assert ancestor_codes(tree['D']) == ['A', 'B', 'C']
+    assert ancestor_codes(tree['D'], include_self=True) == ['A', 'B', 'C', 'D']
+
+
+@pytest.mark.django_db
+def test_move_reparents_whole_subtree(tree):
+    move(tree['C'], tree['E'])
+
+    assert_closure_is_consistent()
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['B'].id)) == {'B'}
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['E'].id)) == {'E', 'C', 'D'}
+    assert ancestor_codes(tree['D']) == ['A', 'E', 'C']
+
+
+@pytest.mark.django_db
+def test_move_to_root_and_back(tree):
+    move(tree['B'], None)
+    assert_closure_is_consistent()
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['A'].id)) == {'A', 'E'}
+    assert DepartmentTreeService.get_ancestors(tree['B'].id) == []
+
+    move(tree['A'], tree['D'])
+    assert_closure_is_consistent()
+    assert ancestor_codes(tree['E']) == ['B', 'C', 'D', 'A']
+
+
+@pytest.mark.django_db
+def test_saving_without_parent_change_keeps_closure(tree):
+    before = closure_from_parents()
+
+    with QueryRecorder() as recorder:
+        DepartmentService.update_department(tree['C'].id, description='Kho lạnh')
+    tree['C'].soft_delete()
+
+    assert_closure_is_consistent()
+    assert closure_from_parents() == before
+    assert not any(sql.lstrip().upper().startswith('DELETE') for sql in recorder.statements)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('target', ['B', 'C', 'D'])
+def test_move_under_own_subtree_is_rejected(tree, target):
+    before = closure_from_parents()
+
+    with pytest.raises(ValueError):
+        move(tree['B'], tree[target])
+
+    assert Department.objects.get(code='B').parent_id == tree['A'].id
+    assert closure_from_parents() == before
+    assert_closure_is_consistent()
+
+
+@pytest.mark.django_db
+def test_delete_removes_subtree_rows(tree):
+    tree['C'].delete()
+
+    assert set(Department.objects.values_list('code', flat=True)) == {'A', 'B', 'E'}
+    assert_closure_is_consistent()
+    assert codes(DepartmentTreeService.get_descendant_ids(tree['A'].id)) == {'A', 'B', 'E'}
+
+
+@pytest.mark.django_db
+def test_headcounts_and_members(tree, make_user):
+    for code, active in (('C', True), ('C', True), ('C', False), ('D', True), ('E', True)):
+        make_user(department=tree[code], is_active=active)
+
+    with QueryRecorder() as recorder:
+        headcounts = {d.code: (d.member_count, d.total_member_count) for d in DepartmentTreeService.get_headcounts()}
+
+    assert recorder.count == 1
+    assert headcounts == {'A': (0, 4), 'B': (0, 3), 'C': (2, 3), 'D': (1, 1), 'E': (1, 1)}
+    assert DepartmentTreeService.get_members(tree['B'].id).count() == 3
+    assert DepartmentTreeService.get_members(tree['B'].id, is_active=False).count() == 1
+
+    move(tree['C'], tree['E'])
+    headcounts = {d.code: (d.member_count, d.total_member_count) for d in DepartmentTreeService.get_headcounts()}
+    assert headcounts == {'A': (0, 4), 'B': (0, 0), 'C': (2, 3), 'D': (1, 1), 'E': (1, 4)}
+    assert DepartmentService.get_department(tree['E'].id, with_counts=True).total_member_count == 4
+
+
+@pytest.mark.django_db
+def test_headcounts_skip_inactive_departments(tree):
+    tree['E'].soft_delete()
+
+    assert [d.code for d in DepartmentTreeService.get_headcounts()] == ['A', 'B', 'C', 'D']
+    assert [d.code for d in DepartmentTreeService.get_headcounts(is_active=None)] == ['A', 'B', 'C', 'D', 'E']
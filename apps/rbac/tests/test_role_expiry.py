@@ -0,0 +1,130 @@
+"""
+Time-limited user roles: expired assignments are ignored by every permission
+lookup, deactivated in one UPDATE by expire_user_roles, and counted in one
+aggregate by the stats endpoint
+"""
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.querybudget import QueryRecorder
+from apps.rbac import api
+from apps.rbac.authorization import AuthorizationCache
+from apps.rbac.models import Permission, Role, RolePermission, UserRole
+from apps.rbac.services import UserRoleService
+from apps.users.jwt_utils import create_user_access_token, decode_access_token
+from apps.users.models import User
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """with committed(): ... chạy các callback on_commit như khi transaction commit"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.fixture
+def assignments(make_user):
+    """Một user với role vĩnh viễn, role còn hạn và role đã hết hạn (mỗi role một permission)"""
+    user = make_user()
+    now = timezone.now()
+    rows = {}
+    for slug, expires_at in (('sale', None), ('kho', now + timedelta(hours=1)), ('ca-dem', now - timedelta(minutes=1))):
+        role = Role.objects.create(name=slug, slug=slug)
+        permission = Permission.objects.create(name=slug, codename=f'{slug}.view', module=slug, action='view')
+        RolePermission.objects.create(role=role, permission=permission)
+        rows[slug] = UserRole.objects.create(user=user, role=role, expires_at=expires_at)
+    return user, rows
+
+
+@pytest.mark.django_db
+def test_not_expired_q(assignments):
+    user, rows = assignments
+
+    current = UserRole.objects.filter(UserRole.not_expired_q())
+    later = UserRole.objects.filter(UserRole.not_expired_q(now=timezone.now() + timedelta(hours=2)))
+    by_user = User.objects.filter(UserRole.not_expired_q(prefix='user_roles__'), user_roles__role__slug='kho')
+
+    assert {row.role.slug for row in current} == {'sale', 'kho'}
+    assert {row.role.slug for row in later} == {'sale'}
+    assert list(by_user) == [user]
+
+
+@pytest.mark.django_db
+def test_expired_roles_grant_nothing(assignments):
+    user, rows = assignments
+
+    authorization = AuthorizationCache.load(user.pk)
+
+    assert authorization['roles'] == {'sale', 'kho'}
+    assert authorization['permissions'] == {'sale.view', 'kho.view'}
+    assert authorization['expires_at'] == rows['kho'].expires_at
+    assert {permission.codename for permission in user.get_all_permissions()} == {'sale.view', 'kho.view'}
+    assert not user.has_permission('ca-dem.view')
+
+
+@pytest.mark.django_db
+def test_token_carries_earliest_expiry(assignments, make_user):
+    user, rows = assignments
+
+    payload = decode_access_token(create_user_access_token(user))
+
+    assert payload['roles'] == ['kho', 'sale']
+    assert payload['authz_expires_at'] == int(rows['kho'].expires_at.timestamp())
+    assert decode_access_token(create_user_access_token(make_user(roles=['sale'])))['authz_expires_at'] is None
+
+
+@pytest.mark.django_db
+def test_expire_roles_is_one_update_and_bumps_version(assignments, committed):
+    user, rows = assignments
+    start = AuthorizationCache.version()
+
+    with committed(), QueryRecorder() as recorder:
+        assert UserRoleService.expire_roles() == 1
+
+    assert recorder.count == 1
+    assert recorder.statements[0].lstrip().upper().startswith('UPDATE')
+    assert cache.get(AuthorizationCache.VERSION_KEY) > start
+    assert set(UserRole.objects.filter(is_active=False).values_list('role__slug', flat=True)) == {'ca-dem'}
+
+
+@pytest.mark.django_db
+def test_expire_roles_without_expired_rows_keeps_version(assignments, committed):
+    UserRoleService.expire_roles()
+    start = AuthorizationCache.version()
+
+    with committed():
+        assert UserRoleService.expire_roles() == 0
+
+    assert cache.get(AuthorizationCache.VERSION_KEY) == start
+
+
+@pytest.mark.django_db
+def test_expire_user_roles_command(assignments, committed):
+    stdout = StringIO()
+    with committed():
+        call_command('expire_user_roles', stdout=stdout)
+        call_command('expire_user_roles', stdout=stdout)
+
+    assert stdout.getvalue().splitlines() == ['Deactivated 1 expired role assignments', 'No expired role assignments']
+
+
+@pytest.mark.django_db
+def test_user_role_stats_is_one_aggregate(assignments, make_user):
+    make_user(roles=['sale'])
+    UserRoleService.expire_roles()
+
+    with QueryRecorder() as recorder:
+        stats = api.get_user_role_stats(None)
+
+    # Một aggregate cho total / active / expired + một đếm user distinct
+    assert recorder.count == 2
+    assert stats == {
+        'total_assignments': 4,
+        'active_assignments': 3,
+        'expired_assignments': 1,
+        'users_with_roles': 2,
+    }
@@ -3,17 +3,18 @@ API endpoints cho hệ thống bán hải sản
 """
 from ninja import Router
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, F, Q
+from django.db.models import Sum, Q
 from django.utils import timezone
+from datetime import date
 from decimal import Decimal
 from uuid import UUID
 import uuid
 
 from .models import (
     SeafoodCategory, Seafood, ImportSource, ImportBatch,
-    Order, OrderItem, InventoryLog
+    Order, OrderItem, InventoryLog, PaymentTransaction
 )
 from .schemas import (
     CategoryRead, CategoryCreate, CategoryUpdate,
@@ -22,11 +23,16 @@ from .schemas import (
     ImportBatchRead, ImportBatchCreate, ImportBatchUpdate,
     OrderRead, OrderCreate, OrderUpdate, OrderItemRead,
     OrderConfirmBySale, OrderAssignToEmployee, OrderStartWeighing, OrderCompleteWeighing,
-    DashboardStats, ProductStats
+    DashboardStats, ProductStats, PaymentTransactionRead
 )
-from .sepay_service import get_sepay_service, SepayAPIError
+from .repositories import SalesFactRepository
+from .services import DashboardStatsService, PaymentService, StatementReconciliationService
+from .sepay_service import SepayAPIError
+from apps.rbac.permissions import require_permission
+from apps.users.authentication import JWTAuth
 
 router = Router(tags=["Seafood"], auth=None)  # No auth required for seafood APIs
+jwt_auth = JWTAuth()  # Dùng cho các endpoint thanh toán / đối soát
 
 
 # ============================================
@@ -40,6 +46,7 @@ def send_new_order_notification(order):
     from django.core.mail import send_mail
     from django.conf import settings
     from django.contrib.auth import get_user_model
+    from api import metrics
 
     User = get_user_model()
 
@@ -91,13 +98,14 @@ Hệ thống Hải sản
 
     # Gửi email cho tất cả staff
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=list(staff_users),
-            fail_silently=False,
-        )
+        with metrics.outbound('smtp', 'new_order_notification'):
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=list(staff_users),
+                fail_silently=False,
+            )
     except Exception as e:
         # Re-raise để log ở nơi gọi
         raise e
@@ -733,7 +741,7 @@ def update_import_batch(request, batch_id: UUID, payload: ImportBatchUpdate):
 @router.get("/orders", response=List[OrderRead])
 def list_orders(request, status: str = None, customer_phone: str = None, created_by: UUID = None, limit: int = 50):
     """Lấy danh sách đơn hàng"""
-    query = Order.objects.filter(is_active=True).prefetch_related(
+    query = Order.objects.filter(is_active=True).select_related('weighed_by', 'shipped_by').prefetch_related(
         'items', 'items__seafood', 'items__seafood__category'
     )
 
@@ -1377,52 +1385,54 @@ def export_order_pdf(request, order_id: UUID):
 
 @router.get("/stats/dashboard", response=DashboardStats)
 def get_dashboard_stats(request):
-    """Lấy thống kê tổng quan"""
-    today = timezone.now().date()
-
-    # Tổng số sản phẩm
-    total_products = Seafood.objects.filter(is_active=True, status='active').count()
-
-    # Tổng giá trị tồn kho
-    total_stock_value = Seafood.objects.filter(is_active=True).aggregate(
-        total=Sum(F('stock_quantity') * F('current_price'))
-    )['total'] or Decimal('0')
-
-    # Đơn hàng hôm nay
-    today_orders = Order.objects.filter(
-        created_at__date=today,
-        status__in=['pending', 'completed']
-    ).count()
-
-    # Doanh thu hôm nay
-    today_revenue = Order.objects.filter(
-        created_at__date=today,
-        status='completed'
-    ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-
-    # Sản phẩm sắp hết hàng (< 10kg)
-    low_stock_products = Seafood.objects.filter(
-        is_active=True,
-        stock_quantity__lt=10,
-        status='active'
-    ).count()
-
-    return DashboardStats(
-        total_products=total_products,
-        total_stock_value=total_stock_value,
-        today_orders=today_orders,
-        today_revenue=today_revenue,
-        low_stock_products=low_stock_products
-    )
+    """Lấy thống kê tổng quan (cache ngắn hạn, tự làm mới khi đơn hàng / tồn kho thay đổi)"""
+    return DashboardStats(**DashboardStatsService.get_stats())
 
 
 @router.get("/stats/products", response=List[ProductStats])
-def get_product_stats(request, limit: int = 10):
-    """Lấy thống kê sản phẩm bán chạy"""
-    products = Seafood.objects.filter(is_active=True).annotate(
-        total_sold=Sum('orderitem__weight'),
-        revenue=Sum(F('orderitem__weight') * F('orderitem__unit_price'))
-    ).order_by('-revenue')[:limit]
+def get_product_stats(
+    request,
+    limit: int = 10,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category_id: Optional[UUID] = None
+):
+    """
+    Lấy thống kê sản phẩm bán chạy
+
+    Tính từ bảng tổng hợp theo ngày, bỏ qua đơn đã hủy.
+    date_from / date_to: khoảng ngày tạo đơn (bỏ trống = toàn bộ lịch sử)
+    """
+    if date_from and date_to and date_from > date_to:
+        from api.exceptions import BadRequest
+        raise BadRequest("date_from phải trước hoặc bằng date_to")
+
+    products_qs = Seafood.objects.filter(is_active=True)
+    if category_id:
+        products_qs = products_qs.filter(category_id=category_id)
+
+    facts = SalesFactRepository().product_facts(
+        date_from=date_from,
+        date_to=date_to
+    ).exclude(status='cancelled').filter(seafood__is_active=True)
+    if category_id:
+        facts = facts.filter(seafood__category_id=category_id)
+
+    top_sellers = list(
+        facts.values('seafood_id')
+        .annotate(total_sold=Sum('weight'), revenue=Sum('revenue'))
+        .order_by('-revenue', 'seafood_id')[:limit]
+    ) if limit > 0 else []
+    totals = {row['seafood_id']: row for row in top_sellers}
+
+    products = Seafood.objects.in_bulk(list(totals))
+    ranked = [products[seafood_id] for seafood_id in totals]
+
+    # Bổ sung sản phẩm chưa bán được để đủ số lượng (xếp sau cùng)
+    if len(ranked) < limit:
+        ranked += list(
+            products_qs.exclude(id__in=list(totals)).order_by('code')[:limit - len(ranked)]
+        )
 
     return [
         ProductStats(
@@ -1430,10 +1440,10 @@ def get_product_stats(request, limit: int = 10):
             name=p.name,
             stock_quantity=p.stock_quantity,
             current_price=p.current_price,
-            total_sold=p.total_sold or Decimal('0'),
-            revenue=p.revenue or Decimal('0')
+            total_sold=totals.get(p.id, {}).get('total_sold') or Decimal('0'),
+            revenue=totals.get(p.id, {}).get('revenue') or Decimal('0')
         )
-        for p in products
+        for p in ranked
     ]
 
 
@@ -1581,7 +1591,7 @@ def get_sale_orders(request, status: str = None):
     # Bao gồm: đơn cần xác nhận, đơn đang xử lý, đơn đã cân
     orders = Order.objects.exclude(
         status__in=['cancelled']
-    ).select_related('created_by', 'sale_user', 'assigned_employee', 'customer', 'weighed_by', 'shipped_by').prefetch_related('items__seafood').order_by('-created_at')
+    ).select_related('created_by', 'sale_user', 'assigned_employee', 'customer', 'weighed_by', 'shipped_by').prefetch_related('items__seafood__category').order_by('-created_at')
 
     if status:
         orders = orders.filter(status=status)
@@ -1637,7 +1647,7 @@ def get_employee_orders(request, status: str = None):
         # Nếu không đăng nhập, không trả về gì
         return []
 
-    orders = Order.objects.filter(query).select_related('created_by', 'sale_user', 'assigned_employee', 'customer', 'weighed_by', 'shipped_by').prefetch_related('items__seafood').order_by('-created_at')
+    orders = Order.objects.filter(query).select_related('created_by', 'sale_user', 'assigned_employee', 'customer', 'weighed_by', 'shipped_by').prefetch_related('items__seafood__category').order_by('-created_at')
 
     if status:
         orders = orders.filter(status=status)
@@ -1704,6 +1714,7 @@ def sepay_webhook(request):
     """
     try:
         import json
+        from decimal import InvalidOperation
 
         # Parse request body
         if request.body:
@@ -1712,71 +1723,63 @@ def sepay_webhook(request):
             return {"success": False, "error": "Empty payload"}
 
         # Extract data from SePay payload
-        reference_number = payload.get('reference_number', '')
-        amount = float(payload.get('amount', 0))
+        transaction_id = str(payload.get('transaction_id') or '')
         status = payload.get('status', '')
-        transaction_id = payload.get('transaction_id', '')
-        content = payload.get('content', '')
-
-        # Find order by order_code in reference_number or content
-        order_code = reference_number
-        if not order_code:
-            # Try to extract order code from content
-            # Content format: "Thanh toan ORDER123"
-            import re
-            match = re.search(r'ORD[A-Z0-9]+', content.upper())
-            if match:
-                order_code = match.group(0)
-
-        if not order_code:
-            return {"success": False, "error": "Order code not found in payload"}
-
-        # Find the order
+        if not transaction_id:
+            return {"success": False, "error": "transaction_id is required"}
         try:
-            order = Order.objects.get(order_code=order_code)
-        except Order.DoesNotExist:
-            return {"success": False, "error": f"Order {order_code} not found"}
+            amount = Decimal(str(payload.get('amount', 0)))
+        except InvalidOperation:
+            return {"success": False, "error": "Invalid amount"}
+
+        # Ghi vào sổ giao dịch + cập nhật đơn (webhook gửi lại chỉ tốn 1 câu lệnh)
+        outcome = PaymentService.process(
+            gateway='sepay',
+            transaction_id=transaction_id,
+            amount=amount,
+            status=status,
+            reference_number=payload.get('reference_number') or '',
+            content=payload.get('content') or '',
+            payload=payload
+        )
+        order_code = outcome['order_code']
+        result = outcome['result']
 
-        # Verify amount matches (allow 1% difference for rounding)
-        expected_amount = float(order.total_amount)
-        if abs(amount - expected_amount) > (expected_amount * 0.01):
+        if outcome['duplicate']:
             return {
-                "success": False,
-                "error": f"Amount mismatch. Expected: {expected_amount}, Received: {amount}"
+                "success": True,
+                "message": f"Transaction {transaction_id} already processed"
             }
-
-        # Update payment status based on SePay status
-        if status == 'success':
-            order.payment_status = 'paid'
-            order.paid_amount = amount
-
-            # Store transaction info in notes if needed
-            transaction_note = f"\nGiao dịch SePay: {transaction_id} - {amount}đ"
-            if order.notes:
-                order.notes += transaction_note
-            else:
-                order.notes = transaction_note.strip()
-
-            order.save()
-
+        if result == 'applied':
             return {
                 "success": True,
                 "message": f"Payment confirmed for order {order_code}",
-                "order_id": str(order.id)
+                "order_id": str(outcome['order']['id'])
             }
-        elif status == 'pending':
-            order.payment_status = 'pending_verification'
-            order.save()
+        if result == 'pending':
             return {
                 "success": True,
                 "message": f"Payment pending for order {order_code}"
             }
-        else:
-            # Payment failed
+        if result == 'already_paid':
+            return {
+                "success": True,
+                "message": f"Order {order_code} already paid"
+            }
+        if result == 'order_not_found':
+            if not order_code:
+                return {"success": False, "error": "Order code not found in payload"}
+            return {"success": False, "error": f"Order {order_code} not found"}
+        if result == 'amount_mismatch':
             return {
                 "success": False,
-                "error": f"Payment failed with status: {status}"
+                "error": f"Amount mismatch. Expected: {outcome['order']['total_amount']}, Received: {amount}"
             }
+        # Payment failed
+        return {
+            "success": False,
+            "error": f"Payment failed with status: {status}"
+        }
 
     except Exception as e:
         import traceback
@@ -1787,6 +1790,55 @@ def sepay_webhook(request):
         }
 
 
+@router.get("/payment/transactions", response=List[PaymentTransactionRead], auth=jwt_auth)
+@require_permission('view_payment_transactions')
+def list_payment_transactions(
+    request,
+    order_code: Optional[str] = None,
+    order_id: Optional[UUID] = None,
+    result: Optional[str] = None,
+    limit: int = 100
+):
+    """Lịch sử giao dịch thanh toán nhận từ cổng thanh toán"""
+    transactions = PaymentTransaction.objects.all()
+    if order_code:
+        transactions = transactions.filter(order_code=order_code)
+    if order_id:
+        transactions = transactions.filter(order_id=order_id)
+    if result:
+        transactions = transactions.filter(result=result)
+    return list(transactions.order_by('-created_at')[:min(limit, 500)])
+
+
+@router.post("/payments/reconcile", auth=jwt_auth)
+@require_permission('reconcile_payments')
+def reconcile_bank_statement(request):
+    """
+    Đối soát sao kê ngân hàng (CSV hoặc Excel) với các đơn chưa thanh toán
+
+    Ghi nhận thanh toán cho các dòng khớp mã đơn và số tiền; trả về các dòng
+    không khớp để kế toán xử lý tay.
+    """
+    import logging
+    from django.http import JsonResponse
+
+    statement = request.FILES.get('file')
+    if not statement:
+        return JsonResponse({"error": "No file uploaded"}, status=400)
+
+    try:
+        lines = StatementReconciliationService.read_statement(statement, statement.name)
+    except Exception:
+        # Chi tiết lỗi chỉ ghi log, không trả về client
+        logging.getLogger(__name__).exception("Failed to read bank statement %r", statement.name)
+        return JsonResponse(
+            {"error": "Không đọc được file sao kê. Kiểm tra định dạng CSV/Excel và dòng tiêu đề."},
+            status=400
+        )
+
+    return {"success": True, **StatementReconciliationService.reconcile(lines)}
+
+
 @router.get("/payment/check-order/{order_code}")
 def check_order_payment(request, order_code: str):
     """
@@ -1836,15 +1888,9 @@ def generate_payment_qr(request, order_code: str):
                 "can_pay": False
             }
 
-        # Get SePay service
-        sepay = get_sepay_service()
-
-        # Generate QR code
+        # Generate QR code (cached until the order changes)
         content = f"Thanh toan {order_code}"
-        qr_data = sepay.create_qr_code(
-            amount=order.total_amount,
-            content=content
-        )
+        qr_data = PaymentService.order_qr(order, content)
 
         return {
             "success": True,
@@ -1852,6 +1898,7 @@ def generate_payment_qr(request, order_code: str):
             "amount": float(order.total_amount),
             "qr_image_url": qr_data['qr_image_url'],
             "qr_svg": qr_data.get('qr_svg', ''),
+            "qr_payload": qr_data.get('qr_payload', ''),
             "account_number": qr_data['account_number'],
             "account_name": qr_data['account_name'],
             "bank_code": qr_data['bank_code'],
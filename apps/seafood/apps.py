@@ -5,3 +5,6 @@ class SeafoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.seafood'
     verbose_name = 'Quản lý Hải sản'
+
+    def ready(self):
+        from . import signals  # noqa: F401
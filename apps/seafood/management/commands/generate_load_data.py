@@ -0,0 +1,564 @@
+"""
+Management command to generate a production-scale dataset for load testing
+Run: python manage.py generate_load_data --orders 1000000 --workers 4
+
+Products, import batches, orders with weighed items, inventory logs,
+attendance and transactions are written with Postgres COPY (executemany in
+large batches on other databases). Every chunk of orders draws from its own
+random.Random(seed, chunk), so the rows do not depend on --workers.
+"""
+import multiprocessing
+import random
+import time as timer
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, models, transaction
+
+from apps.business_day import business_today, business_tz
+from apps.payroll.models import SalaryConfiguration
+from apps.rbac.models import Role, UserRole
+from apps.seafood.models import (
+    ImportBatch,
+    ImportSource,
+    InventoryLog,
+    Order,
+    OrderItem,
+    Seafood,
+    SeafoodCategory,
+)
+from apps.users.models import Attendance, Transaction, User
+
+BATCH_SIZE = 5_000
+
+# (danh mục, sản phẩm, khoảng giá bán nghìn đồng/kg)
+CATALOG = [
+    ('Tôm', ['Tôm hùm bông', 'Tôm hùm xanh', 'Tôm sú', 'Tôm thẻ', 'Tôm càng xanh', 'Tôm mũ ni'], (180, 2200)),
+    ('Cua', ['Cua Cà Mau', 'Cua thịt', 'Cua gạch', 'Cua hoàng đế', 'Cua huỳnh đế'], (350, 3500)),
+    ('Ghẹ', ['Ghẹ xanh', 'Ghẹ đỏ', 'Ghẹ sữa'], (300, 900)),
+    ('Cá', ['Cá mú đỏ', 'Cá mú trân châu', 'Cá bớp', 'Cá chim', 'Cá hồi', 'Cá tầm'], (150, 1200)),
+    ('Mực', ['Mực ống', 'Mực lá', 'Mực trứng', 'Bạch tuộc'], (180, 600)),
+    ('Ốc', ['Ốc hương', 'Ốc móng tay', 'Ốc len', 'Ốc bươu'], (120, 700)),
+    ('Sò', ['Sò điệp', 'Sò huyết', 'Sò lông', 'Nghêu'], (60, 450)),
+    ('Hàu', ['Hàu sữa', 'Hàu Thái Bình Dương'], (60, 200)),
+]
+ORIGINS = ['Cà Mau', 'Phú Quốc', 'Nha Trang', 'Quảng Ninh', 'Vũng Tàu', 'Nhập khẩu']
+
+# (slug, tên, level, tỉ lệ nhân viên, lương cơ bản)
+STAFF_ROLES = [
+    ('salesperson', 'Nhân viên bán hàng', 30, 0.40, 7_000_000),
+    ('warehouse', 'Nhân viên kho', 20, 0.30, 6_500_000),
+    ('accountant', 'Kế toán', 40, 0.15, 9_000_000),
+    ('manager', 'Quản lý', 60, 0.15, 15_000_000),
+]
+
+# Đơn cũ hầu hết đã xong; đơn 2 ngày gần nhất còn đang xử lý
+SETTLED_STATUSES = (['completed', 'cancelled', 'weighed'], [85, 8, 7])
+RECENT_STATUSES = (
+    ['pending', 'confirmed', 'assigned_to_warehouse', 'weighing', 'weighed', 'completed', 'cancelled'],
+    [20, 15, 15, 10, 15, 20, 5],
+)
+WEIGHED_STATUSES = {'weighed', 'completed'}
+PAYMENT_METHODS = (['cash', 'bank_transfer', 'cod'], [35, 50, 15])
+ITEM_COUNTS = ([1, 2, 3, 4, 5], [35, 32, 18, 10, 5])
+# Khách quay lại: mỗi khách trung bình ngần này đơn
+ORDERS_PER_CUSTOMER = 4
+
+ORDER_COLUMNS = [
+    'id', 'order_code', 'customer_name', 'customer_phone', 'customer_address', 'customer_source',
+    'subtotal', 'discount_amount', 'total_amount', 'payment_method', 'payment_status', 'paid_amount',
+    'status', 'sale_user_id', 'confirmed_by_sale_at', 'assigned_employee_id', 'assigned_at',
+    'weighed_at', 'weighed_by_id', 'shipped_at', 'shipped_by_id', 'delivered_at', 'delivered_by_id',
+    'created_by_id', 'created_at', 'updated_at',
+]
+ITEM_COLUMNS = [
+    'id', 'order_id', 'seafood_id', 'import_batch_id', 'estimated_weight_range', 'weight',
+    'unit_price', 'subtotal', 'created_at', 'updated_at',
+]
+BATCH_COLUMNS = [
+    'id', 'seafood_id', 'batch_code', 'import_source_id', 'import_date', 'import_price', 'sell_price',
+    'total_weight', 'remaining_weight', 'status', 'imported_by_id', 'created_at', 'updated_at',
+]
+INVENTORY_COLUMNS = [
+    'id', 'seafood_id', 'import_batch_id', 'order_item_id', 'type', 'weight_change', 'stock_after',
+    'notes', 'created_by_id', 'created_at', 'updated_at',
+]
+TRANSACTION_COLUMNS = [
+    'id', 'transaction_type', 'category', 'amount', 'date', 'description', 'order_id',
+    'created_by_id', 'created_at', 'updated_at',
+]
+
+
+def order_code(prefix: str, seed: int, index: int) -> str:
+    return f'{prefix}{seed}-{index:08d}'
+
+
+def admin_email(prefix: str) -> str:
+    return f'{prefix.lower()}-admin@loadtest.example.com'
+
+
+@contextmanager
+def explicit_timestamps(*model_classes):
+    """Tắt auto_now / auto_now_add để bulk_create giữ created_at đã sinh"""
+    fields = [
+        field for model in model_classes for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _random_uuid(rnd: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rnd.getrandbits(128), version=4)
+
+
+def _kg(centigrams: int) -> Decimal:
+    """Cân nặng lưu bằng số nguyên 1/100 kg khi sinh, đổi sang Decimal khi ghi"""
+    return Decimal(centigrams).scaleb(-2)
+
+
+# ---------------------------------------------------------------------------
+# Ghi dữ liệu: COPY trên Postgres, executemany ở nơi khác
+# ---------------------------------------------------------------------------
+
+def write_rows(model, columns: List[str], rows: List[tuple]) -> int:
+    """
+    Insert rows (values in `columns` order, by field attname) into model's table
+
+    Every concrete column is written: columns not generated get the field's
+    Python default, which neither COPY nor a raw INSERT would apply.
+    """
+    if not rows:
+        return 0
+    fields = model._meta.concrete_fields
+    position = {name: index for index, name in enumerate(columns)}
+    plan = [(field, position.get(field.attname), field.get_default()) for field in fields]
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column_list = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            from psycopg.types.json import Jsonb
+
+            # psycopg tự chuyển kiểu Python (UUID, Decimal, datetime...) sang Postgres
+            plan = [
+                (field, index, Jsonb(default) if isinstance(field, models.JSONField) else default)
+                for field, index, default in plan
+            ]
+            with cursor.cursor.copy(f'COPY {table} ({column_list}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row([row[index] if index is not None else default for _, index, default in plan])
+        else:
+            sql = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['%s'] * len(fields))})"
+            for start in range(0, len(rows), BATCH_SIZE):
+                cursor.executemany(sql, [
+                    [
+                        field.get_db_prep_save(row[index] if index is not None else default, connection)
+                        for field, index, default in plan
+                    ]
+                    for row in rows[start:start + BATCH_SIZE]
+                ])
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Đơn hàng theo chunk (chạy trong tiến trình chính hoặc worker)
+# ---------------------------------------------------------------------------
+
+class LoadPlan:
+    """Reference data the order chunks need; plain values so workers inherit it cheaply"""
+
+    def __init__(self, prefix: str, seed: int, orders: int, chunk_size: int, first_day: date, days: int):
+        self.prefix = prefix
+        self.seed = seed
+        self.orders = orders
+        self.chunk_size = chunk_size
+        self.first_day = first_day
+        self.days = days
+        self.day_cum_weights: List[float] = []
+        self.products: List[tuple] = []  # (id, giá bán, (phase, interval, [id lô nhập]))
+        self.product_cum_weights: List[float] = []
+        self.staff: Dict[str, List[uuid.UUID]] = {}
+
+    @property
+    def chunks(self) -> int:
+        return (self.orders + self.chunk_size - 1) // self.chunk_size
+
+    def batch_for(self, product: tuple, day_index: int):
+        phase, interval, batch_ids = product[2]
+        return batch_ids[(day_index - phase) // interval + 1]
+
+
+def generate_chunk(plan: LoadPlan, chunk: int) -> Dict[str, list]:
+    rnd = random.Random(f'{plan.seed}:orders:{chunk}')
+    zone = business_tz()
+    customers = max(1, plan.orders // ORDERS_PER_CUSTOMER)
+    day_indexes = range(plan.days)
+    sales, warehouse = plan.staff['salesperson'], plan.staff['warehouse']
+    recent = plan.days - 2
+
+    orders, items, inventory, transactions = [], [], [], []
+    start = chunk * plan.chunk_size
+    for index in range(start, min(plan.orders, start + plan.chunk_size)):
+        day_index = rnd.choices(day_indexes, cum_weights=plan.day_cum_weights)[0]
+        day = plan.first_day + timedelta(days=day_index)
+        created_at = (
+            datetime.combine(day, time(7), tzinfo=zone)
+            + timedelta(seconds=int(rnd.triangular(0, 14 * 3600, 4 * 3600)))
+        )
+        status = rnd.choices(*(RECENT_STATUSES if day_index >= recent else SETTLED_STATUSES))[0]
+        weighed = status in WEIGHED_STATUSES
+        # Khách cũ đặt nhiều hơn: phân phối lệch về các số nhỏ
+        customer = int(customers * rnd.random() ** 2)
+        sale_user = rnd.choice(sales)
+        order_id = _random_uuid(rnd)
+        code = order_code(plan.prefix, plan.seed, index)
+
+        confirmed_at = assigned_at = weighed_at = shipped_at = delivered_at = None
+        assigned_employee = shipped_by = delivered_by = None
+        if status not in ('pending', 'cancelled'):
+            confirmed_at = created_at + timedelta(minutes=rnd.randint(1, 30))
+        if status not in ('pending', 'confirmed', 'cancelled'):
+            assigned_employee = rnd.choice(warehouse)
+            assigned_at = created_at + timedelta(minutes=rnd.randint(30, 90))
+        if weighed:
+            weighed_at = created_at + timedelta(minutes=rnd.randint(90, 240))
+        if status == 'completed' and rnd.random() < 0.6:
+            shipped_by = delivered_by = assigned_employee
+            shipped_at = weighed_at + timedelta(minutes=rnd.randint(10, 60))
+            delivered_at = shipped_at + timedelta(minutes=rnd.randint(20, 180))
+
+        subtotal = 0
+        for _ in range(rnd.choices(*ITEM_COUNTS)[0]):
+            product = rnd.choices(plan.products, cum_weights=plan.product_cum_weights)[0]
+            product_id, price = product[0], product[1]
+            batch_id = plan.batch_for(product, day_index)
+            item_id = _random_uuid(rnd)
+            if weighed:
+                weight = max(20, min(800, int(rnd.lognormvariate(4.9, 0.6))))
+                amount = weight * price // 100
+                subtotal += amount
+                items.append((item_id, order_id, product_id, batch_id, '', _kg(weight), price, amount,
+                              created_at, weighed_at))
+                # stock_after chỉ là giá trị gần đúng: các chunk sinh song song nên không có tồn kho chạy
+                inventory.append((_random_uuid(rnd), product_id, batch_id, item_id, 'sale', -_kg(weight),
+                                  _kg(rnd.randint(0, 30_000)), f'Bán {code}', assigned_employee,
+                                  weighed_at, weighed_at))
+            else:
+                low = rnd.randint(1, 4)
+                subtotal += (2 * low + 1) * price // 2
+                items.append((item_id, order_id, product_id, batch_id, f'{low}-{low + 1}kg', None, price, 0,
+                              created_at, created_at))
+
+        discount = rnd.randrange(10_000, 60_000, 5_000) if rnd.random() < 0.05 else 0
+        total = max(0, subtotal - discount)
+        paid = status == 'completed' and rnd.random() < 0.92
+        updated_at = delivered_at or weighed_at or assigned_at or confirmed_at or created_at
+        orders.append((
+            order_id, code, f'Khách {customer}', f'09{customer:08d}', f'{customer % 700 + 1} Đường số {customer % 31 + 1}',
+            rnd.choice(['telephone', 'facebook', 'zalo']), subtotal, discount, total,
+            rnd.choices(*PAYMENT_METHODS)[0], 'paid' if paid else 'unpaid', total if paid else 0,
+            status, sale_user, confirmed_at, assigned_employee, assigned_at,
+            weighed_at, assigned_employee if weighed else None, shipped_at, shipped_by, delivered_at, delivered_by,
+            sale_user, created_at, updated_at,
+        ))
+        if paid:
+            transactions.append((
+                _random_uuid(rnd), 'income', 'sales', total, day, f'Thanh toán đơn {code}', order_id,
+                sale_user, updated_at, updated_at,
+            ))
+    return {'orders': orders, 'items': items, 'inventory': inventory, 'transactions': transactions}
+
+
+def write_chunk(plan: LoadPlan, chunk: int) -> Dict[str, int]:
+    rows = generate_chunk(plan, chunk)
+    with transaction.atomic():
+        return {
+            'orders': write_rows(Order, ORDER_COLUMNS, rows['orders']),
+            'order_items': write_rows(OrderItem, ITEM_COLUMNS, rows['items']),
+            'inventory_logs': write_rows(InventoryLog, INVENTORY_COLUMNS, rows['inventory']),
+            'transactions': write_rows(Transaction, TRANSACTION_COLUMNS, rows['transactions']),
+        }
+
+
+_worker_plan = None
+
+
+def _init_worker(plan: LoadPlan) -> None:
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _write_chunk_in_worker(chunk: int) -> Dict[str, int]:
+    return write_chunk(_worker_plan, chunk)
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, deterministic dataset (orders, items, batches, inventory, attendance, transactions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10_000, help='Number of orders')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed = same rows)')
+        parser.add_argument('--days', type=int, default=365, help='Orders are spread over this many days')
+        parser.add_argument(
+            '--anchor', type=date.fromisoformat, help='Last day of the data (YYYY-MM-DD). Default: today'
+        )
+        parser.add_argument('--products', type=int, default=300, help='Number of products')
+        parser.add_argument('--staff', type=int, help='Number of employees (default: scales with --orders)')
+        parser.add_argument('--workers', type=int, default=1, help='Parallel processes writing orders (Postgres)')
+        parser.add_argument('--chunk-size', type=int, default=20_000, help='Orders generated and written per transaction')
+        parser.add_argument('--prefix', default='LOAD', help='Prefix of generated order codes and e-mails')
+        parser.add_argument('--skip-facts', action='store_true', help='Do not rebuild daily sales facts')
+
+    def handle(self, *args, **options):
+        for name in ('orders', 'days', 'products', 'workers', 'chunk_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        if options['workers'] > 1:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--workers > 1 needs PostgreSQL (concurrent writers)')
+            if 'fork' not in multiprocessing.get_all_start_methods():
+                raise CommandError('--workers > 1 needs the fork start method')
+        prefix = options['prefix']
+        if User.objects.filter(email=admin_email(prefix)).exists():
+            raise CommandError(
+                f'The database already holds data generated with prefix {prefix!r}; use an empty database '
+                f'or another --prefix'
+            )
+
+        started = timer.perf_counter()
+        anchor = options['anchor'] or business_today()
+        first_day = anchor - timedelta(days=options['days'] - 1)
+        staff = options['staff'] or max(20, min(400, options['orders'] // 10_000))
+        plan = LoadPlan(prefix, options['seed'], options['orders'], options['chunk_size'], first_day, options['days'])
+        rnd = random.Random(f"{options['seed']}:reference")
+
+        self.stdout.write(
+            f"Generating {options['orders']} orders over {first_day} -> {anchor} "
+            f"(seed {options['seed']}, {options['workers']} worker(s))"
+        )
+        with transaction.atomic():
+            counts = self._reference_data(plan, rnd, options['products'], staff)
+        self.stdout.write(f"  reference data: {counts}")
+
+        totals = dict.fromkeys(('orders', 'order_items', 'inventory_logs', 'transactions'), 0)
+        for done, chunk_counts in enumerate(self._write_orders(plan, options['workers']), start=1):
+            for key, value in chunk_counts.items():
+                totals[key] += value
+            elapsed = timer.perf_counter() - started
+            self.stdout.write(f"  chunk {done}/{plan.chunks}: {totals['orders']} orders ({elapsed:.0f}s)")
+
+        with transaction.atomic():
+            totals['attendance'] = self._attendance(plan, rnd)
+            totals['transactions'] += self._expenses(plan, rnd)
+        self.stdout.write(f'  {totals}')
+
+        if not options['skip_facts']:
+            call_command('rebuild_sales_facts', date_from=first_day, date_to=anchor, stdout=self.stdout)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        elapsed = timer.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s ({totals['orders'] / elapsed:.0f} orders/s). "
+            f"Log in as {admin_email(prefix)} (no password; use a JWT or set one)"
+        ))
+
+    def _write_orders(self, plan: LoadPlan, workers: int):
+        chunks = range(plan.chunks)
+        if workers == 1:
+            for chunk in chunks:
+                yield write_chunk(plan, chunk)
+            return
+
+        # Worker fork không được dùng chung kết nối DB của tiến trình cha
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+            yield from pool.imap_unordered(_write_chunk_in_worker, chunks)
+
+    # ------------------------------------------------------------------
+    # Nhân viên, sản phẩm, lô nhập
+    # ------------------------------------------------------------------
+
+    def _reference_data(self, plan: LoadPlan, rnd: random.Random, product_count: int, staff_count: int) -> dict:
+        zone = business_tz()
+        created = datetime.combine(plan.first_day - timedelta(days=30), time(8), tzinfo=zone)
+        prefix = plan.prefix.lower()
+
+        users, user_roles = [], []
+        admin = User(
+            id=_random_uuid(rnd), email=admin_email(plan.prefix), username=f'{prefix}-admin',
+            first_name='Load', last_name='Admin', user_type='manager', is_staff=True, is_superuser=True,
+            date_joined=created, created_at=created, updated_at=created,
+        )
+        admin.set_unusable_password()
+        users.append(admin)
+        for slug, name, level, share, base_salary in STAFF_ROLES:
+            role, _ = Role.objects.get_or_create(slug=slug, defaults={'name': name, 'level': level})
+            if not SalaryConfiguration.objects.filter(role=role, is_active=True).exists():
+                SalaryConfiguration.objects.create(
+                    role=role, base_salary=Decimal(base_salary), enable_commission=slug == 'salesperson'
+                )
+            members = plan.staff.setdefault(slug, [])
+            for number in range(max(1, round(staff_count * share))):
+                user = User(
+                    id=_random_uuid(rnd), email=f'{prefix}-{slug}-{number:03d}@loadtest.example.com',
+                    username=f'{prefix}-{slug}-{number:03d}', first_name=name, last_name=f'{number:03d}',
+                    user_type='manager' if slug == 'manager' else 'employee', is_staff=True,
+                    date_joined=created, created_at=created, updated_at=created,
+                )
+                user.set_unusable_password()
+                users.append(user)
+                members.append(user.id)
+                user_roles.append(UserRole(
+                    id=_random_uuid(rnd), user=user, role=role, created_at=created, updated_at=created
+                ))
+        with explicit_timestamps(User, UserRole):
+            User.objects.bulk_create(users)
+            UserRole.objects.bulk_create(user_roles)
+
+        categories = []
+        for position, (name, _, _) in enumerate(CATALOG):
+            category, _ = SeafoodCategory.objects.get_or_create(
+                name=name, defaults={'slug': f'{prefix}-{position}', 'sort_order': position}
+            )
+            categories.append(category)
+        sources = [
+            ImportSource(
+                id=_random_uuid(rnd), name=f'Nguồn {number:02d}', source_type=source_type,
+                created_at=created, updated_at=created,
+            )
+            for number, source_type in enumerate(
+                rnd.choices(['facebook', 'zalo', 'phone', 'market', 'company'], k=24)
+            )
+        ]
+
+        catalog = [
+            (category, product_name, price_range)
+            for category, (_, names, price_range) in zip(categories, CATALOG) for product_name in names
+        ]
+        products, batches, batch_rows, import_logs, purchases = [], [], [], [], []
+        last_day_index = plan.days - 1
+        for number in range(product_count):
+            category, product_name, (low, high) = catalog[number % len(catalog)]
+            grade = number // len(catalog)
+            price = int(rnd.uniform(low, high) * (1 + 0.15 * grade)) // 5 * 5_000
+            product_id = _random_uuid(rnd)
+            code = f'{plan.prefix}-P{number:04d}'
+
+            # Mỗi sản phẩm nhập lô mới theo chu kỳ riêng; lô -1 phủ những ngày trước lô đầu
+            interval = rnd.randint(5, 21)
+            phase = rnd.randrange(interval)
+            batch_ids, remaining = [], Decimal(0)
+            for k in range(-1, (last_day_index - phase) // interval + 1):
+                batch_id = _random_uuid(rnd)
+                batch_ids.append(batch_id)
+                import_day = plan.first_day + timedelta(days=phase + k * interval)
+                imported_at = datetime.combine(import_day, time(6), tzinfo=zone)
+                total_weight = rnd.randint(2_000, 30_000)
+                is_last = phase + (k + 1) * interval > last_day_index
+                remaining = _kg(int(total_weight * rnd.uniform(0.1, 0.8))) if is_last else Decimal(0)
+                import_price = int(price * rnd.uniform(0.55, 0.8)) // 1_000 * 1_000
+                importer = rnd.choice(plan.staff['warehouse'])
+                batch_code = f'{code}-B{k + 1:03d}'
+                batch_rows.append((
+                    batch_id, product_id, batch_code, rnd.choice(sources).id, import_day, import_price, price,
+                    _kg(total_weight), remaining, 'selling' if is_last else 'sold_out', importer,
+                    imported_at, imported_at,
+                ))
+                import_logs.append((
+                    _random_uuid(rnd), product_id, batch_id, None, 'import', _kg(total_weight),
+                    _kg(total_weight), f'Nhập lô {batch_code}', importer, imported_at, imported_at,
+                ))
+                purchases.append((
+                    _random_uuid(rnd), 'expense', 'purchase', import_price * total_weight // 100, import_day,
+                    f'Nhập lô {batch_code}', None, importer, imported_at, imported_at,
+                ))
+            batches.append((phase, interval, batch_ids))
+            products.append(Seafood(
+                id=product_id, code=code, name=f'{product_name} loại {grade + 1}', category=category,
+                current_price=price, stock_quantity=remaining, origin=rnd.choice(ORIGINS),
+                weight_range_options=['0.5-1kg', '1-2kg', '2-3kg'], created_at=created, updated_at=created,
+            ))
+            plan.products.append((product_id, price, batches[-1]))
+
+        with explicit_timestamps(ImportSource, Seafood):
+            ImportSource.objects.bulk_create(sources)
+            Seafood.objects.bulk_create(products, batch_size=BATCH_SIZE)
+        write_rows(ImportBatch, BATCH_COLUMNS, batch_rows)
+        write_rows(InventoryLog, INVENTORY_COLUMNS, import_logs)
+        write_rows(Transaction, TRANSACTION_COLUMNS, purchases)
+
+        # Sản phẩm bán chạy theo phân phối Zipf; cuối tuần và các tháng gần đây đông đơn hơn
+        ranks = list(range(product_count))
+        rnd.shuffle(ranks)
+        cumulative = 0.0
+        for rank in ranks:
+            cumulative += 1 / (rank + 1) ** 1.1
+            plan.product_cum_weights.append(cumulative)
+        cumulative = 0.0
+        for day_index in range(plan.days):
+            weekday = (plan.first_day + timedelta(days=day_index)).weekday()
+            cumulative += (1.4 if weekday >= 5 else 1.0) * (0.7 + 0.6 * day_index / plan.days)
+            plan.day_cum_weights.append(cumulative)
+
+        return {
+            'users': len(users), 'products': len(products), 'import_batches': len(batch_rows),
+            'import_sources': len(sources),
+        }
+
+    # ------------------------------------------------------------------
+    # Chấm công và chi phí cố định
+    # ------------------------------------------------------------------
+
+    def _attendance(self, plan: LoadPlan, rnd: random.Random) -> int:
+        rows = []
+        for members in plan.staff.values():
+            for user_id in members:
+                for day_index in range(plan.days):
+                    day = plan.first_day + timedelta(days=day_index)
+                    weights = [40, 10, 50] if day.weekday() == 6 else [88, 7, 5]
+                    at = datetime.combine(day, time(18), tzinfo=business_tz())
+                    rows.append((
+                        _random_uuid(rnd), user_id, day, rnd.choices(['full', 'half', 'off'], weights)[0], at, at,
+                    ))
+        return write_rows(Attendance, ['id', 'user_id', 'date', 'attendance_type', 'created_at', 'updated_at'], rows)
+
+    def _expenses(self, plan: LoadPlan, rnd: random.Random) -> int:
+        rows = []
+        all_staff = [user_id for members in plan.staff.values() for user_id in members]
+        accountant = plan.staff['accountant'][0]
+        for day_index in range(plan.days):
+            day = plan.first_day + timedelta(days=day_index)
+            at = datetime.combine(day, time(17), tzinfo=business_tz())
+            entries = []
+            if day.day == 1:
+                entries.append(('rent', 45_000_000, 'Tiền thuê mặt bằng'))
+            if day.day == 5:
+                entries.append(('utilities', rnd.randrange(8_000_000, 15_000_000, 1_000), 'Tiền điện nước'))
+                for user_id in all_staff:
+                    rows.append((
+                        _random_uuid(rnd), 'expense', 'salary', rnd.randrange(6_000_000, 20_000_000, 1_000),
+                        day, f'Lương tháng {day.month}/{day.year}', None, accountant, at, at,
+                    ))
+            if day.weekday() == 0:
+                entries.append(('marketing', rnd.randrange(2_000_000, 10_000_000, 1_000), 'Quảng cáo Facebook'))
+            if rnd.random() < 0.3:
+                entries.append(('shipping', rnd.randrange(200_000, 2_000_000, 1_000), 'Phí vận chuyển'))
+            for category, amount, description in entries:
+                rows.append((_random_uuid(rnd), 'expense', category, amount, day, description, None, accountant, at, at))
+        return write_rows(Transaction, TRANSACTION_COLUMNS, rows)
@@ -0,0 +1,61 @@
+"""
+Management command to rebuild the DailySalesFact rollup from orders
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from apps.business_day import business_date, business_today
+from apps.seafood.models import Order
+from apps.seafood.services import SalesFactService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily sales facts (backfill) for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD). Default: first order date'
+        )
+        parser.add_argument(
+            '--date-to',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD). Default: today'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        date_to = options['date_to'] or business_today()
+        date_from = options['date_from']
+        if date_from is None:
+            first_order = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first_order is None:
+                self.stdout.write(self.style.WARNING('No orders found, nothing to rebuild'))
+                return
+            date_from = business_date(first_order)
+
+        if date_from > date_to:
+            raise CommandError('--date-from must not be after --date-to')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        self.stdout.write(f'Rebuilding sales facts from {date_from} to {date_to}...')
+
+        total_rows = 0
+        chunk_start = date_from
+        while chunk_start <= date_to:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), date_to)
+            rows = SalesFactService.rebuild(chunk_start, chunk_end)
+            total_rows += rows
+            self.stdout.write(f'  {chunk_start} -> {chunk_end}: {rows} rows')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Done. {total_rows} fact rows written'))
@@ -0,0 +1,100 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seafood", "0010_orderitem_estimated_weight_range_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySalesFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(help_text="Ngày tạo đơn")),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("created_by", "Người tạo đơn"),
+                            ("sale_user", "Sale phụ trách"),
+                            ("assigned_employee", "Nhân viên kho"),
+                            ("weighed_by", "Người cân hàng"),
+                            ("shipped_by", "Người gửi hàng"),
+                            ("delivered_by", "Người giao hàng"),
+                            ("any", "Bất kỳ vai trò"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(help_text="Trạng thái đơn hàng", max_length=30),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("item_count", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=15),
+                ),
+                (
+                    "paid_amount",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=15),
+                ),
+                (
+                    "weight",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "seafood",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="NULL = dòng tổng cấp đơn hàng",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales_facts",
+                        to="seafood.seafood",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales_facts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Doanh số theo ngày",
+                "verbose_name_plural": "Doanh số theo ngày",
+                "db_table": "daily_sales_fact",
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(fields=["date"], name="daily_sales_date_ffa01d_idx"),
+                    models.Index(
+                        fields=["role", "user", "date"],
+                        name="daily_sales_role_47c9d3_idx",
+                    ),
+                    models.Index(
+                        fields=["role", "date", "seafood"],
+                        name="daily_sales_role_435cdc_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seafood", "0011_daily_sales_fact"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dailysalesfact",
+            name="date",
+            field=models.DateField(help_text="Ngày tạo đơn (theo BUSINESS_TIME_ZONE)"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_by", "created_at"], name="order_created_3f13a7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "created_at"], name="order_status_e42465_idx"
+            ),
+        ),
+    ]
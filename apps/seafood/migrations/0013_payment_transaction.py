@@ -0,0 +1,142 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:45
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seafood", "0012_order_report_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentTransaction",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        help_text="Unique identifier",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, help_text="Creation timestamp"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, help_text="Last update timestamp"
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        db_index=True, default=True, help_text="Soft delete flag"
+                    ),
+                ),
+                ("gateway", models.CharField(default="sepay", max_length=30)),
+                (
+                    "transaction_id",
+                    models.CharField(
+                        help_text="Mã giao dịch của cổng thanh toán", max_length=100
+                    ),
+                ),
+                (
+                    "order_code",
+                    models.CharField(
+                        blank=True,
+                        help_text="Mã đơn đọc được từ giao dịch",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=0, default=0, max_digits=12),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("success", "Thành công"),
+                            ("pending", "Đang chờ"),
+                            ("failed", "Thất bại"),
+                        ],
+                        help_text="Trạng thái do cổng gửi",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "result",
+                    models.CharField(
+                        choices=[
+                            ("received", "Đã nhận"),
+                            ("applied", "Đã ghi nhận vào đơn"),
+                            ("pending", "Đơn chờ xác minh"),
+                            ("already_paid", "Đơn đã thanh toán trước đó"),
+                            ("amount_mismatch", "Sai số tiền"),
+                            ("order_not_found", "Không tìm thấy đơn"),
+                            ("rejected", "Giao dịch thất bại"),
+                        ],
+                        default="received",
+                        max_length=20,
+                    ),
+                ),
+                ("reference_number", models.CharField(blank=True, max_length=100)),
+                (
+                    "content",
+                    models.TextField(blank=True, help_text="Nội dung chuyển khoản"),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True, default=dict, help_text="Dữ liệu gốc từ webhook"
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="payment_transactions",
+                        to="seafood.order",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Giao dịch thanh toán",
+                "verbose_name_plural": "Giao dịch thanh toán",
+                "db_table": "payment_transaction",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["order", "created_at"],
+                        name="payment_tra_order_i_d46ee7_idx",
+                    ),
+                    models.Index(
+                        fields=["order_code"], name="payment_tra_order_c_f48854_idx"
+                    ),
+                    models.Index(
+                        fields=["result", "created_at"],
+                        name="payment_tra_result_011f76_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="paymenttransaction",
+            constraint=models.UniqueConstraint(
+                fields=("gateway", "transaction_id"),
+                name="uniq_payment_gateway_transaction",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seafood", "0013_payment_transaction"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="order_created_6dbd10_idx"),
+        ),
+    ]
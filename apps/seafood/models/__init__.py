@@ -6,6 +6,8 @@ from .product import Seafood
 from .import_batch import ImportSource, ImportBatch
 from .order import Order, OrderItem
 from .inventory import InventoryLog
+from .sales_fact import DailySalesFact
+from .payment import PaymentTransaction
 
 __all__ = [
     'SeafoodCategory',
@@ -15,4 +17,6 @@ __all__ = [
     'Order',
     'OrderItem',
     'InventoryLog',
+    'DailySalesFact',
+    'PaymentTransaction',
 ]
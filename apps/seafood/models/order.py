@@ -32,6 +32,16 @@ class Order(BaseModel):
         ('zalo', 'Zalo'),
     ]
 
+    # Các cột ghi nhận nhân viên tham gia xử lý đơn (dùng cho KPI nhân viên)
+    STAFF_ROLE_FIELDS = (
+        'created_by',
+        'sale_user',
+        'assigned_employee',
+        'weighed_by',
+        'shipped_by',
+        'delivered_by',
+    )
+
     STATUS_CHOICES = [
         ('pending', 'Chờ xử lý'),  # Sale vừa tạo đơn
         ('pending_sale_confirm', 'Chờ Sale xác nhận'),  # Customer tạo đơn, chờ Sale
@@ -142,6 +152,14 @@ class Order(BaseModel):
     class Meta:
         db_table = 'order'
         ordering = ['-created_at']
+        indexes = [
+            # Báo cáo lọc theo khoảng thời gian [start, end) trên created_at (apps.business_day)
+            models.Index(fields=['created_by', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
+            # Quét theo khoảng thời gian không có cột lọc nào khác: tính lại facts cả ngày,
+            # từng nhánh vai trò của KPI tổng hợp (OrderRepository.get_staff_kpi_totals)
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self):
         return f"{self.order_code} - {self.customer_phone}"
@@ -0,0 +1,67 @@
+"""
+Payment Transaction Model
+"""
+from django.db import models
+from apps.base_models import BaseModel
+from .order import Order
+
+
+class PaymentTransaction(BaseModel):
+    """
+    Sổ giao dịch thanh toán nhận từ cổng thanh toán (SePay webhook...)
+
+    Mỗi giao dịch của cổng chỉ có một dòng (unique gateway + transaction_id),
+    nên webhook gửi lại nhiều lần chỉ được áp dụng vào đơn hàng một lần.
+    """
+    STATUS_CHOICES = [
+        ('success', 'Thành công'),
+        ('pending', 'Đang chờ'),
+        ('failed', 'Thất bại'),
+    ]
+
+    RESULT_CHOICES = [
+        ('received', 'Đã nhận'),
+        ('applied', 'Đã ghi nhận vào đơn'),
+        ('pending', 'Đơn chờ xác minh'),
+        ('already_paid', 'Đơn đã thanh toán trước đó'),
+        ('amount_mismatch', 'Sai số tiền'),
+        ('order_not_found', 'Không tìm thấy đơn'),
+        ('rejected', 'Giao dịch thất bại'),
+    ]
+
+    gateway = models.CharField(max_length=30, default='sepay')
+    transaction_id = models.CharField(max_length=100, help_text="Mã giao dịch của cổng thanh toán")
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payment_transactions'
+    )
+    order_code = models.CharField(max_length=50, blank=True, help_text="Mã đơn đọc được từ giao dịch")
+    amount = models.DecimalField(max_digits=12, decimal_places=0, default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, help_text="Trạng thái do cổng gửi")
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES, default='received')
+    reference_number = models.CharField(max_length=100, blank=True)
+    content = models.TextField(blank=True, help_text="Nội dung chuyển khoản")
+    payload = models.JSONField(default=dict, blank=True, help_text="Dữ liệu gốc từ webhook")
+
+    class Meta:
+        db_table = 'payment_transaction'
+        verbose_name = 'Giao dịch thanh toán'
+        verbose_name_plural = 'Giao dịch thanh toán'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['gateway', 'transaction_id'],
+                name='uniq_payment_gateway_transaction'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+            models.Index(fields=['order_code']),
+            models.Index(fields=['result', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway} {self.transaction_id} - {self.amount:,.0f}đ ({self.result})"
@@ -0,0 +1,71 @@
+"""
+Daily Sales Fact Model
+"""
+from django.db import models
+from django.contrib.auth import get_user_model
+from .product import Seafood
+
+User = get_user_model()
+
+
+class DailySalesFact(models.Model):
+    """
+    Bảng tổng hợp doanh số theo ngày (rollup) cho các báo cáo/KPI
+
+    Mỗi dòng là tổng của các đơn hàng trong một ngày theo
+    (ngày, cột vai trò nhân viên, nhân viên, sản phẩm, trạng thái đơn).
+
+    - seafood = NULL: dòng cấp đơn hàng (order_count, revenue = total_amount, paid_amount)
+    - seafood != NULL: dòng cấp sản phẩm (order_count = số đơn có sản phẩm,
+      revenue = thành tiền các item, weight = kg đã bán)
+    - role = 'any': nhân viên tham gia đơn ở bất kỳ vai trò nào, mỗi đơn chỉ tính một lần
+
+    Được tính lại theo ngày mỗi khi đơn/item thay đổi (apps.seafood.services.sales_facts).
+    """
+    ROLE_ANY = 'any'
+    ROLE_CHOICES = [
+        ('created_by', 'Người tạo đơn'),
+        ('sale_user', 'Sale phụ trách'),
+        ('assigned_employee', 'Nhân viên kho'),
+        ('weighed_by', 'Người cân hàng'),
+        ('shipped_by', 'Người gửi hàng'),
+        ('delivered_by', 'Người giao hàng'),
+        (ROLE_ANY, 'Bất kỳ vai trò'),
+    ]
+
+    date = models.DateField(help_text="Ngày tạo đơn (theo BUSINESS_TIME_ZONE)")
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_sales_facts'
+    )
+    seafood = models.ForeignKey(
+        Seafood,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_sales_facts',
+        help_text="NULL = dòng tổng cấp đơn hàng"
+    )
+    status = models.CharField(max_length=30, help_text="Trạng thái đơn hàng")
+
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=0, default=0)
+    paid_amount = models.DecimalField(max_digits=15, decimal_places=0, default=0)
+    weight = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'daily_sales_fact'
+        verbose_name = 'Doanh số theo ngày'
+        verbose_name_plural = 'Doanh số theo ngày'
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['role', 'user', 'date']),
+            models.Index(fields=['role', 'date', 'seafood']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.role} - {self.user_id} - {self.revenue:,.0f}đ"
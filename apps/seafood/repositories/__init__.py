@@ -6,6 +6,7 @@ from .product import ProductRepository
 from .import_batch import ImportBatchRepository, ImportSourceRepository
 from .order import OrderRepository
 from .inventory import InventoryRepository
+from .sales_fact import SalesFactRepository
 
 __all__ = [
     'CategoryRepository',
@@ -14,4 +15,5 @@ __all__ = [
     'ImportSourceRepository',
     'OrderRepository',
     'InventoryRepository',
+    'SalesFactRepository',
 ]
@@ -1,9 +1,11 @@
 """
 Order Repository
 """
-from typing import Optional, List
+from decimal import Decimal
+from typing import Optional, List, Dict, Tuple
 from uuid import UUID
 from datetime import datetime
+from django.db import connection
 from django.db.models import QuerySet, Q, Sum, Count
 from apps.seafood.models import Order, OrderItem
 from .base import BaseRepository
@@ -115,6 +117,90 @@ class OrderRepository(BaseRepository[Order]):
         result = self.model.objects.values('status').annotate(count=Count('id'))
         return {item['status']: item['count'] for item in result}
 
+    def get_staff_kpi_totals(
+        self,
+        today_range: Tuple[datetime, datetime],
+        week_start: datetime,
+        month_range: Tuple[datetime, datetime]
+    ) -> Dict[UUID, dict]:
+        """
+        KPI totals for every staff member in one query
+
+        Orders are attributed to a user through the UNION of the staff role columns
+        (Order.STAFF_ROLE_FIELDS), so an order counts once per user even when the user
+        holds several roles on it. Windows are half-open [start, end) timestamp ranges
+        and are evaluated with FILTER-style conditional SUM/COUNT in a single GROUP BY.
+        """
+        qn = connection.ops.quote_name
+        adapt = connection.ops.adapt_datetimefield_value
+        opts = self.model._meta
+        table = qn(opts.db_table)
+        id_column = qn(opts.pk.column)
+        created_at = qn(opts.get_field('created_at').column)
+        total_amount = qn(opts.get_field('total_amount').column)
+        paid_amount = qn(opts.get_field('paid_amount').column)
+        status = qn(opts.get_field('status').column)
+
+        today_start, today_end = (adapt(value) for value in today_range)
+        month_start, month_end = (adapt(value) for value in month_range)
+        week_start = adapt(week_start)
+        scan_start = min(today_start, week_start, month_start)
+
+        involvement_sql = ' UNION '.join(
+            f'SELECT {id_column} AS order_id, {qn(opts.get_field(field).column)} AS user_id '
+            f'FROM {table} '
+            f'WHERE {qn(opts.get_field(field).column)} IS NOT NULL AND {created_at} >= %s'
+            for field in self.model.STAFF_ROLE_FIELDS
+        )
+        involvement_params = [scan_start] * len(self.model.STAFF_ROLE_FIELDS)
+
+        sql = f"""
+            SELECT
+                involved.user_id,
+                SUM(o.{total_amount}) FILTER (WHERE o.{created_at} >= %s AND o.{created_at} < %s),
+                SUM(o.{paid_amount}) FILTER (WHERE o.{created_at} >= %s AND o.{created_at} < %s),
+                SUM(o.{total_amount}) FILTER (WHERE o.{created_at} >= %s),
+                SUM(o.{total_amount}) FILTER (WHERE o.{created_at} >= %s AND o.{created_at} < %s),
+                COUNT(*) FILTER (WHERE o.{created_at} >= %s AND o.{created_at} < %s),
+                COUNT(*) FILTER (
+                    WHERE o.{created_at} >= %s AND o.{created_at} < %s AND o.{status} = %s
+                )
+            FROM ({involvement_sql}) AS involved
+            INNER JOIN {table} AS o ON o.{id_column} = involved.order_id
+            GROUP BY involved.user_id
+        """
+        params = [
+            today_start, today_end,
+            today_start, today_end,
+            week_start,
+            month_start, month_end,
+            month_start, month_end,
+            month_start, month_end, 'completed',
+        ] + involvement_params
+
+        user_pk = opts.get_field('created_by').target_field
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        def to_decimal(value):
+            return Decimal(str(value)) if value is not None else Decimal('0')
+
+        return {
+            user_pk.to_python(user_id): {
+                'today_revenue': to_decimal(today_revenue),
+                'today_paid': to_decimal(today_paid),
+                'week_revenue': to_decimal(week_revenue),
+                'month_revenue': to_decimal(month_revenue),
+                'month_orders': month_orders,
+                'month_completed': month_completed,
+            }
+            for (
+                user_id, today_revenue, today_paid, week_revenue,
+                month_revenue, month_orders, month_completed
+            ) in rows
+        }
+
 
 class OrderItemRepository(BaseRepository[OrderItem]):
     """Repository for OrderItem model"""
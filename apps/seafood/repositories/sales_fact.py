@@ -0,0 +1,61 @@
+"""
+Daily Sales Fact Repository
+"""
+from datetime import date
+from typing import Iterable, Optional
+from uuid import UUID
+from django.db.models import QuerySet
+from apps.seafood.models import DailySalesFact
+from .base import BaseRepository
+
+
+class SalesFactRepository(BaseRepository[DailySalesFact]):
+    """Repository for DailySalesFact rollup rows"""
+
+    def __init__(self):
+        super().__init__(DailySalesFact)
+
+    def _scoped(
+        self,
+        role: str,
+        user_id: Optional[UUID],
+        date_from: Optional[date],
+        date_to: Optional[date],
+        statuses: Optional[Iterable[str]]
+    ) -> QuerySet[DailySalesFact]:
+        queryset = self.model.objects.filter(role=role)
+        if user_id:
+            queryset = queryset.filter(user_id=user_id)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if statuses is not None:
+            queryset = queryset.filter(status__in=list(statuses))
+        return queryset
+
+    def order_facts(
+        self,
+        role: str = 'created_by',
+        user_id: Optional[UUID] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        statuses: Optional[Iterable[str]] = None
+    ) -> QuerySet[DailySalesFact]:
+        """
+        Order-level rows (seafood IS NULL)
+
+        Without user_id, role='created_by' counts every order exactly once.
+        """
+        return self._scoped(role, user_id, date_from, date_to, statuses).filter(seafood__isnull=True)
+
+    def product_facts(
+        self,
+        role: str = 'created_by',
+        user_id: Optional[UUID] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        statuses: Optional[Iterable[str]] = None
+    ) -> QuerySet[DailySalesFact]:
+        """Per-product rows (seafood IS NOT NULL)"""
+        return self._scoped(role, user_id, date_from, date_to, statuses).filter(seafood__isnull=False)
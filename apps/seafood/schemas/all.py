@@ -299,6 +299,27 @@ class OrderCompleteWeighing(BaseModel):
     notes: Optional[str] = None
 
 
+# ============================================
+# PAYMENT SCHEMAS
+# ============================================
+
+class PaymentTransactionRead(BaseModel):
+    id: UUID
+    gateway: str
+    transaction_id: str
+    order_id: Optional[UUID] = None
+    order_code: str
+    amount: Decimal
+    status: str
+    result: str
+    reference_number: str
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # ============================================
 # STATS SCHEMAS
 # ============================================
@@ -5,6 +5,11 @@ import requests
 from decimal import Decimal
 from typing import Dict, Any, Optional
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api import metrics
+from . import vietqr
 
 
 class SepayAPIError(Exception):
@@ -15,7 +20,13 @@ class SepayAPIError(Exception):
 class SepayService:
     """
     Service class for integrating with SePay payment gateway
+
+    QR codes are built locally (apps.seafood.vietqr) unless SEPAY_QR_MODE is
+    'remote' and an API key is set; remote calls share one pooled Session with
+    short timeouts and retries, and fall back to the local QR on failure.
     """
+    # (connect, read) seconds
+    DEFAULT_TIMEOUT = (3.05, 10)
 
     def __init__(self):
         self.base_url = getattr(settings, 'SEPAY_BASE_URL', 'https://api.sepay.vn')
@@ -23,6 +34,25 @@ class SepayService:
         self.account_number = getattr(settings, 'SEPAY_ACCOUNT_NUMBER', '1160976779')
         self.account_name = getattr(settings, 'SEPAY_ACCOUNT_NAME', 'TO TRONG HIEU')
         self.bank_code = getattr(settings, 'SEPAY_BANK_CODE', 'BIDV')
+        self.qr_mode = getattr(settings, 'SEPAY_QR_MODE', 'local')
+        self.timeout = getattr(settings, 'SEPAY_TIMEOUT', self.DEFAULT_TIMEOUT)
+        self.session = self._build_session()
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        """Session dùng chung: giữ kết nối (keep-alive) và tự thử lại lỗi tạm thời"""
+        retry = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
 
     def create_qr_code(
         self,
@@ -31,7 +61,7 @@ class SepayService:
         bank_code: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Create VietQR code via SePay API
+        Create VietQR code (locally, or via SePay API in 'remote' mode)
 
         Args:
             amount: Transaction amount
@@ -43,15 +73,14 @@ class SepayService:
             {
                 'account_number': str,
                 'account_name': str,
-                'qr_image_url': str,
+                'qr_image_url': str,  # PNG data URI when generated locally
                 'qr_svg': str,
                 'session_id': str,
                 'bank_code': str
             }
         """
-        if not self.api_key:
-            # Return mock data if no API key configured
-            return self._get_mock_qr_data(amount, content, bank_code or self.bank_code)
+        if self.qr_mode != 'remote' or not self.api_key:
+            return self.create_local_qr_code(amount, content, bank_code or self.bank_code)
 
         url = f"{self.base_url}/api/v1/qr"
         headers = {
@@ -68,8 +97,9 @@ class SepayService:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            response.raise_for_status()
+            with metrics.outbound('sepay', 'create_qr'):
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                response.raise_for_status()
 
             data = response.json()
 
@@ -85,44 +115,27 @@ class SepayService:
             else:
                 raise SepayAPIError(f"SePay API error: {data.get('message', 'Unknown error')}")
 
-        except requests.RequestException as e:
-            raise SepayAPIError(f"Failed to create QR code: {str(e)}")
+        except (requests.RequestException, SepayAPIError):
+            # QR chuyển khoản tạo tại chỗ vẫn hợp lệ, webhook khớp đơn theo nội dung
+            return self.create_local_qr_code(amount, content, bank_code or self.bank_code)
 
-    def _get_mock_qr_data(
+    def create_local_qr_code(
         self,
         amount: Decimal,
         content: str,
         bank_code: str
     ) -> Dict[str, Any]:
-        """
-        Return mock QR data when API key is not configured
-        Uses VietQR's free image generation service
-        """
-        # Get bank ID from bank code
-        bank_ids = {
-            'BIDV': '970418',
-            'VCB': '970436',
-            'VTB': '970415',
-            'ACB': '970416',
-            'TCB': '970407',
-            'MB': '970422',
-        }
-        bank_id = bank_ids.get(bank_code, '970418')
-
-        # Generate VietQR URL
-        from urllib.parse import urlencode
-        params = {
-            'amount': str(amount),
-            'addInfo': content,
-            'accountName': self.account_name
-        }
-        qr_url = f"https://img.vietqr.io/image/{bank_id}-{self.account_number}-compact2.png?{urlencode(params)}"
+        """Build the VietQR payload and image locally (no network)"""
+        bank_bin = vietqr.BANK_BINS.get(bank_code, vietqr.BANK_BINS['BIDV'])
+        payload = vietqr.build_payload(bank_bin, self.account_number, amount, content)
+        images = vietqr.render(payload)
 
         return {
             'account_number': self.account_number,
             'account_name': self.account_name,
-            'qr_image_url': qr_url,
-            'qr_svg': '',
+            'qr_image_url': images['png'],
+            'qr_svg': images['svg'],
+            'qr_payload': payload,
             'session_id': '',
             'bank_code': bank_code
         }
@@ -166,8 +179,9 @@ class SepayService:
             params['toDate'] = to_date
 
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
+            with metrics.outbound('sepay', 'check_transaction'):
+                response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+                response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             raise SepayAPIError(f"Failed to check transactions: {str(e)}")
@@ -0,0 +1,14 @@
+"""
+Business Logic Layer (Services)
+"""
+from .sales_facts import SalesFactService
+from .dashboard import DashboardStatsService
+from .payments import PaymentService
+from .reconciliation import StatementReconciliationService
+
+__all__ = [
+    'SalesFactService',
+    'DashboardStatsService',
+    'PaymentService',
+    'StatementReconciliationService',
+]
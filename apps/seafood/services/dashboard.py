@@ -0,0 +1,133 @@
+"""
+Dashboard Stats Service
+Cache thống kê tổng quan với chống dồn tải (single-flight)
+"""
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum, F, Q
+
+from api import metrics
+from apps.business_day import business_today
+from apps.seafood.models import Seafood
+from apps.seafood.repositories import SalesFactRepository
+
+
+class DashboardStatsService:
+    """
+    Cache thống kê dashboard trong Redis
+
+    - Dữ liệu được coi là mới trong FRESH_SECONDS; sau đó (hoặc khi bị
+      invalidate) vẫn được giữ trong cache đến STALE_SECONDS để phục vụ tạm.
+    - Chỉ một worker giữ khóa LOCK_KEY và tính lại; các worker khác trả về
+      dữ liệu cũ thay vì cùng truy vấn DB.
+    - Invalidate bằng cách tăng VERSION_KEY (không xóa dữ liệu cũ).
+    """
+    CACHE_KEY = 'seafood:dashboard_stats'
+    VERSION_KEY = 'seafood:dashboard_stats:version'
+    LOCK_KEY = 'seafood:dashboard_stats:lock'
+
+    FRESH_SECONDS = 30
+    STALE_SECONDS = 600
+    LOCK_SECONDS = 10
+    WAIT_SECONDS = 2.0
+    POLL_INTERVAL = 0.05
+
+    @staticmethod
+    def compute() -> dict:
+        """Tính thống kê trực tiếp từ DB"""
+        today = business_today()
+
+        # Sản phẩm: tổng số, giá trị tồn kho, sắp hết hàng (< 10kg) - một truy vấn
+        active = Q(status='active')
+        products = Seafood.objects.filter(is_active=True).aggregate(
+            total_products=Count('id', filter=active),
+            total_stock_value=Sum(F('stock_quantity') * F('current_price')),
+            low_stock_products=Count('id', filter=active & Q(stock_quantity__lt=10)),
+        )
+
+        # Đơn hàng / doanh thu hôm nay (từ bảng tổng hợp theo ngày)
+        today_totals = SalesFactRepository().order_facts(date_from=today, date_to=today).aggregate(
+            orders=Sum('order_count', filter=Q(status__in=['pending', 'completed'])),
+            revenue=Sum('revenue', filter=Q(status='completed'))
+        )
+
+        return {
+            'total_products': products['total_products'],
+            'total_stock_value': products['total_stock_value'] or Decimal('0'),
+            'today_orders': today_totals['orders'] or 0,
+            'today_revenue': today_totals['revenue'] or Decimal('0'),
+            'low_stock_products': products['low_stock_products'],
+        }
+
+    @staticmethod
+    def _current_version() -> int:
+        return cache.get_or_set(DashboardStatsService.VERSION_KEY, 0, timeout=None)
+
+    @staticmethod
+    def _is_fresh(entry, version) -> bool:
+        return (
+            entry is not None
+            and entry['version'] == version
+            and entry['date'] == business_today()
+            and entry['fresh_until'] > time.time()
+        )
+
+    @staticmethod
+    def _recompute(version: int) -> dict:
+        data = DashboardStatsService.compute()
+        cache.set(
+            DashboardStatsService.CACHE_KEY,
+            {
+                'data': data,
+                'version': version,
+                'date': business_today(),
+                'fresh_until': time.time() + DashboardStatsService.FRESH_SECONDS,
+            },
+            timeout=DashboardStatsService.STALE_SECONDS
+        )
+        return data
+
+    @staticmethod
+    def get_stats() -> dict:
+        """Lấy thống kê từ cache; chỉ một worker tính lại khi dữ liệu hết hạn"""
+        service = DashboardStatsService
+        version = service._current_version()
+        entry = cache.get(service.CACHE_KEY)
+        fresh = service._is_fresh(entry, version)
+        metrics.cache_lookup('dashboard_stats', fresh)
+        if fresh:
+            return entry['data']
+
+        deadline = time.monotonic() + service.WAIT_SECONDS
+        while True:
+            if cache.add(service.LOCK_KEY, 1, timeout=service.LOCK_SECONDS):
+                try:
+                    return service._recompute(version)
+                finally:
+                    cache.delete(service.LOCK_KEY)
+
+            # Worker khác đang tính lại: trả dữ liệu cũ nếu có
+            if entry is not None:
+                return entry['data']
+
+            # Chưa có dữ liệu: chờ worker kia tính xong, quá hạn thì tự tính
+            if time.monotonic() >= deadline:
+                return service.compute()
+            time.sleep(service.POLL_INTERVAL)
+            entry = cache.get(service.CACHE_KEY)
+            if entry is not None and entry['version'] == version:
+                return entry['data']
+
+    @staticmethod
+    def invalidate() -> None:
+        """Đánh dấu cache hết hạn (sau khi transaction commit)"""
+        def bump():
+            try:
+                cache.incr(DashboardStatsService.VERSION_KEY)
+            except ValueError:
+                cache.set(DashboardStatsService.VERSION_KEY, 1, timeout=None)
+
+        transaction.on_commit(bump)
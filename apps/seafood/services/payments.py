@@ -0,0 +1,208 @@
+"""
+Payment Service
+Ghi nhận giao dịch từ cổng thanh toán (SePay webhook) vào sổ PaymentTransaction
+"""
+import re
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api import metrics
+from apps.seafood.models import Order, PaymentTransaction
+
+
+class PaymentService:
+    """
+    Áp dụng giao dịch thanh toán vào đơn hàng đúng một lần
+
+    - record(): một câu INSERT ... ON CONFLICT vào sổ giao dịch. Webhook gửi lại
+      (trùng gateway + transaction_id) chỉ tốn đúng câu lệnh này.
+    - apply(): cập nhật đơn bằng UPDATE có điều kiện (đúng số tiền, chưa thanh
+      toán), an toàn khi nhiều request cùng lúc.
+    - order_qr(): QR chuyển khoản cho đơn, cache đến khi đơn thay đổi.
+    """
+    # Cho phép lệch 1% do làm tròn
+    AMOUNT_TOLERANCE = Decimal('0.01')
+
+    # QR thanh toán theo (mã đơn, số tiền, lần sửa đơn cuối) - đơn đổi thì key đổi
+    QR_CACHE_KEY = 'seafood:payment_qr:{order_code}:{amount}:{version}'
+    QR_CACHE_SECONDS = 60 * 60 * 24
+
+    # POS-20250101-001 (nội dung chuyển khoản thường mất dấu '-') hoặc mã cũ ORD00001
+    ORDER_CODE_PATTERN = re.compile(r'POS-?(\d{8})-?(\d{3,})|ORD[A-Z0-9]+')
+
+    # Trường của Order cần cho signal orders_updated và chẩn đoán khi không cập nhật được
+    _ORDER_FIELDS = (
+        'id', 'created_at', 'total_amount', 'payment_status',
+        *(f'{field}_id' for field in Order.STAFF_ROLE_FIELDS)
+    )
+
+    @staticmethod
+    def extract_order_code(reference_number: str, content: str) -> str:
+        """Mã đơn từ reference_number, hoặc tìm trong nội dung chuyển khoản"""
+        if reference_number:
+            return reference_number.strip()
+        match = PaymentService.ORDER_CODE_PATTERN.search((content or '').upper())
+        if not match:
+            return ''
+        if match.group(1):
+            return f'POS-{match.group(1)}-{match.group(2)}'
+        return match.group(0)
+
+    @staticmethod
+    def order_qr(order: Order, content: str) -> dict:
+        """QR chuyển khoản cho đơn, lấy từ cache nếu đơn chưa thay đổi"""
+        from apps.seafood.sepay_service import get_sepay_service
+
+        key = PaymentService.QR_CACHE_KEY.format(
+            order_code=order.order_code,
+            amount=int(order.total_amount),
+            version=int(order.updated_at.timestamp() * 1000000)
+        )
+        qr_data = cache.get(key)
+        metrics.cache_lookup('payment_qr', qr_data is not None)
+        if qr_data is None:
+            qr_data = get_sepay_service().create_qr_code(amount=order.total_amount, content=content)
+            cache.set(key, qr_data, PaymentService.QR_CACHE_SECONDS)
+        return qr_data
+
+    @staticmethod
+    def amount_matches(expected: Decimal, amount: Decimal) -> bool:
+        return abs(amount - expected) <= expected * PaymentService.AMOUNT_TOLERANCE
+
+    @staticmethod
+    def record(
+        gateway: str,
+        transaction_id: str,
+        amount: Decimal,
+        status: str,
+        order_code: str = '',
+        reference_number: str = '',
+        content: str = '',
+        payload: Optional[dict] = None
+    ) -> Optional[UUID]:
+        """
+        Ghi giao dịch vào sổ bằng một câu lệnh
+
+        Returns: id của dòng cần xử lý (giao dịch mới, hoặc giao dịch 'pending'
+        nay có trạng thái cuối), None nếu đã xử lý rồi.
+        """
+        entry = PaymentTransaction(
+            gateway=gateway,
+            transaction_id=transaction_id,
+            amount=amount,
+            status=status,
+            order_code=order_code,
+            reference_number=reference_number,
+            content=content,
+            payload=payload or {}
+        )
+        fields = PaymentTransaction._meta.concrete_fields
+        values = [field.get_db_prep_save(field.pre_save(entry, True), connection) for field in fields]
+
+        qn = connection.ops.quote_name
+        table = qn(PaymentTransaction._meta.db_table)
+        refreshed = ('status', 'amount', 'result', 'payload', 'updated_at')
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({qn('gateway')}, {qn('transaction_id')}) DO UPDATE SET "
+            f"{', '.join(f'{qn(column)} = EXCLUDED.{qn(column)}' for column in refreshed)} "
+            f"WHERE {table}.{qn('status')} = %s AND EXCLUDED.{qn('status')} <> %s "
+            f"RETURNING {qn('id')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*values, 'pending', 'pending'])
+            row = cursor.fetchone()
+        return PaymentTransaction._meta.pk.to_python(row[0]) if row else None
+
+    @staticmethod
+    def apply(entry_id: UUID, order_code: str, amount: Decimal, status: str) -> dict:
+        """
+        Cập nhật đơn theo giao dịch và ghi kết quả vào sổ
+
+        Returns: {'result': PaymentTransaction.result, 'order': dict | None}
+        """
+        from apps.seafood.signals import orders_updated
+
+        now = timezone.now()
+        order = None
+        if order_code:
+            order = Order.objects.filter(order_code=order_code).values(*PaymentService._ORDER_FIELDS).first()
+
+        if order is None:
+            result = 'order_not_found'
+        elif status not in ('success', 'pending'):
+            result = 'rejected'
+        else:
+            tolerance = PaymentService.AMOUNT_TOLERANCE
+            matched = Order.objects.filter(
+                pk=order['id'],
+                total_amount__gte=amount / (1 + tolerance),
+                total_amount__lte=amount / (1 - tolerance)
+            )
+            if status == 'success':
+                result = 'applied'
+                updated = matched.exclude(payment_status='paid').update(
+                    payment_status='paid',
+                    paid_amount=amount,
+                    updated_at=now
+                )
+            else:
+                result = 'pending'
+                # Đơn mới có payment_status mặc định 'pending', đơn cũ 'unpaid'
+                updated = matched.exclude(payment_status__in=['paid', 'pending_verification']).update(
+                    payment_status='pending_verification',
+                    updated_at=now
+                )
+
+            if updated:
+                # update() không gửi post_save: cập nhật bảng tổng hợp / lương
+                orders_updated.send(sender=Order, orders=[order])
+                if status == 'success':
+                    metrics.ORDERS_PAID.labels('webhook').inc()
+            elif not PaymentService.amount_matches(order['total_amount'], amount):
+                result = 'amount_mismatch'
+            elif order['payment_status'] == 'paid':
+                result = 'already_paid'
+
+        PaymentTransaction.objects.filter(pk=entry_id).update(
+            result=result,
+            order_id=order['id'] if order else None,
+            updated_at=now
+        )
+        return {'result': result, 'order': order}
+
+    @staticmethod
+    @transaction.atomic
+    def process(
+        gateway: str,
+        transaction_id: str,
+        amount: Decimal,
+        status: str,
+        reference_number: str = '',
+        content: str = '',
+        payload: Optional[dict] = None
+    ) -> dict:
+        """
+        Ghi nhận và áp dụng một giao dịch
+
+        Returns: {'duplicate': bool, 'order_code': str, 'result': str | None, 'order': dict | None}
+        """
+        order_code = PaymentService.extract_order_code(reference_number, content)
+        entry_id = PaymentService.record(
+            gateway, transaction_id, amount, status,
+            order_code=order_code,
+            reference_number=reference_number,
+            content=content,
+            payload=payload
+        )
+        if entry_id is None:
+            return {'duplicate': True, 'order_code': order_code, 'result': None, 'order': None}
+
+        applied = PaymentService.apply(entry_id, order_code, amount, status)
+        return {'duplicate': False, 'order_code': order_code, **applied}
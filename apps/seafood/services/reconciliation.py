@@ -0,0 +1,264 @@
+"""
+Statement Reconciliation Service
+Đối soát sao kê ngân hàng (CSV / Excel) với các đơn chưa thanh toán
+"""
+import csv
+import hashlib
+import io
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from api import metrics
+from apps.seafood.models import Order, PaymentTransaction
+from apps.seafood.vietqr import ascii_content
+from .payments import PaymentService
+
+
+class StatementReconciliationService:
+    """
+    Ghi nhận thanh toán cho các chuyển khoản bị lỡ webhook
+
+    - read_statement(): đọc file sao kê, tự nhận cột theo tên tiêu đề.
+    - reconcile(): tách mã đơn bằng PaymentService.ORDER_CODE_PATTERN, tải
+      các đơn liên quan vào dict bằng một truy vấn, rồi ghi nhận mọi dòng
+      khớp (đúng số tiền hoặc trong sai số) bằng một câu UPDATE.
+    """
+    GATEWAY = 'statement'
+
+    # Số dòng đầu file được dò để tìm dòng tiêu đề (sao kê thường có vài dòng thông tin TK)
+    HEADER_SCAN_ROWS = 30
+
+    # Tên cột (không dấu, chữ thường) theo thứ tự ưu tiên
+    COLUMN_ALIASES = {
+        'content': ('noi dung', 'noi dung giao dich', 'dien giai', 'mo ta', 'chi tiet giao dich',
+                    'description', 'content', 'transaction details', 'remark'),
+        'amount': ('so tien ghi co', 'ghi co', 'so tien vao', 'tien vao', 'credit', 'credit amount',
+                   'so tien', 'amount'),
+        'reference': ('so tham chieu', 'ma giao dich', 'ma gd', 'so but toan', 'reference',
+                      'reference number', 'transaction id'),
+        'date': ('ngay giao dich', 'ngay hieu luc', 'ngay', 'transaction date', 'date'),
+    }
+
+    _THOUSANDS = re.compile(r'^\d{1,3}([.,]\d{3})+$')
+
+    @staticmethod
+    def _normalize_header(value) -> str:
+        text = ascii_content(str(value or '')).lower()
+        return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+    @staticmethod
+    def _locate_columns(header: list) -> Optional[Dict[str, int]]:
+        """Vị trí các cột trong dòng tiêu đề; None nếu thiếu cột nội dung hoặc số tiền"""
+        names = [StatementReconciliationService._normalize_header(value) for value in header]
+        columns = {}
+        for key, aliases in StatementReconciliationService.COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in names:
+                    columns[key] = names.index(alias)
+                    break
+        if 'content' not in columns or 'amount' not in columns:
+            return None
+        return columns
+
+    @staticmethod
+    def parse_amount(value) -> Optional[Decimal]:
+        """Số tiền từ ô sao kê: 1500000, '1,500,000', '1.500.000 VND', '1500000.00'"""
+        if value is None or value == '':
+            return None
+        if isinstance(value, (int, float, Decimal)):
+            return Decimal(str(value))
+        text = re.sub(r'[^\d.,-]', '', str(value))
+        digits = text.lstrip('-')
+        if StatementReconciliationService._THOUSANDS.match(digits):
+            text = text.replace('.', '').replace(',', '')
+        elif ',' in text and '.' in text:
+            # Dấu xuất hiện sau cùng là dấu thập phân
+            if text.rfind(',') > text.rfind('.'):
+                text = text.replace('.', '').replace(',', '.')
+            else:
+                text = text.replace(',', '')
+        else:
+            text = text.replace(',', '.')
+        try:
+            return Decimal(text)
+        except InvalidOperation:
+            return None
+
+    @staticmethod
+    def _read_rows(uploaded_file, filename: str):
+        if filename.lower().endswith(('.xlsx', '.xlsm')):
+            from openpyxl import load_workbook
+
+            wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+            try:
+                yield from wb.active.iter_rows(values_only=True)
+            finally:
+                wb.close()
+            return
+
+        raw = uploaded_file.read()
+        try:
+            text = raw.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = raw.decode('cp1258', errors='replace')
+        # Dấu phân cách: loại cho ra được dòng tiêu đề (csv.Sniffer hỏng với các dòng thông tin TK ở đầu)
+        head = text.splitlines()[:StatementReconciliationService.HEADER_SCAN_ROWS]
+        delimiter = next(
+            (
+                candidate for candidate in (',', ';', '\t', '|')
+                if any(StatementReconciliationService._locate_columns(row) for row in csv.reader(head, delimiter=candidate))
+            ),
+            ','
+        )
+        yield from csv.reader(io.StringIO(text), delimiter=delimiter)
+
+    @staticmethod
+    def read_statement(uploaded_file, filename: str = '') -> List[dict]:
+        """
+        Đọc file sao kê (CSV hoặc Excel .xlsx)
+
+        Returns: list dict {'line', 'amount', 'content', 'reference', 'date'}
+        Raises: ValueError nếu không tìm thấy dòng tiêu đề có cột nội dung và số tiền.
+        """
+        service = StatementReconciliationService
+        filename = filename or getattr(uploaded_file, 'name', '')
+
+        columns = None
+        lines = []
+        for line_no, row in enumerate(service._read_rows(uploaded_file, filename), start=1):
+            if columns is None:
+                if line_no > service.HEADER_SCAN_ROWS:
+                    break
+                columns = service._locate_columns(list(row))
+                continue
+            if not any(value not in (None, '') for value in row):
+                continue
+            cells = {key: row[index] if index < len(row) else None for key, index in columns.items()}
+            lines.append({
+                'line': line_no,
+                'amount': service.parse_amount(cells['amount']),
+                'content': str(cells['content'] or '').strip(),
+                'reference': str(cells.get('reference') or '').strip(),
+                'date': str(cells.get('date') or '').strip(),
+            })
+
+        if columns is None:
+            raise ValueError("Không tìm thấy dòng tiêu đề có cột nội dung và số tiền")
+        return lines
+
+    @staticmethod
+    def _transaction_id(line: dict, seen: Dict[str, int]) -> str:
+        """Mã giao dịch ổn định giữa các lần tải lại cùng một sao kê"""
+        if line['reference']:
+            return line['reference'][:100]
+        base = f"{line['date']}|{line['amount']}|{line['content']}"
+        seen[base] = seen.get(base, 0) + 1
+        return 'h:' + hashlib.sha1(f"{base}|{seen[base]}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    @transaction.atomic
+    def reconcile(lines: List[dict]) -> dict:
+        """
+        Đối soát các dòng sao kê với đơn hàng
+
+        Returns: {'total_lines', 'matched', 'matched_amount', 'skipped', 'unmatched': [...]}
+        """
+        from apps.seafood.signals import orders_updated
+
+        service = StatementReconciliationService
+        credits = []
+        skipped = 0
+        for line in lines:
+            if line['amount'] is None or line['amount'] <= 0:
+                skipped += 1  # ghi nợ / dòng không phải giao dịch
+                continue
+            line['order_code'] = PaymentService.extract_order_code('', line['content'])
+            credits.append(line)
+
+        codes = {line['order_code'] for line in credits if line['order_code']}
+        orders = {
+            order['order_code']: order
+            for order in Order.objects.select_for_update().filter(order_code__in=codes).values(
+                'order_code', 'status', *PaymentService._ORDER_FIELDS
+            )
+        } if codes else {}
+
+        matched = {}
+        unmatched = []
+        for line in credits:
+            order = orders.get(line['order_code'])
+            if not line['order_code']:
+                reason = 'no_order_code'
+            elif order is None:
+                reason = 'order_not_found'
+            elif order['payment_status'] == 'paid':
+                reason = 'already_paid'
+            elif order['status'] == 'cancelled':
+                reason = 'order_cancelled'
+            elif order['id'] in matched:
+                reason = 'duplicate_payment'
+            elif not PaymentService.amount_matches(order['total_amount'], line['amount']):
+                reason = 'amount_mismatch'
+            else:
+                matched[order['id']] = line
+                line['result'] = 'applied'
+                continue
+            line['result'] = reason
+            unmatched.append({
+                'line': line['line'],
+                'date': line['date'],
+                'amount': line['amount'],
+                'content': line['content'],
+                'reference': line['reference'],
+                'order_code': line['order_code'],
+                'reason': reason,
+            })
+
+        now = timezone.now()
+        if matched:
+            # Khớp đúng số tiền: paid_amount = total_amount; chỉ dòng lệch trong sai số cần CASE
+            partial = [
+                When(pk=order_id, then=line['amount'])
+                for order_id, line in matched.items()
+                if line['amount'] != orders[line['order_code']]['total_amount']
+            ]
+            Order.objects.filter(pk__in=list(matched)).update(
+                payment_status='paid',
+                paid_amount=Case(*partial, default=F('total_amount')) if partial else F('total_amount'),
+                updated_at=now
+            )
+            # update() không gửi post_save: cập nhật bảng tổng hợp / lương
+            orders_updated.send(sender=Order, orders=[orders[line['order_code']] for line in matched.values()])
+            metrics.ORDERS_PAID.labels('statement').inc(len(matched))
+
+        # Sổ giao dịch: mọi dòng có mã đơn; tải lại cùng sao kê không tạo dòng trùng
+        seen = {}
+        reason_to_result = {'duplicate_payment': 'already_paid', 'order_cancelled': 'rejected'}
+        PaymentTransaction.objects.bulk_create([
+            PaymentTransaction(
+                gateway=service.GATEWAY,
+                transaction_id=service._transaction_id(line, seen),
+                order_id=orders[line['order_code']]['id'] if line['order_code'] in orders else None,
+                order_code=line['order_code'],
+                amount=line['amount'],
+                status='success',
+                result=reason_to_result.get(line['result'], line['result']),
+                reference_number=line['reference'][:100],
+                content=line['content'],
+                payload={'line': line['line'], 'date': line['date']}
+            )
+            for line in credits if line['order_code']
+        ], batch_size=1000, ignore_conflicts=True)
+
+        return {
+            'total_lines': len(lines),
+            'matched': len(matched),
+            'matched_amount': sum((line['amount'] for line in matched.values()), Decimal('0')),
+            'skipped': skipped,
+            'unmatched': unmatched,
+        }
@@ -0,0 +1,240 @@
+"""
+Sales Fact Service
+Duy trì bảng tổng hợp DailySalesFact từ Order/OrderItem
+"""
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.business_day import business_date, date_range, day_range
+from apps.seafood.models import Order, OrderItem, DailySalesFact
+
+
+# (business date, role, user_id, seafood_id, status)
+FactKey = Tuple[date, str, UUID, Optional[UUID], str]
+
+_ORDER_FIELDS = ('id', 'created_at', 'status', 'total_amount', 'paid_amount') + tuple(
+    f'{field}_id' for field in Order.STAFF_ROLE_FIELDS
+)
+
+_pending = threading.local()
+
+
+def _new_measures() -> dict:
+    return {
+        'order_count': 0,
+        'item_count': 0,
+        'revenue': Decimal('0'),
+        'paid_amount': Decimal('0'),
+        'weight': Decimal('0'),
+    }
+
+
+class SalesFactService:
+    """Tính lại và đánh dấu cần tính lại các dòng DailySalesFact"""
+
+    BATCH_SIZE = 2000
+
+    @staticmethod
+    def order_users(order_values: dict) -> Dict[str, UUID]:
+        """Map vai trò -> user id của các nhân viên tham gia đơn"""
+        users = {}
+        for field in Order.STAFF_ROLE_FIELDS:
+            user_id = order_values.get(f'{field}_id')
+            if user_id:
+                users[field] = user_id
+        return users
+
+    @staticmethod
+    def accumulate(
+        facts: Dict[FactKey, dict],
+        order_values: dict,
+        items: Iterable[dict],
+        user_ids: Optional[Set[UUID]] = None
+    ) -> None:
+        """
+        Cộng phần đóng góp của một đơn vào facts
+
+        user_ids: chỉ tính cho các nhân viên này (None = tất cả)
+        """
+        day = business_date(order_values['created_at'])
+        status = order_values['status']
+
+        by_product = defaultdict(_new_measures)
+        item_count = 0
+        order_weight = Decimal('0')
+        for item in items:
+            weight = item['weight'] or Decimal('0')
+            product = by_product[item['seafood_id']]
+            product['item_count'] += 1
+            product['revenue'] += item['subtotal'] or Decimal('0')
+            product['weight'] += weight
+            item_count += 1
+            order_weight += weight
+
+        roles = SalesFactService.order_users(order_values)
+        targets = list(roles.items())
+        targets += [(DailySalesFact.ROLE_ANY, user_id) for user_id in set(roles.values())]
+
+        for role, user_id in targets:
+            if user_ids is not None and user_id not in user_ids:
+                continue
+
+            row = facts[(day, role, user_id, None, status)]
+            row['order_count'] += 1
+            row['item_count'] += item_count
+            row['revenue'] += order_values['total_amount'] or Decimal('0')
+            row['paid_amount'] += order_values['paid_amount'] or Decimal('0')
+            row['weight'] += order_weight
+
+            for seafood_id, measures in by_product.items():
+                row = facts[(day, role, user_id, seafood_id, status)]
+                row['order_count'] += 1
+                row['item_count'] += measures['item_count']
+                row['revenue'] += measures['revenue']
+                row['weight'] += measures['weight']
+
+    @staticmethod
+    def _build(orders, user_ids: Optional[Set[UUID]] = None) -> Dict[FactKey, dict]:
+        """Đọc đơn + item theo lô và tổng hợp thành facts"""
+        facts: Dict[FactKey, dict] = defaultdict(_new_measures)
+        batch = []
+
+        def flush():
+            items_by_order = defaultdict(list)
+            for item in OrderItem.objects.filter(
+                order_id__in=[order['id'] for order in batch]
+            ).values('order_id', 'seafood_id', 'subtotal', 'weight'):
+                items_by_order[item['order_id']].append(item)
+            for order in batch:
+                SalesFactService.accumulate(facts, order, items_by_order[order['id']], user_ids)
+            batch.clear()
+
+        for order in orders.values(*_ORDER_FIELDS).order_by().iterator(
+            chunk_size=SalesFactService.BATCH_SIZE
+        ):
+            batch.append(order)
+            if len(batch) >= SalesFactService.BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+
+        return facts
+
+    @staticmethod
+    def _save(facts: Dict[FactKey, dict]) -> int:
+        rows = [
+            DailySalesFact(
+                date=day,
+                role=role,
+                user_id=user_id,
+                seafood_id=seafood_id,
+                status=status,
+                **measures
+            )
+            for (day, role, user_id, seafood_id, status), measures in facts.items()
+        ]
+        DailySalesFact.objects.bulk_create(rows, batch_size=SalesFactService.BATCH_SIZE)
+        return len(rows)
+
+    @staticmethod
+    @transaction.atomic
+    def refresh(day: date, user_ids: Optional[Set[UUID]] = None) -> int:
+        """
+        Tính lại facts của một ngày
+
+        user_ids: chỉ tính lại các dòng của những nhân viên này (None = cả ngày)
+        """
+        start, end = day_range(day)
+        orders = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        stale = DailySalesFact.objects.filter(date=day)
+
+        if user_ids is not None:
+            user_ids = set(user_ids)
+            if not user_ids:
+                return 0
+            involved = Q()
+            for field in Order.STAFF_ROLE_FIELDS:
+                involved |= Q(**{f'{field}_id__in': user_ids})
+            orders = orders.filter(involved)
+            stale = stale.filter(user_id__in=user_ids)
+
+        stale.delete()
+        return SalesFactService._save(SalesFactService._build(orders, user_ids))
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(date_from: date, date_to: date) -> int:
+        """Tính lại toàn bộ facts trong khoảng ngày [date_from, date_to]"""
+        start, end = date_range(date_from, date_to)
+
+        DailySalesFact.objects.filter(date__gte=date_from, date__lte=date_to).delete()
+        orders = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        return SalesFactService._save(SalesFactService._build(orders))
+
+    # ============================================
+    # Cập nhật tăng dần (gọi từ signals)
+    # ============================================
+
+    @staticmethod
+    def mark_dirty(created_at: datetime, user_ids: Iterable[UUID]) -> None:
+        """
+        Đánh dấu (ngày, nhân viên) cần tính lại; tính lại sau khi transaction commit
+
+        Nhiều thay đổi trong cùng savepoint chỉ tính lại một lần (một lô, một
+        callback on_commit). Rollback bỏ callback nên bỏ luôn lô của nó.
+        """
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not created_at or not user_ids:
+            return
+
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            SalesFactService.refresh(business_date(created_at), user_ids)
+            return
+        SalesFactService._pending_batch(connection).days[business_date(created_at)] |= user_ids
+
+    @staticmethod
+    def _pending_batch(connection) -> '_PendingFacts':
+        """Lô đang chờ của savepoint hiện tại, tạo mới (kèm callback on_commit) nếu chưa có"""
+        savepoint_ids = set(connection.savepoint_ids)
+        cached = getattr(_pending, 'batch', None)
+        # Commit / rollback (kể cả rollback savepoint) đều thay danh sách run_on_commit
+        if (
+            cached is not None and cached[0] is connection.run_on_commit
+            and cached[1] == savepoint_ids and not cached[2].done
+        ):
+            return cached[2]
+
+        for callback_savepoint_ids, callback, _ in connection.run_on_commit:
+            if (
+                isinstance(callback, _PendingFacts) and not callback.done
+                and callback_savepoint_ids == savepoint_ids
+            ):
+                batch = callback
+                break
+        else:
+            batch = _PendingFacts()
+            transaction.on_commit(batch)
+
+        _pending.batch = (connection.run_on_commit, savepoint_ids, batch)
+        return batch
+
+
+class _PendingFacts:
+    """Các (ngày -> nhân viên) chờ tính lại của một savepoint; chính là callback on_commit của nó"""
+
+    def __init__(self):
+        self.days: Dict[date, Set[UUID]] = defaultdict(set)
+        self.done = False
+
+    def __call__(self) -> None:
+        self.done = True
+        for day, user_ids in self.days.items():
+            SalesFactService.refresh(day, user_ids)
@@ -0,0 +1,86 @@
+"""
+Seafood Signals
+Giữ bảng DailySalesFact và cache dashboard đồng bộ khi đơn hàng / item / tồn kho thay đổi
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from api import metrics
+from .models import Order, OrderItem, Seafood
+from .services import SalesFactService, DashboardStatsService
+
+_ROLE_ID_FIELDS = tuple(f'{field}_id' for field in Order.STAFF_ROLE_FIELDS)
+
+# Gửi sau khi đơn hàng được cập nhật bằng queryset.update() (không có post_save),
+# vd. ghi nhận thanh toán. orders: list dict gồm 'created_at' và các cột <vai trò>_id
+# (ORDER_SIGNAL_FIELDS).
+orders_updated = Signal()
+ORDER_SIGNAL_FIELDS = ('id', 'created_at', *_ROLE_ID_FIELDS)
+
+
+def _role_user_ids(order):
+    return [getattr(order, field) for field in _ROLE_ID_FIELDS]
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_staff(sender, instance, raw=False, **kwargs):
+    """Lưu nhân viên cũ của đơn để tính lại cả người bị đổi khỏi đơn (và trạng thái cũ cho metrics)"""
+    if raw or instance._state.adding:
+        return
+    previous = Order.objects.filter(pk=instance.pk).values_list(
+        'status', 'payment_status', *_ROLE_ID_FIELDS
+    ).first() or ()
+    instance._previous_status = tuple(previous[:2])
+    instance._previous_staff_ids = list(previous[2:])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_staff_ids', ())
+    SalesFactService.mark_dirty(instance.created_at, [*_role_user_ids(instance), *previous])
+    DashboardStatsService.invalidate()
+
+
+@receiver(post_save, sender=Order)
+def count_order_events(sender, instance, created=False, raw=False, **kwargs):
+    """Business counters: đơn tạo mới / cân xong / thanh toán"""
+    if raw:
+        return
+    status, payment_status = getattr(instance, '_previous_status', None) or (None, None)
+    if created:
+        metrics.ORDERS_CREATED.inc()
+    if instance.status == 'weighed' and status != 'weighed':
+        metrics.ORDERS_WEIGHED.inc()
+    if instance.payment_status == 'paid' and payment_status != 'paid':
+        metrics.ORDERS_PAID.labels('order_update').inc()
+
+
+@receiver(orders_updated)
+def orders_bulk_updated(sender, orders, **kwargs):
+    for order in orders:
+        SalesFactService.mark_dirty(order['created_at'], [order[field] for field in _ROLE_ID_FIELDS])
+    if orders:
+        DashboardStatsService.invalidate()
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        order = instance.order
+    except Order.DoesNotExist:
+        return
+    SalesFactService.mark_dirty(order.created_at, _role_user_ids(order))
+
+
+@receiver(post_save, sender=Seafood)
+@receiver(post_delete, sender=Seafood)
+def seafood_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    DashboardStatsService.invalidate()
@@ -0,0 +1,203 @@
+"""
+Business-day filters compile to half-open created_at ranges
+
+Reports must filter with `created_at >= start AND created_at < end` so the
+created_at indexes are usable; a date cast (created_at__date, TruncDate in
+WHERE) forces a scan. TruncDate is still allowed in SELECT / GROUP BY.
+The EXPLAIN QUERY PLAN tests check the planner really picks the indexes.
+"""
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.querybudget import QueryRecorder
+from apps.business_day import business_today, date_range, day_range
+from apps.seafood import api as seafood_api
+from apps.seafood.models import DailySalesFact, Order
+from apps.seafood.repositories import SalesFactRepository
+from apps.seafood.services import DashboardStatsService, SalesFactService
+from apps.users import api
+
+DATE_CAST = re.compile(
+    r'django_datetime_cast_date|django_datetime_extract|django_datetime_trunc'
+    r'|::date|AT TIME ZONE|\bDATE\(|\bEXTRACT\(',
+    re.IGNORECASE,
+)
+CREATED_AT_RANGE = re.compile(r'created_at"?\s*(>=|<)\s*')
+GROUP_BY = re.compile(r'\sGROUP BY\s.*?(?=\sHAVING\s|\sORDER BY\s|$)', re.IGNORECASE | re.DOTALL)
+
+
+def filter_clauses(sql):
+    """FROM ... onwards without GROUP BY: where a cast would defeat the index"""
+    _, _, body = sql.partition(' FROM ')
+    return GROUP_BY.sub(' ', body)
+
+
+def assert_range_predicates(statements, table):
+    scans = [sql for sql in statements if table in sql and 'created_at' in filter_clauses(sql)]
+    assert scans, f'no statement filtered {table}.created_at'
+    for sql in scans:
+        assert not DATE_CAST.search(filter_clauses(sql)), sql
+        assert {'>=', '<'} <= set(CREATED_AT_RANGE.findall(sql)), sql
+
+
+def recorded(call):
+    with QueryRecorder() as recorder:
+        call()
+    return recorder.statements
+
+
+@pytest.fixture
+def seller(make_user, make_order):
+    seller = make_user(roles=['sale'])
+    start, _ = day_range(business_today())
+    # Hai phía của nửa đêm giờ kinh doanh
+    make_order(seller, total=100_000, created_at=start - timedelta(minutes=30))
+    make_order(seller, total=200_000, created_at=start + timedelta(minutes=30))
+    return seller
+
+
+@pytest.mark.django_db
+def test_order_querysets_compile_to_ranges():
+    start, end = date_range(business_today() - timedelta(days=30), business_today())
+    queryset = Order.objects.filter(status='completed', created_at__gte=start, created_at__lt=end)
+
+    sql = str(queryset.query)
+
+    assert not DATE_CAST.search(filter_clauses(sql))
+    assert {'>=', '<'} <= set(CREATED_AT_RANGE.findall(sql))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('call', [
+    lambda user: api.get_staff_weekly_details(None, user.id, 4),
+    lambda user: api.get_staff_monthly_details(None, user.id, 3),
+    lambda user: api.get_attendance_calendar(None, user.id),
+    lambda user: api.get_all_staff_kpi_summary(None),
+], ids=['weekly-details', 'monthly-details', 'attendance-calendar', 'all-kpi-summary'])
+def test_staff_reports_filter_orders_by_range(seller, call):
+    assert_range_predicates(recorded(lambda: call(seller)), Order._meta.db_table)
+
+
+@pytest.mark.django_db
+def test_sales_fact_refresh_filters_orders_by_range(seller):
+    today = business_today()
+
+    statements = recorded(lambda: SalesFactService.refresh(today))
+    statements += recorded(lambda: SalesFactService.rebuild(today - timedelta(days=1), today))
+
+    assert_range_predicates(statements, Order._meta.db_table)
+
+
+@pytest.mark.django_db
+def test_dashboard_and_kpi_read_facts_without_casts(seller, product):
+    SalesFactService.rebuild(business_today() - timedelta(days=1), business_today())
+
+    statements = recorded(DashboardStatsService.compute)
+    statements += recorded(lambda: api.get_staff_kpi_summary(None, seller.id))
+    statements += recorded(lambda: api.get_staff_kpi_stats(None, seller.id))
+    statements += recorded(lambda: api.get_staff_kpi_detail(None, seller.id))
+
+    assert not any(Order._meta.db_table + '"' in sql for sql in statements)
+    assert not any(DATE_CAST.search(filter_clauses(sql)) for sql in statements)
+    facts = str(SalesFactRepository().order_facts(date_from=business_today(), date_to=business_today()).query)
+    assert '"date" >=' in facts and '"date" <=' in facts
+
+
+# ============================================
+# EXPLAIN QUERY PLAN
+# ============================================
+
+sqlite_only = pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN is SQLite syntax')
+
+
+def index_name(model, *fields):
+    return next(index.name for index in model._meta.indexes if tuple(index.fields) == fields)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return ' | '.join(row[-1] for row in cursor.fetchall())
+
+
+def query_plans(call, model):
+    """Plan of every SELECT on model's table run by call() (captured SQL has the params inlined)"""
+    with CaptureQueriesContext(connection) as context:
+        call()
+    table = f'"{model._meta.db_table}"'
+    return [
+        explain(query['sql']) for query in context.captured_queries
+        if table in query['sql'] and query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def full_scans(plans, model):
+    scan = re.compile(rf'\bSCAN {model._meta.db_table}\b(?!_)')
+    return [plan for plan in plans if scan.search(plan)]
+
+
+@sqlite_only
+@pytest.mark.django_db
+@pytest.mark.parametrize('call', [
+    lambda user: api.get_staff_weekly_details(None, user.id, 4),
+    lambda user: api.get_staff_monthly_details(None, user.id, 3),
+    lambda user: api.get_attendance_calendar(None, user.id),
+], ids=['weekly-details', 'monthly-details', 'attendance-calendar'])
+def test_staff_reports_use_created_by_created_at_index(seller, call):
+    plans = query_plans(lambda: call(seller), Order)
+
+    assert plans
+    index = index_name(Order, 'created_by', 'created_at')
+    using = f'USING INDEX {index} (created_by_id=? AND created_at>? AND created_at<?)'
+    assert all(using in plan for plan in plans), plans
+
+
+@sqlite_only
+@pytest.mark.django_db
+def test_status_filters_use_status_created_at_index(seller):
+    start, end = date_range(business_today() - timedelta(days=30), business_today())
+    index = index_name(Order, 'status', 'created_at')
+
+    ranged = Order.objects.filter(status='completed', created_at__gte=start, created_at__lt=end).explain()
+    listed = query_plans(lambda: seafood_api.list_orders(None, status='completed'), Order)
+
+    assert f'USING INDEX {index} (status=? AND created_at>? AND created_at<?)' in ranged
+    # Lọc theo trạng thái, sắp xếp -created_at lấy luôn từ index
+    assert f'USING INDEX {index} (status=?)' in listed[0]
+    assert 'TEMP B-TREE FOR ORDER BY' not in listed[0]
+
+
+@sqlite_only
+@pytest.mark.django_db
+def test_kpi_totals_and_fact_refresh_never_scan_orders(seller):
+    today = business_today()
+    plans = query_plans(lambda: api.get_all_staff_kpi_summary(None), Order)
+    plans += query_plans(lambda: SalesFactService.refresh(today), Order)
+    plans += query_plans(lambda: SalesFactService.refresh(today, {seller.id}), Order)
+
+    assert len(plans) == 3
+    assert not full_scans(plans, Order), plans
+    assert f'USING INDEX {index_name(Order, "created_at")}' in plans[0]
+    assert f'USING INDEX {index_name(Order, "created_by", "created_at")}' in plans[2]
+
+
+@sqlite_only
+@pytest.mark.django_db
+def test_dashboard_and_kpi_use_fact_indexes(seller):
+    SalesFactService.rebuild(business_today() - timedelta(days=1), business_today())
+
+    plans = query_plans(DashboardStatsService.compute, DailySalesFact)
+    plans += query_plans(lambda: api.get_staff_kpi_summary(None, seller.id), DailySalesFact)
+    plans += query_plans(lambda: api.get_staff_kpi_stats(None, seller.id), DailySalesFact)
+
+    assert len(plans) >= 3
+    assert not full_scans(plans, DailySalesFact), plans
+    assert f'USING INDEX {index_name(DailySalesFact, "role", "date", "seafood")}' in plans[0]
+    assert all(
+        f'USING INDEX {index_name(DailySalesFact, "role", "user", "date")} (role=? AND user_id=? AND date>? AND date<?)'
+        in plan for plan in plans[1:]
+    ), plans
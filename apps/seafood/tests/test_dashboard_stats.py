@@ -0,0 +1,108 @@
+"""
+Dashboard stats cache: single-flight recompute and version-based invalidation
+"""
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from api.querybudget import QueryRecorder
+from apps.seafood.services import DashboardStatsService
+
+CALLERS = 20
+
+
+@pytest.fixture
+def compute_calls(monkeypatch):
+    """Thay compute bằng bản chậm để các caller chắc chắn chồng lên nhau"""
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {
+            'total_products': len(calls),
+            'total_stock_value': Decimal('0'),
+            'today_orders': 0,
+            'today_revenue': Decimal('0'),
+            'low_stock_products': 0,
+        }
+
+    monkeypatch.setattr(DashboardStatsService, 'compute', staticmethod(slow_compute))
+    return calls
+
+
+def concurrent_get_stats():
+    barrier = threading.Barrier(CALLERS)
+    results = []
+
+    def caller():
+        barrier.wait()
+        results.append(DashboardStatsService.get_stats())
+
+    threads = [threading.Thread(target=caller) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_cold_callers_compute_once(compute_calls):
+    results = concurrent_get_stats()
+
+    assert len(compute_calls) == 1
+    assert len(results) == CALLERS
+    assert all(result['total_products'] == 1 for result in results)
+
+
+def test_invalidated_cache_recomputes_once_and_serves_stale(compute_calls):
+    DashboardStatsService.get_stats()
+    cache.incr(DashboardStatsService.VERSION_KEY)
+
+    results = concurrent_get_stats()
+
+    assert len(compute_calls) == 2
+    # Một caller tính lại, các caller còn lại nhận dữ liệu cũ
+    assert sorted(result['total_products'] for result in results) == [1] * (CALLERS - 1) + [2]
+    assert DashboardStatsService.get_stats()['total_products'] == 2
+    assert len(compute_calls) == 2
+
+
+@pytest.mark.django_db
+def test_fresh_stats_are_served_without_queries(product):
+    first = DashboardStatsService.get_stats()
+
+    with QueryRecorder() as recorder:
+        assert DashboardStatsService.get_stats() == first
+    assert recorder.count == 0
+
+
+@pytest.mark.django_db
+def test_writes_bump_the_cache_version(product, make_user, make_order, django_capture_on_commit_callbacks):
+    before = DashboardStatsService.get_stats()
+    version = cache.get(DashboardStatsService.VERSION_KEY)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.stock_quantity = Decimal('5')
+        product.save()
+    assert cache.get(DashboardStatsService.VERSION_KEY) == version + 1
+    assert DashboardStatsService.get_stats()['low_stock_products'] == before['low_stock_products'] + 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        make_order(make_user(), total=150_000)
+    assert cache.get(DashboardStatsService.VERSION_KEY) > version + 1
+
+
+@pytest.mark.django_db
+def test_version_is_bumped_only_on_commit(product, django_capture_on_commit_callbacks):
+    DashboardStatsService.get_stats()
+    version = cache.get(DashboardStatsService.VERSION_KEY)
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        product.save()
+
+    assert cache.get(DashboardStatsService.VERSION_KEY) == version
+    assert callbacks
@@ -0,0 +1,198 @@
+"""
+Payment endpoints: JWT plus a payments permission; the SePay webhook is
+idempotent per transaction_id and moves orders unpaid -> pending_verification -> paid
+"""
+import logging
+from decimal import Decimal
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from api.querybudget import QueryRecorder
+from apps.seafood.models import Order, PaymentTransaction
+
+TRANSACTIONS_URL = '/api/seafood/payment/transactions'
+RECONCILE_URL = '/api/seafood/payments/reconcile'
+WEBHOOK_URL = '/api/seafood/sepay/webhook'
+
+
+@pytest.fixture
+def bearer(make_user):
+    """bearer(*codenames) -> Authorization header of a user holding those permissions"""
+    from apps.rbac.models import Permission, Role, RolePermission, UserRole
+    from apps.users.jwt_utils import create_user_access_token
+
+    def make(*codenames):
+        user = make_user()
+        role = Role.objects.create(name=f'Role {user.pk}', slug=f'role-{user.pk}')
+        for codename in codenames:
+            permission, _ = Permission.objects.get_or_create(
+                codename=codename, defaults={'name': codename, 'module': 'payments', 'action': 'manage'}
+            )
+            RolePermission.objects.create(role=role, permission=permission)
+        UserRole.objects.create(user=user, role=role)
+        return f'Bearer {create_user_access_token(user)}'
+
+    return make
+
+
+@pytest.fixture
+def transaction_row(db):
+    return PaymentTransaction.objects.create(
+        transaction_id='TX-1', order_code='POS-1', amount=Decimal('150000'), status='success'
+    )
+
+
+def test_list_transactions_requires_token(client, transaction_row):
+    assert client.get(TRANSACTIONS_URL).status_code == 401
+
+
+def test_list_transactions_requires_permission(client, bearer, transaction_row):
+    response = client.get(TRANSACTIONS_URL, HTTP_AUTHORIZATION=bearer('view_orders'))
+
+    assert response.status_code == 403
+    assert response.json()['required_permission'] == 'view_payment_transactions'
+
+
+def test_list_transactions_with_permission(client, bearer, transaction_row):
+    response = client.get(TRANSACTIONS_URL, HTTP_AUTHORIZATION=bearer('view_payment_transactions'))
+
+    assert response.status_code == 200
+    assert [row['transaction_id'] for row in response.json()] == ['TX-1']
+
+
+def statement(content: bytes, name='sao-ke.csv'):
+    return SimpleUploadedFile(name, content, content_type='text/csv')
+
+
+def test_reconcile_requires_token(client, db):
+    assert client.post(RECONCILE_URL, {'file': statement(b'x')}).status_code == 401
+
+
+def test_reconcile_requires_permission(client, bearer):
+    response = client.post(
+        RECONCILE_URL, {'file': statement(b'x')}, HTTP_AUTHORIZATION=bearer('view_payment_transactions')
+    )
+
+    assert response.status_code == 403
+    assert response.json()['required_permission'] == 'reconcile_payments'
+
+
+def test_reconcile_unreadable_statement_is_logged_not_echoed(client, bearer, caplog):
+    with caplog.at_level(logging.ERROR, logger='apps.seafood.api'):
+        response = client.post(
+            RECONCILE_URL, {'file': statement(b'foo,bar\n1,2\n')}, HTTP_AUTHORIZATION=bearer('reconcile_payments')
+        )
+
+    assert response.status_code == 400
+    assert 'tiêu đề có cột' not in response.json()['error']
+    assert 'Không tìm thấy dòng tiêu đề' in caplog.text
+    assert 'sao-ke.csv' in caplog.text
+
+
+def test_reconcile_applies_matching_lines(client, bearer, make_user, make_order):
+    order = make_order(make_user(), total=150_000, status='pending')
+    order.__class__.objects.filter(pk=order.pk).update(order_code='POS-20251019-001')
+    content = 'Nội dung,Số tiền\nCK POS20251019001 thanh toan,150000\nCK khong ro,99000\n'.encode()
+
+    response = client.post(
+        RECONCILE_URL, {'file': statement(content)}, HTTP_AUTHORIZATION=bearer('reconcile_payments')
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['success'] is True
+    assert (body['total_lines'], body['matched']) == (2, 1)
+    order.refresh_from_db()
+    assert order.payment_status == 'paid'
+
+
+def webhook(client, order_code, transaction_id, status, amount=150_000):
+    payload = {
+        'gateway': 'SePay', 'transaction_id': transaction_id, 'reference_number': order_code,
+        'amount': amount, 'content': f'Thanh toan {order_code}', 'status': status,
+    }
+    response = client.post(WEBHOOK_URL, payload, content_type='application/json')
+    assert response.status_code == 200
+    return response.json()
+
+
+def payment_state(order):
+    return Order.objects.filter(pk=order.pk).values_list('payment_status', 'paid_amount').get()
+
+
+@pytest.fixture
+def new_order(make_user, make_order):
+    """Đơn mới tạo: payment_status mặc định 'pending'"""
+    order = make_order(make_user(), total=150_000, status='pending')
+    assert order.payment_status == 'pending'
+    return order
+
+
+def test_webhook_pending_on_new_order(client, new_order):
+    body = webhook(client, new_order.order_code, 'SP-1', 'pending')
+
+    assert body == {'success': True, 'message': f'Payment pending for order {new_order.order_code}'}
+    assert payment_state(new_order) == ('pending_verification', Decimal('0'))
+    assert PaymentTransaction.objects.get(transaction_id='SP-1').result == 'pending'
+
+
+@pytest.mark.parametrize('payment_status', ['unpaid', 'pending_verification'])
+def test_webhook_pending_keeps_unpaid_or_verifying_orders_verifying(client, new_order, payment_status):
+    Order.objects.filter(pk=new_order.pk).update(payment_status=payment_status)
+
+    assert webhook(client, new_order.order_code, 'SP-1', 'pending')['success'] is True
+    assert payment_state(new_order) == ('pending_verification', Decimal('0'))
+
+
+def test_webhook_replay_is_a_duplicate(client, new_order):
+    webhook(client, new_order.order_code, 'SP-1', 'success')
+    Order.objects.filter(pk=new_order.pk).update(payment_status='unpaid', paid_amount=0)
+
+    with QueryRecorder() as recorder:
+        body = webhook(client, new_order.order_code, 'SP-1', 'success')
+
+    assert body == {'success': True, 'message': 'Transaction SP-1 already processed'}
+    # Chỉ câu INSERT ... ON CONFLICT vào sổ giao dịch, đơn không bị đụng tới
+    assert recorder.count == 1
+    assert payment_state(new_order) == ('unpaid', Decimal('0'))
+    assert PaymentTransaction.objects.filter(transaction_id='SP-1').count() == 1
+
+
+def test_webhook_pending_then_success_is_applied(client, new_order):
+    webhook(client, new_order.order_code, 'SP-1', 'pending')
+    assert webhook(client, new_order.order_code, 'SP-1', 'pending')['message'] == 'Transaction SP-1 already processed'
+
+    body = webhook(client, new_order.order_code, 'SP-1', 'success')
+
+    assert body['success'] is True and body['order_id'] == str(new_order.pk)
+    assert payment_state(new_order) == ('paid', Decimal('150000'))
+    entry = PaymentTransaction.objects.get(transaction_id='SP-1')
+    assert (entry.status, entry.result, entry.order_id) == ('success', 'applied', new_order.pk)
+    assert webhook(client, new_order.order_code, 'SP-1', 'success')['message'] == 'Transaction SP-1 already processed'
+
+
+def test_webhook_second_transaction_for_paid_order(client, new_order):
+    webhook(client, new_order.order_code, 'SP-1', 'success')
+
+    assert webhook(client, new_order.order_code, 'SP-2', 'success')['message'] == (
+        f'Order {new_order.order_code} already paid'
+    )
+    assert webhook(client, new_order.order_code, 'SP-3', 'pending')['message'] == (
+        f'Order {new_order.order_code} already paid'
+    )
+    assert payment_state(new_order) == ('paid', Decimal('150000'))
+    assert dict(PaymentTransaction.objects.values_list('transaction_id', 'result')) == {
+        'SP-1': 'applied', 'SP-2': 'already_paid', 'SP-3': 'already_paid',
+    }
+
+
+def test_webhook_amount_mismatch_and_unknown_order(client, new_order):
+    body = webhook(client, new_order.order_code, 'SP-1', 'success', amount=100_000)
+
+    assert body['success'] is False and 'Amount mismatch' in body['error']
+    assert payment_state(new_order) == ('pending', Decimal('0'))
+    assert webhook(client, 'POS-20990101-001', 'SP-2', 'success')['error'] == 'Order POS-20990101-001 not found'
+    assert dict(PaymentTransaction.objects.values_list('transaction_id', 'result')) == {
+        'SP-1': 'amount_mismatch', 'SP-2': 'order_not_found',
+    }
@@ -0,0 +1,79 @@
+"""
+Product stats: date window, category filter and cancelled orders excluded
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+
+from api.exceptions import BadRequest
+from apps.business_day import business_tz
+from apps.seafood import api
+from apps.seafood.models import OrderItem, Seafood, SeafoodCategory
+from apps.seafood.services import SalesFactService
+
+MARCH = {'date_from': date(2025, 3, 1), 'date_to': date(2025, 3, 31)}
+
+
+@pytest.fixture
+def sales(make_user, make_order, product):
+    crabs = SeafoodCategory.objects.create(name='Cua', slug='cua')
+    crab = Seafood.objects.create(
+        code='P2', name='Cua gạch', category=crabs, current_price=Decimal('500000'), stock_quantity=Decimal('10')
+    )
+    unsold = Seafood.objects.create(
+        code='P3', name='Tôm hùm', category=product.category, current_price=Decimal('900000'),
+        stock_quantity=Decimal('3')
+    )
+    seller = make_user()
+
+    def sell(seafood, total, day, status='completed'):
+        order = make_order(seller, total=total, created_at=datetime.combine(day, time(10), tzinfo=business_tz()),
+                           status=status)
+        OrderItem.objects.filter(order=order).update(seafood=seafood)
+
+    sell(product, 100_000, date(2025, 3, 1))
+    sell(product, 200_000, date(2025, 3, 10))
+    sell(product, 900_000, date(2025, 3, 10), status='cancelled')
+    sell(crab, 250_000, date(2025, 3, 5))
+    sell(crab, 1_000_000, date(2025, 2, 1))
+    SalesFactService.rebuild(date(2025, 2, 1), date(2025, 3, 31))
+    return {'shrimp': product, 'crab': crab, 'unsold': unsold}
+
+
+def ranking(**filters):
+    return [(row.code, row.revenue) for row in api.get_product_stats(None, **filters)]
+
+
+@pytest.mark.django_db
+def test_all_history_skips_cancelled_orders(sales):
+    assert ranking() == [('P2', Decimal('1250000')), ('P1', Decimal('300000')), ('P3', Decimal('0'))]
+
+
+@pytest.mark.django_db
+def test_date_window(sales):
+    assert ranking(**MARCH) == [('P1', Decimal('300000')), ('P2', Decimal('250000')), ('P3', Decimal('0'))]
+    assert ranking(date_from=date(2025, 3, 6), date_to=date(2025, 3, 6)) == [
+        ('P1', Decimal('0')), ('P2', Decimal('0')), ('P3', Decimal('0'))
+    ]
+
+
+@pytest.mark.django_db
+def test_category_filter_also_limits_unsold_fillers(sales):
+    category_id = sales['shrimp'].category_id
+
+    assert ranking(category_id=category_id, **MARCH) == [('P1', Decimal('300000')), ('P3', Decimal('0'))]
+
+
+@pytest.mark.django_db
+def test_limit(sales):
+    assert ranking(limit=1) == [('P2', Decimal('1250000'))]
+    assert ranking(limit=0) == []
+
+
+@pytest.mark.django_db
+def test_reversed_range_is_rejected(sales):
+    with pytest.raises(BadRequest) as error:
+        api.get_product_stats(None, date_from=date(2025, 3, 2), date_to=date(2025, 3, 1))
+
+    assert error.value.status_code == 400
@@ -0,0 +1,128 @@
+"""
+Daily sales facts: rows maintained incrementally by the signals must equal
+a full rebuild, and pending refreshes never outlive a rolled-back transaction
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import transaction
+
+from apps.business_day import business_today
+from apps.seafood.models import DailySalesFact, OrderItem
+from apps.seafood.services import PaymentService, SalesFactService
+
+
+def fact_rows():
+    return sorted(
+        DailySalesFact.objects.values_list(
+            'date', 'role', 'user_id', 'seafood_id', 'status',
+            'order_count', 'item_count', 'revenue', 'paid_amount', 'weight'
+        ),
+        key=str
+    )
+
+
+def assert_matches_rebuild():
+    incremental = fact_rows()
+    today = business_today()
+    SalesFactService.rebuild(today - timedelta(days=1), today + timedelta(days=1))
+    assert incremental == fact_rows()
+    return incremental
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """with committed(): ... chạy các callback on_commit như khi transaction commit"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.mark.django_db
+def test_incremental_facts_match_rebuild_through_order_lifecycle(make_user, make_order, product, committed):
+    seller, helper, warehouse = make_user(), make_user(), make_user()
+
+    with committed():
+        order = make_order(seller, total=300_000, status='pending', sale_user=seller)
+        other = make_order(helper, total=120_000, status='pending')
+    assert {row[2] for row in assert_matches_rebuild()} == {seller.id, helper.id}
+
+    # Cân hàng: đổi trạng thái, thêm người cân, sửa cân nặng item
+    with committed():
+        order.status = 'weighed'
+        order.weighed_by = warehouse
+        order.assigned_employee = warehouse
+        order.save()
+        item = order.items.get()
+        item.weight = Decimal('1.5')
+        item.save()
+        OrderItem.objects.create(order=order, seafood=product, weight=Decimal('0.5'), unit_price=Decimal('100000'))
+    assert_matches_rebuild()
+
+    # Thanh toán qua webhook (queryset.update + orders_updated)
+    with committed():
+        PaymentService.process('sepay', 'tx-1', Decimal('300000'), 'success', reference_number=order.order_code)
+    rows = assert_matches_rebuild()
+    assert any(row[1] == 'created_by' and row[3] is None and row[8] == Decimal('300000') for row in rows)
+
+    # Đổi sale: người cũ phải mất dòng sale_user
+    with committed():
+        order.refresh_from_db()
+        order.sale_user = helper
+        order.save()
+    rows = assert_matches_rebuild()
+    assert not any(row[1] == 'sale_user' and row[2] == seller.id for row in rows)
+
+    # Hủy một đơn, xóa đơn còn lại
+    with committed():
+        order.status = 'cancelled'
+        order.save()
+        other.delete()
+    rows = assert_matches_rebuild()
+    assert {row[4] for row in rows} == {'cancelled'}
+    assert not any(row[2] == helper.id and row[1] == 'created_by' for row in rows)
+
+
+@pytest.mark.django_db
+def test_changes_in_one_transaction_refresh_once(make_user, make_order, committed, mocker):
+    seller = make_user()
+    refresh = mocker.spy(SalesFactService, 'refresh')
+
+    with committed():
+        for total in (100_000, 200_000, 300_000):
+            make_order(seller, total=total)
+
+    assert refresh.call_count == 1
+    assert refresh.call_args.args[1] == {seller.id}
+
+
+@pytest.mark.django_db
+def test_rolled_back_savepoint_is_not_refreshed_by_the_next_commit(make_user, make_order, committed, mocker):
+    seller, other = make_user(), make_user()
+    refresh = mocker.spy(SalesFactService, 'refresh')
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            make_order(seller)
+            raise RuntimeError
+    with committed():
+        make_order(other)
+
+    assert [call.args[1] for call in refresh.call_args_list] == [{other.id}]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_transaction_is_not_refreshed_by_the_next_commit(make_user, make_order, mocker):
+    seller, other = make_user(), make_user()
+    refresh = mocker.spy(SalesFactService, 'refresh')
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            make_order(seller)
+            raise RuntimeError
+    assert refresh.call_count == 0
+
+    with transaction.atomic():
+        make_order(other)
+
+    assert [call.args[1] for call in refresh.call_args_list] == [{other.id}]
+    assert {row[2] for row in fact_rows()} == {other.id}
@@ -0,0 +1,156 @@
+"""
+VietQR payloads: the EMVCo field layout is pinned by a golden payload, the
+pooled SePay client falls back to the local QR, and order QR codes are cached
+until the order changes
+"""
+from decimal import Decimal
+
+import pytest
+import requests
+
+from apps.seafood import vietqr
+from apps.seafood.sepay_service import SepayService, get_sepay_service
+from apps.seafood.services import PaymentService
+
+ACCOUNT = '1160976779'
+
+# Chuyển 150.000đ đến BIDV 1160976779, nội dung "Thanh toan POS-20251019-001"
+GOLDEN_PAYLOAD = (
+    '000201'                                    # 00 phiên bản payload
+    '010212'                                    # 01 QR động (có số tiền)
+    '3854'                                      # 38 thông tin tài khoản NAPAS
+    '0010A000000727'                            #    00 GUID NAPAS 247
+    '0124' '0006970418' '01101160976779'        #    01 BIN ngân hàng + số tài khoản
+    '0208QRIBFTTA'                              #    02 dịch vụ chuyển nhanh đến tài khoản
+    '5303704'                                   # 53 VND
+    '5406150000'                                # 54 số tiền
+    '5802VN'                                    # 58 quốc gia
+    '6231' '0827Thanh toan POS-20251019-001'    # 62 / 08 nội dung chuyển khoản
+    '6304EFC5'                                  # 63 CRC
+)
+
+
+def parse_fields(payload):
+    """TLV EMVCo -> [(tag, value)]"""
+    fields = []
+    while payload:
+        tag, length = payload[:2], int(payload[2:4])
+        fields.append((tag, payload[4:4 + length]))
+        payload = payload[4 + length:]
+    return fields
+
+
+def test_crc16_ccitt_check_value():
+    assert vietqr.crc16_ccitt('123456789') == '29B1'
+    assert vietqr.crc16_ccitt('') == 'FFFF'
+
+
+def test_golden_dynamic_payload():
+    payload = vietqr.build_payload(
+        vietqr.BANK_BINS['BIDV'], ACCOUNT, Decimal('150000'), 'Thanh toán POS-20251019-001'
+    )
+
+    assert payload == GOLDEN_PAYLOAD
+    assert [tag for tag, _ in parse_fields(payload)] == ['00', '01', '38', '53', '54', '58', '62', '63']
+    assert payload[-4:] == vietqr.crc16_ccitt(payload[:-4])
+
+
+def test_static_payload_has_no_amount():
+    payload = vietqr.build_payload(vietqr.BANK_BINS['BIDV'], ACCOUNT)
+    fields = dict(parse_fields(payload))
+
+    assert fields['01'] == '11'
+    assert '54' not in fields and '62' not in fields
+    assert dict(parse_fields(fields['38']))['01'] == '0006970418' '01101160976779'
+    assert payload == '00020101021138540010A00000072701240006970418011011609767790208QRIBFTTA53037045802VN6304902F'
+
+
+def test_content_is_ascii_and_fields_are_bounded():
+    assert vietqr.ascii_content('Đặng Thị Hương trả tiền') == 'Dang Thi Huong tra tien'
+    assert vietqr.emv_field('08', 'x' * 99).startswith('0899')
+    with pytest.raises(ValueError):
+        vietqr.emv_field('08', 'x' * 100)
+
+
+def test_render_svg_and_png():
+    images = vietqr.render(GOLDEN_PAYLOAD)
+
+    assert images['svg'].startswith('<svg')
+    assert images['png'].startswith('data:image/png;base64,')
+
+
+# ---------------------------------------------------------------------------
+# SePay client
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def remote(settings):
+    settings.SEPAY_QR_MODE = 'remote'
+    settings.SEPAY_API_KEY = 'test-key'
+    return SepayService()
+
+
+def test_client_shares_one_pooled_session():
+    service = get_sepay_service()
+    adapter = service.session.get_adapter('https://api.sepay.vn/api/v1/qr')
+
+    assert get_sepay_service() is service
+    assert adapter._pool_maxsize == 16
+    assert adapter.max_retries.total == 2
+    assert service.session.get_adapter('http://example.com') is adapter
+
+
+def test_local_mode_never_calls_the_network(mocker):
+    service = SepayService()
+    post = mocker.patch.object(service.session, 'post')
+
+    qr = service.create_qr_code(Decimal('150000'), 'Thanh toan POS-20251019-001')
+
+    post.assert_not_called()
+    assert qr['qr_payload'] == GOLDEN_PAYLOAD
+    assert qr['qr_image_url'].startswith('data:image/png;base64,')
+
+
+def test_remote_failure_falls_back_to_local_qr(remote, mocker):
+    post = mocker.patch.object(remote.session, 'post', side_effect=requests.ConnectionError('down'))
+
+    qr = remote.create_qr_code(Decimal('150000'), 'Thanh toan POS-20251019-001')
+
+    assert post.call_args.kwargs['timeout'] == SepayService.DEFAULT_TIMEOUT
+    assert qr['qr_payload'] == GOLDEN_PAYLOAD
+
+
+def test_remote_success_uses_gateway_qr(remote, mocker):
+    response = mocker.Mock(**{'json.return_value': {'status': 'success', 'qrCode': 'https://qr', 'sessionId': 's-1'}})
+    mocker.patch.object(remote.session, 'post', return_value=response)
+
+    qr = remote.create_qr_code(Decimal('150000'), 'Thanh toan POS-20251019-001')
+
+    assert (qr['qr_image_url'], qr['session_id'], qr['bank_code']) == ('https://qr', 's-1', 'BIDV')
+
+
+# ---------------------------------------------------------------------------
+# PaymentService.order_qr
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_order_qr_is_cached_until_the_order_changes(make_user, make_order, mocker):
+    order = make_order(make_user(), total=150_000, status='weighed')
+    create = mocker.spy(SepayService, 'create_qr_code')
+
+    first = PaymentService.order_qr(order, f'Thanh toan {order.order_code}')
+    assert PaymentService.order_qr(order, f'Thanh toan {order.order_code}') == first
+    assert create.call_count == 1
+
+    order.total_amount = Decimal('200000')
+    order.save()
+    changed = PaymentService.order_qr(order, f'Thanh toan {order.order_code}')
+
+    assert create.call_count == 2
+    assert dict(parse_fields(changed['qr_payload']))['54'] == '200000'
+    assert dict(parse_fields(first['qr_payload']))['54'] == '150000'
+
+    # Lưu lại không đổi số tiền: updated_at đổi nên vẫn tạo QR mới
+    order.save()
+    PaymentService.order_qr(order, f'Thanh toan {order.order_code}')
+    assert create.call_count == 3
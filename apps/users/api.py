@@ -14,7 +14,7 @@ from .schemas import (
 )
 from .services import UserService
 from .authentication import JWTAuth
-from .jwt_utils import create_access_token
+from .jwt_utils import create_user_access_token
 from apps.rbac.schemas import MessageResponse
 from apps.rbac.permissions import require_permission
 
@@ -48,7 +48,7 @@ def customer_login(request, payload: UserLogin):
         raise PermissionDenied("Endpoint này chỉ dành cho khách hàng. Vui lòng đăng nhập tại trang quản trị")
 
     # Generate JWT token
-    token = create_access_token(data={"user_id": str(user.id), "email": user.email})
+    token = create_user_access_token(user)
 
     return {
         "access_token": token,
@@ -85,7 +85,7 @@ def customer_register(request, payload: UserCreate):
         logger.warning("Customer role not found in database")
 
     # Generate JWT token automatically
-    token = create_access_token(data={"user_id": str(user.id), "email": user.email})
+    token = create_user_access_token(user)
 
     return {
         "access_token": token,
@@ -107,7 +107,7 @@ def login(request, payload: UserLogin):
         raise Unauthorized("Invalid credentials")
 
     # Generate JWT token for all user types
-    token = create_access_token(data={"user_id": str(user.id), "email": user.email})
+    token = create_user_access_token(user)
 
     return {
         "access_token": token,
@@ -300,7 +300,8 @@ def list_users(
     request,
     department_id: Optional[UUID] = None,
     is_active: bool = True,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    include_descendants: bool = False
 ):
     """List all users with optional filters - Admin/Manager only"""
     # Check if user is customer - customers cannot list users
@@ -311,12 +312,13 @@ def list_users(
     users = UserService.list_users(
         department_id=department_id,
         is_active=is_active,
-        search=search
+        search=search,
+        include_descendants=include_descendants
     )
     return users
 
 
-@router.get("/{user_id}", response=UserRead, auth=jwt_auth)
+@router.get("/{uuid:user_id}", response=UserRead, auth=jwt_auth)
 def get_user(request, user_id: UUID):
     """Get user by ID"""
     user = UserService.get_user(user_id)
@@ -330,14 +332,14 @@ def create_user(request, payload: UserCreate):
     return user
 
 
-@router.put("/{user_id}", response=UserRead, auth=jwt_auth)
+@router.put("/{uuid:user_id}", response=UserRead, auth=jwt_auth)
 def update_user(request, user_id: UUID, payload: UserUpdate):
     """Update existing user"""
     user = UserService.update_user(user_id, payload)
     return user
 
 
-@router.delete("/{user_id}", response=MessageResponse, auth=jwt_auth)
+@router.delete("/{uuid:user_id}", response=MessageResponse, auth=jwt_auth)
 def delete_user(request, user_id: UUID, hard: bool = False):
     """Delete user (soft delete by default)"""
     UserService.delete_user(user_id, soft=not hard)
@@ -351,48 +353,50 @@ def delete_user(request, user_id: UUID, hard: bool = False):
 @router.get("/staff/kpi-stats", auth=None)
 def get_staff_kpi_stats(request, user_id: UUID = None):
     """Get KPI statistics for staff (day/month/year)"""
-    from django.db.models import Sum, Count
-    from apps.seafood.models import Order
+    from django.db.models import Sum, Q
+    from apps.seafood.repositories import SalesFactRepository
     from decimal import Decimal
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from apps.business_day import business_today
 
     # TODO: Get user_id from auth instead of param
     # For now, calculate for all staff or specific user
 
-    today = timezone.now().date()
+    today = business_today()
     current_month_start = today.replace(day=1)
     current_year_start = today.replace(month=1, day=1)
 
-    # Base query - filter by created_by if user_id provided
-    base_query = Order.objects.filter(status='completed')
-    if user_id:
-        base_query = base_query.filter(created_by_id=user_id)
-
-    # Today stats
-    today_orders = base_query.filter(created_at__date=today)
-    today_stats = today_orders.aggregate(
-        orders=Count('id'),
-        revenue=Sum('total_amount'),
-        items_sold=Count('items')
+    # Rollup theo ngày của các đơn hoàn thành (theo người tạo đơn)
+    facts = SalesFactRepository().order_facts(
+        user_id=user_id,
+        date_from=current_year_start,
+        date_to=today,
+        statuses=['completed']
     )
 
-    # Month stats
-    month_orders = base_query.filter(created_at__date__gte=current_month_start)
-    month_stats = month_orders.aggregate(
-        orders=Count('id'),
-        revenue=Sum('total_amount'),
-        items_sold=Count('items')
-    )
+    # Nhãn cố định: ngày 1 của tháng / 1-1 trùng ngày bắt đầu nên không dùng ngày làm tên
+    def window(label, since):
+        in_window = Q(date__gte=since)
+        return {
+            f'{label}_orders': Sum('order_count', filter=in_window),
+            f'{label}_revenue': Sum('revenue', filter=in_window),
+            f'{label}_items_sold': Sum('item_count', filter=in_window),
+        }
 
-    # Year stats
-    year_orders = base_query.filter(created_at__date__gte=current_year_start)
-    year_stats = year_orders.aggregate(
-        orders=Count('id'),
-        revenue=Sum('total_amount'),
-        items_sold=Count('items')
+    totals = facts.aggregate(
+        **window('today', today), **window('month', current_month_start), **window('year', current_year_start)
     )
 
+    def stats(label):
+        return {
+            'orders': totals[f'{label}_orders'] or 0,
+            'revenue': totals[f'{label}_revenue'],
+            'items_sold': totals[f'{label}_items_sold'] or 0,
+        }
+
+    today_stats = stats('today')
+    month_stats = stats('month')
+    year_stats = stats('year')
+
     # Calculate month target (example: 100M VND)
     target_revenue = Decimal('100000000')
     month_revenue = month_stats['revenue'] or Decimal('0')
@@ -422,31 +426,26 @@ def get_staff_kpi_stats(request, user_id: UUID = None):
 @router.get("/staff/monthly-stats", auth=None)
 def get_staff_monthly_stats(request, user_id: UUID = None, months: int = 12):
     """Get monthly performance stats grouped by month"""
-    from django.db.models import Sum, Count
+    from django.db.models import Sum
     from django.db.models.functions import TruncMonth
-    from apps.seafood.models import Order
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from apps.seafood.repositories import SalesFactRepository
+    from apps.business_day import business_today
+    from datetime import timedelta
 
     # Get orders from last N months
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=months * 30)
-
-    # Base query
-    base_query = Order.objects.filter(
-        status='completed',
-        created_at__gte=start_date
-    )
-    if user_id:
-        base_query = base_query.filter(created_by_id=user_id)
+    start_date = business_today() - timedelta(days=months * 30)
 
     # Group by month
-    monthly_data = base_query.annotate(
-        month_date=TruncMonth('created_at')
+    monthly_data = SalesFactRepository().order_facts(
+        user_id=user_id,
+        date_from=start_date,
+        statuses=['completed']
+    ).annotate(
+        month_date=TruncMonth('date')
     ).values('month_date').annotate(
-        orders=Count('id'),
-        revenue=Sum('total_amount'),
-        items_sold=Count('items')
+        orders=Sum('order_count'),
+        revenue=Sum('revenue'),
+        items_sold=Sum('item_count')
     ).order_by('-month_date')
 
     # Format response
@@ -464,139 +463,162 @@ def get_staff_monthly_stats(request, user_id: UUID = None, months: int = 12):
     return result
 
 
+def _order_brief(order):
+    """Serialize an order for the staff daily breakdowns"""
+    return {
+        "id": str(order.id),
+        "order_code": order.order_code,
+        "customer_name": order.customer_name or "",
+        "customer_phone": order.customer_phone,
+        "total_amount": float(order.total_amount),
+        "paid_amount": float(order.paid_amount),
+        "payment_status": order.payment_status,
+        "created_at": order.created_at.isoformat(),
+    }
+
+
+def _bucket_orders_by_day(orders):
+    """
+    Bucket an order queryset per business day in two queries:
+    one grouped TruncDate aggregate for the day totals and one fetch for the order listings
+
+    Returns (stats_by_day, orders_by_day), both keyed by date
+    """
+    from django.db.models import Sum, Count
+    from django.db.models.functions import TruncDate
+    from apps.business_day import business_tz, business_date
+
+    day_rows = orders.annotate(day=TruncDate('created_at', tzinfo=business_tz())).values('day').annotate(
+        total_orders=Count('id'),
+        total_revenue=Sum('total_amount'),
+        total_paid=Sum('paid_amount')
+    ).order_by()
+    stats_by_day = {row['day']: row for row in day_rows}
+
+    orders_by_day = {}
+    order_rows = orders.only(
+        'id', 'order_code', 'customer_name', 'customer_phone',
+        'total_amount', 'paid_amount', 'payment_status', 'created_at'
+    )
+    for order in order_rows:
+        orders_by_day.setdefault(business_date(order.created_at), []).append(_order_brief(order))
+
+    return stats_by_day, orders_by_day
+
+
+def _day_breakdown(day, stats_by_day, orders_by_day):
+    """Build the per-day entry from the bucketed stats and orders"""
+    stats = stats_by_day.get(day, {})
+    revenue = stats.get('total_revenue') or 0
+    paid = stats.get('total_paid') or 0
+
+    return {
+        "date": day.isoformat(),
+        "total_orders": stats.get('total_orders', 0),
+        "total_revenue": float(revenue),
+        "total_paid": float(paid),
+        "total_unpaid": float(revenue - paid),
+        "orders": orders_by_day.get(day, []),
+    }
+
+
 @router.get("/staff/weekly-details", auth=None)
 def get_staff_weekly_details(request, user_id: UUID = None, weeks: int = 4):
     """Get detailed weekly breakdown with daily orders"""
-    from django.db.models import Sum, Count
-    from django.db.models.functions import TruncDate
     from apps.seafood.models import Order
+    from apps.business_day import date_range, week_start as get_week_start
     from django.utils import timezone
-    from datetime import datetime, timedelta
+    from datetime import timedelta
+
+    if weeks < 1:
+        return []
 
     # Get data for last N weeks
-    end_date = timezone.now()
-    start_date = end_date - timedelta(weeks=weeks)
+    start_date = timezone.now() - timedelta(weeks=weeks)
 
-    # Base query
-    base_query = Order.objects.filter(created_at__gte=start_date)
+    # Week boundaries (Monday to Sunday), newest week first
+    this_week_start = get_week_start()
+    week_starts = [this_week_start - timedelta(weeks=week_num) for week_num in range(weeks)]
+
+    # Base query - one pass over the whole window
+    window_start, window_end = date_range(week_starts[-1], this_week_start + timedelta(days=6))
+    base_query = Order.objects.filter(
+        created_at__gte=max(start_date, window_start),
+        created_at__lt=window_end
+    )
     if user_id:
         base_query = base_query.filter(created_by_id=user_id)
 
-    # Group orders by week and day
-    result = []
-    current_date = end_date.date()
+    stats_by_day, orders_by_day = _bucket_orders_by_day(base_query)
 
-    for week_num in range(weeks):
-        # Calculate week boundaries (Monday to Sunday)
-        week_start = current_date - timedelta(days=current_date.weekday() + (week_num * 7))
+    result = []
+    for week_start in week_starts:
         week_end = week_start + timedelta(days=6)
-
-        # Get all orders in this week
-        week_orders = base_query.filter(
-            created_at__date__gte=week_start,
-            created_at__date__lte=week_end
-        )
+        week_days = [week_start + timedelta(days=day_offset) for day_offset in range(7)]
 
         # Group by day
-        days_data = []
-        for day_offset in range(7):
-            current_day = week_start + timedelta(days=day_offset)
-
-            # Get orders for this day
-            day_orders = week_orders.filter(created_at__date=current_day)
-
-            # Get order details
-            orders_list = []
-            for order in day_orders:
-                orders_list.append({
-                    "id": str(order.id),
-                    "order_code": order.order_code,
-                    "customer_name": order.customer_name or "",
-                    "customer_phone": order.customer_phone,
-                    "total_amount": float(order.total_amount),
-                    "paid_amount": float(order.paid_amount),
-                    "payment_status": order.payment_status,
-                    "created_at": order.created_at.isoformat(),
-                })
-
-            # Calculate day stats
-            day_stats = day_orders.aggregate(
-                total_revenue=Sum('total_amount'),
-                total_paid=Sum('paid_amount')
-            )
+        days_data = [_day_breakdown(day, stats_by_day, orders_by_day) for day in week_days]
 
-            days_data.append({
-                "date": current_day.isoformat(),
-                "total_orders": day_orders.count(),
-                "total_revenue": float(day_stats['total_revenue'] or 0),
-                "total_paid": float(day_stats['total_paid'] or 0),
-                "total_unpaid": float((day_stats['total_revenue'] or 0) - (day_stats['total_paid'] or 0)),
-                "orders": orders_list
-            })
-
-        # Calculate week totals
-        week_stats = week_orders.aggregate(
-            total_orders=Count('id'),
-            total_revenue=Sum('total_amount')
-        )
+        # Week totals from the day buckets
+        week_stats = [stats_by_day[day] for day in week_days if day in stats_by_day]
 
         result.append({
             "week_start": week_start.isoformat(),
             "week_end": week_end.isoformat(),
             "days": days_data,
-            "total_orders": week_stats['total_orders'] or 0,
-            "total_revenue": float(week_stats['total_revenue'] or 0)
+            "total_orders": sum(stats['total_orders'] for stats in week_stats),
+            "total_revenue": float(sum(stats['total_revenue'] or 0 for stats in week_stats))
         })
 
     return result
 
 
+def _kpi_window_totals(facts, today, week_start, month_start):
+    """Today/week/month totals from order-level DailySalesFact rows in one query"""
+    from django.db.models import Sum, Q
+
+    today_q = Q(date=today)
+    month_q = Q(date__gte=month_start)
+    totals = facts.filter(date__gte=min(week_start, month_start), date__lte=today).aggregate(
+        today_revenue=Sum('revenue', filter=today_q),
+        today_paid=Sum('paid_amount', filter=today_q),
+        week_revenue=Sum('revenue', filter=Q(date__gte=week_start)),
+        month_revenue=Sum('revenue', filter=month_q),
+        month_orders=Sum('order_count', filter=month_q),
+        month_completed=Sum('order_count', filter=month_q & Q(status='completed')),
+        month_cancelled=Sum('order_count', filter=month_q & Q(status='cancelled')),
+    )
+    for key in ('month_orders', 'month_completed', 'month_cancelled'):
+        totals[key] = totals[key] or 0
+    return totals
+
+
 @router.get("/staff/kpi-summary", auth=None)
 def get_staff_kpi_summary(request, user_id: UUID = None):
     """Get KPI summary for header"""
-    from django.db.models import Sum, Count
-    from apps.seafood.models import Order
-    from django.utils import timezone
-    from datetime import timedelta
+    from apps.seafood.repositories import SalesFactRepository
+    from apps.business_day import business_today, week_start as get_week_start
 
-    today = timezone.now().date()
-    week_start = today - timedelta(days=today.weekday())
+    today = business_today()
+    week_start = get_week_start(today)
     month_start = today.replace(day=1)
 
-    # Base query
-    base_query = Order.objects.all()
-    if user_id:
-        base_query = base_query.filter(created_by_id=user_id)
-
-    # Today stats
-    today_stats = base_query.filter(created_at__date=today).aggregate(
-        revenue=Sum('total_amount'),
-        paid=Sum('paid_amount')
-    )
-
-    # Week stats
-    week_stats = base_query.filter(created_at__date__gte=week_start).aggregate(
-        revenue=Sum('total_amount')
-    )
-
-    # Month stats
-    month_stats = base_query.filter(created_at__date__gte=month_start).aggregate(
-        revenue=Sum('total_amount')
+    # Đơn theo người tạo (không có user_id = toàn bộ đơn)
+    totals = _kpi_window_totals(
+        SalesFactRepository().order_facts(user_id=user_id),
+        today, week_start, month_start
     )
 
     # Calculate service efficiency (example: % of completed orders)
-    total_orders = base_query.filter(created_at__date__gte=month_start).count()
-    completed_orders = base_query.filter(
-        created_at__date__gte=month_start,
-        status='completed'
-    ).count()
+    total_orders = totals['month_orders']
+    completed_orders = totals['month_completed']
     service_efficiency = (completed_orders / total_orders * 100) if total_orders > 0 else 0
 
     return {
-        "today_revenue": float(today_stats['revenue'] or 0),
-        "today_paid": float(today_stats['paid'] or 0),
-        "week_revenue": float(week_stats['revenue'] or 0),
-        "month_revenue": float(month_stats['revenue'] or 0),
+        "today_revenue": float(totals['today_revenue'] or 0),
+        "today_paid": float(totals['today_paid'] or 0),
+        "week_revenue": float(totals['week_revenue'] or 0),
+        "month_revenue": float(totals['month_revenue'] or 0),
         "service_efficiency": float(service_efficiency)
     }
 
@@ -609,83 +631,45 @@ def get_all_staff_kpi_summary(request, year: Optional[int] = None, month: Option
     - year: Filter by year (default: current year)
     - month: Filter by month 1-12 (default: current month)
     """
-    from django.db.models import Sum, Count, Q
-    from apps.seafood.models import Order
-    from django.utils import timezone
-    from datetime import timedelta, date
-    from calendar import monthrange
+    from apps.seafood.repositories import OrderRepository
+    from apps.business_day import business_today, day_range, day_start, month_range, week_start as get_week_start
 
     # Get all staff members (exclude customers only)
     users = User.objects.exclude(
         user_type='customer'
     ).filter(is_active=True)
 
-    today = timezone.now().date()
+    today = business_today()
 
     # Use provided year/month or default to current
     selected_year = year or today.year
     selected_month = month or today.month
 
-    # Calculate date ranges
-    week_start = today - timedelta(days=today.weekday())
-    month_start = date(selected_year, selected_month, 1)
-    _, last_day = monthrange(selected_year, selected_month)
-    month_end = date(selected_year, selected_month, last_day)
+    # Orders are attributed through every role column (created_by, sale_user,
+    # assigned_employee, weighed_by, shipped_by, delivered_by) - one query for all staff
+    kpi_totals = OrderRepository().get_staff_kpi_totals(
+        today_range=day_range(today),
+        week_start=day_start(get_week_start(today)),
+        month_range=month_range(selected_year, selected_month)
+    )
 
     result = []
     for user in users:
-        # Query orders based on user role
-        # For employees: assigned_employee (warehouse workers)
-        # For sales: sale_user (sales staff)
-        # For creators: created_by (who created the order)
-        base_query = Order.objects.filter(
-            Q(created_by=user) |  # Orders created by user
-            Q(sale_user=user) |   # Orders assigned to sales
-            Q(assigned_employee=user) |  # Orders assigned to warehouse
-            Q(weighed_by=user) |  # Orders weighed by user
-            Q(shipped_by=user) |  # Orders shipped by user
-            Q(delivered_by=user)  # Orders delivered by user
-        ).distinct()
-
-        # Today stats
-        today_stats = base_query.filter(created_at__date=today).aggregate(
-            revenue=Sum('total_amount'),
-            paid=Sum('paid_amount')
-        )
-
-        # Week stats
-        week_stats = base_query.filter(created_at__date__gte=week_start).aggregate(
-            revenue=Sum('total_amount')
-        )
-
-        # Month stats (for selected month)
-        month_stats = base_query.filter(
-            created_at__date__gte=month_start,
-            created_at__date__lte=month_end
-        ).aggregate(
-            revenue=Sum('total_amount')
-        )
+        stats = kpi_totals.get(user.id)
 
         # Calculate service efficiency for selected month
-        total_orders = base_query.filter(
-            created_at__date__gte=month_start,
-            created_at__date__lte=month_end
-        ).count()
-        completed_orders = base_query.filter(
-            created_at__date__gte=month_start,
-            created_at__date__lte=month_end,
-            status='completed'
-        ).count()
+        total_orders = stats['month_orders'] if stats else 0
+        completed_orders = stats['month_completed'] if stats else 0
         service_efficiency = (completed_orders / total_orders * 100) if total_orders > 0 else 0
 
         result.append({
             "user_id": str(user.id),
             "user_email": user.email,
             "user_name": f"{user.first_name} {user.last_name}".strip() or user.email,
-            "today_revenue": float(today_stats['revenue'] or 0),
-            "today_paid": float(today_stats['paid'] or 0),
-            "week_revenue": float(week_stats['revenue'] or 0),
-            "month_revenue": float(month_stats['revenue'] or 0),
+            "today_revenue": float(stats['today_revenue']) if stats else 0.0,
+            "today_paid": float(stats['today_paid']) if stats else 0.0,
+            "week_revenue": float(stats['week_revenue']) if stats else 0.0,
+            "month_revenue": float(stats['month_revenue']) if stats else 0.0,
             "service_efficiency": float(service_efficiency),
             "selected_year": selected_year,
             "selected_month": selected_month,
@@ -700,10 +684,9 @@ def get_all_staff_kpi_summary(request, year: Optional[int] = None, month: Option
 @router.get("/staff/{user_id}/kpi-detail", auth=jwt_auth)
 def get_staff_kpi_detail(request, user_id: UUID):
     """Get detailed KPI for a specific staff member"""
-    from django.db.models import Sum, Count, Q
-    from apps.seafood.models import Order
-    from django.utils import timezone
-    from datetime import timedelta
+    from apps.seafood.models import DailySalesFact
+    from apps.seafood.repositories import SalesFactRepository
+    from apps.business_day import business_today, week_start as get_week_start
     from api.exceptions import ResourceNotFound
 
     try:
@@ -711,50 +694,21 @@ def get_staff_kpi_detail(request, user_id: UUID):
     except User.DoesNotExist:
         raise ResourceNotFound("User not found")
 
-    today = timezone.now().date()
-    week_start = today - timedelta(days=today.weekday())
+    today = business_today()
+    week_start = get_week_start(today)
     month_start = today.replace(day=1)
 
-    # Query orders based on user involvement
-    base_query = Order.objects.filter(
-        Q(created_by=user) |
-        Q(sale_user=user) |
-        Q(assigned_employee=user) |
-        Q(weighed_by=user) |
-        Q(shipped_by=user) |
-        Q(delivered_by=user)
-    ).distinct()
-
-    # Today stats
-    today_stats = base_query.filter(created_at__date=today).aggregate(
-        revenue=Sum('total_amount'),
-        paid=Sum('paid_amount')
-    )
-
-    # Week stats
-    week_stats = base_query.filter(created_at__date__gte=week_start).aggregate(
-        revenue=Sum('total_amount')
-    )
-
-    # Month stats
-    month_stats = base_query.filter(created_at__date__gte=month_start).aggregate(
-        revenue=Sum('total_amount'),
-        total_orders=Count('id')
+    # Đơn có nhân viên tham gia ở bất kỳ vai trò nào (mỗi đơn tính một lần)
+    totals = _kpi_window_totals(
+        SalesFactRepository().order_facts(role=DailySalesFact.ROLE_ANY, user_id=user.id),
+        today, week_start, month_start
     )
 
-    # Order status breakdown (for the month)
-    completed_orders = base_query.filter(
-        created_at__date__gte=month_start,
-        status='completed'
-    ).count()
-
-    cancelled_orders = base_query.filter(
-        created_at__date__gte=month_start,
-        status='cancelled'
-    ).count()
+    completed_orders = totals['month_completed']
+    cancelled_orders = totals['month_cancelled']
 
     # Calculate service efficiency
-    total_orders = month_stats['total_orders'] or 0
+    total_orders = totals['month_orders']
     service_efficiency = (completed_orders / total_orders * 100) if total_orders > 0 else 0
 
     return {
@@ -762,10 +716,10 @@ def get_staff_kpi_detail(request, user_id: UUID):
         "user_email": user.email,
         "user_name": f"{user.first_name} {user.last_name}".strip() or user.email,
         "user_type": user.user_type,
-        "today_revenue": float(today_stats['revenue'] or 0),
-        "today_paid": float(today_stats['paid'] or 0),
-        "week_revenue": float(week_stats['revenue'] or 0),
-        "month_revenue": float(month_stats['revenue'] or 0),
+        "today_revenue": float(totals['today_revenue'] or 0),
+        "today_paid": float(totals['today_paid'] or 0),
+        "week_revenue": float(totals['week_revenue'] or 0),
+        "month_revenue": float(totals['month_revenue'] or 0),
         "service_efficiency": float(service_efficiency),
         "total_orders": total_orders,
         "completed_orders": completed_orders,
@@ -916,20 +870,20 @@ def get_attendance_calendar(
     month: Optional[int] = None
 ):
     """Get attendance calendar for a specific user and month"""
-    from django.utils import timezone
+    from apps.business_day import business_date, business_today, date_range
     from datetime import datetime, timedelta
     from calendar import monthrange
     from apps.seafood.models import Order
 
     # Default to current month if not provided
-    now = timezone.now()
-    year = year or now.year
-    month = month or now.month
+    today = business_today()
+    year = year or today.year
+    month = month or today.month
 
     # Get user's account creation date
     try:
         user = User.objects.get(id=user_id)
-        account_start_date = user.date_joined.date()
+        account_start_date = business_date(user.date_joined)
     except User.DoesNotExist:
         from api.exceptions import ResourceNotFound
         raise ResourceNotFound("Không tìm thấy người dùng")
@@ -957,13 +911,14 @@ def get_attendance_calendar(
 
     # Get orders for this month to show if user had orders
     orders_by_date = {}
+    range_start, range_end = date_range(first_day, last_day)
     orders = Order.objects.filter(
         created_by_id=user_id,
-        created_at__date__gte=first_day,
-        created_at__date__lte=last_day
-    )
+        created_at__gte=range_start,
+        created_at__lt=range_end
+    ).only('created_at')
     for order in orders:
-        order_date = order.created_at.date()
+        order_date = business_date(order.created_at)
         if order_date not in orders_by_date:
             orders_by_date[order_date] = 0
         orders_by_date[order_date] += 1
@@ -1019,7 +974,7 @@ def export_attendance_calendar_excel(
 ):
     """Export attendance calendar to Excel file"""
     from django.http import HttpResponse
-    from django.utils import timezone
+    from apps.business_day import business_date, business_today, date_range
     from datetime import datetime, timedelta
     from calendar import monthrange
     from apps.seafood.models import Order
@@ -1028,14 +983,14 @@ def export_attendance_calendar_excel(
     from openpyxl.utils import get_column_letter
 
     # Default to current month if not provided
-    now = timezone.now()
-    year = year or now.year
-    month = month or now.month
+    today = business_today()
+    year = year or today.year
+    month = month or today.month
 
     # Get user
     try:
         user = User.objects.get(id=user_id)
-        account_start_date = user.date_joined.date()
+        account_start_date = business_date(user.date_joined)
     except User.DoesNotExist:
         from api.exceptions import ResourceNotFound
         raise ResourceNotFound("Không tìm thấy người dùng")
@@ -1060,13 +1015,14 @@ def export_attendance_calendar_excel(
 
     # Get orders
     orders_by_date = {}
+    range_start, range_end = date_range(first_day, last_day)
     orders = Order.objects.filter(
         created_by_id=user_id,
-        created_at__date__gte=first_day,
-        created_at__date__lte=last_day
-    )
+        created_at__gte=range_start,
+        created_at__lt=range_end
+    ).only('created_at')
     for order in orders:
-        order_date = order.created_at.date()
+        order_date = business_date(order.created_at)
         if order_date not in orders_by_date:
             orders_by_date[order_date] = 0
         orders_by_date[order_date] += 1
@@ -1235,18 +1191,15 @@ def export_attendance_calendar_excel(
     return response
 
 
-@router.get("/my-attendance/export-excel")
+@router.get("/my-attendance/export-excel", auth=jwt_auth)
 def export_my_attendance_excel(
     request,
     year: Optional[int] = None,
     month: Optional[int] = None
 ):
     """Export current user's attendance calendar to Excel file"""
-    # Get current user from request
-    user = request.user
-    if not user or not user.is_authenticated:
-        from django.http import JsonResponse
-        return JsonResponse({"error": "Unauthorized"}, status=401)
+    # Get current user from the JWT
+    user = request.auth
 
     # Reuse the existing export function
     return export_attendance_calendar_excel(request, user.id, year, month)
@@ -1255,63 +1208,79 @@ def export_my_attendance_excel(
 @router.get("/staff/monthly-details/{user_id}", auth=None)
 def get_staff_monthly_details(request, user_id: UUID, months: int = 12):
     """Get detailed monthly breakdown grouped by month from account creation to now"""
-    from django.db.models import Sum, Count
-    from django.db.models.functions import TruncDate
     from apps.seafood.models import Order
-    from django.utils import timezone
+    from apps.business_day import business_date, business_today, date_range
     from datetime import datetime, timedelta
     from calendar import monthrange
 
     # Get user's account creation date
     try:
         user = User.objects.get(id=user_id)
-        start_date = user.date_joined.date()
+        start_date = business_date(user.date_joined)
     except User.DoesNotExist:
         from api.exceptions import ResourceNotFound
         raise ResourceNotFound("Không tìm thấy người dùng")
 
-    end_date = timezone.now().date()
+    end_date = business_today()
+
+    # Months to report, newest first, limited to requested number of months
+    month_starts = []
+    current_month_start = end_date.replace(day=1)
+    while current_month_start >= start_date.replace(day=1):
+        month_starts.append(current_month_start)
+        if len(month_starts) >= months:
+            break
+
+        # Move to previous month
+        if current_month_start.month == 1:
+            current_month_start = current_month_start.replace(year=current_month_start.year - 1, month=12)
+        else:
+            current_month_start = current_month_start.replace(month=current_month_start.month - 1)
 
-    # Get all orders for this user from account creation to now
+    if not month_starts:
+        return []
+
+    first_month_start = month_starts[-1]
+    last_month_end = end_date.replace(day=monthrange(end_date.year, end_date.month)[1])
+
+    # Get all orders for this user in the reported months - one pass
+    range_start, range_end = date_range(max(start_date, first_month_start), end_date)
     base_query = Order.objects.filter(
         created_by_id=user_id,
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
+        created_at__gte=range_start,
+        created_at__lt=range_end
     )
+    stats_by_day, orders_by_day = _bucket_orders_by_day(base_query)
 
-    # Group by month
-    result = []
-    current_month_start = end_date.replace(day=1)
+    # Get attendance for the reported months (skip if table doesn't exist)
+    try:
+        attendance_by_date = {
+            attendance.date: attendance
+            for attendance in Attendance.objects.filter(
+                user_id=user_id,
+                date__gte=first_month_start,
+                date__lte=last_month_end
+            )
+        }
+    except Exception:
+        attendance_by_date = {}
 
-    while current_month_start >= start_date.replace(day=1):
+    result = []
+    for current_month_start in month_starts:
         # Calculate month boundaries
         year = current_month_start.year
         month = current_month_start.month
         month_end = datetime(year, month, monthrange(year, month)[1]).date()
 
-        # Get orders for this month
-        month_orders = base_query.filter(
-            created_at__date__gte=current_month_start,
-            created_at__date__lte=month_end
-        )
-
-        # Get attendance for this month (skip if table doesn't exist)
-        try:
-            attendances = Attendance.objects.filter(
-                user_id=user_id,
-                date__gte=current_month_start,
-                date__lte=month_end
-            )
-            # Count working days
-            full_days = attendances.filter(attendance_type='full').count()
-            half_days = attendances.filter(attendance_type='half').count()
-            off_days = attendances.filter(attendance_type='off').count()
-        except:
-            # If attendance table doesn't exist, use default values
-            attendances = []
-            full_days = 0
-            half_days = 0
-            off_days = 0
+        # Count working days
+        month_types = [
+            attendance.attendance_type
+            for attendance_date, attendance in attendance_by_date.items()
+            if current_month_start <= attendance_date <= month_end
+        ]
+        full_days = month_types.count('full')
+        half_days = month_types.count('half')
+        off_days = month_types.count('off')
 
         # Calculate total working days (half day = 0.5)
         total_working_days = full_days + (half_days * 0.5)
@@ -1320,64 +1289,34 @@ def get_staff_monthly_details(request, user_id: UUID, months: int = 12):
         days_data = []
         current_day = current_month_start
         while current_day <= month_end and current_day <= end_date:
-            day_orders = month_orders.filter(created_at__date=current_day)
-
-            # Get attendance for this day
-            try:
-                attendance = attendances.filter(date=current_day).first() if attendances else None
-            except:
-                attendance = None
-
-            # Get order details
-            orders_list = []
-            for order in day_orders:
-                orders_list.append({
-                    "id": str(order.id),
-                    "order_code": order.order_code,
-                    "customer_name": order.customer_name or "",
-                    "customer_phone": order.customer_phone,
-                    "total_amount": float(order.total_amount),
-                    "paid_amount": float(order.paid_amount),
-                    "payment_status": order.payment_status,
-                    "created_at": order.created_at.isoformat(),
-                })
-
-            # Calculate day stats
-            day_stats = day_orders.aggregate(
-                total_revenue=Sum('total_amount'),
-                total_paid=Sum('paid_amount')
-            )
+            attendance = attendance_by_date.get(current_day)
 
             # Calculate working hours from check in/out times
             working_hours = 0
             if attendance and attendance.check_in_time and attendance.check_out_time:
-                from datetime import datetime, timedelta
                 check_in = datetime.combine(current_day, attendance.check_in_time)
                 check_out = datetime.combine(current_day, attendance.check_out_time)
                 hours_delta = (check_out - check_in).total_seconds() / 3600
                 working_hours = round(hours_delta, 2)
 
-            days_data.append({
-                "date": current_day.isoformat(),
-                "total_orders": day_orders.count(),
-                "total_revenue": float(day_stats['total_revenue'] or 0),
-                "total_paid": float(day_stats['total_paid'] or 0),
-                "total_unpaid": float((day_stats['total_revenue'] or 0) - (day_stats['total_paid'] or 0)),
-                "orders": orders_list,
+            day_data = _day_breakdown(current_day, stats_by_day, orders_by_day)
+            day_data.update({
                 "attendance_type": attendance.attendance_type if attendance else "off",
                 "check_in_time": attendance.check_in_time.isoformat() if attendance and attendance.check_in_time else None,
                 "check_out_time": attendance.check_out_time.isoformat() if attendance and attendance.check_out_time else None,
                 "working_hours": working_hours
             })
+            days_data.append(day_data)
 
             current_day += timedelta(days=1)
 
-        # Calculate month totals
-        month_stats = month_orders.aggregate(
-            total_orders=Count('id'),
-            total_revenue=Sum('total_amount'),
-            total_paid=Sum('paid_amount')
-        )
+        # Calculate month totals from the day buckets
+        month_stats = [
+            stats for day, stats in stats_by_day.items()
+            if current_month_start <= day <= month_end
+        ]
+        month_revenue = sum(stats['total_revenue'] or 0 for stats in month_stats)
+        month_paid = sum(stats['total_paid'] or 0 for stats in month_stats)
 
         result.append({
             "year": year,
@@ -1385,26 +1324,16 @@ def get_staff_monthly_details(request, user_id: UUID, months: int = 12):
             "month_start": current_month_start.isoformat(),
             "month_end": month_end.isoformat(),
             "days": days_data,
-            "total_orders": month_stats['total_orders'] or 0,
-            "total_revenue": float(month_stats['total_revenue'] or 0),
-            "total_paid": float(month_stats['total_paid'] or 0),
-            "total_unpaid": float((month_stats['total_revenue'] or 0) - (month_stats['total_paid'] or 0)),
+            "total_orders": sum(stats['total_orders'] for stats in month_stats),
+            "total_revenue": float(month_revenue),
+            "total_paid": float(month_paid),
+            "total_unpaid": float(month_revenue - month_paid),
             "full_days": full_days,
             "half_days": half_days,
             "off_days": off_days,
             "total_working_days": total_working_days
         })
 
-        # Move to previous month
-        if current_month_start.month == 1:
-            current_month_start = current_month_start.replace(year=current_month_start.year - 1, month=12)
-        else:
-            current_month_start = current_month_start.replace(month=current_month_start.month - 1)
-
-        # Limit to requested number of months
-        if len(result) >= months:
-            break
-
     return result
 
 
@@ -1530,14 +1459,13 @@ def get_transaction_summary(request, date_from: Optional[str] = None, date_to: O
     """Get transaction summary statistics"""
     from django.db.models import Sum, Count
     from datetime import datetime, timedelta
-    from django.utils import timezone
+    from apps.business_day import business_today
 
     # Default to current month if no dates provided
     if not date_from:
-        now = timezone.now()
-        date_from = now.replace(day=1).date().isoformat()
+        date_from = business_today().replace(day=1).isoformat()
     if not date_to:
-        date_to = timezone.now().date().isoformat()
+        date_to = business_today().isoformat()
 
     try:
         from_date = datetime.fromisoformat(date_from).date()
@@ -1,6 +1,8 @@
 """
 Authentication Backend for JWT
 """
+import time
+
 from ninja.security import HttpBearer
 from django.contrib.auth import get_user_model
 from .jwt_utils import decode_access_token
@@ -11,6 +13,10 @@ User = get_user_model()
 class JWTAuth(HttpBearer):
     """
     JWT Authentication for Django Ninja
+
+    Tokens from create_user_access_token carry user_type, roles and the RBAC
+    version; while that version is current the request user is a TokenUser built
+    from the claims (no DB query). Older or stale tokens fall back to a DB lookup.
     """
     def authenticate(self, request, token: str):
         """
@@ -25,8 +31,26 @@ class JWTAuth(HttpBearer):
         if not user_id:
             return None
 
+        if self.claims_are_current(payload):
+            from .models import TokenUser
+            return TokenUser.from_claims(payload)
+
         try:
             user = User.objects.get(id=user_id, is_active=True)
             return user
         except User.DoesNotExist:
             return None
+
+    @staticmethod
+    def claims_are_current(payload: dict) -> bool:
+        """Token carries authorization claims issued at the current RBAC version"""
+        if "user_type" not in payload or "rbac_version" not in payload:
+            return False
+
+        # A role in the claims has expired since the token was issued
+        authz_expires_at = payload.get("authz_expires_at")
+        if authz_expires_at is not None and authz_expires_at <= time.time():
+            return False
+
+        from apps.rbac.authorization import AuthorizationCache
+        return payload["rbac_version"] == AuthorizationCache.version()
@@ -29,6 +29,37 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     return encoded_jwt
 
 
+def create_user_access_token(user, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create JWT access token carrying authorization claims
+
+    user_type, role slugs, highest role level and the RBAC version let JWTAuth
+    authenticate without a DB query while the version is still current and no
+    role has expired (authz_expires_at).
+    """
+    from apps.rbac.authorization import AuthorizationCache
+
+    # Read the version before the roles: a concurrent change makes the token stale, never wrong
+    rbac_version = AuthorizationCache.version()
+    authorization = AuthorizationCache.get(user)
+
+    return create_access_token(
+        data={
+            "user_id": str(user.id),
+            "email": user.email,
+            "user_type": user.user_type,
+            "is_superuser": user.is_superuser,
+            "roles": sorted(authorization['roles']),
+            "level": authorization['level'],
+            "rbac_version": rbac_version,
+            "authz_expires_at": (
+                int(authorization['expires_at'].timestamp()) if authorization['expires_at'] else None
+            ),
+        },
+        expires_delta=expires_delta
+    )
+
+
 def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Decode and validate JWT token
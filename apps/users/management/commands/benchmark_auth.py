@@ -0,0 +1,84 @@
+"""
+Management command to benchmark JWT authentication + authorization throughput
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.rbac.models import Permission, Role, RolePermission, UserRole
+from apps.rbac.permissions import require_any_permission, require_role
+from apps.users.authentication import JWTAuth
+from apps.users.jwt_utils import create_access_token, create_user_access_token
+from apps.users.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark authenticated requests per second: legacy token vs claims token (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Number of simulated requests per run')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self._seed()
+                self._run(user, options['requests'])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write('Benchmark data rolled back')
+
+    def _seed(self):
+        user = User.objects.create_user(email='benchmark-auth@benchmark.local', password='x', first_name='Bench')
+        role = Role.objects.create(name='Benchmark Auth', slug='benchmark-auth', level=40)
+        for action in ('view', 'update'):
+            permission = Permission.objects.create(
+                name=f'Benchmark {action}', codename=f'benchmark.{action}', module='benchmark', action=action
+            )
+            RolePermission.objects.create(role=role, permission=permission)
+        UserRole.objects.create(user=user, role=role)
+        return user
+
+    def _run(self, user, total):
+        auth = JWTAuth()
+        factory = RequestFactory()
+
+        # A typical protected endpoint: role check + permission check
+        @require_role('benchmark-auth')
+        @require_any_permission(['benchmark.delete', 'benchmark.update'])
+        def view(request):
+            return request.auth.id
+
+        tokens = {
+            'legacy token': create_access_token(data={"user_id": str(user.id), "email": user.email}),
+            'claims token': create_user_access_token(user),
+        }
+        results = {}
+        for label, token in tokens.items():
+            header = f'Bearer {token}'
+
+            def one_request():
+                request = factory.get('/api/benchmark', HTTP_AUTHORIZATION=header)
+                request.auth = auth(request)
+                assert view(request) == user.id
+
+            one_request()  # warm caches
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(total):
+                    one_request()
+                elapsed = time.perf_counter() - started
+            results[label] = total / elapsed
+            self.stdout.write(
+                f'{label:<14} {results[label]:9.0f} req/s {len(queries) / total:6.2f} queries/request'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Claims token speed-up x{results['claims token'] / results['legacy token']:.1f}"
+        ))
@@ -0,0 +1,87 @@
+"""
+Management command to benchmark the per-request overhead of RateLimitMiddleware
+"""
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from api.middleware import RateLimitMiddleware
+from apps.users.jwt_utils import create_access_token
+
+# Ngân sách overhead của rate limiter cho mỗi request (p99)
+BUDGET_MS = 1.0
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rate limiter overhead per request: in-process buckets and Redis (target p99 < 1 ms)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Number of simulated requests per run')
+        parser.add_argument('--clients', type=int, default=100, help='Number of distinct client IPs / users')
+        parser.add_argument(
+            '--redis-url', default=getattr(settings, 'RATE_LIMIT_REDIS_URL', None),
+            help='Redis used for the shared buckets (default: RATE_LIMIT_REDIS_URL)'
+        )
+
+    def handle(self, *args, **options):
+        total, clients = options['requests'], options['clients']
+        factory = RequestFactory()
+        requests = [
+            factory.get(
+                '/api/seafood/orders',
+                REMOTE_ADDR=f'10.0.{i // 256}.{i % 256}',
+                HTTP_AUTHORIZATION=f"Bearer {create_access_token({'user_id': str(uuid.uuid4())})}"
+            )
+            for i in range(clients)
+        ]
+
+        over_budget = False
+        for label, redis_url in (('in-process', None), ('redis', options['redis_url'])):
+            if label == 'redis' and not redis_url:
+                self.stdout.write('redis         skipped (no --redis-url / RATE_LIMIT_REDIS_URL)')
+                continue
+            middleware = self._middleware(redis_url, total)
+            timings = self._run(middleware, requests, total)
+            if middleware.limiter._redis_down:
+                label = 'redis (down)'
+            p50, p99 = statistics.median(timings), statistics.quantiles(timings, n=100)[98]
+            over_budget |= p99 >= BUDGET_MS
+            self.stdout.write(
+                f'{label:<13} {statistics.fmean(timings) * 1000:7.1f} us mean '
+                f'{p50 * 1000:7.1f} us p50 {p99 * 1000:7.1f} us p99 {1000 / statistics.fmean(timings):9.0f} req/s'
+            )
+
+        if over_budget:
+            self.stdout.write(self.style.ERROR(f'p99 overhead is over the {BUDGET_MS:g} ms budget'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'p99 overhead under the {BUDGET_MS:g} ms budget'))
+
+    @staticmethod
+    def _middleware(redis_url, total) -> RateLimitMiddleware:
+        # Giới hạn đủ lớn để mọi request đều qua: đo đường bình thường (IP + user bucket, giải mã JWT)
+        with override_settings(
+            RATE_LIMIT_ENABLED=True,
+            RATE_LIMIT_REDIS_URL=redis_url,
+            RATE_LIMIT_ROUTES=[('/api/', 'api')],
+            RATE_LIMITS={'api': {'ip': (total * 2, 60), 'user': (total * 2, 60)}},
+        ):
+            return RateLimitMiddleware(lambda request: None)
+
+    @staticmethod
+    def _run(middleware, requests, total) -> list:
+        """Milliseconds spent in process_request, one entry per request"""
+        for request in requests:
+            middleware.process_request(request)  # warm up (Redis connection, script load)
+
+        timings = []
+        for i in range(total):
+            request = requests[i % len(requests)]
+            started = time.perf_counter()
+            response = middleware.process_request(request)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response is None
+        return timings
@@ -0,0 +1,68 @@
+"""
+Management command to check the SQL query budget of every GET API route
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from api.querybudget import REPEAT_THRESHOLD, run_route_baseline
+from apps.users.jwt_utils import create_user_access_token
+from apps.users.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Call every GET route of the API against the current (seeded) data and fail if a route '
+        'does not answer 2xx, exceeds its query budget (api.querybudget.ROUTE_QUERY_BUDGETS) '
+        'or shows an N+1 pattern'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='User to authenticate as (default: first superuser)')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print the repeated statement shapes')
+
+    def handle(self, *args, **options):
+        from api.main import api
+
+        users = User.objects.filter(email=options['email']) if options['email'] else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to authenticate as; seed data first (seed_rbac, seed_all_data)')
+
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {create_user_access_token(user)}', raise_request_exception=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], RATE_LIMIT_ENABLED=False), transaction.atomic():
+                results = run_route_baseline(api, client)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        failed = 0
+        for result in results:
+            if result['skipped']:
+                self.stdout.write(f"  SKIP  {result['route']} ({result['skipped']})")
+                continue
+            if not result['ok']:
+                failed += 1
+            mark = '  ok  ' if result['ok'] else self.style.ERROR('  FAIL')
+            repeated = f" N+1 x{result['repeated'][0][1]}" if result['repeated'] else ''
+            problems = f" ({', '.join(result['problems'])})" if result['problems'] else ''
+            self.stdout.write(
+                f"{mark} {result['route']} [{result['status']}] "
+                f"{result['queries']}/{result['budget']} queries{repeated}{problems}"
+            )
+            if options['verbose_sql']:
+                for shape, times in result['repeated']:
+                    self.stdout.write(f'          x{times}: {shape[:200]}')
+
+        if failed:
+            raise CommandError(
+                f'{failed} route(s) failed: non-2xx status, over their query budget or '
+                f'repeating a statement {REPEAT_THRESHOLD}+ times'
+            )
+        self.stdout.write(self.style.SUCCESS('All routes within their query budgets'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_transaction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TokenUser",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("users.user",),
+        ),
+    ]
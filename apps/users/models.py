@@ -136,7 +136,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def roles(self):
-        """Return user's active roles"""
+        """Return user's active roles (dùng prefetch user_roles__role nếu đã có)"""
+        if 'user_roles' in getattr(self, '_prefetched_objects_cache', {}):
+            return [ur.role for ur in self.user_roles.all() if ur.is_active]
         return [ur.role for ur in self.user_roles.filter(is_active=True).select_related('role')]
 
     def get_roles(self):
@@ -147,25 +149,21 @@ class User(AbstractBaseUser, PermissionsMixin):
             is_active=True
         ).select_related('role')
 
+    def get_authorization(self) -> dict:
+        """Cached role slugs, permission codenames and highest level (see AuthorizationCache)"""
+        from apps.rbac.authorization import AuthorizationCache
+        return AuthorizationCache.get(self)
+
     def has_role(self, role_slug: str) -> bool:
         """Check if user has specific role"""
-        return self.user_roles.filter(
-            role__slug=role_slug,
-            is_active=True
-        ).exists()
+        return role_slug in self.get_authorization()['roles']
 
     def has_permission(self, permission_codename: str) -> bool:
         """Check if user has specific permission through any role"""
         if self.is_superuser:
             return True
 
-        from apps.rbac.models import Permission
-        return Permission.objects.filter(
-            roles__role_users__user=self,
-            roles__role_users__is_active=True,
-            codename=permission_codename,
-            is_active=True
-        ).exists()
+        return permission_codename in self.get_authorization()['permissions']
 
     def get_all_permissions(self):
         """Get all permissions from all user's roles"""
@@ -173,8 +171,9 @@ class User(AbstractBaseUser, PermissionsMixin):
             from apps.rbac.models import Permission
             return Permission.objects.filter(is_active=True)
 
-        from apps.rbac.models import Permission
+        from apps.rbac.models import Permission, UserRole
         return Permission.objects.filter(
+            UserRole.not_expired_q(prefix='roles__role_users__'),
             roles__role_users__user=self,
             roles__role_users__is_active=True,
             is_active=True
@@ -185,14 +184,62 @@ class User(AbstractBaseUser, PermissionsMixin):
         if self.is_superuser:
             return 100
 
-        from apps.rbac.models import Role
-        highest = Role.objects.filter(
-            role_users__user=self,
-            role_users__is_active=True,
-            is_active=True
-        ).order_by('-level').first()
+        return self.get_authorization()['level']
 
-        return highest.level if highest else 0
+
+class TokenUser(User):
+    """
+    Request user built from JWT claims (see JWTAuth)
+
+    Only id, email, user_type, is_superuser and is_active come from the token;
+    role checks use the role slugs / level claims, so authorization needs no DB
+    query. Any other field is deferred: the first access loads the whole row once.
+    Read-only: save() and delete() raise.
+    """
+    CLAIM_FIELDS = ('id', 'email', 'user_type', 'is_superuser', 'is_active')
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> 'TokenUser':
+        """Build a user instance (treated as loaded from DB) from decoded token claims"""
+        from django.db import router
+
+        values = {
+            'id': uuid.UUID(payload['user_id']),
+            'email': payload.get('email'),
+            'user_type': payload['user_type'],
+            'is_superuser': payload.get('is_superuser', False),
+            'is_active': True,
+        }
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in values]
+        user = cls.from_db(router.db_for_read(cls), field_names, [values[name] for name in field_names])
+        user.token_roles = frozenset(payload.get('roles', ()))
+        user.token_level = payload.get('level', 0)
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Accessing one deferred field loads every deferred field in one query
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+    def save(self, *args, **kwargs):
+        # Chỉ một phần trường lấy từ token (is_active luôn True): lưu sẽ ghi đè dữ liệu thật
+        raise NotImplementedError("TokenUser is read-only; load the user with User.objects.get() to modify it")
+
+    def delete(self, *args, **kwargs):
+        raise NotImplementedError("TokenUser is read-only; load the user with User.objects.get() to delete it")
+
+    def has_role(self, role_slug: str) -> bool:
+        return role_slug in self.token_roles
+
+    def get_highest_role_level(self) -> int:
+        if self.is_superuser:
+            return 100
+        return self.token_level
 
 
 class Attendance(models.Model):
@@ -268,6 +315,16 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.user.full_name} - {self.date} ({self.get_attendance_type_display()})"
 
+    @property
+    def working_hours(self) -> float:
+        """Số giờ làm tính từ giờ vào/ra (0 nếu thiếu một trong hai)"""
+        if not (self.check_in_time and self.check_out_time):
+            return 0
+        from datetime import datetime
+        check_in = datetime.combine(self.date, self.check_in_time)
+        check_out = datetime.combine(self.date, self.check_out_time)
+        return round((check_out - check_in).total_seconds() / 3600, 2)
+
 
 class Transaction(models.Model):
     """
@@ -72,12 +72,15 @@ class UserService:
     def list_users(
         department_id: Optional[UUID] = None,
         is_active: bool = True,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        include_descendants: bool = False
     ) -> List[User]:
-        """List users with filters"""
+        """List users with filters (include_descendants: also members of sub-departments)"""
         queryset = User.objects.filter(is_active=is_active).select_related('department').prefetch_related('user_roles__role')
 
-        if department_id:
+        if department_id and include_descendants:
+            queryset = queryset.filter(department__ancestor_links__ancestor_id=department_id)
+        elif department_id:
             queryset = queryset.filter(department_id=department_id)
 
         if search:
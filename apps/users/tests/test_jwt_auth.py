@@ -0,0 +1,133 @@
+"""
+JWT authentication: tokens whose authorization claims are current give a
+DB-free TokenUser; a version bump or an expired role sends the request back
+to the DB, and a TokenUser can never be written
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.querybudget import QueryRecorder
+from apps.rbac.authorization import AuthorizationCache
+from apps.rbac.models import Role, UserRole
+from apps.users.authentication import JWTAuth
+from apps.users.jwt_utils import create_access_token, create_user_access_token, decode_access_token
+from apps.users.models import TokenUser, User
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """with committed(): ... chạy các callback on_commit như khi transaction commit"""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user(roles=['sale'], first_name='An', phone='0901234567')
+
+
+def authenticate(token):
+    with QueryRecorder() as recorder:
+        user = JWTAuth().authenticate(None, token)
+    return user, recorder.count
+
+
+@pytest.mark.django_db
+def test_token_claims(seller):
+    Role.objects.filter(slug='sale').update(level=30)
+    AuthorizationCache.forget(seller)
+    expires_at = timezone.now() + timedelta(hours=2)
+    UserRole.objects.create(user=seller, role=Role.objects.create(name='Kho', slug='kho'), expires_at=expires_at)
+
+    payload = decode_access_token(create_user_access_token(seller))
+
+    assert payload['user_id'] == str(seller.id)
+    assert payload['email'] == seller.email
+    assert payload['user_type'] == seller.user_type
+    assert payload['is_superuser'] is False
+    assert payload['roles'] == ['kho', 'sale']
+    assert payload['level'] == 30
+    assert payload['rbac_version'] == AuthorizationCache.version()
+    assert payload['authz_expires_at'] == int(expires_at.timestamp())
+
+
+@pytest.mark.django_db
+def test_current_token_needs_no_query(seller):
+    token = create_user_access_token(seller)
+
+    user, queries = authenticate(token)
+
+    assert queries == 0
+    assert type(user) is TokenUser
+    assert user.pk == seller.pk and user.has_role('sale') and not user.has_role('kho')
+
+
+@pytest.mark.django_db
+def test_token_user_loads_other_fields_once(seller):
+    user, _ = authenticate(create_user_access_token(seller))
+
+    with QueryRecorder() as recorder:
+        assert (user.first_name, user.phone) == ('An', '0901234567')
+
+    assert recorder.count == 1
+
+
+@pytest.mark.django_db
+def test_token_issued_before_version_bump_is_reloaded(seller, committed):
+    token = create_user_access_token(seller)
+    with committed():
+        UserRole.objects.create(user=seller, role=Role.objects.create(name='Kho', slug='kho'))
+
+    user, queries = authenticate(token)
+
+    assert type(user) is User
+    assert queries == 1
+    assert user.has_role('kho')
+
+
+@pytest.mark.django_db
+def test_token_issued_before_role_expiry_is_reloaded(seller, mocker):
+    UserRole.objects.create(
+        user=seller, role=Role.objects.create(name='Kho', slug='kho'),
+        expires_at=timezone.now() + timedelta(minutes=5)
+    )
+    token = create_user_access_token(seller)
+    expired = decode_access_token(token)['authz_expires_at']
+    assert type(authenticate(token)[0]) is TokenUser
+
+    mocker.patch('apps.users.authentication.time', **{'time.return_value': expired})
+    user, _ = authenticate(token)
+
+    assert type(user) is User
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(seller, committed):
+    token = create_user_access_token(seller)
+    with committed():
+        seller.is_active = False
+        seller.save()
+
+    assert authenticate(token)[0] is None
+
+
+@pytest.mark.django_db
+def test_token_without_claims_uses_db(seller):
+    user, queries = authenticate(create_access_token({'user_id': str(seller.id), 'email': seller.email}))
+
+    assert type(user) is User
+    assert queries == 1
+
+
+@pytest.mark.django_db
+def test_token_user_cannot_be_saved_or_deleted(seller):
+    User.objects.filter(pk=seller.pk).update(is_active=False)
+    user = TokenUser.from_claims(decode_access_token(create_user_access_token(seller)))
+
+    with pytest.raises(NotImplementedError):
+        user.save()
+    with pytest.raises(NotImplementedError):
+        user.delete()
+
+    assert User.objects.filter(pk=seller.pk, is_active=False).exists()
@@ -0,0 +1,85 @@
+"""
+Staff weekly/monthly detail endpoints: one grouped pass per window,
+so the statement count must not grow with the number of days or orders.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from api.querybudget import QueryRecorder
+from apps.business_day import business_today, business_tz
+from apps.users import api
+
+
+def count_queries(call):
+    with QueryRecorder() as recorder:
+        call()
+    return recorder.count
+
+
+def seed_orders(make_order, user, days, per_day):
+    today = business_today()
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        for slot in range(per_day):
+            created_at = datetime.combine(day, time(8 + slot % 10, 30), tzinfo=business_tz())
+            make_order(user, total=100_000 + slot, created_at=created_at)
+
+
+@pytest.fixture
+def staff(make_user):
+    from django.utils import timezone
+
+    return make_user(first_name='Sale', date_joined=timezone.now() - timedelta(days=800))
+
+
+@pytest.mark.django_db
+def test_weekly_details_query_count_is_flat(staff, make_order, query_budget):
+    seed_orders(make_order, staff, days=3, per_day=1)
+    small = [count_queries(lambda: api.get_staff_weekly_details(None, staff.id, weeks)) for weeks in (1, 4, 52)]
+
+    seed_orders(make_order, staff, days=60, per_day=4)
+    with query_budget(2, label='weekly-details'):
+        result = api.get_staff_weekly_details(None, staff.id, 52)
+    large = [count_queries(lambda: api.get_staff_weekly_details(None, staff.id, weeks)) for weeks in (1, 4, 52)]
+
+    assert small == large == [2, 2, 2]
+    assert len(result) == 52
+    assert sum(week['total_orders'] for week in result) > 0
+
+
+@pytest.mark.django_db
+def test_weekly_details_all_staff(staff, make_user, make_order):
+    other = make_user()
+    seed_orders(make_order, staff, days=10, per_day=2)
+    seed_orders(make_order, other, days=10, per_day=2)
+
+    assert count_queries(lambda: api.get_staff_weekly_details(None, None, 8)) == 2
+    assert api.get_staff_weekly_details(None, None, 0) == []
+
+
+@pytest.mark.django_db
+def test_weekly_details_days_carry_their_orders(staff, make_order):
+    seed_orders(make_order, staff, days=1, per_day=3)
+
+    week = api.get_staff_weekly_details(None, staff.id, 1)[0]
+    today = next(day for day in week['days'] if day['date'] == business_today().isoformat())
+
+    assert today['total_orders'] == week['total_orders'] == 3
+    assert len(today['orders']) == 3
+    assert today['total_revenue'] == 300_003.0
+
+
+@pytest.mark.django_db
+def test_monthly_details_query_count_is_flat(staff, make_order, query_budget):
+    seed_orders(make_order, staff, days=5, per_day=1)
+    small = [count_queries(lambda: api.get_staff_monthly_details(None, staff.id, months)) for months in (1, 3, 24)]
+
+    seed_orders(make_order, staff, days=200, per_day=2)
+    with query_budget(4, label='monthly-details'):
+        result = api.get_staff_monthly_details(None, staff.id, 24)
+    large = [count_queries(lambda: api.get_staff_monthly_details(None, staff.id, months)) for months in (1, 3, 24)]
+
+    # user + bucketed totals + order listing + attendance
+    assert small == large == [4, 4, 4]
+    assert len(result) == 24
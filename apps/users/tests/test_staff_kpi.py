@@ -0,0 +1,145 @@
+"""
+Staff KPI totals: orders are attributed through every staff role column,
+once per user, and all staff are summarised in a fixed number of queries.
+"""
+import io
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from api.querybudget import QueryRecorder
+from apps.business_day import business_today, business_tz, day_range, day_start, month_range, week_start
+from apps.seafood.repositories import OrderRepository
+from apps.users import api
+
+
+def previous_month():
+    first = business_today().replace(day=1) - timedelta(days=1)
+    return first.year, first.month
+
+
+@pytest.fixture
+def staff(make_user, make_order):
+    seller = make_user(first_name='Sale', roles=['sale'])
+    helper = make_user(first_name='Sale 2', roles=['sale'])
+    warehouse = make_user(first_name='Kho', roles=['warehouse'])
+    make_user(email='customer@example.com', user_type='customer')
+
+    # Hôm nay: seller vừa tạo vừa là sale của đơn 1 -> chỉ tính một lần
+    make_order(seller, total=100_000, paid_amount=Decimal('40000'), sale_user=seller)
+    make_order(seller, total=200_000, status='pending', sale_user=helper, weighed_by=warehouse)
+
+    # Tháng trước
+    year, month = previous_month()
+    last_month = datetime.combine(datetime(year, month, 15).date(), time(12), tzinfo=business_tz())
+    make_order(helper, total=300_000, created_at=last_month, shipped_by=warehouse)
+    make_order(helper, total=50_000, created_at=last_month, status='cancelled')
+
+    return {'seller': seller, 'helper': helper, 'warehouse': warehouse}
+
+
+def kpi_totals(year=None, month=None):
+    today = business_today()
+    return OrderRepository().get_staff_kpi_totals(
+        today_range=day_range(today),
+        week_start=day_start(week_start(today)),
+        month_range=month_range(year or today.year, month or today.month),
+    )
+
+
+@pytest.mark.django_db
+def test_kpi_totals_current_month(staff):
+    totals = kpi_totals()
+
+    assert totals[staff['seller'].id] == {
+        'today_revenue': Decimal('300000'),
+        'today_paid': Decimal('40000'),
+        'week_revenue': Decimal('300000'),
+        'month_revenue': Decimal('300000'),
+        'month_orders': 2,
+        'month_completed': 1,
+    }
+    assert totals[staff['helper'].id]['today_revenue'] == Decimal('200000')
+    assert totals[staff['helper'].id]['month_orders'] == 1
+    assert totals[staff['helper'].id]['month_completed'] == 0
+    assert totals[staff['warehouse'].id]['week_revenue'] == Decimal('200000')
+
+
+@pytest.mark.django_db
+def test_kpi_totals_selected_month(staff):
+    totals = kpi_totals(*previous_month())
+
+    assert totals[staff['helper'].id]['month_revenue'] == Decimal('350000')
+    assert totals[staff['helper'].id]['month_orders'] == 2
+    assert totals[staff['helper'].id]['month_completed'] == 1
+    assert totals[staff['warehouse'].id]['month_revenue'] == Decimal('300000')
+    assert totals[staff['seller'].id]['month_revenue'] == Decimal('0')
+    # Doanh số hôm nay không phụ thuộc tháng được chọn
+    assert totals[staff['seller'].id]['today_revenue'] == Decimal('300000')
+
+
+@pytest.mark.django_db
+def test_all_staff_kpi_summary(staff):
+    year, month = previous_month()
+    rows = {row['user_email']: row for row in api.get_all_staff_kpi_summary(None, year, month)}
+
+    assert 'customer@example.com' not in rows
+    helper = rows[staff['helper'].email]
+    assert helper['month_revenue'] == 350_000.0
+    assert helper['service_efficiency'] == 50.0
+    assert (helper['selected_year'], helper['selected_month']) == (year, month)
+    seller = rows[staff['seller'].email]
+    assert seller['today_revenue'] == 300_000.0
+    assert seller['today_paid'] == 40_000.0
+    assert seller['month_revenue'] == 0.0
+    assert list(rows)[0] == staff['helper'].email
+
+
+@pytest.mark.django_db
+def test_all_staff_kpi_summary_query_count_ignores_staff_count(staff, make_user, make_order, query_budget):
+    with QueryRecorder() as few:
+        api.get_all_staff_kpi_summary(None)
+
+    for index in range(15):
+        user = make_user(roles=['sale'])
+        make_order(user, total=10_000 + index, sale_user=staff['seller'], delivered_by=user)
+
+    with query_budget(2, label='all-kpi-summary'):
+        rows = api.get_all_staff_kpi_summary(None)
+
+    assert few.count == 2
+    assert len(rows) == 18
+
+
+def on_day(day, hour=10):
+    return datetime.combine(day, time(hour), tzinfo=business_tz())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('today, earlier_this_year', [
+    (date(2025, 3, 1), date(2025, 2, 10)),   # ngày 1 của tháng: today == month start
+    (date(2025, 1, 1), None),                # 1-1: today == month start == year start
+])
+def test_staff_kpi_stats_on_period_boundaries(make_user, make_order, mocker, today, earlier_this_year):
+    from django.core.management import call_command
+
+    seller = make_user(roles=['sale'])
+    make_order(seller, total=120_000, created_at=on_day(today))
+    make_order(seller, total=80_000, created_at=on_day(today, hour=15))
+    make_order(seller, total=999_000, created_at=on_day(today - timedelta(days=400)))
+    make_order(seller, total=70_000, created_at=on_day(today), status='cancelled')
+    if earlier_this_year:
+        make_order(seller, total=500_000, created_at=on_day(earlier_this_year))
+    call_command('rebuild_sales_facts', date_to=today, stdout=io.StringIO())
+    mocker.patch('apps.business_day.business_today', return_value=today)
+
+    stats = api.get_staff_kpi_stats(None, seller.id)
+
+    assert stats['today'] == {'orders': 2, 'revenue': 200_000.0, 'items_sold': 2}
+    assert stats['month']['orders'] == 2
+    assert stats['month']['revenue'] == 200_000.0
+    assert stats['month']['completion_rate'] == 0.2
+    year_orders = 3 if earlier_this_year else 2
+    assert stats['year']['orders'] == year_orders
+    assert stats['year']['revenue'] == (700_000.0 if earlier_this_year else 200_000.0)
@@ -0,0 +1,15 @@
+"""
+Endpoint micro-benchmarks
+
+Seeds a reproducible dataset (benchmarks/dataset.py) into a dedicated
+database per scale, calls the hot endpoints (benchmarks/scenarios.py) through
+the Django test client and writes latency percentiles, SQL query counts and
+allocated memory as JSON under benchmarks/results/.
+
+    python -m benchmarks.run --scale 1k                 # Postgres from POSTGRES_* env
+    python -m benchmarks.run --scale 100k --iterations 50 --only list_orders
+    python -m benchmarks.compare results/base.json results/head.json --threshold 10
+
+The database for a scale ("<POSTGRES_DB>_bench_<scale>") is created and
+migrated on first use and kept between runs; the dataset is seeded once.
+"""
@@ -0,0 +1,77 @@
+"""
+Compare two benchmark result files
+
+    python -m benchmarks.compare results/1k-base.json results/1k-head.json [--threshold 10]
+
+Prints latency / query / memory changes per scenario. With --threshold the
+exit status is 1 when a scenario's latency (--metric, default p50) grew by
+more than that percentage or its query count went up.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _change(before, after) -> str:
+    if before in (None, 0) or after is None:
+        return ''
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def compare(base: dict, head: dict, metric: str = 'p50', threshold=None) -> tuple:
+    """Returns (lines, regressions)"""
+    lines, regressions = [], []
+    for label, key in (('scale', 'scale'), ('anchor', 'anchor'), ('database', 'database'), ('commit', 'commit')):
+        lines.append(f"{label:10} {base['meta'].get(key)} -> {head['meta'].get(key)}")
+    if base['meta'].get('scale') != head['meta'].get('scale'):
+        lines.append('warning: results were taken at different scales')
+    if base['meta'].get('anchor') != head['meta'].get('anchor'):
+        lines.append('warning: results were taken on datasets with different anchor dates')
+
+    lines.append(f"\n{'scenario':20} {metric + ' ms':>22} {'change':>8} {'queries':>10} {'peak KiB':>20}")
+    names = sorted(set(base['scenarios']) | set(head['scenarios']))
+    for name in names:
+        before, after = base['scenarios'].get(name), head['scenarios'].get(name)
+        if before is None or after is None:
+            lines.append(f"{name:20} {'only in ' + ('head' if before is None else 'base')}")
+            continue
+        latency_before, latency_after = before['latency_ms'][metric], after['latency_ms'][metric]
+        queries_before, queries_after = before['queries']['max'], after['queries']['max']
+        memory_before = before.get('memory_kib', {}).get('peak')
+        memory_after = after.get('memory_kib', {}).get('peak')
+        change = _change(latency_before, latency_after)
+        lines.append(
+            f"{name:20} {latency_before:10.2f} -> {latency_after:8.2f} {change:>8} "
+            f"{queries_before:4} -> {queries_after:<4} {memory_before or '-':>8} -> {memory_after or '-':<8}"
+        )
+        if threshold is not None:
+            if latency_before and (latency_after - latency_before) / latency_before * 100 > threshold:
+                regressions.append(f'{name}: {metric} {change}')
+            if queries_after > queries_before:
+                regressions.append(f'{name}: queries {queries_before} -> {queries_after}')
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--metric', default='p50', help='Latency statistic to compare (p50, p90, p95, p99, mean)')
+    parser.add_argument('--threshold', type=float, help='Fail if latency grows by more than this percentage')
+    args = parser.parse_args(argv)
+
+    lines, regressions = compare(_load(args.base), _load(args.head), args.metric, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print('\nRegressions:\n  ' + '\n  '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
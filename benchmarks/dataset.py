@@ -0,0 +1,74 @@
+"""
+Reproducible benchmark dataset
+
+Generated by `manage.py generate_load_data` with the BENCH prefix: the same
+seed, scale and anchor date always produce the same rows, and the last order
+code doubles as the "already seeded" marker. The anchor (last day of the
+data) is pinned so a dataset seeded today matches one seeded next month;
+changing it needs --recreate.
+"""
+from datetime import date
+from typing import Dict, Optional, TextIO
+
+from django.core.management import call_command
+from django.db.models import Max, Min
+
+from apps.seafood.management.commands import generate_load_data
+from apps.seafood.models import Order, OrderItem, Seafood
+from apps.users.models import User
+
+SCALES: Dict[str, int] = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+DEFAULT_SEED = 20240601
+DEFAULT_ANCHOR = date(2025, 6, 30)
+PREFIX = 'BENCH'
+ADMIN_EMAIL = generate_load_data.admin_email(PREFIX)
+
+
+def order_code(seed: int, index: int) -> str:
+    return generate_load_data.order_code(PREFIX, seed, index)
+
+
+def is_seeded(n_orders: int, seed: int = DEFAULT_SEED) -> bool:
+    return Order.objects.filter(order_code=order_code(seed, n_orders - 1)).exists()
+
+
+def describe() -> dict:
+    """Row counts and order date range of the current database"""
+    span = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    return {
+        'orders': Order.objects.count(),
+        'order_items': OrderItem.objects.count(),
+        'products': Seafood.objects.count(),
+        'users': User.objects.count(),
+        'first_order_at': span['first'].isoformat() if span['first'] else None,
+        'last_order_at': span['last'].isoformat() if span['last'] else None,
+    }
+
+
+def seed(
+    n_orders: int,
+    seed: int = DEFAULT_SEED,
+    workers: int = 1,
+    stdout: Optional[TextIO] = None,
+    anchor: date = DEFAULT_ANCHOR,
+) -> bool:
+    """
+    Seed n_orders orders (plus staff, products, batches, attendance, transactions) unless already there
+
+    Returns: True if data was written, False if the dataset already existed
+    """
+    if is_seeded(n_orders, seed):
+        return False
+    if User.objects.filter(email=ADMIN_EMAIL).exists():
+        raise RuntimeError(
+            'Database holds a partial or different benchmark dataset; rerun with --recreate'
+        )
+    call_command(
+        'generate_load_data', orders=n_orders, seed=seed, prefix=PREFIX, workers=workers, anchor=anchor,
+        stdout=stdout
+    )
+    return True
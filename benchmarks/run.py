@@ -0,0 +1,220 @@
+"""
+Run the endpoint benchmarks
+
+    python -m benchmarks.run --scale 1k [--iterations 30] [--only get_order] [--recreate] [--anchor 2025-06-30]
+
+Uses DJANGO_SETTINGS_MODULE (default config.settings.development, i.e. the
+local Postgres from POSTGRES_*). Results go to
+benchmarks/results/<scale>-<commit>.json unless --output is given.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date
+from typing import List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nội suy tuyến tính trên danh sách đã sắp xếp"""
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies_ms: List[float]) -> dict:
+    ordered = sorted(latencies_ms)
+    summary = {f'p{pct}': round(percentile(ordered, pct), 3) for pct in PERCENTILES}
+    summary.update({
+        'min': round(ordered[0], 3),
+        'max': round(ordered[-1], 3),
+        'mean': round(statistics.fmean(ordered), 3),
+        'stdev': round(statistics.stdev(ordered), 3) if len(ordered) > 1 else 0.0,
+    })
+    return summary
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(
+            ['git', *args], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def benchmark_database_name(database: dict, scale: str) -> str:
+    if database['ENGINE'].endswith('sqlite3'):
+        return os.path.join(BENCH_DIR, '.data', f'bench_{scale}.sqlite3')
+    return f"{database['NAME']}_bench_{scale}"
+
+
+def measure(scenario, client, context: dict, iterations: int, warmup: int, memory_iterations: int) -> dict:
+    from api.querybudget import QueryRecorder
+
+    for iteration in range(warmup):
+        scenario.prepare()
+        scenario.call(client, context, iteration)
+
+    latencies, queries, statuses = [], [], Counter()
+    for iteration in range(iterations):
+        scenario.prepare()
+        with QueryRecorder() as recorder:
+            start = time.perf_counter()
+            response = scenario.call(client, context, iteration)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+        statuses[str(response.status_code)] += 1
+
+    # tracemalloc làm chậm mọi lần cấp phát nên đo bộ nhớ ở vòng riêng
+    peaks, retained = [], []
+    for iteration in range(memory_iterations):
+        scenario.prepare()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            response = scenario.call(client, context, iteration)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del response
+        peaks.append(peak - before)
+        retained.append(after - before)
+
+    result = {
+        'method': scenario.method,
+        'status': dict(statuses),
+        'latency_ms': summarize(latencies),
+        'queries': {'min': min(queries), 'median': statistics.median(queries), 'max': max(queries)},
+    }
+    if peaks:
+        result['memory_kib'] = {
+            'peak': round(max(peaks) / 1024, 1),
+            'retained': round(statistics.median(retained) / 1024, 1),
+        }
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the hot API endpoints against a seeded dataset')
+    parser.add_argument('--scale', default='1k', help='Dataset size: 1k, 100k, 1m')
+    parser.add_argument('--seed', type=int, default=None, help='Dataset seed')
+    parser.add_argument(
+        '--anchor', type=date.fromisoformat, default=None,
+        help='Last day of the dataset (YYYY-MM-DD, default: dataset.DEFAULT_ANCHOR); changing it needs --recreate'
+    )
+    parser.add_argument('--iterations', type=int, default=30, help='Timed calls per scenario')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed calls before measuring')
+    parser.add_argument('--memory-iterations', type=int, default=3, help='Calls under tracemalloc (0 = skip)')
+    parser.add_argument('--only', action='append', default=[], help='Scenario name (repeatable)')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<scale>-<commit>.json)')
+    parser.add_argument('--recreate', action='store_true', help='Drop and re-seed the benchmark database')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel processes when seeding (Postgres)')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+
+    from apps.users.jwt_utils import create_user_access_token
+    from apps.users.models import User
+
+    from . import dataset
+    from .scenarios import SCENARIOS, SCENARIOS_BY_NAME, build_context
+
+    if args.scale not in dataset.SCALES:
+        parser.error(f"--scale must be one of {', '.join(dataset.SCALES)}")
+    unknown = [name for name in args.only if name not in SCENARIOS_BY_NAME]
+    if unknown:
+        parser.error(f"unknown scenario(s) {', '.join(unknown)}; choose from {', '.join(SCENARIOS_BY_NAME)}")
+    n_orders = dataset.SCALES[args.scale]
+    seed = args.seed if args.seed is not None else dataset.DEFAULT_SEED
+    anchor = args.anchor or dataset.DEFAULT_ANCHOR
+    scenarios = [SCENARIOS_BY_NAME[name] for name in args.only] if args.only else SCENARIOS
+
+    # Database riêng cho mỗi scale: tạo + migrate lần đầu, giữ lại giữa các lần chạy
+    database = settings.DATABASES['default']
+    database['TEST'] = {**database.get('TEST', {}), 'NAME': benchmark_database_name(database, args.scale)}
+    os.makedirs(os.path.join(BENCH_DIR, '.data'), exist_ok=True)
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=not args.recreate)
+
+    started = time.perf_counter()
+    if dataset.seed(n_orders, seed, workers=args.workers, anchor=anchor):
+        print(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+    overrides = override_settings(
+        ALLOWED_HOSTS=['*'],
+        RATE_LIMIT_ENABLED=False,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        REQUEST_TIMING_SLOW_MS=10 ** 9,
+    )
+    results = {}
+    with overrides:
+        admin = User.objects.get(email=dataset.ADMIN_EMAIL)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {create_user_access_token(admin)}', raise_request_exception=False)
+        context = build_context(n_orders, seed, anchor)
+        for scenario in scenarios:
+            result = measure(scenario, client, context, args.iterations, args.warmup, args.memory_iterations)
+            results[scenario.name] = result
+            latency = result['latency_ms']
+            print(
+                f"{scenario.name:20} p50 {latency['p50']:9.2f} ms  p95 {latency['p95']:9.2f} ms  "
+                f"{result['queries']['max']:4} queries  status {result['status']}"
+            )
+
+    report = {
+        'meta': {
+            **git_revision(),
+            'scale': args.scale,
+            'orders': n_orders,
+            'seed': seed,
+            'anchor': anchor.isoformat(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset.describe(),
+        },
+        'scenarios': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{args.scale}-{(report['meta']['commit'] or 'unknown')[:10]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True, ensure_ascii=False)
+        handle.write('\n')
+    print(f'Results written to {output}')
+    return 1 if any(set(result['status']) - {'200', '201'} for result in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Benchmarked endpoints
+
+Each scenario issues one request per iteration through the Django test
+client. Scenarios that write (create_order, bulk_payroll) run inside a
+transaction that is rolled back after the on_commit callbacks have run, so
+every iteration sees the same data and still pays for the post-commit work
+(sales fact refresh, notifications).
+"""
+import random
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from apps.seafood.models import Order, Seafood
+
+from .dataset import order_code
+
+# Số đơn / sản phẩm lấy mẫu để các lần gọi không luôn trúng một dòng
+SAMPLE_SIZE = 200
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        path: Callable[[dict, int], str],
+        params: Optional[Callable[[dict, int], dict]] = None,
+        before: Optional[Callable[[], None]] = None,
+        writes: bool = False,
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.params = params
+        self.before = before
+        self.writes = writes
+
+    def prepare(self) -> None:
+        """Chạy trước mỗi lần gọi, ngoài phần đo thời gian"""
+        if self.before:
+            self.before()
+
+    def call(self, client, context: dict, iteration: int):
+        path = self.path(context, iteration)
+        params = self.params(context, iteration) if self.params else {}
+        if self.method == 'GET':
+            return client.get(path, params)
+        if not self.writes:
+            return client.post(path, params, content_type='application/json')
+
+        response = None
+        try:
+            with transaction.atomic():
+                with TestCase.captureOnCommitCallbacks() as callbacks:
+                    response = client.post(path, params, content_type='application/json')
+                # Request lỗi thì transaction đã hỏng, không chạy callback được
+                if response.status_code < 400:
+                    for callback in callbacks:
+                        callback()
+                raise _Rollback
+        except _Rollback:
+            pass
+        return response
+
+
+def build_context(n_orders: int, seed: int, anchor: date) -> dict:
+    """Ids sampled deterministically from the seeded dataset; year/month are the anchor's"""
+    rnd = random.Random(seed + 1)
+    codes = [order_code(seed, rnd.randrange(n_orders)) for _ in range(SAMPLE_SIZE)]
+    ids_by_code = dict(Order.objects.filter(order_code__in=codes).values_list('order_code', 'id'))
+    products = list(Seafood.objects.order_by('code').values('id', 'current_price')[:SAMPLE_SIZE])
+    return {
+        'order_ids': [str(ids_by_code[code]) for code in codes if code in ids_by_code],
+        'products': [{'id': str(row['id']), 'price': int(row['current_price'])} for row in products],
+        'year': anchor.year,
+        'month': anchor.month,
+    }
+
+
+def _order_path(context: dict, iteration: int) -> str:
+    order_ids = context['order_ids']
+    return f'/api/seafood/orders/{order_ids[iteration % len(order_ids)]}'
+
+
+def _order_payload(context: dict, iteration: int) -> dict:
+    products = context['products']
+    items = []
+    for offset in range(3):
+        product = products[(iteration * 3 + offset) % len(products)]
+        items.append({
+            'seafood_id': product['id'], 'unit_price': product['price'],
+            'weight': '1.25', 'estimated_weight_range': '',
+        })
+    return {
+        'customer_name': 'Khách benchmark',
+        'customer_phone': f'08{iteration:08d}',
+        'payment_method': 'cash',
+        'items': items,
+    }
+
+
+def _month(context: dict, iteration: int) -> dict:
+    return {'year': context['year'], 'month': context['month']}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario('list_orders', 'GET', lambda context, i: '/api/seafood/orders', lambda context, i: {'limit': 50}),
+    Scenario('get_order', 'GET', _order_path),
+    Scenario('create_order', 'POST', lambda context, i: '/api/seafood/orders', _order_payload, writes=True),
+    # Cache rỗng mỗi lần: đo thời gian tính lại, không phải lần đọc cache
+    Scenario('dashboard_stats', 'GET', lambda context, i: '/api/seafood/stats/dashboard', before=lambda: cache.clear()),
+    Scenario('staff_kpi_summary', 'GET', lambda context, i: '/api/users/staff/all-kpi-summary', _month),
+    Scenario('bulk_payroll', 'POST', lambda context, i: '/api/payroll/calculate-bulk', _month, writes=True),
+]
+
+SCENARIOS_BY_NAME: Dict[str, Scenario] = {scenario.name: scenario for scenario in SCENARIOS}
@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration
+
+    gunicorn config.wsgi -c config/gunicorn.conf.py
+
+Turns on prometheus_client multi-process mode so /api/metrics reports the
+samples of every worker, whichever worker serves the scrape.
+"""
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+# Phải có trước khi worker import prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/operis_prometheus')
+
+
+def on_starting(server):
+    # Xóa số liệu của lần chạy trước
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
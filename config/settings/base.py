@@ -48,10 +48,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.middleware.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -124,6 +126,9 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# Múi giờ kinh doanh của cửa hàng - dùng để chia ngày/tuần/tháng cho báo cáo
+BUSINESS_TIME_ZONE = os.getenv('BUSINESS_TIME_ZONE', 'Asia/Ho_Chi_Minh')
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -189,6 +194,50 @@ CACHES = {
     }
 }
 
+# SePay / VietQR
+SEPAY_BASE_URL = os.getenv('SEPAY_BASE_URL', 'https://api.sepay.vn')
+SEPAY_API_KEY = os.getenv('SEPAY_API_KEY', '')
+SEPAY_ACCOUNT_NUMBER = os.getenv('SEPAY_ACCOUNT_NUMBER', '1160976779')
+SEPAY_ACCOUNT_NAME = os.getenv('SEPAY_ACCOUNT_NAME', 'TO TRONG HIEU')
+SEPAY_BANK_CODE = os.getenv('SEPAY_BANK_CODE', 'BIDV')
+# 'local' = tạo QR VietQR tại chỗ (không cần mạng); 'remote' = gọi SePay API (cần SEPAY_API_KEY)
+SEPAY_QR_MODE = os.getenv('SEPAY_QR_MODE', 'local')
+
+# Rate limiting (token bucket trong Redis, fallback trong process khi Redis lỗi)
+RATE_LIMIT_ENABLED = _env_bool('RATE_LIMIT_ENABLED', 'True')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/1'))
+# Số reverse proxy tin cậy phía trước (0 = dùng REMOTE_ADDR, bỏ qua X-Forwarded-For)
+RATE_LIMIT_TRUSTED_PROXY_COUNT = int(os.getenv('RATE_LIMIT_TRUSTED_PROXY_COUNT', '0'))
+# (tiền tố path, nhóm route) - khớp tiền tố đầu tiên; path không khớp thì không giới hạn
+RATE_LIMIT_ROUTES = [
+    ('/api/users/login', 'auth'),
+    ('/api/users/register', 'auth'),
+    ('/api/users/customer/login', 'auth'),
+    ('/api/users/customer/register', 'auth'),
+    ('/api/seafood/sepay/webhook', 'webhook'),
+    ('/api/users/staff/', 'reports'),
+    ('/api/', 'api'),
+]
+# nhóm route -> {'ip' | 'user': (số request, chu kỳ tính bằng giây)}
+RATE_LIMITS = {
+    'auth': {'ip': (10, 60)},
+    'webhook': {'ip': (120, 60)},
+    'reports': {'ip': (30, 60), 'user': (60, 60)},
+    'api': {'ip': (600, 60), 'user': (1200, 60)},
+}
+
+# Đo thời gian request (số query / thời gian DB, header Server-Timing, log request chậm)
+REQUEST_TIMING_ENABLED = _env_bool('REQUEST_TIMING_ENABLED', 'True')
+REQUEST_TIMING_HEADER = _env_bool('REQUEST_TIMING_HEADER', 'True')
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', '500'))
+REQUEST_TIMING_TOP_QUERIES = int(os.getenv('REQUEST_TIMING_TOP_QUERIES', '5'))
+
+# Prometheus metrics tại /api/metrics (gunicorn: đặt PROMETHEUS_MULTIPROC_DIR, xem config/gunicorn.conf.py)
+METRICS_ENABLED = _env_bool('METRICS_ENABLED', 'True')
+# Nếu đặt: /api/metrics yêu cầu header "Authorization: Bearer <METRICS_TOKEN>".
+# Không đặt: endpoint chỉ mở khi DEBUG, ngược lại trả 404
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -202,12 +251,21 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        # Một dòng JSON / request chậm, để đưa thẳng vào hệ thống log
+        'json_line': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'slow_requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json_line',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -219,5 +277,10 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        'api.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
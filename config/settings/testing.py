@@ -13,6 +13,16 @@ DATABASES = {
     }
 }
 
+# Local memory cache instead of Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# No rate limiting in tests
+RATE_LIMIT_ENABLED = False
+
 # Disable migrations for faster tests
 class DisableMigrations:
     def __contains__(self, item):
@@ -0,0 +1,70 @@
+"""
+Shared pytest fixtures (config.settings.testing: in-memory SQLite, locmem cache)
+"""
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    """make_user(email=None, roles=(), **fields) -> User, roles given by slug"""
+    from apps.rbac.models import Role, UserRole
+    from apps.users.models import User
+
+    counter = iter(range(1, 10_000))
+
+    def make(email=None, roles=(), **fields):
+        user = User.objects.create_user(email=email or f'user{next(counter)}@example.com', password='x', **fields)
+        for slug in roles:
+            role, _ = Role.objects.get_or_create(slug=slug, defaults={'name': slug.title()})
+            UserRole.objects.create(user=user, role=role)
+        return user
+
+    return make
+
+
+@pytest.fixture
+def product(db):
+    from apps.seafood.models import Seafood, SeafoodCategory
+
+    category = SeafoodCategory.objects.create(name='Tôm', slug='tom')
+    return Seafood.objects.create(
+        code='P1', name='Tôm sú', category=category, current_price=Decimal('200000'), stock_quantity=Decimal('50')
+    )
+
+
+@pytest.fixture
+def make_order(db, product):
+    """
+    make_order(created_by, total=100000, created_at=None, status='completed', **fields) -> Order
+
+    One weighed item of `product`; created_at is written after the insert
+    (the column is auto_now_add).
+    """
+    from apps.seafood.models import Order, OrderItem
+
+    counter = iter(range(1, 100_000))
+
+    def make(created_by, total=100_000, created_at=None, status='completed', **fields):
+        total = Decimal(total)
+        order = Order.objects.create(
+            order_code=f'T-{next(counter):05d}', customer_phone='0900000000', subtotal=total,
+            total_amount=total, status=status, created_by=created_by, **fields
+        )
+        OrderItem.objects.create(order=order, seafood=product, weight=Decimal('1'), unit_price=total)
+        if created_at is not None:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            order.created_at = created_at
+        return order
+
+    return make
@@ -0,0 +1,55 @@
+"""
+/api/metrics: bearer METRICS_TOKEN required; without a token the endpoint only
+exists in DEBUG
+"""
+import pytest
+
+METRICS_URL = '/api/metrics'
+
+
+@pytest.fixture
+def metrics_settings(settings):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_TOKEN = ''
+    settings.DEBUG = False
+    return settings
+
+
+def test_disabled_metrics_are_not_found(client, metrics_settings):
+    metrics_settings.METRICS_ENABLED = False
+    metrics_settings.METRICS_TOKEN = 'secret'
+
+    assert client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret').status_code == 404
+
+
+def test_without_token_hidden_outside_debug(client, metrics_settings):
+    assert client.get(METRICS_URL).status_code == 404
+
+
+def test_without_token_open_in_debug(client, metrics_settings):
+    metrics_settings.DEBUG = True
+
+    response = client.get(METRICS_URL)
+
+    assert response.status_code == 200
+    assert b'http_request_duration_seconds' in response.content
+
+
+@pytest.mark.parametrize('header', [None, 'Bearer wrong', 'secret', 'Bearer secret '])
+@pytest.mark.parametrize('debug', [False, True])
+def test_token_required_when_set(client, metrics_settings, header, debug):
+    metrics_settings.METRICS_TOKEN = 'secret'
+    metrics_settings.DEBUG = debug
+    headers = {'HTTP_AUTHORIZATION': header} if header else {}
+
+    assert client.get(METRICS_URL, **headers).status_code == 401
+
+
+def test_valid_token(client, metrics_settings):
+    metrics_settings.METRICS_TOKEN = 'secret'
+
+    response = client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    assert b'http_requests_total' in response.content
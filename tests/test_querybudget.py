@@ -0,0 +1,232 @@
+"""
+Query budgets: statement shapes, the pytest plugin and the GET route baseline
+"""
+import importlib.util
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from api.querybudget import (
+    ROUTE_EXPECTED_STATUS, QueryBudgetExceeded, QueryRecorder, assert_query_budget, run_route_baseline, sql_shape,
+)
+
+# Route cần thư viện tùy chọn chưa cài trong môi trường test
+OPTIONAL_DEPENDENCY_ROUTES = {
+    'reportlab': {
+        'GET /api/seafood/products/export-pdf',
+        'GET /api/seafood/orders/{order_id}/export-pdf',
+    },
+}
+
+
+def categories(count=0):
+    from apps.seafood.models import SeafoodCategory
+
+    for index in range(count):
+        SeafoodCategory.objects.create(name=f'Loại {index}', slug=f'loai-{index}')
+    return SeafoodCategory.objects.all()
+
+
+# ---------------------------------------------------------------------------
+# sql_shape
+# ---------------------------------------------------------------------------
+
+def test_sql_shape_collapses_parameter_lists():
+    one = sql_shape('SELECT * FROM "t" WHERE "t"."id" = %s AND "t"."x" IN (%s) LIMIT 21')
+    many = sql_shape('SELECT * FROM "t" WHERE "t"."id" = %s AND "t"."x" IN (%s, %s, %s) LIMIT 21')
+
+    assert one == many
+    assert sql_shape('SELECT * FROM t WHERE x IN (?, ?)') == 'SELECT * FROM t WHERE x IN (...)'
+
+
+def test_sql_shape_collapses_literals_and_values_rows():
+    assert sql_shape("SELECT 'abc', 12, -3.5 FROM t3 WHERE s = 'it''s'") == 'SELECT ?, ?, ? FROM t3 WHERE s = ?'
+    assert sql_shape('INSERT INTO t VALUES (%s, %s), (%s, %s), (%s, %s)') == sql_shape('INSERT INTO t VALUES (%s, %s)')
+
+
+def test_sql_shape_keeps_quoted_identifiers_with_digits():
+    assert sql_shape('SELECT "t1"."col2" FROM "t1"') == 'SELECT "t1"."col2" FROM "t1"'
+
+
+# ---------------------------------------------------------------------------
+# QueryRecorder / assert_query_budget
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_recorder_skips_savepoints():
+    from django.db import transaction
+
+    with QueryRecorder() as recorder:
+        with transaction.atomic():
+            list(categories())
+
+    assert recorder.count == 1
+    assert recorder.repeated() == []
+
+
+@pytest.mark.django_db
+def test_budget_flags_n_plus_one():
+    from apps.seafood.models import SeafoodCategory
+
+    categories(4)
+    with pytest.raises(QueryBudgetExceeded, match=r'N\+1'):
+        with assert_query_budget(label='loop'):
+            for category in SeafoodCategory.objects.all():
+                SeafoodCategory.objects.get(pk=category.pk)
+
+
+@pytest.mark.django_db
+def test_budget_flags_too_many_queries():
+    with pytest.raises(QueryBudgetExceeded, match='2 queries, budget 1'):
+        with assert_query_budget(1, repeat_threshold=None, label='twice'):
+            list(categories())
+            list(categories())
+
+
+# ---------------------------------------------------------------------------
+# pytest plugin: marker và fixtures
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(1)
+def test_marker_within_budget():
+    list(categories())
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(1, repeat_threshold=None)
+@pytest.mark.xfail(raises=QueryBudgetExceeded, strict=True, reason='marker enforces the budget')
+def test_marker_over_budget_fails():
+    list(categories())
+    list(categories())
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(repeat_threshold=2)
+@pytest.mark.xfail(raises=QueryBudgetExceeded, strict=True, reason='marker detects repeated shapes')
+def test_marker_repeated_shape_fails():
+    list(categories().filter(slug='a'))
+    list(categories().filter(slug='b'))
+
+
+@pytest.mark.django_db
+def test_query_budget_fixture(query_budget):
+    assert query_budget is assert_query_budget
+    with query_budget(1) as recorder:
+        list(categories())
+    assert recorder.count == 1
+
+
+@pytest.mark.django_db
+def test_query_recorder_fixture(query_recorder):
+    list(categories())
+    list(categories())
+
+    assert query_recorder.count == 2
+    assert query_recorder.repeated(threshold=2)[0][1] == 2
+
+
+# ---------------------------------------------------------------------------
+# Baseline trên dữ liệu seed
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def seeded(make_user, make_order, product):
+    """Một bản ghi cho mỗi tham số path của PATH_PARAM_SOURCES, vài đơn / chấm công / lương"""
+    from django.utils import timezone
+
+    from apps.payroll.models import SalaryConfiguration
+    from apps.payroll.services import BulkPayrollService
+    from apps.rbac.models import Department, Permission, Role, RolePermission
+    from apps.seafood.models import ImportBatch, ImportSource
+    from apps.seafood.services import SalesFactService
+    from apps.users.models import Attendance, Transaction
+
+    admin = make_user(
+        email='admin@example.com', first_name='Admin', is_staff=True, is_superuser=True,
+        date_joined=timezone.now() - timedelta(days=60),
+    )
+    sellers = [make_user(first_name=f'Sale {index}', roles=['salesperson']) for index in range(3)]
+    make_user(email='khach@example.com', user_type='customer')
+
+    role = Role.objects.get(slug='salesperson')
+    permission = Permission.objects.create(
+        name='Xem đơn hàng', codename='view_orders', module='orders', action='list'
+    )
+    RolePermission.objects.create(role=role, permission=permission)
+    SalaryConfiguration.objects.create(role=role, base_salary=Decimal('8000000'), enable_commission=True)
+    Department.objects.create(name='Kinh doanh', code='KD', manager=admin)
+
+    source = ImportSource.objects.create(name='Chợ Long Biên', source_type='market')
+    ImportBatch.objects.create(
+        seafood=product, batch_code='LB-001', import_source=source, import_price=Decimal('150000'),
+        sell_price=Decimal('200000'), total_weight=Decimal('50'), remaining_weight=Decimal('40'),
+    )
+
+    today = date.today()
+    for index in range(12):
+        seller = sellers[index % len(sellers)]
+        make_order(
+            seller, total=100_000 + index * 1_000, sale_user=seller, weighed_by=sellers[0],
+            status='completed' if index % 3 else 'pending',
+            created_at=timezone.now() - timedelta(days=index * 2),
+        )
+    Attendance.objects.bulk_create([
+        Attendance(user=seller, date=today - timedelta(days=offset), attendance_type='full')
+        for seller in sellers for offset in range(5)
+    ])
+    Transaction.objects.create(
+        transaction_type='income', category='sales', amount=Decimal('100000'), date=today, created_by=admin
+    )
+    SalesFactService.rebuild(today - timedelta(days=30), today)
+    BulkPayrollService(today.year, today.month).calculate(sellers)
+    return admin
+
+
+@pytest.mark.django_db
+def test_route_baseline_on_seeded_data(seeded, settings):
+    from django.test import Client
+
+    from api.main import api
+    from apps.users.jwt_utils import create_user_access_token
+
+    settings.ALLOWED_HOSTS = ['*']
+    settings.RATE_LIMIT_ENABLED = False
+    # Như môi trường dev của check_query_budgets: /api/metrics mở khi DEBUG và không có METRICS_TOKEN
+    settings.DEBUG = True
+    settings.METRICS_TOKEN = ''
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {create_user_access_token(seeded)}', raise_request_exception=False)
+
+    results = run_route_baseline(api, client)
+
+    unavailable = set().union(*(
+        routes for module, routes in OPTIONAL_DEPENDENCY_ROUTES.items() if importlib.util.find_spec(module) is None
+    ))
+    checked = [result for result in results if result['route'] not in unavailable]
+    assert [result['route'] for result in checked if result['skipped']] == []
+    assert [(result['route'], result['problems']) for result in checked if not result['ok']] == []
+    assert {result['route']: result['status'] for result in checked if result['route'] in ROUTE_EXPECTED_STATUS} == (
+        ROUTE_EXPECTED_STATUS
+    )
+
+
+@pytest.mark.django_db
+def test_route_baseline_reports_error_status(seeded, settings, mocker):
+    from django.test import Client
+
+    from api.main import api
+    from apps.users.jwt_utils import create_user_access_token
+
+    settings.ALLOWED_HOSTS = ['*']
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {create_user_access_token(seeded)}', raise_request_exception=False)
+    mocker.patch(
+        'apps.seafood.services.DashboardStatsService.get_stats', side_effect=RuntimeError('boom')
+    )
+
+    results = {result['route']: result for result in run_route_baseline(api, client)}
+
+    dashboard = results['GET /api/seafood/stats/dashboard']
+    assert dashboard['status'] == 500
+    assert dashboard['ok'] is False
+    assert dashboard['problems'] == ['status 500']
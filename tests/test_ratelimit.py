@@ -0,0 +1,220 @@
+"""
+Rate limiting: token refill and bursts, the in-process fallback while Redis is
+down, and the 429 response of RateLimitMiddleware
+"""
+import json
+import logging
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from api.middleware import RateLimitMiddleware
+from api.ratelimit import LocalTokenBuckets, RateLimiter
+from apps.users.jwt_utils import create_access_token
+
+# 2 request / 60 giây: một token mới mỗi 30 giây
+BUCKET = ('ratelimit:test:ip:1.2.3.4', 2.0, 2 / 60)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """Redis buckets that fail while `down` is set"""
+
+    def __init__(self):
+        self.down = True
+        self.calls = 0
+
+    def consume(self, buckets):
+        self.calls += 1
+        if self.down:
+            raise RedisConnectionError('Connection refused')
+        return 0.0
+
+
+@pytest.fixture
+def clock(mocker):
+    clock = FakeClock()
+    mocker.patch('api.ratelimit.time', clock)
+    return clock
+
+
+# ---------------------------------------------------------------------------
+# LocalTokenBuckets
+# ---------------------------------------------------------------------------
+
+def test_burst_up_to_capacity_then_wait_for_refill():
+    buckets = LocalTokenBuckets()
+
+    assert [buckets.consume([BUCKET], now=0) for _ in range(2)] == [0, 0]
+    assert buckets.consume([BUCKET], now=0) == pytest.approx(30)
+    assert buckets.consume([BUCKET], now=20) == pytest.approx(10)
+    assert buckets.consume([BUCKET], now=30) == 0
+    assert buckets.consume([BUCKET], now=30) == pytest.approx(30)
+
+
+def test_refill_never_exceeds_capacity():
+    buckets = LocalTokenBuckets()
+    buckets.consume([BUCKET], now=0)
+
+    assert [buckets.consume([BUCKET], now=3600) for _ in range(3)] == [0, 0, pytest.approx(30)]
+
+
+def test_all_buckets_or_nothing():
+    buckets = LocalTokenBuckets()
+    user = ('ratelimit:test:user:1', 1.0, 1 / 60)
+    other_ip = ('ratelimit:test:ip:5.6.7.8', 2.0, 2 / 60)
+
+    assert buckets.consume([BUCKET, user], now=0) == 0
+    # Bucket user đã hết: request bị từ chối và bucket IP không bị trừ
+    assert buckets.consume([BUCKET, user], now=0) == pytest.approx(60)
+    assert buckets.consume([BUCKET], now=0) == 0
+    assert buckets.consume([other_ip, user], now=30) == pytest.approx(30)
+    assert buckets.consume([other_ip], now=30) == 0
+
+
+def test_full_buckets_are_evicted(monkeypatch):
+    monkeypatch.setattr(LocalTokenBuckets, 'MAX_KEYS', 3)
+    buckets = LocalTokenBuckets()
+    for index in range(3):
+        buckets.consume([(f'ratelimit:test:ip:{index}', 2.0, 2 / 60)], now=0)
+    buckets.consume([BUCKET], now=10)
+    assert len(buckets._buckets) == 4
+
+    buckets.consume([BUCKET], now=60)
+
+    assert set(buckets._buckets) == {BUCKET[0]}
+
+
+# ---------------------------------------------------------------------------
+# RateLimiter: fallback while Redis is down
+# ---------------------------------------------------------------------------
+
+def test_redis_errors_fall_back_to_local_buckets(clock, caplog):
+    limiter = RateLimiter('redis://localhost:6379/1')
+    limiter.redis = FakeRedis()
+
+    with caplog.at_level(logging.WARNING, logger='api.ratelimit'):
+        results = [limiter.consume([BUCKET]) for _ in range(3)]
+
+    assert results == [0, 0, pytest.approx(30)]
+    # Sau lỗi đầu tiên không gọi lại Redis trong REDIS_RETRY_SECONDS, chỉ log một lần
+    assert limiter.redis.calls == 1
+    assert len([r for r in caplog.records if 'Redis unavailable' in r.getMessage()]) == 1
+
+
+def test_redis_is_retried_after_backoff(clock, caplog):
+    limiter = RateLimiter('redis://localhost:6379/1')
+    limiter.redis = FakeRedis()
+    limiter.consume([BUCKET])
+
+    clock.advance(RateLimiter.REDIS_RETRY_SECONDS)
+    limiter.consume([BUCKET])
+    assert limiter.redis.calls == 2
+
+    clock.advance(RateLimiter.REDIS_RETRY_SECONDS)
+    limiter.redis.down = False
+    with caplog.at_level(logging.INFO, logger='api.ratelimit'):
+        assert [limiter.consume([BUCKET]) for _ in range(5)] == [0] * 5
+
+    assert limiter.redis.calls == 7
+    assert any('Redis available again' in r.getMessage() for r in caplog.records)
+
+
+def test_without_redis_url_only_local_buckets_are_used(clock):
+    limiter = RateLimiter(None)
+
+    assert limiter.redis is None
+    assert [limiter.consume([BUCKET]) for _ in range(3)] == [0, 0, pytest.approx(30)]
+
+
+# ---------------------------------------------------------------------------
+# RateLimitMiddleware
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def limits(settings):
+    settings.RATE_LIMIT_ENABLED = True
+    settings.RATE_LIMIT_REDIS_URL = None
+    settings.RATE_LIMIT_ROUTES = [('/api/users/login', 'auth'), ('/api/', 'api')]
+    # 2 request / 64 giây: tốc độ hồi 1/32 token/giây biểu diễn chính xác bằng float
+    settings.RATE_LIMITS = {'auth': {'ip': (2, 64)}, 'api': {'ip': (100, 60), 'user': (1, 60)}}
+    return settings
+
+
+@pytest.fixture
+def middleware(limits, clock):
+    return RateLimitMiddleware(lambda request: HttpResponse('ok'))
+
+
+def get(middleware, path, ip='1.2.3.4', **headers):
+    return middleware(RequestFactory().get(path, REMOTE_ADDR=ip, **headers))
+
+
+def test_disabled_middleware_is_not_used(settings):
+    from django.core.exceptions import MiddlewareNotUsed
+
+    settings.RATE_LIMIT_ENABLED = False
+    with pytest.raises(MiddlewareNotUsed):
+        RateLimitMiddleware(lambda request: HttpResponse('ok'))
+
+
+def test_429_with_retry_after(middleware, clock):
+    assert [get(middleware, '/api/users/login').status_code for _ in range(2)] == [200, 200]
+
+    response = get(middleware, '/api/users/login')
+    assert response.status_code == 429
+    assert response['Retry-After'] == '32'
+    assert 'detail' in json.loads(response.content)
+
+    clock.advance(16)
+    assert get(middleware, '/api/users/login')['Retry-After'] == '16'
+    assert get(middleware, '/api/users/login', ip='5.6.7.8').status_code == 200
+    clock.advance(16)
+    assert get(middleware, '/api/users/login').status_code == 200
+
+
+def test_user_bucket_follows_the_token_across_ips(middleware):
+    header = {'HTTP_AUTHORIZATION': f"Bearer {create_access_token({'user_id': 'u-1'})}"}
+
+    assert get(middleware, '/api/seafood/orders', ip='1.1.1.1', **header).status_code == 200
+    response = get(middleware, '/api/seafood/orders', ip='2.2.2.2', **header)
+
+    assert response.status_code == 429
+    assert response['Retry-After'] == '60'
+    # Token không hợp lệ: chỉ áp dụng bucket IP
+    assert get(middleware, '/api/seafood/orders', HTTP_AUTHORIZATION='Bearer nope').status_code == 200
+
+
+def test_unmatched_paths_are_not_limited(middleware):
+    assert all(get(middleware, '/admin/').status_code == 200 for _ in range(5))
+
+
+def test_client_ip_behind_trusted_proxy(limits, clock):
+    limits.RATE_LIMIT_TRUSTED_PROXY_COUNT = 1
+    middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+
+    def login(forwarded):
+        return get(middleware, '/api/users/login', ip='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded).status_code
+
+    assert [login('9.9.9.9, 1.2.3.4') for _ in range(3)] == [200, 200, 429]
+    assert login('1.2.3.4, 5.6.7.8') == 200
+
+
+@pytest.mark.django_db
+def test_429_through_the_middleware_stack(limits, clock, client):
+    responses = [client.post('/api/users/login', {}, content_type='application/json') for _ in range(3)]
+
+    assert [r.status_code for r in responses][2] == 429
+    assert responses[2]['Retry-After'] == '32'
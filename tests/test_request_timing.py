@@ -0,0 +1,124 @@
+"""
+Request timing: the Server-Timing header reports the statements the request
+ran, and requests over REQUEST_TIMING_SLOW_MS are logged with their queries
+"""
+import itertools
+import json
+import logging
+import re
+
+import pytest
+
+from api.querybudget import QueryRecorder
+from api.timing import QueryStats, RequestTiming
+
+ORDERS_URL = '/api/seafood/orders'
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>\d+\.\d);desc="(?P<queries>\d+) queries", '
+    r'serialize;dur=(?P<serialize>\d+\.\d), app;dur=(?P<app>\d+\.\d)$'
+)
+
+
+@pytest.fixture
+def slow_log(caplog):
+    """Bản ghi của logger api.slow_requests (logger này không propagate lên root)"""
+    logger = logging.getLogger('api.slow_requests')
+    logger.addHandler(caplog.handler)
+    yield lambda: [json.loads(record.getMessage()) for record in caplog.records if record.name == logger.name]
+    logger.removeHandler(caplog.handler)
+
+
+@pytest.fixture
+def orders(make_user, make_order):
+    seller = make_user()
+    for total in (100_000, 200_000, 300_000):
+        make_order(seller, total=total)
+
+
+def get_orders(client):
+    with QueryRecorder() as recorder:
+        response = client.get(ORDERS_URL)
+    assert response.status_code == 200
+    return response, recorder.count
+
+
+@pytest.fixture
+def ticking_clock(mocker):
+    """perf_counter của api.timing tăng đúng 5 ms mỗi lần đọc"""
+    ticks = itertools.count()
+    mocker.patch('api.timing.time', **{'perf_counter.side_effect': lambda: next(ticks) * 0.005})
+
+
+@pytest.mark.django_db
+def test_server_timing_reports_request_queries(client, orders, settings, ticking_clock):
+    settings.REQUEST_TIMING_SLOW_MS = 60_000
+
+    response, queries = get_orders(client)
+
+    timing = SERVER_TIMING.match(response['Server-Timing'])
+    assert timing, response['Server-Timing']
+    assert int(timing['queries']) == queries > 0
+    # Mỗi câu lệnh đọc đồng hồ hai lần (trước / sau): đúng 5 ms mỗi câu
+    assert float(timing['db']) == queries * 5
+    assert float(timing['serialize']) == 5
+    assert float(timing['app']) > 0
+
+
+@pytest.mark.django_db
+def test_header_can_be_disabled(client, orders, settings):
+    settings.REQUEST_TIMING_HEADER = False
+
+    response, _ = get_orders(client)
+
+    assert 'Server-Timing' not in response
+
+
+@pytest.mark.django_db
+def test_fast_request_is_not_logged(client, orders, settings, slow_log):
+    settings.REQUEST_TIMING_SLOW_MS = 60_000
+
+    get_orders(client)
+
+    assert slow_log() == []
+
+
+@pytest.mark.django_db
+def test_slow_request_is_logged_with_its_queries(client, orders, settings, slow_log, ticking_clock):
+    settings.REQUEST_TIMING_SLOW_MS = 10
+    settings.REQUEST_TIMING_TOP_QUERIES = 2
+
+    response, queries = get_orders(client)
+
+    [line] = slow_log()
+    assert (line['event'], line['method'], line['path'], line['status']) == ('slow_request', 'GET', ORDERS_URL, 200)
+    assert line['db_queries'] == queries
+    assert line['db_ms'] == queries * 5
+    assert line['duration_ms'] == line['db_ms'] + line['serialize_ms'] + line['app_ms'] >= 10
+    assert len(line['slowest_queries']) == min(2, queries)
+    assert all(query['sql'].lstrip().upper().startswith('SELECT') for query in line['slowest_queries'])
+    assert f'{line["db_queries"]} queries' in response['Server-Timing']
+
+
+def test_query_stats_slowest_and_repeated():
+    stats = QueryStats(top_n=2)
+    durations = iter([0.0, 0.0, 0.0, 0.0])
+
+    def execute(sql, params, many, context):
+        return next(durations)
+
+    for sql in ('SELECT a', 'SELECT b', 'SELECT b', 'SELECT c'):
+        stats(execute, sql, None, False, {})
+
+    assert stats.count == 4
+    assert len(stats.slowest()) == 2
+    assert stats.repeated() == [{'count': 2, 'sql': 'SELECT b'}]
+
+
+def test_app_time_excludes_db_and_serialization():
+    timing = RequestTiming()
+    timing.queries.duration = 0.010
+    timing.serialize = 0.005
+    timing.total = 0.050
+
+    assert timing.app == pytest.approx(0.035)
+    assert timing.server_timing() == 'db;dur=10.0;desc="0 queries", serialize;dur=5.0, app;dur=35.0'